@@ -16,6 +16,7 @@ from apps.common.admin_base import (
 )
 
 from .models import Alert, NotificationPreference, Rule, RuleParameter
+from .services import counters
 
 
 class RuleParameterInline(BaseTabularInline):
@@ -238,7 +239,8 @@ class AlertAdmin(TimestampedAdminMixin, BaseAdmin):
             )
             return
 
-        to_ack.update(
+        counters.update_alerts(
+            to_ack,
             acknowledged=True,
             acknowledged_at=timezone.now(),
             acknowledged_by=request.user,
@@ -266,7 +268,8 @@ class AlertAdmin(TimestampedAdminMixin, BaseAdmin):
             return
 
         # Resolve também reconhece automaticamente
-        to_resolve.update(
+        counters.update_alerts(
+            to_resolve,
             resolved=True,
             resolved_at=timezone.now(),
             resolved_by=request.user,
@@ -0,0 +1,160 @@
+"""
+Mede a avaliação de regras reproduzindo um fluxo de leituras (ver
+apps.alerts.services.replay).
+
+Tudo roda numa transação desfeita ao final: regras, equipamentos, leituras e
+alertas criados pelo replay não ficam no banco e nenhuma notificação é
+enviada. Use um tenant de desenvolvimento (as demais regras do schema são
+desativadas durante o replay).
+
+Usage:
+    python manage.py replay_rule_evaluation --schema=umc
+    python manage.py replay_rule_evaluation --schema=umc --rules=500 --parameters=3
+    python manage.py replay_rule_evaluation --schema=umc --readings=readings.csv
+    python manage.py replay_rule_evaluation --schema=umc --evaluator=streaming --json
+"""
+
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from django_tenants.utils import schema_context
+
+from apps.alerts.services import replay
+
+
+class Command(BaseCommand):
+    help = "Replay de leituras contra M regras x P parâmetros: queries, latência e alertas por ciclo"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--schema", required=True, help="Schema do tenant")
+        parser.add_argument(
+            "--readings",
+            help="CSV device_id,sensor_id,ts,value (padrão: fluxo sintético)",
+        )
+        parser.add_argument(
+            "--devices", type=int, default=10, help="Fluxo sintético: devices"
+        )
+        parser.add_argument(
+            "--sensors",
+            type=int,
+            default=4,
+            help="Fluxo sintético: sensores por device",
+        )
+        parser.add_argument(
+            "--minutes", type=int, default=60, help="Fluxo sintético: duração"
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Fluxo sintético: segundos entre leituras",
+        )
+        parser.add_argument(
+            "--rules", type=int, default=100, help="Número de regras (M)"
+        )
+        parser.add_argument(
+            "--parameters", type=int, default=1, help="Parâmetros por regra (P)"
+        )
+        parser.add_argument(
+            "--trigger-ratio",
+            type=float,
+            default=0.1,
+            help="Fração de parâmetros que disparam",
+        )
+        parser.add_argument(
+            "--aggregation",
+            default="all",
+            choices=["latest", "all", "mean", "percentile"],
+            help="RuleParameter.aggregation",
+        )
+        parser.add_argument(
+            "--duration", type=int, default=5, help="RuleParameter.duration (min)"
+        )
+        parser.add_argument(
+            "--evaluator",
+            action="append",
+            choices=sorted(replay.EVALUATORS),
+            help="Avaliador(es) medido(s) (padrão: todos)",
+        )
+        parser.add_argument("--cycle", type=int, default=300, help="Segundos por ciclo")
+        parser.add_argument("--max-cycles", type=int, help="Limita o número de ciclos")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--json", action="store_true", help="Saída em JSON")
+
+    def handle(self, *args, **options):
+        if options["verbosity"] < 2:
+            logging.getLogger("apps.alerts").setLevel(logging.WARNING)
+
+        if options["readings"]:
+            readings = replay.load_readings_csv(options["readings"])
+        else:
+            readings = replay.synthetic_readings(
+                devices=options["devices"],
+                sensors=options["sensors"],
+                minutes=options["minutes"],
+                interval_seconds=options["interval"],
+                seed=options["seed"],
+            )
+        if not readings:
+            raise CommandError("Nenhuma leitura para reproduzir")
+
+        schema_name = options["schema"]
+        summaries = []
+        for evaluator in options["evaluator"] or sorted(replay.EVALUATORS):
+            # Cada avaliador parte do mesmo estado: transação desfeita ao final
+            with schema_context(schema_name), transaction.atomic():
+                equipment = replay.prepare_equipment(readings)
+                rule_ids = replay.create_rules(
+                    equipment,
+                    readings,
+                    count=options["rules"],
+                    parameters=options["parameters"],
+                    trigger_ratio=options["trigger_ratio"],
+                    aggregation=options["aggregation"],
+                    duration=options["duration"],
+                    seed=options["seed"],
+                )
+                replay.isolate_rules(schema_name, rule_ids)
+
+                report = replay.replay(
+                    schema_name,
+                    readings,
+                    evaluator=evaluator,
+                    cycle_seconds=options["cycle"],
+                    max_cycles=options["max_cycles"],
+                )
+                summaries.append(report.summary())
+                transaction.set_rollback(True)
+            replay.invalidate_rule_index(schema_name)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(summaries, indent=2))
+            return
+
+        for summary in summaries:
+            self._print_summary(summary)
+
+    def _print_summary(self, summary):
+        queries = summary["queries_per_cycle"]
+        latency = summary["latency_ms"]
+        self.stdout.write(
+            self.style.HTTP_INFO(f"\n🔁 Avaliador: {summary['evaluator']}")
+        )
+        self.stdout.write(
+            f"  Regras: {summary['rules']} ({summary['parameters']} parâmetros), "
+            f"leituras: {summary['readings']}, ciclos: {summary['cycles']}"
+        )
+        self.stdout.write(
+            f"  Queries/ciclo: min {queries['min']}, média {queries['mean']}, máx {queries['max']}"
+        )
+        self.stdout.write(
+            f"  Latência (ms): p50 {latency['p50']}, p95 {latency['p95']}, "
+            f"p99 {latency['p99']}, máx {latency['max']}"
+        )
+        style = self.style.ERROR if summary["errors"] else self.style.SUCCESS
+        self.stdout.write(
+            style(f"  Alertas: {summary['alerts']}, erros: {summary['errors']}")
+        )
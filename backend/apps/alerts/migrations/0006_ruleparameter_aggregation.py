@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("alerts", "0005_alert_asset_tag_trgm_index"),
+    ]
+
+    operations = [
+        # Parâmetros existentes mantêm a avaliação pela última leitura;
+        # novos parâmetros passam a exigir a condição sustentada na janela
+        migrations.AddField(
+            model_name="ruleparameter",
+            name="aggregation",
+            field=models.CharField(
+                choices=[
+                    ("latest", "Última leitura"),
+                    ("all", "Todas as amostras"),
+                    ("mean", "Média"),
+                    ("percentile", "Percentil"),
+                ],
+                default="latest",
+                help_text="Como a condição é avaliada nos últimos `duration` minutos",
+                max_length=20,
+                verbose_name="Agregação da Janela",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ruleparameter",
+            name="aggregation",
+            field=models.CharField(
+                choices=[
+                    ("latest", "Última leitura"),
+                    ("all", "Todas as amostras"),
+                    ("mean", "Média"),
+                    ("percentile", "Percentil"),
+                ],
+                default="all",
+                help_text="Como a condição é avaliada nos últimos `duration` minutos",
+                max_length=20,
+                verbose_name="Agregação da Janela",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ruleparameter",
+            name="percentile",
+            field=models.FloatField(
+                default=95.0,
+                help_text="Percentil (0-100) usado com a agregação 'percentile'",
+                verbose_name="Percentil",
+            ),
+        ),
+    ]
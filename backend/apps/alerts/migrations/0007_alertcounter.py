@@ -0,0 +1,77 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Alert = apps.get_model("alerts", "Alert")
+    AlertCounter = apps.get_model("alerts", "AlertCounter")
+
+    rows = (
+        Alert.objects.values("asset_tag", "severity", "rule_id")
+        .annotate(
+            active=Count("id", filter=Q(acknowledged=False, resolved=False)),
+            acknowledged=Count("id", filter=Q(acknowledged=True, resolved=False)),
+            resolved=Count("id", filter=Q(resolved=True)),
+        )
+        .order_by()
+    )
+
+    counters = {}
+    for row in rows:
+        key = (row["asset_tag"], row["severity"], row["rule_id"] or 0)
+        counter = counters.setdefault(
+            key,
+            AlertCounter(asset_tag=key[0], severity=key[1], rule_id=key[2]),
+        )
+        counter.active += row["active"]
+        counter.acknowledged += row["acknowledged"]
+        counter.resolved += row["resolved"]
+
+    AlertCounter.objects.bulk_create(counters.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("alerts", "0006_ruleparameter_aggregation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AlertCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "asset_tag",
+                    models.CharField(max_length=100, verbose_name="Tag do Equipamento"),
+                ),
+                ("severity", models.CharField(max_length=20, verbose_name="Severidade")),
+                ("rule_id", models.IntegerField(default=0, verbose_name="Regra")),
+                ("active", models.IntegerField(default=0, verbose_name="Ativos")),
+                (
+                    "acknowledged",
+                    models.IntegerField(default=0, verbose_name="Reconhecidos"),
+                ),
+                ("resolved", models.IntegerField(default=0, verbose_name="Resolvidos")),
+            ],
+            options={
+                "verbose_name": "Contador de Alertas",
+                "verbose_name_plural": "Contadores de Alertas",
+                "db_table": "alerts_alert_counter",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("asset_tag", "severity", "rule_id"),
+                        name="alerts_counter_unique_key",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
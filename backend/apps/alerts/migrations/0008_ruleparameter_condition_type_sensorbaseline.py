@@ -0,0 +1,67 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("alerts", "0007_alertcounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ruleparameter",
+            name="condition_type",
+            field=models.CharField(
+                choices=[
+                    ("threshold", "Limite fixo"),
+                    ("anomaly", "Desvio da média móvel (k·σ)"),
+                    ("seasonal", "Desvio da linha de base sazonal (k·σ)"),
+                ],
+                default="threshold",
+                max_length=20,
+                verbose_name="Tipo de Condição",
+            ),
+        ),
+        migrations.CreateModel(
+            name="SensorBaseline",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("device_id", models.CharField(max_length=255, verbose_name="Device")),
+                ("sensor_id", models.CharField(max_length=255, verbose_name="Sensor")),
+                ("mean", models.FloatField(default=0.0, verbose_name="Média")),
+                ("variance", models.FloatField(default=0.0, verbose_name="Variância")),
+                (
+                    "hours",
+                    models.IntegerField(default=0, verbose_name="Horas incorporadas"),
+                ),
+                (
+                    "hourly",
+                    models.JSONField(default=list, verbose_name="Linha de base por hora"),
+                ),
+                (
+                    "updated_through",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Atualizada até"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Linha de Base de Sensor",
+                "verbose_name_plural": "Linhas de Base de Sensores",
+                "db_table": "alerts_sensor_baseline",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("device_id", "sensor_id"),
+                        name="alerts_sensor_baseline_unique_key",
+                    )
+                ],
+            },
+        ),
+    ]
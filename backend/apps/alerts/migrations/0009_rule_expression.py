@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("alerts", "0008_ruleparameter_condition_type_sensorbaseline"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rule",
+            name="expression",
+            field=models.TextField(
+                blank=True,
+                default="",
+                help_text="Combina sensores do equipamento com AND/OR/NOT; substitui os parâmetros",
+                verbose_name="Expressão Composta",
+            ),
+        ),
+    ]
@@ -0,0 +1,110 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("alerts", "0009_rule_expression"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="alert",
+            index=models.Index(
+                fields=["rule", "parameter_key", "resolved", "acknowledged", "-triggered_at"],
+                name="alerts_alert_cooldown_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="alert",
+            index=models.Index(
+                condition=models.Q(("resolved", True)),
+                fields=["resolved_at"],
+                name="alerts_alert_resolved_at_idx",
+            ),
+        ),
+        migrations.CreateModel(
+            name="AlertHistory",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("alert_id", models.BigIntegerField(verbose_name="Alerta")),
+                (
+                    "rule_id",
+                    models.BigIntegerField(blank=True, null=True, verbose_name="Regra"),
+                ),
+                ("message", models.TextField(verbose_name="Mensagem")),
+                ("severity", models.CharField(max_length=20, verbose_name="Severidade")),
+                (
+                    "asset_tag",
+                    models.CharField(max_length=100, verbose_name="Tag do Equipamento"),
+                ),
+                (
+                    "parameter_key",
+                    models.CharField(max_length=100, verbose_name="Parâmetro"),
+                ),
+                ("parameter_value", models.FloatField(verbose_name="Valor do Parâmetro")),
+                ("threshold", models.FloatField(verbose_name="Limite")),
+                ("triggered_at", models.DateTimeField(verbose_name="Disparado em")),
+                (
+                    "acknowledged_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Reconhecido em"),
+                ),
+                (
+                    "acknowledged_by_id",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="Reconhecido por"
+                    ),
+                ),
+                ("resolved_at", models.DateTimeField(verbose_name="Resolvido em")),
+                (
+                    "resolved_by_id",
+                    models.BigIntegerField(blank=True, null=True, verbose_name="Resolvido por"),
+                ),
+                (
+                    "work_order_id",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="Ordem de Serviço"
+                    ),
+                ),
+                ("notes", models.TextField(blank=True, verbose_name="Notas")),
+                ("archived_at", models.DateTimeField(verbose_name="Arquivado em")),
+            ],
+            options={
+                "verbose_name": "Histórico de Alerta",
+                "verbose_name_plural": "Histórico de Alertas",
+                "db_table": "alerts_alert_history",
+                "ordering": ["-resolved_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["asset_tag", "-resolved_at"], name="alerts_history_asset_idx"
+                    ),
+                    models.Index(
+                        fields=["rule_id", "-resolved_at"], name="alerts_history_rule_idx"
+                    ),
+                    models.Index(fields=["alert_id"], name="alerts_history_alert_idx"),
+                ],
+            },
+        ),
+        # Hypertable exige que chaves únicas incluam a coluna de tempo (ver Reading)
+        migrations.RunSQL(
+            sql="ALTER TABLE alerts_alert_history DROP CONSTRAINT IF EXISTS alerts_alert_history_pkey;",
+            reverse_sql="-- Cannot restore primary key after hypertable conversion",
+        ),
+        migrations.RunSQL(
+            sql="""
+            SELECT create_hypertable(
+                'alerts_alert_history', 'resolved_at',
+                chunk_time_interval => INTERVAL '30 days',
+                if_not_exists => TRUE
+            );
+            """,
+            reverse_sql="-- Cannot reverse hypertable conversion safely",
+        ),
+    ]
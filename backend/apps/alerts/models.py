@@ -34,6 +34,22 @@ class RuleParameter(models.Model):
         ("Low", "Baixo"),
     ]
 
+    # Tipo de condição: limite fixo ou desvio estatístico (ver services.anomaly).
+    # Nos tipos de anomalia ``threshold`` é o multiplicador k de σ.
+    CONDITION_TYPE_CHOICES = [
+        ("threshold", "Limite fixo"),
+        ("anomaly", "Desvio da média móvel (k·σ)"),
+        ("seasonal", "Desvio da linha de base sazonal (k·σ)"),
+    ]
+
+    # Como a janela de `duration` minutos é avaliada (ver services.windows)
+    AGGREGATION_CHOICES = [
+        ("latest", "Última leitura"),
+        ("all", "Todas as amostras"),
+        ("mean", "Média"),
+        ("percentile", "Percentil"),
+    ]
+
     # Relacionamento com a regra
     rule = models.ForeignKey(
         "Rule",
@@ -52,9 +68,27 @@ class RuleParameter(models.Model):
     operator = models.CharField(
         max_length=10, choices=OPERATOR_CHOICES, verbose_name="Operador"
     )
+    condition_type = models.CharField(
+        max_length=20,
+        choices=CONDITION_TYPE_CHOICES,
+        default="threshold",
+        verbose_name="Tipo de Condição",
+    )
     threshold = models.FloatField(verbose_name="Valor Limite")
     unit = models.CharField(max_length=50, blank=True, verbose_name="Unidade")
     duration = models.IntegerField(default=5, verbose_name="Duração (minutos)")
+    aggregation = models.CharField(
+        max_length=20,
+        choices=AGGREGATION_CHOICES,
+        default="all",
+        verbose_name="Agregação da Janela",
+        help_text="Como a condição é avaliada nos últimos `duration` minutos",
+    )
+    percentile = models.FloatField(
+        default=95.0,
+        verbose_name="Percentil",
+        help_text="Percentil (0-100) usado com a agregação 'percentile'",
+    )
 
     # Severidade e mensagem
     severity = models.CharField(
@@ -174,6 +208,14 @@ class Rule(models.Model):
         null=True,
         verbose_name="Severidade (deprecated)",
     )
+    # Regra composta: expressão sobre vários sensores do equipamento
+    # (ex.: "supply_temp > 12 AND compressor_current < 2"), ver services.expressions
+    expression = models.TextField(
+        blank=True,
+        default="",
+        verbose_name="Expressão Composta",
+        help_text="Combina sensores do equipamento com AND/OR/NOT; substitui os parâmetros",
+    )
     actions = models.JSONField(
         default=list,
         verbose_name="Ações ao Disparar",
@@ -208,6 +250,15 @@ class Rule(models.Model):
     def __str__(self):
         return f"{self.name} - {self.equipment.name if self.equipment else 'N/A'}"
 
+    @property
+    def compiled_expression(self):
+        """Expressão composta compilada (cache por texto, sem reparse a cada ciclo)"""
+        from .services.expressions import compile_expression
+
+        if not self.expression:
+            return None
+        return compile_expression(self.expression)
+
     def get_condition_display(self):
         """Retorna a condição formatada para exibição"""
         operator_symbols = {
@@ -302,6 +353,23 @@ class Alert(models.Model):
                 name="alerts_alert_asset_tag_trgm",
                 opclasses=["gin_trgm_ops"],
             ),
+            # Cooldown: (regra, parâmetro) + estado, alerta mais recente primeiro
+            models.Index(
+                fields=[
+                    "rule",
+                    "parameter_key",
+                    "resolved",
+                    "acknowledged",
+                    "-triggered_at",
+                ],
+                name="alerts_alert_cooldown_idx",
+            ),
+            # Arquivamento de resolvidos antigos (services.history)
+            models.Index(
+                fields=["resolved_at"],
+                condition=models.Q(resolved=True),
+                name="alerts_alert_resolved_at_idx",
+            ),
         ]
 
     def __str__(self):
@@ -317,6 +385,147 @@ class Alert(models.Model):
         """Verifica se o alerta está ativo (não reconhecido e não resolvido)"""
         return not self.acknowledged and not self.resolved
 
+    @property
+    def counter_state(self):
+        """Coluna de AlertCounter em que o alerta é contado"""
+        if self.resolved:
+            return "resolved"
+        if self.acknowledged:
+            return "acknowledged"
+        return "active"
+
+
+class AlertCounter(models.Model):
+    """
+    Contadores de alertas por (asset_tag, severity, rule), mantidos de forma
+    incremental pelos signals de Alert (ver services.counters).
+
+    Usados pelos dashboards no lugar de agregações sobre alerts_alert.
+    ``rule_id`` acompanha Alert.rule (0 = alerta sem regra); não é FK para
+    que os contadores sobrevivam à exclusão da regra (ver counters.detach_rule).
+    """
+
+    asset_tag = models.CharField(max_length=100, verbose_name="Tag do Equipamento")
+    severity = models.CharField(max_length=20, verbose_name="Severidade")
+    rule_id = models.IntegerField(default=0, verbose_name="Regra")
+
+    active = models.IntegerField(default=0, verbose_name="Ativos")
+    acknowledged = models.IntegerField(default=0, verbose_name="Reconhecidos")
+    resolved = models.IntegerField(default=0, verbose_name="Resolvidos")
+
+    class Meta:
+        db_table = "alerts_alert_counter"
+        verbose_name = "Contador de Alertas"
+        verbose_name_plural = "Contadores de Alertas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["asset_tag", "severity", "rule_id"],
+                name="alerts_counter_unique_key",
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.asset_tag}/{self.severity}/{self.rule_id}: "
+            f"{self.active} ativos, {self.acknowledged} reconhecidos, {self.resolved} resolvidos"
+        )
+
+
+class AlertHistory(models.Model):
+    """
+    Histórico de alertas resolvidos, arquivados de alerts_alert pela limpeza
+    periódica (ver services.history).
+
+    Hypertable do TimescaleDB particionada por ``resolved_at``: o histórico
+    antigo é descartado com drop_chunks. Sem FKs (regra, usuários e OS podem
+    ser excluídos depois do arquivamento) e sem chave primária, como Reading.
+    """
+
+    alert_id = models.BigIntegerField(verbose_name="Alerta")
+    rule_id = models.BigIntegerField(null=True, blank=True, verbose_name="Regra")
+
+    message = models.TextField(verbose_name="Mensagem")
+    severity = models.CharField(max_length=20, verbose_name="Severidade")
+    asset_tag = models.CharField(max_length=100, verbose_name="Tag do Equipamento")
+    parameter_key = models.CharField(max_length=100, verbose_name="Parâmetro")
+    parameter_value = models.FloatField(verbose_name="Valor do Parâmetro")
+    threshold = models.FloatField(verbose_name="Limite")
+
+    triggered_at = models.DateTimeField(verbose_name="Disparado em")
+    acknowledged_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Reconhecido em"
+    )
+    acknowledged_by_id = models.BigIntegerField(
+        null=True, blank=True, verbose_name="Reconhecido por"
+    )
+    resolved_at = models.DateTimeField(verbose_name="Resolvido em")
+    resolved_by_id = models.BigIntegerField(
+        null=True, blank=True, verbose_name="Resolvido por"
+    )
+    work_order_id = models.BigIntegerField(
+        null=True, blank=True, verbose_name="Ordem de Serviço"
+    )
+    notes = models.TextField(blank=True, verbose_name="Notas")
+
+    archived_at = models.DateTimeField(verbose_name="Arquivado em")
+
+    class Meta:
+        db_table = "alerts_alert_history"
+        verbose_name = "Histórico de Alerta"
+        verbose_name_plural = "Histórico de Alertas"
+        ordering = ["-resolved_at"]
+        indexes = [
+            models.Index(
+                fields=["asset_tag", "-resolved_at"], name="alerts_history_asset_idx"
+            ),
+            models.Index(
+                fields=["rule_id", "-resolved_at"], name="alerts_history_rule_idx"
+            ),
+            models.Index(fields=["alert_id"], name="alerts_history_alert_idx"),
+        ]
+
+    def __str__(self):
+        return f"[Arquivado] {self.asset_tag} - {self.message[:50]}"
+
+
+class SensorBaseline(models.Model):
+    """
+    Linha de base estatística de um sensor (device_id, sensor_id) usada pelas
+    regras de anomalia (ver services.anomaly).
+
+    Atualizada de forma incremental a partir de agregados horários de
+    Reading: só as horas completas após ``updated_through`` são incorporadas.
+    """
+
+    device_id = models.CharField(max_length=255, verbose_name="Device")
+    sensor_id = models.CharField(max_length=255, verbose_name="Sensor")
+
+    # Média e variância móveis (EWMA sobre os agregados horários)
+    mean = models.FloatField(default=0.0, verbose_name="Média")
+    variance = models.FloatField(default=0.0, verbose_name="Variância")
+    hours = models.IntegerField(default=0, verbose_name="Horas incorporadas")
+
+    # Linha de base sazonal: 24 posições [horas, média, variância] por hora do dia
+    hourly = models.JSONField(default=list, verbose_name="Linha de base por hora")
+
+    updated_through = models.DateTimeField(
+        null=True, blank=True, verbose_name="Atualizada até"
+    )
+
+    class Meta:
+        db_table = "alerts_sensor_baseline"
+        verbose_name = "Linha de Base de Sensor"
+        verbose_name_plural = "Linhas de Base de Sensores"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device_id", "sensor_id"],
+                name="alerts_sensor_baseline_unique_key",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.device_id}/{self.sensor_id}: {self.mean:.2f} ± {self.variance ** 0.5:.2f}"
+
 
 class NotificationPreference(models.Model):
     """
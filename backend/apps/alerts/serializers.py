@@ -5,6 +5,7 @@ Serializers para o sistema de Alertas e Regras
 from rest_framework import serializers
 
 from .models import Alert, NotificationPreference, Rule, RuleParameter
+from .services.expressions import ExpressionError, compile_expression
 
 
 class RuleParameterSerializer(serializers.ModelSerializer):
@@ -36,9 +37,12 @@ class RuleParameterSerializer(serializers.ModelSerializer):
             "parameter_key",
             "variable_key",
             "operator",
+            "condition_type",
             "threshold",
             "unit",
             "duration",
+            "aggregation",
+            "percentile",
             "severity",
             "message_template",
             "order",
@@ -50,6 +54,9 @@ class RuleParameterSerializer(serializers.ModelSerializer):
             "variable_key": {"required": False, "allow_blank": True},
             "unit": {"required": False, "allow_blank": True},
             "order": {"required": False, "default": 0},
+            "aggregation": {"required": False},
+            "percentile": {"required": False},
+            "condition_type": {"required": False},
         }
 
     def validate_severity(self, value):
@@ -64,6 +71,12 @@ class RuleParameterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Duração deve ser maior que zero.")
         return value
 
+    def validate_percentile(self, value):
+        """Valida que o percentil esteja entre 0 e 100"""
+        if value is not None and not 0 < value <= 100:
+            raise serializers.ValidationError("Percentil deve estar entre 0 e 100.")
+        return value
+
     def validate_threshold(self, value):
         """Valida que threshold seja um número válido"""
         if value is None:
@@ -72,6 +85,21 @@ class RuleParameterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Valor limite deve ser um número.")
         return value
 
+    def validate(self, attrs):
+        """Em regras de anomalia o limite é o multiplicador k de σ"""
+        attrs = super().validate(attrs)
+        condition_type = attrs.get(
+            "condition_type", getattr(self.instance, "condition_type", "threshold")
+        )
+        threshold = attrs.get("threshold", getattr(self.instance, "threshold", None))
+        if condition_type != "threshold" and threshold is not None and threshold <= 0:
+            raise serializers.ValidationError(
+                {
+                    "threshold": "Em regras de anomalia o limite (k·σ) deve ser maior que zero."
+                }
+            )
+        return attrs
+
 
 class RuleSerializer(serializers.ModelSerializer):
     """Serializer para Rule com suporte a múltiplos parâmetros"""
@@ -105,6 +133,8 @@ class RuleSerializer(serializers.ModelSerializer):
             "equipment_tag",
             # Campo write_only para aceitar do frontend
             "parameters",
+            # Regra composta (substitui os parâmetros quando preenchida)
+            "expression",
             # Campos antigos (mantidos para compatibilidade)
             "parameter_key",
             "variable_key",
@@ -158,11 +188,26 @@ class RuleSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Valor limite deve ser um número.")
         return value
 
+    def validate_expression(self, value):
+        """Valida (compilando) a expressão de regra composta"""
+        value = (value or "").strip()
+        if not value:
+            return ""
+        try:
+            compile_expression(value)
+        except ExpressionError as e:
+            raise serializers.ValidationError(f"Expressão inválida: {e}") from e
+        return value
+
     def validate(self, data):
-        """Validação geral - deve ter parameters OU campos antigos"""
+        """Validação geral - deve ter parameters, expressão OU campos antigos"""
         parameters = data.get("parameters", [])
         has_old_format = data.get("parameter_key") is not None
 
+        # Regra composta dispensa parâmetros
+        if data.get("expression") and "parameters" not in data:
+            return data
+
         # Se veio parameters, validar que tem pelo menos um
         if "parameters" in data and not parameters:
             raise serializers.ValidationError(
@@ -0,0 +1,248 @@
+"""
+Regras de anomalia: desvio de k·σ em relação à média móvel do sensor
+(``condition_type="anomaly"``) ou à linha de base sazonal da mesma hora do
+dia (``condition_type="seasonal"``).
+
+Linhas de base (SensorBaseline) são atualizadas de forma incremental a partir
+de agregados horários de Reading (``time_bucket('1 hour')``): a cada ciclo só
+as horas completas ainda não incorporadas são lidas, numa única query para
+todos os sensores do tenant. A edição Apache do TimescaleDB não tem continuous
+aggregates, então o agregado horário é calculado sob demanda só para essa
+janela incremental.
+
+A pontuação (z-score) de todos os sensores do tenant é vetorizada com NumPy.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .planner import ReadingKey, ReadingSnapshot
+
+logger = logging.getLogger(__name__)
+
+ANOMALY_CONDITION_TYPES = ("anomaly", "seasonal")
+
+HOURS_PER_DAY = 24
+
+
+def is_anomaly(param) -> bool:
+    return getattr(param, "condition_type", "threshold") in ANOMALY_CONDITION_TYPES
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def _hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _ewma(mean: float, variance: float, value: float, spread: float, alpha: float):
+    """
+    Atualiza média/variância exponenciais com um agregado horário.
+
+    ``spread`` é a variância das leituras dentro da hora, somada ao desvio da
+    média horária para que σ represente leituras individuais.
+    """
+    delta = value - mean
+    mean = mean + alpha * delta
+    variance = (1 - alpha) * (variance + alpha * delta * delta) + alpha * spread
+    return mean, variance
+
+
+def fold_bucket(baseline, bucket: datetime, value: float, spread: float):
+    """Incorpora um agregado horário (média ``value``) à linha de base."""
+    alpha = _setting("ALERTS_ANOMALY_EWMA_ALPHA", 0.1)
+    seasonal_alpha = _setting("ALERTS_ANOMALY_SEASONAL_ALPHA", 0.2)
+
+    if baseline.hours == 0:
+        baseline.mean, baseline.variance = value, spread
+    else:
+        baseline.mean, baseline.variance = _ewma(
+            baseline.mean, baseline.variance, value, spread, alpha
+        )
+    baseline.hours += 1
+
+    hourly = baseline.hourly or [[0, 0.0, 0.0] for _ in range(HOURS_PER_DAY)]
+    slot = hourly[timezone.localtime(bucket).hour]
+    if slot[0] == 0:
+        slot[1], slot[2] = value, spread
+    else:
+        slot[1], slot[2] = _ewma(slot[1], slot[2], value, spread, seasonal_alpha)
+    slot[0] += 1
+    baseline.hourly = hourly
+
+
+def fetch_hourly_buckets(
+    keys: Iterable[ReadingKey], since: datetime, until: datetime
+) -> Dict[ReadingKey, List[Tuple[datetime, float, float]]]:
+    """Agregados horários (bucket, média, variância) de vários sensores numa query."""
+    keys = list(set(keys))
+    if not keys:
+        return {}
+
+    buckets = {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT r.device_id, r.sensor_id, time_bucket('1 hour', r.ts) AS bucket,
+                   avg(r.value), coalesce(var_samp(r.value), 0)
+            FROM reading r
+            JOIN unnest(%s::text[], %s::text[]) AS k(device_id, sensor_id)
+              ON r.device_id = k.device_id AND r.sensor_id = k.sensor_id
+            WHERE r.ts >= %s AND r.ts < %s
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2, 3
+            """,
+            [[d for d, _ in keys], [s for _, s in keys], since, until],
+        )
+        for device_id, sensor_id, bucket, value, spread in cursor.fetchall():
+            buckets.setdefault((device_id, sensor_id), []).append(
+                (bucket, float(value), float(spread))
+            )
+    return buckets
+
+
+def refresh_baselines(keys: Iterable[ReadingKey], now: Optional[datetime] = None):
+    """
+    Carrega as linhas de base dos sensores e incorpora as horas completas
+    ainda não processadas.
+
+    Returns:
+        Dict (device_id, sensor_id) -> SensorBaseline
+    """
+    from apps.alerts.models import SensorBaseline
+
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    now = now or timezone.now()
+    current_hour = _hour_start(now)
+    backfill = timedelta(days=_setting("ALERTS_ANOMALY_BACKFILL_DAYS", 14))
+
+    baselines = {
+        (baseline.device_id, baseline.sensor_id): baseline
+        for baseline in SensorBaseline.objects.filter(
+            device_id__in={d for d, _ in keys}, sensor_id__in={s for _, s in keys}
+        )
+        if (baseline.device_id, baseline.sensor_id) in keys
+    }
+
+    created = []
+    for device_id, sensor_id in keys - baselines.keys():
+        baseline = SensorBaseline(device_id=device_id, sensor_id=sensor_id)
+        baselines[(device_id, sensor_id)] = baseline
+        created.append(baseline)
+
+    # Só consulta Reading se alguma linha de base tem horas pendentes
+    stale = {
+        key: baseline.updated_through or current_hour - backfill
+        for key, baseline in baselines.items()
+        if baseline.updated_through is None or baseline.updated_through < current_hour
+    }
+    if not stale:
+        return baselines
+
+    buckets = fetch_hourly_buckets(stale.keys(), min(stale.values()), current_hour)
+    for key, since in stale.items():
+        baseline = baselines[key]
+        for bucket, value, spread in buckets.get(key, []):
+            if bucket >= since:
+                fold_bucket(baseline, bucket, value, spread)
+        baseline.updated_through = current_hour
+
+    existing = [baselines[key] for key in stale if baselines[key].pk]
+    SensorBaseline.objects.bulk_create(created)
+    SensorBaseline.objects.bulk_update(
+        existing, ["mean", "variance", "hours", "hourly", "updated_through"]
+    )
+
+    logger.debug(f"Baselines refreshed for {len(stale)} sensors ({len(created)} new)")
+    return baselines
+
+
+def load_baselines(keys: Iterable[ReadingKey]):
+    """Linhas de base existentes (sem atualização), para a avaliação em streaming."""
+    from apps.alerts.models import SensorBaseline
+
+    keys = set(keys)
+    if not keys:
+        return {}
+    return {
+        (baseline.device_id, baseline.sensor_id): baseline
+        for baseline in SensorBaseline.objects.filter(
+            device_id__in={d for d, _ in keys}, sensor_id__in={s for _, s in keys}
+        )
+        if (baseline.device_id, baseline.sensor_id) in keys
+    }
+
+
+class AnomalyScores:
+    """
+    z-scores (com sinal) de todas as leituras do tenant, calculados de uma vez.
+
+    ``rolling[key]`` é o desvio em relação à média móvel e ``seasonal[key]`` em
+    relação à linha de base da hora do dia; NaN quando a linha de base ainda
+    não tem histórico suficiente.
+    """
+
+    def __init__(self, readings: Dict[ReadingKey, ReadingSnapshot], baselines):
+        import numpy as np
+
+        min_hours = _setting("ALERTS_ANOMALY_MIN_HOURS", 24)
+        min_days = _setting("ALERTS_ANOMALY_SEASONAL_MIN_DAYS", 3)
+        min_std = _setting("ALERTS_ANOMALY_MIN_STD", 0.01)
+
+        self.keys = [key for key in readings if key in baselines]
+        count = len(self.keys)
+
+        values = np.empty(count)
+        means = np.full(count, np.nan)
+        variances = np.full(count, np.nan)
+        seasonal_means = np.full(count, np.nan)
+        seasonal_variances = np.full(count, np.nan)
+
+        for index, key in enumerate(self.keys):
+            reading = readings[key]
+            baseline = baselines[key]
+            values[index] = reading.value
+            if baseline.hours >= min_hours:
+                means[index] = baseline.mean
+                variances[index] = baseline.variance
+            if baseline.hourly:
+                hours, mean, variance = baseline.hourly[
+                    timezone.localtime(reading.ts).hour
+                ]
+                if hours >= min_days:
+                    seasonal_means[index] = mean
+                    seasonal_variances[index] = variance
+
+        with np.errstate(invalid="ignore"):
+            rolling = (values - means) / np.maximum(np.sqrt(variances), min_std)
+            seasonal = (values - seasonal_means) / np.maximum(
+                np.sqrt(seasonal_variances), min_std
+            )
+
+        self.rolling = dict(zip(self.keys, rolling.tolist(), strict=False))
+        self.seasonal = dict(zip(self.keys, seasonal.tolist(), strict=False))
+
+    def score(self, param, key: ReadingKey) -> Optional[float]:
+        """
+        Desvio (em σ) na direção do operador do parâmetro: ``>``/``>=`` só
+        desvios para cima, ``<``/``<=`` só para baixo, demais nos dois sentidos.
+        """
+        scores = self.seasonal if param.condition_type == "seasonal" else self.rolling
+        z = scores.get(key)
+        if z is None or z != z:  # sem histórico (NaN)
+            return None
+        if param.operator in (">", ">="):
+            return z
+        if param.operator in ("<", "<="):
+            return -z
+        return abs(z)
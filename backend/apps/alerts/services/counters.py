@@ -0,0 +1,221 @@
+"""
+Contadores de alertas (AlertCounter) mantidos de forma incremental.
+
+Cada alerta é contado em exatamente uma coluna (active, acknowledged ou
+resolved) da linha (asset_tag, severity, rule_id). Criação, reconhecimento,
+resolução e exclusão de alertas aplicam deltas com um UPSERT atômico, na mesma
+transação da alteração do alerta (ver apps.alerts.signals).
+
+Os endpoints de estatísticas e o ``AssetViewSet.complete`` leem os contadores
+em vez de agregar alerts_alert. Alterações em massa de estado devem passar
+por ``update_alerts`` (o ``QuerySet.update`` não dispara signals);
+``rebuild_counters`` recalcula tudo a partir dos alertas (reparo).
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+logger = logging.getLogger(__name__)
+
+STATES = ("active", "acknowledged", "resolved")
+
+# Severidades no formato do frontend (MAIÚSCULAS)
+SEVERITIES = ("Critical", "High", "Medium", "Low")
+
+
+def apply_delta(
+    asset_tag: str, severity: str, rule_id: Optional[int], deltas: Dict[str, int]
+):
+    """Soma ``deltas`` ({estado: n}) à linha de contadores (cria se não existir)."""
+    values = [deltas.get(state, 0) for state in STATES]
+    if not any(values):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO alerts_alert_counter
+                (asset_tag, severity, rule_id, active, acknowledged, resolved)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (asset_tag, severity, rule_id) DO UPDATE SET
+                active = alerts_alert_counter.active + EXCLUDED.active,
+                acknowledged = alerts_alert_counter.acknowledged + EXCLUDED.acknowledged,
+                resolved = alerts_alert_counter.resolved + EXCLUDED.resolved
+            """,
+            [asset_tag, severity, rule_id or 0, *values],
+        )
+
+
+def record_transition(alert, old_state: Optional[str], new_state: Optional[str]):
+    """Move o alerta entre colunas (None = alerta inexistente)."""
+    if old_state == new_state:
+        return
+
+    deltas = defaultdict(int)
+    if old_state:
+        deltas[old_state] -= 1
+    if new_state:
+        deltas[new_state] += 1
+    apply_delta(alert.asset_tag, alert.severity, alert.rule_id, deltas)
+
+
+def update_alerts(queryset, **fields) -> int:
+    """
+    ``QuerySet.update`` de alertas que mantém os contadores.
+
+    Os alertas são travados e agrupados por (asset_tag, severity, rule_id) e
+    estado atual; os deltas são aplicados na mesma transação do update.
+
+    Returns:
+        Número de alertas atualizados
+    """
+    from apps.alerts.models import Alert
+
+    with transaction.atomic():
+        ids = list(queryset.select_for_update().values_list("id", flat=True))
+        alerts = Alert.objects.filter(id__in=ids)
+        rows = (
+            alerts.values("asset_tag", "severity", "rule_id")
+            .annotate(
+                active=Count("id", filter=Q(acknowledged=False, resolved=False)),
+                acknowledged=Count("id", filter=Q(acknowledged=True, resolved=False)),
+                resolved=Count("id", filter=Q(resolved=True)),
+            )
+            .order_by()
+        )
+
+        for row in rows:
+            deltas = defaultdict(int)
+            for state in STATES:
+                new_state = _state_after(state, fields)
+                if row[state] and new_state != state:
+                    deltas[state] -= row[state]
+                    deltas[new_state] += row[state]
+            apply_delta(row["asset_tag"], row["severity"], row["rule_id"], deltas)
+
+        return alerts.update(**fields)
+
+
+def _state_after(state: str, fields: dict) -> str:
+    """Estado de um alerta em ``state`` depois de receber ``fields``."""
+    resolved = fields.get("resolved", state == "resolved")
+    acknowledged = fields.get("acknowledged", state == "acknowledged")
+    if resolved:
+        return "resolved"
+    if acknowledged:
+        return "acknowledged"
+    return "active"
+
+
+def detach_rule(rule_id: int):
+    """
+    Move os contadores de uma regra excluída para ``rule_id=0``.
+
+    A exclusão da regra zera Alert.rule (SET_NULL) sem disparar signals;
+    os contadores acompanham a nova chave dos alertas.
+    """
+    from apps.alerts.models import AlertCounter
+
+    with transaction.atomic():
+        for counter in AlertCounter.objects.filter(rule_id=rule_id).select_for_update():
+            apply_delta(
+                counter.asset_tag,
+                counter.severity,
+                0,
+                {state: getattr(counter, state) for state in STATES},
+            )
+            counter.delete()
+
+
+def rebuild_counters():
+    """Recalcula os contadores do schema atual a partir de alerts_alert."""
+    from apps.alerts.models import Alert, AlertCounter
+
+    rows = (
+        Alert.objects.values("asset_tag", "severity", "rule_id")
+        .annotate(
+            active=Count("id", filter=Q(acknowledged=False, resolved=False)),
+            acknowledged=Count("id", filter=Q(acknowledged=True, resolved=False)),
+            resolved=Count("id", filter=Q(resolved=True)),
+        )
+        .order_by()
+    )
+
+    counters = {}
+    for row in rows:
+        key = (row["asset_tag"], row["severity"], row["rule_id"] or 0)
+        counter = counters.setdefault(
+            key, AlertCounter(asset_tag=key[0], severity=key[1], rule_id=key[2])
+        )
+        for state in STATES:
+            setattr(counter, state, getattr(counter, state) + row[state])
+
+    with transaction.atomic():
+        AlertCounter.objects.all().delete()
+        AlertCounter.objects.bulk_create(counters.values(), batch_size=1000)
+
+    logger.info(f"🔄 Contadores de alertas recalculados: {len(counters)} linhas")
+    return len(counters)
+
+
+def alert_statistics(counters, status: Optional[str] = None) -> dict:
+    """
+    Estatísticas no formato de AlertStatisticsSerializer a partir de um
+    queryset de AlertCounter (uma query).
+
+    ``status`` (active | acknowledged | resolved) restringe o total e a
+    distribuição por severidade, como o filtro de mesmo nome da listagem.
+    """
+    rows = (
+        counters.values("severity")
+        .annotate(
+            active_sum=Sum("active"),
+            acknowledged_sum=Sum("acknowledged"),
+            resolved_sum=Sum("resolved"),
+        )
+        .order_by()
+    )
+
+    totals = dict.fromkeys(STATES, 0)
+    by_severity = {severity.upper(): 0 for severity in SEVERITIES}
+    states = (status,) if status in STATES else STATES
+
+    for row in rows:
+        counts = {state: row[f"{state}_sum"] or 0 for state in STATES}
+        for state in STATES:
+            totals[state] += counts[state]
+        key = row["severity"].upper()
+        if key in by_severity:
+            by_severity[key] += sum(counts[state] for state in states)
+
+    if status in STATES:
+        for state in STATES:
+            if state != status:
+                totals[state] = 0
+
+    return {
+        "total": sum(totals.values()),
+        **totals,
+        "by_severity": by_severity,
+    }
+
+
+def active_alerts_by_asset(asset_tags: Iterable[str]) -> Dict[str, int]:
+    """Alertas ativos (não reconhecidos e não resolvidos) por asset_tag."""
+    from apps.alerts.models import AlertCounter
+
+    asset_tags = list(asset_tags)
+    if not asset_tags:
+        return {}
+
+    return {
+        row["asset_tag"]: row["total"]
+        for row in AlertCounter.objects.filter(asset_tag__in=asset_tags, active__gt=0)
+        .values("asset_tag")
+        .annotate(total=Sum("active"))
+        .order_by()
+    }
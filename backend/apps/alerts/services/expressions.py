@@ -0,0 +1,214 @@
+"""
+Expressões de regras compostas (Rule.expression).
+
+Combinam vários sensores do mesmo equipamento numa única condição, por exemplo::
+
+    supply_temp > 12 AND compressor_current < 2
+    (temp-01 >= 30 OR temp-02 >= 30) AND NOT door_open == 1
+
+Gramática::
+
+    expr       := or_expr
+    or_expr    := and_expr ("OR" and_expr)*
+    and_expr   := not_expr ("AND" not_expr)*
+    not_expr   := "NOT" not_expr | "(" expr ")" | comparison
+    comparison := operand OP operand       (OP: > >= < <= == !=)
+    operand    := identificador | "identificador entre aspas" | número
+
+Identificadores são tags de sensor (ou ``sensor_<id>``), resolvidos no
+equipamento da regra. A expressão é compilada uma vez para uma árvore de
+closures (``compile_expression`` tem cache por texto) e avaliada sobre um
+snapshot único das últimas leituras de todos os termos.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+COMPARISON_OPERATORS = {
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+# ``12 < temp`` equivale a ``temp > 12``
+REVERSED_OPERATORS = {
+    ">": "<",
+    ">=": "<=",
+    "<": ">",
+    "<=": ">=",
+    "==": "==",
+    "!=": "!=",
+}
+
+KEYWORDS = {"AND", "OR", "NOT"}
+
+TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<operator>>=|<=|==|!=|>|<)
+      | (?P<paren>[()])
+      | "(?P<quoted>[^"]+)"
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.:\-]*)
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+class ExpressionError(Exception):
+    """Expressão de regra inválida."""
+
+    pass
+
+
+@dataclass(frozen=True)
+class Term:
+    """Comparação simples ``identifier OP value`` (usada nas mensagens de alerta)."""
+
+    identifier: str
+    operator: str
+    value: float
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    source: str
+    identifiers: Tuple[str, ...]
+    terms: Tuple[Term, ...]
+    _evaluate: Callable[[Dict[str, float]], bool]
+
+    def evaluate(self, values: Dict[str, float]) -> bool:
+        """
+        Avalia a expressão. ``values`` deve ter um valor para cada
+        identificador (ver ``identifiers``).
+        """
+        missing = [name for name in self.identifiers if name not in values]
+        if missing:
+            raise ExpressionError(f"Sem valor para: {', '.join(missing)}")
+        return self._evaluate(values)
+
+
+def _tokenize(source: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    source = source.strip()
+    while position < len(source):
+        match = TOKEN_RE.match(source, position)
+        if not match or match.end() == position:
+            raise ExpressionError(
+                f"Caractere inesperado na posição {position}: {source[position:]!r}"
+            )
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "name" and text.upper() in KEYWORDS:
+            kind, text = "keyword", text.upper()
+        elif kind == "quoted":
+            kind = "name"
+        tokens.append((kind, text))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+        self.identifiers = []
+        self.terms = []
+
+    def peek(self) -> Optional[Tuple[str, str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, kind=None, text=None):
+        token = self.peek()
+        if token is None:
+            raise ExpressionError("Expressão incompleta")
+        if (kind and token[0] != kind) or (text and token[1] != text):
+            raise ExpressionError(f"Token inesperado: {token[1]!r}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self.or_expr()
+        if self.peek() is not None:
+            raise ExpressionError(f"Token inesperado: {self.peek()[1]!r}")
+        return node
+
+    def or_expr(self):
+        nodes = [self.and_expr()]
+        while self.peek() == ("keyword", "OR"):
+            self.take()
+            nodes.append(self.and_expr())
+        if len(nodes) == 1:
+            return nodes[0]
+        return lambda values: any(node(values) for node in nodes)
+
+    def and_expr(self):
+        nodes = [self.not_expr()]
+        while self.peek() == ("keyword", "AND"):
+            self.take()
+            nodes.append(self.not_expr())
+        if len(nodes) == 1:
+            return nodes[0]
+        return lambda values: all(node(values) for node in nodes)
+
+    def not_expr(self):
+        token = self.peek()
+        if token == ("keyword", "NOT"):
+            self.take()
+            node = self.not_expr()
+            return lambda values: not node(values)
+        if token == ("paren", "("):
+            self.take()
+            node = self.or_expr()
+            self.take("paren", ")")
+            return node
+        return self.comparison()
+
+    def operand(self):
+        kind, text = self.take()
+        if kind == "number":
+            value = float(text)
+            return ("number", value), lambda values: value
+        if kind == "name":
+            if text not in self.identifiers:
+                self.identifiers.append(text)
+            return ("name", text), lambda values: values[text]
+        raise ExpressionError(f"Operando inválido: {text!r}")
+
+    def comparison(self):
+        left, left_fn = self.operand()
+        _, operator = self.take("operator")
+        right, right_fn = self.operand()
+        if left[0] == "number" and right[0] == "number":
+            raise ExpressionError("Comparação sem sensor")
+
+        if left[0] == "name" and right[0] == "number":
+            self.terms.append(Term(left[1], operator, right[1]))
+        elif left[0] == "number" and right[0] == "name":
+            self.terms.append(Term(right[1], REVERSED_OPERATORS[operator], left[1]))
+
+        compare = COMPARISON_OPERATORS[operator]
+        return lambda values: compare(left_fn(values), right_fn(values))
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(source: str) -> CompiledExpression:
+    """Compila (e guarda em cache por texto) uma expressão de regra composta."""
+    if not source or not source.strip():
+        raise ExpressionError("Expressão vazia")
+
+    parser = _Parser(_tokenize(source))
+    evaluate = parser.parse()
+    return CompiledExpression(
+        source=source,
+        identifiers=tuple(parser.identifiers),
+        terms=tuple(parser.terms),
+        _evaluate=evaluate,
+    )
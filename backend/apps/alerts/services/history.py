@@ -0,0 +1,159 @@
+"""
+Arquivamento e retenção do histórico de alertas.
+
+alerts_alert guarda só os alertas "quentes" (abertos e resolvidos recentes),
+usados pelo cooldown (índice ``alerts_alert_cooldown_idx``) e pelas
+listagens. A limpeza diária move os alertas resolvidos há mais de N dias para
+alerts_alert_history, uma hypertable particionada por ``resolved_at``:
+
+- a movimentação é feita em lotes de ``ALERTS_CLEANUP_CHUNK_SIZE`` alertas,
+  cada lote numa transação curta (DELETE ... RETURNING + INSERT numa única
+  instrução, com SKIP LOCKED para não esperar alertas em edição);
+- os contadores (AlertCounter) recebem um delta por (asset_tag, severity,
+  rule) do lote, em vez de um signal por alerta;
+- o histórico além de ``ALERTS_HISTORY_RETENTION_DAYS`` é descartado com
+  drop_chunks, sem DELETE linha a linha.
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .counters import apply_delta
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TABLE = "alerts_alert_history"
+
+ARCHIVED_COLUMNS = (
+    "rule_id",
+    "message",
+    "severity",
+    "asset_tag",
+    "parameter_key",
+    "parameter_value",
+    "threshold",
+    "triggered_at",
+    "acknowledged_at",
+    "acknowledged_by_id",
+    "resolved_at",
+    "resolved_by_id",
+    "work_order_id",
+    "notes",
+)
+
+
+def chunk_size() -> int:
+    return max(getattr(settings, "ALERTS_CLEANUP_CHUNK_SIZE", 1000), 1)
+
+
+def history_retention_days() -> int:
+    """Dias de histórico mantidos (0 = sem descarte)."""
+    return int(getattr(settings, "ALERTS_HISTORY_RETENTION_DAYS", 365))
+
+
+def _detach_related(alert_ids: List[int]):
+    """
+    Aplica o on_delete das relações que apontam para Alert (ex.: economias
+    do TrakLedger) com um UPDATE/DELETE por relação, já que o DELETE em SQL
+    não passa pelo collector do ORM.
+    """
+    from apps.alerts.models import Alert
+
+    for relation in Alert._meta.related_objects:
+        if not relation.one_to_many:
+            continue
+        related = relation.related_model._base_manager.filter(
+            **{f"{relation.field.name}__in": alert_ids}
+        )
+        if relation.on_delete is models.SET_NULL:
+            related.update(**{relation.field.name: None})
+        else:
+            related.delete()
+
+
+def _archive_chunk(cutoff: datetime, size: int) -> int:
+    """Move um lote de alertas resolvidos antes de ``cutoff``; retorna quantos."""
+    from apps.alerts.models import Alert
+
+    with transaction.atomic():
+        alert_ids = list(
+            Alert.objects.select_for_update(skip_locked=True)
+            .filter(resolved=True, resolved_at__lt=cutoff)
+            .order_by("resolved_at")
+            .values_list("id", flat=True)[:size]
+        )
+        if not alert_ids:
+            return 0
+
+        _detach_related(alert_ids)
+
+        columns = ", ".join(ARCHIVED_COLUMNS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM alerts_alert WHERE id = ANY(%s)
+                    RETURNING id, {columns}
+                )
+                INSERT INTO {HISTORY_TABLE} (alert_id, {columns}, archived_at)
+                SELECT id, {columns}, %s FROM moved
+                RETURNING asset_tag, severity, rule_id
+                """,
+                [alert_ids, timezone.now()],
+            )
+            archived = Counter(cursor.fetchall())
+
+        # Alertas arquivados saem da coluna "resolved" dos contadores
+        for (asset_tag, severity, rule_id), count in archived.items():
+            apply_delta(asset_tag, severity, rule_id, {"resolved": -count})
+
+    return sum(archived.values())
+
+
+def archive_resolved_alerts(
+    cutoff: datetime, size: Optional[int] = None, max_chunks: Optional[int] = None
+) -> int:
+    """
+    Move para o histórico os alertas resolvidos antes de ``cutoff``, em lotes.
+
+    Deve ser chamada dentro do schema do tenant.
+
+    Returns:
+        Número de alertas arquivados
+    """
+    size = size or chunk_size()
+    total = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        archived = _archive_chunk(cutoff, size)
+        total += archived
+        chunks += 1
+        if archived < size:
+            break
+
+    if total:
+        logger.info(
+            f"🗄️ {total} alertas arquivados em {chunks} lote(s) (resolvidos antes de {cutoff})"
+        )
+    return total
+
+
+def drop_old_history(days: Optional[int] = None) -> int:
+    """
+    Descarta os chunks do histórico mais antigos que ``days`` dias.
+
+    Returns:
+        Número de chunks descartados
+    """
+    from apps.ingest.services.retention import drop_old_chunks
+
+    days = history_retention_days() if days is None else days
+    if not days:
+        return 0
+    return drop_old_chunks(HISTORY_TABLE, days)
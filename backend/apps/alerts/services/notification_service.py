@@ -12,15 +12,73 @@ which notifications to send.
 """
 
 import logging
-from typing import Any, Dict
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
 logger = logging.getLogger(__name__)
 
+# channel -> (rule action, preference channel)
+CHANNEL_ACTIONS = {
+    "email": ("EMAIL", "email"),
+    "in_app": ("IN_APP", "push"),
+    "sms": ("SMS", "sms"),
+    "whatsapp": ("WHATSAPP", "whatsapp"),
+}
+
+# Base delay (seconds) of the exponential retry backoff per channel
+DEFAULT_RETRY_BACKOFF_SECONDS = {
+    "email": 60,
+    "in_app": 10,
+    "sms": 30,
+    "whatsapp": 30,
+}
+
+# (user, NotificationPreference)
+Recipient = Tuple[Any, Any]
+
+
+def retry_countdown(channel: str, retries: int) -> int:
+    """Delay before retrying a channel (exponential, capped at 1 hour)."""
+    backoff = getattr(settings, "ALERTS_NOTIFICATION_RETRY_BACKOFF_SECONDS", {})
+    base = backoff.get(channel, DEFAULT_RETRY_BACKOFF_SECONDS.get(channel, 60))
+    return min(base * (2**retries), 3600)
+
+
+def _collect(results, user, channel, result):
+    """Append a channel result for a user to the aggregated results."""
+    if result["sent"]:
+        results["sent"].append(
+            {
+                "user": user.email,
+                "user_id": user.id,
+                "channel": channel,
+                "message": result.get("message"),
+            }
+        )
+    elif result.get("skipped"):
+        results["skipped"].append(
+            {
+                "user": user.email,
+                "user_id": user.id,
+                "channel": channel,
+                "reason": result.get("reason"),
+            }
+        )
+    else:
+        results["failed"].append(
+            {
+                "user": user.email,
+                "user_id": user.id,
+                "channel": channel,
+                "error": result.get("error"),
+            }
+        )
+
 
 class NotificationService:
     """
@@ -42,7 +100,12 @@ class NotificationService:
 
     def send_alert_notifications(self, alert, users=None):
         """
-        Send notifications for an alert to all relevant users.
+        Send notifications for an alert to all relevant users (synchronously).
+
+        Rule evaluation does not call this directly: it enqueues
+        ``alerts.dispatch_alert_notifications`` (see tasks.enqueue_alert_notifications),
+        which uses the same plan_recipients/send_channel steps in background
+        tasks, one per channel.
 
         Args:
             alert: Alert model instance
@@ -51,44 +114,12 @@ class NotificationService:
         Returns:
             Dict with results of each notification attempt
         """
-        from apps.accounts.models import User
-
-        if users is None:
-            # Get all users from the same tenant
-            users = User.objects.filter(is_active=True)
-
-        results = {"sent": [], "failed": [], "skipped": []}
+        recipients, results = self.plan_recipients(alert, users)
 
-        rule = alert.rule
-
-        for user in users:
-            user_results = self._send_to_user(alert, rule, user)
-
-            for channel, result in user_results.items():
-                if result["sent"]:
-                    results["sent"].append(
-                        {
-                            "user": user.email,
-                            "channel": channel,
-                            "message": result.get("message"),
-                        }
-                    )
-                elif result.get("skipped"):
-                    results["skipped"].append(
-                        {
-                            "user": user.email,
-                            "channel": channel,
-                            "reason": result.get("reason"),
-                        }
-                    )
-                else:
-                    results["failed"].append(
-                        {
-                            "user": user.email,
-                            "channel": channel,
-                            "error": result.get("error"),
-                        }
-                    )
+        for channel, channel_recipients in recipients.items():
+            channel_results = self.send_channel(alert, channel, channel_recipients)
+            for status in ("sent", "failed", "skipped"):
+                results[status].extend(channel_results[status])
 
         logger.info(
             f"Alert {alert.id} notifications: "
@@ -99,99 +130,175 @@ class NotificationService:
 
         return results
 
-    def _send_to_user(self, alert, rule, user) -> Dict[str, Dict[str, Any]]:
+    def load_preferences(self, users) -> Dict[int, Any]:
         """
-        Send notifications to a specific user based on their preferences.
-
-        Args:
-            alert: Alert model instance
-            rule: Rule model instance
-            user: User model instance
+        Load notification preferences for all users in bulk.
 
-        Returns:
-            Dict with results for each channel
+        Users without preferences get the defaults (created in a single
+        bulk insert).
         """
-        results = {}
-
-        # Get or create user notification preferences
         from apps.alerts.models import NotificationPreference
 
-        preferences, _ = NotificationPreference.objects.get_or_create(user=user)
+        users = list(users)
+        preferences = {
+            preference.user_id: preference
+            for preference in NotificationPreference.objects.filter(user__in=users)
+        }
+
+        missing = [
+            NotificationPreference(user=user)
+            for user in users
+            if user.id not in preferences
+        ]
+        if missing:
+            NotificationPreference.objects.bulk_create(missing, ignore_conflicts=True)
+            for preference in missing:
+                preferences[preference.user_id] = preference
+
+        return preferences
+
+    def plan_recipients(
+        self, alert, users=None
+    ) -> Tuple[Dict[str, List[Recipient]], Dict[str, List[dict]]]:
+        """
+        Group the recipients of an alert per channel.
 
-        # Check if user wants alerts of this severity
-        if not preferences.should_notify_severity(alert.severity):
-            logger.debug(f"User {user.email} has disabled {alert.severity} alerts")
-            return {
-                "all": {
-                    "sent": False,
-                    "skipped": True,
-                    "reason": f"User has disabled {alert.severity} alerts",
-                }
-            }
+        A channel is used for a user only if it is:
+        1. Enabled in rule actions
+        2. Enabled in user preferences (and the severity is wanted)
 
-        # Get enabled channels for this user
-        enabled_channels = preferences.get_enabled_channels()
+        Returns:
+            (recipients per channel, results dict with skipped users)
+        """
+        from apps.accounts.models import User
 
-        # Send through each channel that is:
-        # 1. Enabled in rule actions
-        # 2. Enabled in user preferences
-        # 3. Enabled in system settings
+        if users is None:
+            # Get all users from the same tenant
+            users = User.objects.filter(is_active=True)
 
-        if "EMAIL" in rule.actions and "email" in enabled_channels:
-            results["email"] = self._send_email(alert, user, preferences)
+        users = list(users)
+        preferences = self.load_preferences(users)
+        rule = alert.rule
 
-        if "IN_APP" in rule.actions and "push" in enabled_channels:
-            results["in_app"] = self._send_in_app(alert, user)
+        recipients = defaultdict(list)
+        results = {"sent": [], "failed": [], "skipped": []}
 
-        if "SMS" in rule.actions and "sms" in enabled_channels:
-            results["sms"] = self._send_sms(alert, user, preferences)
+        for user in users:
+            user_preferences = preferences[user.id]
+
+            # Check if user wants alerts of this severity
+            if not user_preferences.should_notify_severity(alert.severity):
+                logger.debug(f"User {user.email} has disabled {alert.severity} alerts")
+                results["skipped"].append(
+                    {
+                        "user": user.email,
+                        "user_id": user.id,
+                        "channel": "all",
+                        "reason": f"User has disabled {alert.severity} alerts",
+                    }
+                )
+                continue
+
+            enabled_channels = user_preferences.get_enabled_channels()
+            for channel, (action, preference_channel) in CHANNEL_ACTIONS.items():
+                if action in rule.actions and preference_channel in enabled_channels:
+                    recipients[channel].append((user, user_preferences))
+
+        return dict(recipients), results
+
+    def send_channel(
+        self, alert, channel: str, recipients: List[Recipient]
+    ) -> Dict[str, list]:
+        """
+        Send an alert to all recipients of one channel.
 
-        if "WHATSAPP" in rule.actions and "whatsapp" in enabled_channels:
-            results["whatsapp"] = self._send_whatsapp(alert, user, preferences)
+        Email is sent in a single SMTP connection; the other channels are
+        sent per recipient.
+        """
+        if channel == "email":
+            return self._send_email_batch(alert, recipients)
 
+        results = {"sent": [], "failed": [], "skipped": []}
+        for user, preferences in recipients:
+            if channel == "in_app":
+                result = self._send_in_app(alert, user)
+            elif channel == "sms":
+                result = self._send_sms(alert, user, preferences)
+            elif channel == "whatsapp":
+                result = self._send_whatsapp(alert, user, preferences)
+            else:
+                result = {
+                    "sent": False,
+                    "skipped": True,
+                    "reason": f"Unknown channel {channel}",
+                }
+            _collect(results, user, channel, result)
         return results
 
-    def _send_email(self, alert, user, preferences) -> Dict[str, Any]:
-        """Send email notification."""
+    def _build_email(self, alert, user):
+        subject = f"[{alert.severity.upper()}] Alert: {alert.rule.name}"
+
+        # Render HTML template
+        context = {
+            "alert": alert,
+            "rule": alert.rule,
+            "user": user,
+            "severity_label": alert.get_severity_display(),
+        }
+
+        html_message = render_to_string("alerts/email/alert_notification.html", context)
+        message = EmailMultiAlternatives(
+            subject=subject,
+            body=strip_tags(html_message),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user.email],
+        )
+        message.attach_alternative(html_message, "text/html")
+        return message
+
+    def _send_email_batch(self, alert, recipients: List[Recipient]) -> Dict[str, list]:
+        """Send email notifications to all recipients over one SMTP connection."""
+        results = {"sent": [], "failed": [], "skipped": []}
+
         if not self.email_enabled:
-            return {
-                "sent": False,
-                "skipped": True,
-                "reason": "Email notifications disabled in settings",
-            }
+            for user, _ in recipients:
+                _collect(
+                    results,
+                    user,
+                    "email",
+                    {
+                        "sent": False,
+                        "skipped": True,
+                        "reason": "Email notifications disabled in settings",
+                    },
+                )
+            return results
 
         try:
-            subject = f"[{alert.severity.upper()}] Alert: {alert.rule.name}"
-
-            # Render HTML template
-            context = {
-                "alert": alert,
-                "rule": alert.rule,
-                "user": user,
-                "severity_label": alert.get_severity_display(),
-            }
-
-            html_message = render_to_string(
-                "alerts/email/alert_notification.html", context
-            )
-            plain_message = strip_tags(html_message)
-
-            send_mail(
-                subject=subject,
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                html_message=html_message,
-                fail_silently=False,
+            connection = get_connection(fail_silently=False)
+            connection.open()
+        except Exception as e:
+            logger.error(
+                f"Failed to open email connection for alert {alert.id}: {str(e)}"
             )
+            for user, _ in recipients:
+                _collect(results, user, "email", {"sent": False, "error": str(e)})
+            return results
 
-            logger.info(f"Email sent to {user.email} for alert {alert.id}")
-
-            return {"sent": True, "message": f"Email sent to {user.email}"}
+        try:
+            for user, _ in recipients:
+                try:
+                    connection.send_messages([self._build_email(alert, user)])
+                    logger.info(f"Email sent to {user.email} for alert {alert.id}")
+                    result = {"sent": True, "message": f"Email sent to {user.email}"}
+                except Exception as e:
+                    logger.error(f"Failed to send email to {user.email}: {str(e)}")
+                    result = {"sent": False, "error": str(e)}
+                _collect(results, user, "email", result)
+        finally:
+            connection.close()
 
-        except Exception as e:
-            logger.error(f"Failed to send email to {user.email}: {str(e)}")
-            return {"sent": False, "error": str(e)}
+        return results
 
     def _send_in_app(self, alert, user) -> Dict[str, Any]:
         """
@@ -0,0 +1,506 @@
+"""
+Planejador da avaliação periódica de regras por tenant.
+
+Em vez de cada regra buscar seus sensores, a última leitura de cada parâmetro
+e o estado de cooldown (até três queries em Alert por parâmetro), o plano
+carrega tudo de uma vez para o conjunto de regras ativas do tenant:
+
+1. Sensores de todos os parâmetros (uma query)
+2. Última leitura de cada par (mqtt_client_id, sensor_tag) com LATERAL (uma query)
+3. Estado de cooldown de todos os pares (rule, parameter_key) agrupado (uma query)
+
+e avalia em memória. O número de queries por tenant não depende do número de
+regras (exceto os INSERTs dos alertas efetivamente disparados).
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ReadingKey = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class ReadingSnapshot:
+    """Leitura usada na avaliação (mesmos campos de Reading)."""
+
+    device_id: str
+    sensor_id: str
+    ts: datetime
+    value: float
+
+    def as_dict(self):
+        return {
+            "device_id": self.device_id,
+            "sensor_id": self.sensor_id,
+            "ts": self.ts.isoformat(),
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            device_id=data["device_id"],
+            sensor_id=data["sensor_id"],
+            ts=datetime.fromisoformat(data["ts"]),
+            value=data["value"],
+        )
+
+
+def _sensor_id_from_key(parameter_key: str) -> Optional[int]:
+    if parameter_key.startswith("sensor_"):
+        try:
+            return int(parameter_key.replace("sensor_", ""))
+        except ValueError:
+            return None
+    return None
+
+
+class SensorResolver:
+    """
+    Resolve parameter_key (tag ou ``sensor_<id>``) para pares
+    (mqtt_client_id, sensor_tag).
+
+    Um tag pode existir em mais de um device; quando algum deles pertence ao
+    equipamento da regra, só esses são considerados.
+    """
+
+    def __init__(self, sensors: Iterable[dict]):
+        self._by_id = {}
+        self._by_tag = defaultdict(list)
+        for sensor in sensors:
+            self._by_id[sensor["id"]] = sensor
+            self._by_tag[sensor["tag"]].append(sensor)
+
+    @classmethod
+    def load(cls, parameter_keys: Iterable[str]) -> "SensorResolver":
+        from apps.assets.models import Sensor
+
+        sensor_ids = set()
+        tags = set()
+        for key in parameter_keys:
+            sensor_id = _sensor_id_from_key(key)
+            if sensor_id is not None:
+                sensor_ids.add(sensor_id)
+            else:
+                tags.add(key)
+
+        if not sensor_ids and not tags:
+            return cls([])
+
+        return cls(
+            Sensor.objects.filter(Q(id__in=sensor_ids) | Q(tag__in=tags))
+            .exclude(device__mqtt_client_id__isnull=True)
+            .exclude(device__mqtt_client_id="")
+            .values("id", "tag", "device__mqtt_client_id", "device__asset_id")
+        )
+
+    def resolve(self, parameter_key: str, equipment_id) -> List[ReadingKey]:
+        sensor_id = _sensor_id_from_key(parameter_key)
+        if sensor_id is not None:
+            sensor = self._by_id.get(sensor_id)
+            tag = sensor["tag"] if sensor else None
+        else:
+            tag = parameter_key
+
+        candidates = self._by_tag.get(tag, [])
+        on_equipment = [s for s in candidates if s["device__asset_id"] == equipment_id]
+        return [
+            (sensor["device__mqtt_client_id"], sensor["tag"])
+            for sensor in (on_equipment or candidates)
+        ]
+
+
+def fetch_latest_readings(
+    keys: Iterable[ReadingKey], since: Optional[datetime] = None
+) -> Dict[ReadingKey, ReadingSnapshot]:
+    """
+    Última leitura de cada (device_id, sensor_id) numa única query.
+
+    O LATERAL faz um index scan (device_id, sensor_id, ts DESC) LIMIT 1 por
+    par; ``since`` restringe os chunks consultados da hypertable.
+    """
+    keys = list(set(keys))
+    if not keys:
+        return {}
+
+    device_ids = [device_id for device_id, _ in keys]
+    sensor_ids = [sensor_id for _, sensor_id in keys]
+    since_filter = "AND r.ts >= %s" if since else ""
+    params = [device_ids, sensor_ids] + ([since] if since else [])
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT k.device_id, k.sensor_id, latest.ts, latest.value
+            FROM unnest(%s::text[], %s::text[]) AS k(device_id, sensor_id)
+            CROSS JOIN LATERAL (
+                SELECT r.ts, r.value
+                FROM reading r
+                WHERE r.device_id = k.device_id
+                  AND r.sensor_id = k.sensor_id
+                  {since_filter}
+                ORDER BY r.ts DESC
+                LIMIT 1
+            ) latest
+            """,
+            params,
+        )
+        return {
+            (device_id, sensor_id): ReadingSnapshot(device_id, sensor_id, ts, value)
+            for device_id, sensor_id, ts, value in cursor.fetchall()
+        }
+
+
+@dataclass
+class CooldownState:
+    """Estado agregado dos alertas de um par (rule, parameter_key)."""
+
+    last_active_at: Optional[datetime] = None
+    acknowledged_count: int = 0
+    last_acknowledged_at: Optional[datetime] = None
+    last_resolved_at: Optional[datetime] = None
+
+    def check(self, cooldown_minutes: int, now: datetime) -> Tuple[bool, str]:
+        """Mesmas regras (e mensagens) de tasks.check_alert_cooldown."""
+        from apps.alerts.tasks import (
+            ACKNOWLEDGED_CHECK_INTERVAL_MINUTES,
+            RESOLVED_COOLDOWN_MINUTES,
+        )
+
+        # 1. Alerta ativo (não reconhecido) dentro do cooldown
+        if self.last_active_at and self.last_active_at >= now - timedelta(
+            minutes=cooldown_minutes
+        ):
+            time_since = (now - self.last_active_at).total_seconds() / 60
+            remaining = cooldown_minutes - time_since
+            return (
+                False,
+                f"Active alert exists (triggered {time_since:.0f}min ago, cooldown remaining: {remaining:.0f}min)",
+            )
+
+        # 2. Alerta reconhecido e não resolvido bloqueia novos alertas
+        if self.acknowledged_count:
+            time_since_ack = (
+                (now - self.last_acknowledged_at).total_seconds() / 60
+                if self.last_acknowledged_at
+                else 0
+            )
+            return (
+                False,
+                f"Alert is acknowledged but not resolved (ack'd {time_since_ack:.0f}min ago). Will re-check after {ACKNOWLEDGED_CHECK_INTERVAL_MINUTES}min.",
+            )
+
+        # 3. Alerta resolvido recentemente
+        if self.last_resolved_at and self.last_resolved_at >= now - timedelta(
+            minutes=RESOLVED_COOLDOWN_MINUTES
+        ):
+            time_since_resolved = (now - self.last_resolved_at).total_seconds() / 60
+            remaining = RESOLVED_COOLDOWN_MINUTES - time_since_resolved
+            return (
+                False,
+                f"Alert was recently resolved ({time_since_resolved:.0f}min ago), cooldown remaining: {remaining:.0f}min",
+            )
+
+        return True, "OK"
+
+
+def fetch_cooldown_states(
+    rule_ids: Iterable[int], now: datetime
+) -> Dict[Tuple[int, str], CooldownState]:
+    """
+    Estado de cooldown de todos os pares (rule, parameter_key) numa única
+    query agrupada em Alert.
+    """
+    from apps.alerts.models import Alert
+    from apps.alerts.tasks import RESOLVED_COOLDOWN_MINUTES
+
+    rule_ids = list(rule_ids)
+    if not rule_ids:
+        return {}
+
+    active = Q(acknowledged=False, resolved=False)
+    acknowledged = Q(acknowledged=True, resolved=False)
+    rows = (
+        Alert.objects.filter(rule_id__in=rule_ids)
+        .filter(
+            Q(resolved=False)
+            | Q(resolved_at__gte=now - timedelta(minutes=RESOLVED_COOLDOWN_MINUTES))
+        )
+        .values("rule_id", "parameter_key")
+        .annotate(
+            last_active_at=Max("triggered_at", filter=active),
+            acknowledged_count=Count("id", filter=acknowledged),
+            last_acknowledged_at=Max("acknowledged_at", filter=acknowledged),
+            last_resolved_at=Max("resolved_at", filter=Q(resolved=True)),
+        )
+        .order_by()
+    )
+
+    return {
+        (row["rule_id"], row["parameter_key"]): CooldownState(
+            last_active_at=row["last_active_at"],
+            acknowledged_count=row["acknowledged_count"],
+            last_acknowledged_at=row["last_acknowledged_at"],
+            last_resolved_at=row["last_resolved_at"],
+        )
+        for row in rows
+    }
+
+
+def _rule_expression(rule):
+    """Expressão composta compilada da regra (None se não houver ou for inválida)."""
+    from .expressions import ExpressionError
+
+    if not rule.expression:
+        return None
+    try:
+        return rule.compiled_expression
+    except ExpressionError as e:
+        logger.warning(f"⚠️ Rule {rule.id} has an invalid expression: {e}")
+        return None
+
+
+def parameter_keys(rule) -> List[str]:
+    """
+    parameter_keys de que a regra depende: identificadores da expressão
+    composta ou o parameter_key de cada parâmetro (legado: o da própria regra).
+    """
+    expression = _rule_expression(rule)
+    if expression is not None:
+        return list(expression.identifiers)
+
+    parameters = list(rule.parameters.all())
+    if not parameters and rule.parameter_key:
+        return [rule.parameter_key]
+    return [param.parameter_key for param in parameters]
+
+
+class TenantEvaluationPlan:
+    """
+    Dados pré-carregados para avaliar todas as regras ativas de um tenant.
+
+    ``rules`` deve vir com ``parameters`` pré-carregado (prefetch_related) e
+    ``created_by`` via select_related, para que a avaliação não faça queries.
+    """
+
+    def __init__(self, rules, now: Optional[datetime] = None):
+        from apps.alerts.tasks import READING_MAX_AGE_MINUTES
+
+        from .anomaly import AnomalyScores, is_anomaly, refresh_baselines
+        from .windows import fetch_window_aggregates, is_windowed
+
+        self.now = now or timezone.now()
+        self.rules = list(rules)
+
+        rule_keys = set()
+        for rule in self.rules:
+            for key in parameter_keys(rule):
+                rule_keys.add(key)
+
+        self.sensors = SensorResolver.load(rule_keys)
+
+        reading_keys = set()
+        for rule in self.rules:
+            for key in parameter_keys(rule):
+                reading_keys.update(self.sensors.resolve(key, rule.equipment_id))
+
+        # Leituras mais antigas que a janela de frescor nunca disparam alertas
+        self.latest_readings = fetch_latest_readings(
+            reading_keys, since=self.now - timedelta(minutes=READING_MAX_AGE_MINUTES)
+        )
+
+        # Janelas de duração agregadas no banco (uma query para todos os parâmetros)
+        self.window_aggregates = fetch_window_aggregates(
+            (
+                (key, param)
+                for rule in self.rules
+                for param in rule.parameters.all()
+                if is_windowed(param)
+                for key in self.sensors.resolve(param.parameter_key, rule.equipment_id)
+            ),
+            self.now,
+        )
+
+        # Regras de anomalia: linhas de base incrementais e z-scores de todos
+        # os sensores envolvidos calculados de uma vez (ver services.anomaly)
+        self.anomaly_scores = None
+        anomaly_keys = set()
+        for rule in self.rules:
+            for param in rule.parameters.all():
+                if is_anomaly(param):
+                    anomaly_keys.update(
+                        self.sensors.resolve(param.parameter_key, rule.equipment_id)
+                    )
+        if anomaly_keys:
+            baselines = refresh_baselines(anomaly_keys, self.now)
+            self.anomaly_scores = AnomalyScores(
+                {
+                    key: self.latest_readings[key]
+                    for key in anomaly_keys
+                    if key in self.latest_readings
+                },
+                baselines,
+            )
+
+        self.cooldowns = fetch_cooldown_states(
+            (rule.id for rule in self.rules), self.now
+        )
+
+    def latest_reading(
+        self, parameter_key: str, equipment_id
+    ) -> Optional[ReadingSnapshot]:
+        readings = [
+            self.latest_readings[key]
+            for key in self.sensors.resolve(parameter_key, equipment_id)
+            if key in self.latest_readings
+        ]
+        return max(readings, key=lambda reading: reading.ts) if readings else None
+
+    def parameter_reading(self, rule, param) -> Optional[ReadingSnapshot]:
+        """
+        Leitura a comparar para o parâmetro: a última leitura ou, com janela
+        de duração, o valor agregado da janela (ver services.windows).
+        """
+        from .windows import is_windowed, sustained_reading
+
+        if not is_windowed(param):
+            return self.latest_reading(param.parameter_key, rule.equipment_id)
+
+        reasons = []
+        for key in self.sensors.resolve(param.parameter_key, rule.equipment_id):
+            reading, reason = sustained_reading(
+                param, self.window_aggregates.get((key, param.id)), self.now
+            )
+            if reading is not None:
+                return reading
+            reasons.append(reason)
+
+        logger.debug(
+            f"Rule {rule.id} parameter {param.parameter_key} window: "
+            f"{', '.join(reasons) or 'no sensor'}"
+        )
+        return None
+
+    def anomaly_reading(
+        self, rule, param
+    ) -> Tuple[Optional[ReadingSnapshot], Optional[float]]:
+        """Leitura mais recente e seu desvio (em σ) para um parâmetro de anomalia."""
+        best = (None, None)
+        if self.anomaly_scores is None:
+            return best
+
+        for key in self.sensors.resolve(param.parameter_key, rule.equipment_id):
+            reading = self.latest_readings.get(key)
+            score = self.anomaly_scores.score(param, key)
+            if reading is None or score is None:
+                continue
+            if best[1] is None or score > best[1]:
+                best = (reading, score)
+        return best
+
+    def check_cooldown(self, rule, parameter_key: str) -> Tuple[bool, str]:
+        from apps.alerts.tasks import get_alert_cooldown_minutes
+
+        state = self.cooldowns.get((rule.id, parameter_key), CooldownState())
+        return state.check(get_alert_cooldown_minutes(rule), self.now)
+
+    def _mark_triggered(self, rule, alert):
+        state = self.cooldowns.setdefault(
+            (rule.id, alert.parameter_key), CooldownState()
+        )
+        state.last_active_at = alert.triggered_at or self.now
+
+    def evaluate_composite(self, rule):
+        """
+        Avalia uma regra composta sobre o snapshot de últimas leituras já
+        carregado pelo plano (nenhuma query por termo).
+        """
+        from apps.alerts.tasks import COMPOSITE_PARAMETER_KEY, create_composite_alert
+
+        expression = _rule_expression(rule)
+        if expression is None:
+            return None
+
+        can_alert, reason = self.check_cooldown(rule, COMPOSITE_PARAMETER_KEY)
+        if not can_alert:
+            logger.debug(f"Rule {rule.id} cannot trigger: {reason}")
+            return None
+
+        readings = {
+            name: self.latest_reading(name, rule.equipment_id)
+            for name in expression.identifiers
+        }
+        alert = create_composite_alert(rule, readings)
+        if alert:
+            self._mark_triggered(rule, alert)
+        return alert
+
+    def evaluate_rule(self, rule):
+        """
+        Avalia uma regra do plano (mesmo contrato de tasks.evaluate_single_rule).
+
+        Returns:
+            Primeiro Alert criado ou None
+        """
+        from apps.alerts.tasks import (
+            create_alert_from_reading,
+            create_legacy_alert_from_reading,
+        )
+
+        from .anomaly import is_anomaly
+
+        if rule.expression:
+            return self.evaluate_composite(rule)
+
+        parameters = list(rule.parameters.all())
+        if not parameters and rule.parameter_key:
+            can_alert, reason = self.check_cooldown(rule, rule.parameter_key)
+            if not can_alert:
+                logger.debug(f"Rule {rule.id} cannot trigger: {reason}")
+                return None
+            reading = self.latest_reading(rule.parameter_key, rule.equipment_id)
+            if reading is None:
+                logger.debug(
+                    f"No fresh telemetry for rule {rule.id} parameter {rule.parameter_key}"
+                )
+                return None
+            alert = create_legacy_alert_from_reading(rule, reading)
+            if alert:
+                self._mark_triggered(rule, alert)
+            return alert
+
+        alerts_created = []
+        for param in parameters:
+            can_alert, reason = self.check_cooldown(rule, param.parameter_key)
+            if not can_alert:
+                logger.debug(
+                    f"Rule {rule.id} parameter {param.parameter_key} cannot trigger: {reason}"
+                )
+                continue
+
+            score = None
+            if is_anomaly(param):
+                reading, score = self.anomaly_reading(rule, param)
+            else:
+                reading = self.parameter_reading(rule, param)
+            if reading is None:
+                logger.info(
+                    f"⚠️ Rule {rule.id} - No fresh reading found for {param.parameter_key}"
+                )
+                continue
+
+            alert = create_alert_from_reading(rule, param, reading, score=score)
+            if alert:
+                self._mark_triggered(rule, alert)
+                alerts_created.append(alert)
+
+        return alerts_created[0] if alerts_created else None
@@ -0,0 +1,340 @@
+"""
+Harness de replay para medir a avaliação de regras.
+
+Reproduz um fluxo de leituras (gravado em CSV ou sintético) contra um
+conjunto de M regras com P parâmetros, ciclo a ciclo, e mede para cada
+avaliador (``EVALUATORS``) as queries por ciclo, a latência e os alertas
+gerados. Roda só com Postgres/TimescaleDB: as notificações são agendadas com
+``on_commit`` e nunca saem, porque o comando executa tudo numa transação
+desfeita ao final (ver ``manage.py replay_rule_evaluation``).
+
+O relógio é virtual: em cada ciclo as leituras da fatia são gravadas com o
+timestamp deslocado para o presente e ``timezone.now()`` aponta para o fim
+da fatia, de modo que cooldowns, janelas de duração e idade máxima das
+leituras se comportam como em produção.
+"""
+
+import csv
+import random
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .planner import ReadingSnapshot
+from .streaming import evaluate_readings, invalidate_rule_index, match_readings
+
+
+def _evaluate_periodic(schema_name: str, readings) -> dict:
+    from apps.alerts.tasks import _evaluate_rules_for_tenant
+
+    return _evaluate_rules_for_tenant(schema_name, schema_name)
+
+
+def _evaluate_streaming(schema_name: str, readings) -> dict:
+    return evaluate_readings(schema_name, match_readings(schema_name, readings))
+
+
+# Avaliadores medidos pelo harness: (schema, leituras da fatia) -> stats
+EVALUATORS: Dict[str, Callable[[str, list], dict]] = {
+    "periodic": _evaluate_periodic,
+    "streaming": _evaluate_streaming,
+}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+@dataclass
+class ReplayReport:
+    evaluator: str
+    rules: int
+    parameters: int
+    readings: int
+    queries: List[int] = field(default_factory=list)
+    latencies: List[float] = field(default_factory=list)
+    alerts: int = 0
+    errors: int = 0
+
+    def add_cycle(self, queries: int, latency: float, result: dict):
+        self.queries.append(queries)
+        self.latencies.append(latency)
+        self.alerts += result.get("triggered", 0)
+        self.errors += result.get("errors", 0)
+
+    def summary(self) -> dict:
+        latencies_ms = [latency * 1000 for latency in self.latencies]
+        return {
+            "evaluator": self.evaluator,
+            "rules": self.rules,
+            "parameters": self.parameters,
+            "readings": self.readings,
+            "cycles": len(self.queries),
+            "queries_per_cycle": {
+                "min": min(self.queries, default=0),
+                "mean": round(statistics.fmean(self.queries), 1) if self.queries else 0,
+                "max": max(self.queries, default=0),
+            },
+            "latency_ms": {
+                "p50": round(_percentile(latencies_ms, 50), 2),
+                "p95": round(_percentile(latencies_ms, 95), 2),
+                "p99": round(_percentile(latencies_ms, 99), 2),
+                "max": round(max(latencies_ms, default=0.0), 2),
+            },
+            "alerts": self.alerts,
+            "errors": self.errors,
+        }
+
+
+# =============================================================================
+# Fluxo de leituras
+# =============================================================================
+
+
+def synthetic_readings(
+    devices: int = 10,
+    sensors: int = 4,
+    minutes: int = 60,
+    interval_seconds: int = 60,
+    seed: int = 42,
+) -> List[ReadingSnapshot]:
+    """Passeio aleatório em torno de 20 para ``devices`` x ``sensors`` séries."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    steps = max(minutes * 60 // interval_seconds, 1)
+
+    readings = []
+    for device in range(devices):
+        device_id = f"bench-device-{device:03d}"
+        for sensor in range(sensors):
+            value = 20.0
+            for step in range(steps):
+                value += rng.uniform(-0.5, 0.5)
+                readings.append(
+                    ReadingSnapshot(
+                        device_id=device_id,
+                        sensor_id=f"bench-sensor-{device:03d}-{sensor}",
+                        ts=start + timedelta(seconds=step * interval_seconds),
+                        value=round(value, 3),
+                    )
+                )
+    return readings
+
+
+def load_readings_csv(path: str) -> List[ReadingSnapshot]:
+    """
+    Fluxo gravado com colunas ``device_id,sensor_id,ts,value`` (ts em ISO 8601),
+    por exemplo exportado com::
+
+        \\copy (SELECT device_id, sensor_id, ts, value FROM reading
+               WHERE ts > now() - interval '1 hour') TO 'readings.csv' CSV HEADER
+    """
+    readings = []
+    with open(path, newline="") as handle:
+        for row in csv.DictReader(handle):
+            ts = parse_datetime(row["ts"])
+            if ts is None:
+                continue
+            if timezone.is_naive(ts):
+                ts = timezone.make_aware(ts, dt_timezone.utc)
+            readings.append(
+                ReadingSnapshot(
+                    row["device_id"], row["sensor_id"], ts, float(row["value"])
+                )
+            )
+    return readings
+
+
+# =============================================================================
+# Regras
+# =============================================================================
+
+
+def prepare_equipment(readings: List[ReadingSnapshot]) -> Dict[str, tuple]:
+    """
+    Garante Asset/Device/Sensor para cada série do fluxo (reaproveita devices
+    existentes pelo mqtt_client_id).
+
+    Returns:
+        Dict device_id -> (asset, [tags dos sensores])
+    """
+    from apps.assets.models import Asset, Device, Sensor, Site
+
+    tags_by_device = defaultdict(set)
+    for reading in readings:
+        tags_by_device[reading.device_id].add(reading.sensor_id)
+
+    site = None
+    equipment = {}
+    for index, (device_id, tags) in enumerate(sorted(tags_by_device.items())):
+        device = (
+            Device.objects.select_related("asset")
+            .filter(mqtt_client_id=device_id)
+            .first()
+        )
+        if device is None:
+            if site is None:
+                site, _ = Site.objects.get_or_create(name="Replay Bench")
+            asset = Asset.objects.create(
+                tag=f"BENCH-{index:04d}", site=site, asset_type="CHILLER"
+            )
+            device = Device.objects.create(
+                name=f"Replay {device_id}",
+                serial_number=f"BENCH-{device_id}",
+                asset=asset,
+                mqtt_client_id=device_id,
+                device_type="GATEWAY",
+            )
+        for tag in tags:
+            Sensor.objects.get_or_create(
+                device=device,
+                tag=tag,
+                defaults={"metric_type": "temp_supply", "unit": "celsius"},
+            )
+        equipment[device_id] = (device.asset, sorted(tags))
+    return equipment
+
+
+def create_rules(
+    equipment: Dict[str, tuple],
+    readings: List[ReadingSnapshot],
+    count: int,
+    parameters: int = 1,
+    trigger_ratio: float = 0.1,
+    aggregation: str = "all",
+    duration: int = 5,
+    seed: int = 42,
+) -> List[int]:
+    """
+    Cria ``count`` regras com ``parameters`` parâmetros cada, distribuídas
+    pelos equipamentos. Cada parâmetro dispara sempre (limite abaixo do
+    mínimo da série) com probabilidade ``trigger_ratio`` e nunca nos demais.
+    """
+    from apps.alerts.models import Rule, RuleParameter
+
+    rng = random.Random(seed)
+    bounds = {}
+    for reading in readings:
+        low, high = bounds.get(reading.sensor_id, (reading.value, reading.value))
+        bounds[reading.sensor_id] = (min(low, reading.value), max(high, reading.value))
+
+    devices = sorted(equipment)
+    rule_ids = []
+    for index in range(count):
+        asset, tags = equipment[devices[index % len(devices)]]
+        rule = Rule.objects.create(
+            name=f"Replay rule {index}", equipment=asset, actions=["IN_APP"]
+        )
+        params = []
+        for position in range(parameters):
+            tag = tags[(index + position) % len(tags)]
+            low, high = bounds[tag]
+            threshold = low - 1 if rng.random() < trigger_ratio else high + 1
+            params.append(
+                RuleParameter(
+                    rule=rule,
+                    parameter_key=tag,
+                    operator=">",
+                    threshold=threshold,
+                    duration=duration,
+                    aggregation=aggregation,
+                    message_template="{variavel} = {value}",
+                    order=position,
+                )
+            )
+        RuleParameter.objects.bulk_create(params)
+        rule_ids.append(rule.id)
+    return rule_ids
+
+
+def isolate_rules(schema_name: str, rule_ids: List[int]):
+    """Desativa as demais regras do schema (use dentro de uma transação desfeita)."""
+    from apps.alerts.models import Rule
+
+    Rule.objects.exclude(id__in=rule_ids).update(enabled=False)
+    invalidate_rule_index(schema_name)
+
+
+# =============================================================================
+# Replay
+# =============================================================================
+
+
+@contextmanager
+def _virtual_clock(moment: datetime):
+    with mock.patch.object(timezone, "now", return_value=moment):
+        yield
+
+
+def replay(
+    schema_name: str,
+    readings: List[ReadingSnapshot],
+    evaluator: str = "periodic",
+    cycle_seconds: int = 300,
+    max_cycles: Optional[int] = None,
+) -> ReplayReport:
+    """
+    Reproduz ``readings`` em fatias de ``cycle_seconds`` e avalia as regras ao
+    fim de cada fatia com ``EVALUATORS[evaluator]``.
+
+    Deve ser chamada dentro do schema do tenant.
+    """
+    from apps.alerts.models import Rule, RuleParameter
+    from apps.ingest.models import Reading
+
+    evaluate = EVALUATORS[evaluator]
+    readings = sorted(readings, key=lambda reading: reading.ts)
+    report = ReplayReport(
+        evaluator=evaluator,
+        rules=Rule.objects.filter(enabled=True).count(),
+        parameters=RuleParameter.objects.filter(rule__enabled=True).count(),
+        readings=len(readings),
+    )
+    if not readings:
+        return report
+
+    cycle = timedelta(seconds=cycle_seconds)
+    start = readings[0].ts
+    slices = defaultdict(list)
+    for reading in readings:
+        slices[(reading.ts - start) // cycle].append(reading)
+
+    cycles = max(slices) + 1
+    # O fim do último ciclo coincide com o instante atual
+    shift = timezone.now() - (start + cycle * cycles)
+
+    for index in range(cycles if max_cycles is None else min(cycles, max_cycles)):
+        clock = start + cycle * (index + 1) + shift
+        rows = Reading.objects.bulk_create(
+            Reading(
+                device_id=reading.device_id,
+                sensor_id=reading.sensor_id,
+                ts=reading.ts + shift,
+                value=reading.value,
+            )
+            for reading in slices.get(index, [])
+        )
+
+        with _virtual_clock(clock), CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = evaluate(schema_name, rows)
+            latency = time.perf_counter() - started
+
+        report.add_cycle(len(queries.captured_queries), latency, result)
+
+    return report
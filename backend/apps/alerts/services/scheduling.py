@@ -0,0 +1,144 @@
+"""
+Agendamento da avaliação periódica de regras por tenant.
+
+- Guarda de ciclo: um novo ciclo de um tenant não começa enquanto o anterior
+  ainda está rodando (lock no cache compartilhado, com TTL para o caso de o
+  worker morrer no meio do ciclo).
+- Shards: tenants com muitas regras são divididos por equipamento em shards
+  avaliados em paralelo (chord); todas as regras de um equipamento ficam no
+  mesmo shard, de modo que sensores e leituras são resolvidos uma vez só.
+- Retomada: quando uma avaliação estoura o orçamento de tempo, a primeira
+  regra pulada é gravada como cursor e o ciclo seguinte começa por ela, de
+  modo que as regras do fim da lista não ficam sempre sem avaliação.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY_PREFIX = "alerts:evaluation-lock"
+CURSOR_KEY_PREFIX = "alerts:evaluation-cursor"
+CURSOR_TTL_SECONDS = 3600
+
+
+def shard_size() -> int:
+    """Máximo de regras avaliadas inline; acima disso o tenant é dividido."""
+    return max(getattr(settings, "ALERTS_EVALUATION_SHARD_SIZE", 200), 1)
+
+
+def max_shards() -> int:
+    return max(getattr(settings, "ALERTS_EVALUATION_MAX_SHARDS", 8), 1)
+
+
+def time_budget_seconds() -> float:
+    """Orçamento de tempo de cada avaliação (tenant inteiro ou shard)."""
+    return float(getattr(settings, "ALERTS_EVALUATION_BUDGET_SECONDS", 60))
+
+
+def lock_ttl_seconds() -> int:
+    return int(getattr(settings, "ALERTS_EVALUATION_LOCK_TTL_SECONDS", 600))
+
+
+def _lock_key(tenant_schema: str) -> str:
+    return f"{LOCK_KEY_PREFIX}:{tenant_schema}"
+
+
+def acquire_tenant_lock(tenant_schema: str) -> Optional[str]:
+    """
+    Reserva o ciclo de avaliação do tenant.
+
+    Returns:
+        Token do lock, ou None se um ciclo anterior ainda está em andamento
+    """
+    token = uuid.uuid4().hex
+    if cache.add(_lock_key(tenant_schema), token, timeout=lock_ttl_seconds()):
+        return token
+    return None
+
+
+def release_tenant_lock(tenant_schema: str, token: str):
+    """Libera o lock apenas se ainda pertence a este ciclo."""
+    key = _lock_key(tenant_schema)
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def _cursor_key(tenant_schema: str, scope: str) -> str:
+    return f"{CURSOR_KEY_PREFIX}:{tenant_schema}:{scope}"
+
+
+def cursor_scope(rule_ids: Optional[Iterable[int]] = None) -> str:
+    """Escopo do cursor: o tenant inteiro ou o shard (identificado pela menor regra)."""
+    if rule_ids is None:
+        return "all"
+    return f"shard:{min(rule_ids, default=0)}"
+
+
+def resume_order(rules: List, tenant_schema: str, scope: str) -> List:
+    """
+    Reordena as regras (ordenadas por id) para começar pela primeira regra
+    pulada no ciclo anterior, seguindo em rodízio até as anteriores a ela.
+    """
+    cursor = cache.get(_cursor_key(tenant_schema, scope))
+    if cursor is None:
+        return rules
+    start = next((index for index, rule in enumerate(rules) if rule.id >= cursor), 0)
+    return rules[start:] + rules[:start]
+
+
+def save_resume_cursor(tenant_schema: str, scope: str, rule_id: Optional[int]):
+    """Grava a primeira regra pulada (ou limpa o cursor se nenhuma foi pulada)."""
+    key = _cursor_key(tenant_schema, scope)
+    if rule_id is None:
+        cache.delete(key)
+    else:
+        cache.set(key, rule_id, timeout=CURSOR_TTL_SECONDS)
+
+
+def shard_rules(rules: Iterable[Tuple[int, Optional[int]]]) -> List[List[int]]:
+    """
+    Divide ``(rule_id, equipment_id)`` em shards por equipamento.
+
+    O número de shards é ``ceil(regras / ALERTS_EVALUATION_SHARD_SIZE)``
+    limitado por ``ALERTS_EVALUATION_MAX_SHARDS``; cada equipamento é
+    atribuído por hash (equipment_id módulo número de shards).
+    """
+    rules = list(rules)
+    if not rules:
+        return []
+
+    count = min(-(-len(rules) // shard_size()), max_shards())
+    shards = defaultdict(list)
+    for rule_id, equipment_id in rules:
+        shards[(equipment_id or 0) % count].append(rule_id)
+
+    return [sorted(rule_ids) for _, rule_ids in sorted(shards.items())]
+
+
+def merge_shard_results(tenant: str, results: Iterable[dict]) -> dict:
+    """Soma os resultados dos shards de um tenant."""
+    merged = {
+        "tenant": tenant,
+        "evaluated": 0,
+        "triggered": 0,
+        "errors": 0,
+        "skipped": 0,
+        "over_budget": False,
+        "shards": 0,
+    }
+    for result in results:
+        if not result:
+            continue
+        merged["shards"] += 1
+        for field in ("evaluated", "triggered", "errors", "skipped"):
+            merged[field] += result.get(field, 0)
+        merged["over_budget"] = merged["over_budget"] or result.get(
+            "over_budget", False
+        )
+    return merged
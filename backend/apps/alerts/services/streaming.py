@@ -0,0 +1,354 @@
+"""
+Avaliação de regras em streaming (disparada pelo ingest).
+
+Com ``ALERTS_STREAMING_EVALUATION=True``, cada lote persistido pelo ingest
+consulta um índice em memória ``(device_id, sensor_id) -> [(rule_id,
+parameter_id)]`` e avalia apenas os parâmetros que dependem das leituras
+recebidas, usando o próprio valor recebido (sem consultar Reading). Parâmetros
+com janela de duração (services.windows) têm a janela agregada no banco numa
+única query por lote; parâmetros de anomalia (services.anomaly) são pontuados
+contra as linhas de base já calculadas.
+
+O índice é montado por schema a partir das regras ativas e invalidado pelos
+signals de Rule/RuleParameter/Sensor/Device (apps.alerts.signals). A task
+periódica ``alerts.evaluate_rules`` continua existindo como varredura de
+segurança (ALERTS_SWEEP_INTERVAL_SECONDS).
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.ingest.services.local_cache import LocalTTLCache
+
+from .anomaly import AnomalyScores, is_anomaly, load_baselines
+from .expressions import ExpressionError, compile_expression
+from .planner import (
+    CooldownState,
+    ReadingSnapshot,
+    SensorResolver,
+    fetch_cooldown_states,
+    fetch_latest_readings,
+    parameter_keys,
+)
+from .windows import fetch_window_aggregates, is_windowed, sustained_reading
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[str, str]
+# parameter_id None = regra no formato antigo (campos na própria Rule)
+IndexTarget = Tuple[int, Optional[int]]
+
+rule_index_cache = LocalTTLCache(
+    "alert_rule_index",
+    maxsize=getattr(settings, "ALERTS_RULE_INDEX_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "ALERTS_RULE_INDEX_TTL_SECONDS", 300),
+)
+
+
+def streaming_enabled() -> bool:
+    return getattr(settings, "ALERTS_STREAMING_EVALUATION", False)
+
+
+def build_rule_index() -> Dict[IndexKey, List[IndexTarget]]:
+    """
+    Monta o índice do schema atual a partir das regras ativas.
+
+    Sensores são resolvidos como na avaliação periódica (SensorResolver).
+    """
+    from apps.alerts.models import Rule, RuleParameter
+
+    # (rule_id, parameter_id, parameter_key, equipment_id)
+    entries = [
+        (rule_id, param_id, key, equipment_id)
+        for param_id, rule_id, key, equipment_id in RuleParameter.objects.filter(
+            rule__enabled=True
+        ).values_list("id", "rule_id", "parameter_key", "rule__equipment_id")
+    ]
+    entries.extend(
+        (rule_id, None, key, equipment_id)
+        for rule_id, key, equipment_id in Rule.objects.filter(
+            enabled=True, parameters__isnull=True, expression=""
+        )
+        .exclude(parameter_key__isnull=True)
+        .exclude(parameter_key="")
+        .values_list("id", "parameter_key", "equipment_id")
+    )
+    # Regras compostas: cada termo da expressão aponta para a regra
+    for rule_id, source, equipment_id in (
+        Rule.objects.filter(enabled=True)
+        .exclude(expression="")
+        .values_list("id", "expression", "equipment_id")
+    ):
+        try:
+            identifiers = compile_expression(source).identifiers
+        except ExpressionError:
+            continue
+        entries.extend((rule_id, None, name, equipment_id) for name in identifiers)
+    if not entries:
+        return {}
+
+    sensors = SensorResolver.load(key for _, _, key, _ in entries)
+
+    index = defaultdict(list)
+    for rule_id, param_id, key, equipment_id in entries:
+        for reading_key in sensors.resolve(key, equipment_id):
+            index[reading_key].append((rule_id, param_id))
+
+    return dict(index)
+
+
+def get_rule_index(schema_name: str) -> Dict[IndexKey, List[IndexTarget]]:
+    """Índice do schema (deve ser chamado dentro do schema do tenant)."""
+    return rule_index_cache.get_or_load(schema_name, build_rule_index)
+
+
+def invalidate_rule_index(schema_name: Optional[str] = None):
+    rule_index_cache.invalidate(schema_name)
+
+
+def match_readings(schema_name: str, readings: Iterable) -> List[ReadingSnapshot]:
+    """
+    Filtra as leituras que alimentam alguma regra (mais recente por chave).
+    """
+    index = get_rule_index(schema_name)
+    if not index:
+        return []
+
+    latest: Dict[IndexKey, object] = {}
+    for reading in readings:
+        key = (reading.device_id, reading.sensor_id)
+        if key not in index:
+            continue
+        current = latest.get(key)
+        if current is None or reading.ts > current.ts:
+            latest[key] = reading
+
+    return [
+        ReadingSnapshot(
+            device_id=reading.device_id,
+            sensor_id=reading.sensor_id,
+            ts=reading.ts,
+            value=reading.value,
+        )
+        for reading in latest.values()
+    ]
+
+
+def on_readings_persisted(schema_name: str, readings) -> int:
+    """
+    Hook do ingest (após o commit): agenda a avaliação dos parâmetros
+    afetados pelas leituras. Retorna quantas leituras foram encaminhadas.
+    """
+    if not streaming_enabled() or not readings:
+        return 0
+
+    try:
+        matched = match_readings(schema_name, readings)
+    except Exception as exc:
+        # Alertas não podem derrubar o ingest; a varredura periódica cobre
+        logger.error(f"❌ Falha ao consultar índice de regras: {exc}", exc_info=True)
+        return 0
+
+    if matched:
+        from apps.alerts.tasks import evaluate_streaming_readings
+
+        evaluate_streaming_readings.delay(
+            schema_name, [snapshot.as_dict() for snapshot in matched]
+        )
+    return len(matched)
+
+
+def evaluate_readings(
+    schema_name: str, snapshots: List[ReadingSnapshot]
+) -> Dict[str, int]:
+    """
+    Avalia os parâmetros ligados às leituras recebidas, cria alertas e agenda
+    as notificações.
+
+    Deve ser chamada dentro do schema do tenant.
+    """
+    from apps.alerts.models import Rule
+    from apps.alerts.tasks import (
+        COMPOSITE_PARAMETER_KEY,
+        READING_MAX_AGE_MINUTES,
+        create_alert_from_reading,
+        create_composite_alert,
+        create_legacy_alert_from_reading,
+        enqueue_alert_notifications,
+        get_alert_cooldown_minutes,
+    )
+
+    stats = {"evaluated": 0, "triggered": 0, "errors": 0}
+    index = get_rule_index(schema_name)
+
+    targets = []
+    for snapshot in snapshots:
+        for rule_id, param_id in index.get(
+            (snapshot.device_id, snapshot.sensor_id), []
+        ):
+            targets.append((rule_id, param_id, snapshot))
+    if not targets:
+        return stats
+
+    rules = {
+        rule.id: rule
+        for rule in Rule.objects.filter(
+            enabled=True, id__in={rule_id for rule_id, _, _ in targets}
+        )
+        .select_related("equipment", "created_by")
+        .prefetch_related("parameters")
+    }
+
+    # Cooldown de todos os pares (rule, parameter_key) numa query agrupada
+    now = timezone.now()
+    cooldowns = fetch_cooldown_states(rules.keys(), now)
+
+    # Janelas de duração dos parâmetros afetados, agregadas no banco
+    window_aggregates = fetch_window_aggregates(
+        (
+            ((snapshot.device_id, snapshot.sensor_id), param)
+            for rule_id, param_id, snapshot in targets
+            if param_id is not None and rule_id in rules
+            for param in rules[rule_id].parameters.all()
+            if param.id == param_id and is_windowed(param)
+        ),
+        now,
+    )
+
+    # Desvio (em σ) das leituras recebidas para os parâmetros de anomalia; as
+    # linhas de base são atualizadas pela varredura periódica
+    anomaly_keys = {
+        (snapshot.device_id, snapshot.sensor_id)
+        for rule_id, param_id, snapshot in targets
+        if param_id is not None and rule_id in rules
+        for param in rules[rule_id].parameters.all()
+        if param.id == param_id and is_anomaly(param)
+    }
+    anomaly_scores = None
+    if anomaly_keys:
+        anomaly_scores = AnomalyScores(
+            {
+                (snapshot.device_id, snapshot.sensor_id): snapshot
+                for snapshot in snapshots
+                if (snapshot.device_id, snapshot.sensor_id) in anomaly_keys
+            },
+            load_baselines(anomaly_keys),
+        )
+
+    # Regras compostas: snapshot único das últimas leituras de todos os termos
+    # (uma query), com as leituras recebidas sobrepostas
+    composite_rules = {
+        rule_id: rules[rule_id]
+        for rule_id, param_id, _ in targets
+        if param_id is None and rule_id in rules and rules[rule_id].expression
+    }
+    composite_readings = {}
+    composite_sensors = None
+    if composite_rules:
+        identifiers = {
+            (rule.equipment_id, name)
+            for rule in composite_rules.values()
+            for name in parameter_keys(rule)
+        }
+        composite_sensors = SensorResolver.load(name for _, name in identifiers)
+        keys = set()
+        for equipment_id, name in identifiers:
+            keys.update(composite_sensors.resolve(name, equipment_id))
+        composite_readings = fetch_latest_readings(
+            keys, since=now - timedelta(minutes=READING_MAX_AGE_MINUTES)
+        )
+        for snapshot in snapshots:
+            key = (snapshot.device_id, snapshot.sensor_id)
+            current = composite_readings.get(key)
+            if key in keys and (current is None or snapshot.ts >= current.ts):
+                composite_readings[key] = snapshot
+    evaluated_composites = set()
+
+    for rule_id, param_id, snapshot in targets:
+        rule = rules.get(rule_id)
+        if rule is None:
+            continue
+
+        if param_id is None and rule.expression:
+            # Uma avaliação por regra composta no lote
+            if rule.id in evaluated_composites:
+                continue
+            evaluated_composites.add(rule.id)
+
+        try:
+            stats["evaluated"] += 1
+            if param_id is None and rule.expression:
+                param = None
+                parameter_key = COMPOSITE_PARAMETER_KEY
+            elif param_id is None:
+                param = None
+                parameter_key = rule.parameter_key
+            else:
+                param = next(
+                    (p for p in rule.parameters.all() if p.id == param_id), None
+                )
+                if param is None:
+                    continue
+                parameter_key = param.parameter_key
+
+            state = cooldowns.setdefault((rule.id, parameter_key), CooldownState())
+            can_alert, reason = state.check(get_alert_cooldown_minutes(rule), now)
+            if not can_alert:
+                logger.debug(f"Rule {rule.id} cannot trigger (streaming): {reason}")
+                continue
+
+            if param is None and rule.expression:
+                readings = {}
+                for name in parameter_keys(rule):
+                    candidates = [
+                        composite_readings[key]
+                        for key in composite_sensors.resolve(name, rule.equipment_id)
+                        if key in composite_readings
+                    ]
+                    readings[name] = (
+                        max(candidates, key=lambda reading: reading.ts)
+                        if candidates
+                        else None
+                    )
+                alert = create_composite_alert(rule, readings)
+            elif param is None:
+                alert = create_legacy_alert_from_reading(rule, snapshot)
+            elif is_anomaly(param):
+                key = (snapshot.device_id, snapshot.sensor_id)
+                alert = create_alert_from_reading(
+                    rule, param, snapshot, score=anomaly_scores.score(param, key)
+                )
+            else:
+                reading = snapshot
+                if is_windowed(param):
+                    key = (snapshot.device_id, snapshot.sensor_id)
+                    reading, reason = sustained_reading(
+                        param, window_aggregates.get((key, param.id)), now
+                    )
+                    if reading is None:
+                        logger.debug(
+                            f"Rule {rule.id} parameter {parameter_key} window: {reason}"
+                        )
+                        continue
+                alert = create_alert_from_reading(rule, param, reading)
+            if not alert:
+                continue
+
+            state.last_active_at = alert.triggered_at or now
+            stats["triggered"] += 1
+            enqueue_alert_notifications(alert)
+        except Exception as e:
+            logger.error(
+                "Error evaluating rule %s (streaming) in schema %s: %s",
+                rule_id,
+                schema_name,
+                str(e),
+            )
+            stats["errors"] += 1
+
+    return stats
@@ -0,0 +1,225 @@
+"""
+Avaliação de condição sustentada (RuleParameter.duration / aggregation).
+
+Em vez de comparar só a última leitura, o parâmetro é avaliado sobre a janela
+dos últimos ``duration`` minutos:
+
+- ``latest``: última leitura (comportamento anterior)
+- ``all``: todas as amostras da janela satisfazem a condição
+- ``mean``: a média das amostras da janela satisfaz a condição
+- ``percentile``: o percentil ``percentile`` das amostras satisfaz a condição
+
+A janela só é considerada completa se existir uma amostra anterior ao início
+dela (o valor vigente no início da janela); no modo ``all`` essa amostra também
+precisa satisfazer a condição. Assim um pico isolado nunca dispara alerta.
+A amostra anterior só vale se estiver a até WINDOW_LOOKBACK_MINUTES do início
+da janela.
+
+No modo ``all`` uma janela sem amostras não é incompleta: dispositivos que só
+publicam na mudança de valor mantêm a amostra anterior vigente durante toda a
+janela, e é ela que é avaliada.
+
+A janela de cada parâmetro é agregada no próprio banco (fetch_window_aggregates):
+uma única query para todos os pares (sensor, parâmetro) do tenant, cada um com
+a sua duração, devolvendo uma linha por par (amostra anterior via LATERAL,
+contagem, média, percentil e ``bool_and`` da condição). Nenhuma amostra bruta
+da janela é trazida para o Python.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import connection
+
+from .planner import ReadingKey, ReadingSnapshot
+
+# Amostra anterior ao início da janela é procurada até este limite
+WINDOW_LOOKBACK_MINUTES = 15
+
+# (device_id, sensor_id), RuleParameter.id
+WindowKey = Tuple[ReadingKey, int]
+
+
+@dataclass(frozen=True)
+class WindowAggregate:
+    """Resumo da janela de um parâmetro sobre um sensor."""
+
+    prior: Optional[ReadingSnapshot]
+    latest: Optional[ReadingSnapshot]
+    count: int
+    mean: Optional[float]
+    percentile: Optional[float]
+    all_satisfied: Optional[bool]
+
+
+def is_windowed(param) -> bool:
+    """Parâmetros de anomalia (services.anomaly) não usam janela."""
+    return bool(
+        param.duration
+        and param.duration > 0
+        and param.aggregation != "latest"
+        and getattr(param, "condition_type", "threshold") == "threshold"
+    )
+
+
+def fetch_window_aggregates(
+    requests: Iterable[Tuple[ReadingKey, object]], now: datetime
+) -> Dict[WindowKey, WindowAggregate]:
+    """
+    Agrega a janela de cada par ((device_id, sensor_id), RuleParameter) numa
+    única query, com a duração, o operador e o percentil de cada parâmetro.
+    """
+    pairs = {(key, param.id): param for key, param in requests}
+    if not pairs:
+        return {}
+
+    rows = [
+        (
+            device_id,
+            sensor_id,
+            param_id,
+            param.duration,
+            param.operator,
+            param.threshold,
+            param.percentile or 95.0,
+        )
+        for ((device_id, sensor_id), param_id), param in pairs.items()
+    ]
+    columns = [list(column) for column in zip(*rows, strict=True)]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH w AS (
+                SELECT k.*, %s::timestamptz - make_interval(mins => k.duration) AS start
+                FROM unnest(
+                    %s::text[], %s::text[], %s::int[], %s::int[], %s::text[],
+                    %s::double precision[], %s::double precision[]
+                ) AS k(device_id, sensor_id, param_id, duration, operator,
+                       threshold, pct)
+            )
+            SELECT w.device_id, w.sensor_id, w.param_id,
+                   prior.ts, prior.value, latest.ts, latest.value,
+                   agg.n, agg.mean, agg.pct_value, agg.all_ok
+            FROM w
+            LEFT JOIN LATERAL (
+                SELECT r.ts, r.value
+                FROM reading r
+                WHERE r.device_id = w.device_id
+                  AND r.sensor_id = w.sensor_id
+                  AND r.ts >= w.start - make_interval(mins => %s)
+                  AND r.ts < w.start
+                ORDER BY r.ts DESC
+                LIMIT 1
+            ) prior ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT r.ts, r.value
+                FROM reading r
+                WHERE r.device_id = w.device_id
+                  AND r.sensor_id = w.sensor_id
+                  AND r.ts >= w.start
+                ORDER BY r.ts DESC
+                LIMIT 1
+            ) latest ON TRUE
+            CROSS JOIN LATERAL (
+                SELECT COUNT(*) AS n,
+                       AVG(r.value) AS mean,
+                       percentile_disc(w.pct / 100.0) WITHIN GROUP (ORDER BY r.value)
+                           AS pct_value,
+                       bool_and(
+                           CASE w.operator
+                               WHEN '>' THEN r.value > w.threshold
+                               WHEN '<' THEN r.value < w.threshold
+                               WHEN '>=' THEN r.value >= w.threshold
+                               WHEN '<=' THEN r.value <= w.threshold
+                               WHEN '==' THEN r.value = w.threshold
+                               WHEN '!=' THEN r.value <> w.threshold
+                               ELSE FALSE
+                           END
+                       ) AS all_ok
+                FROM reading r
+                WHERE r.device_id = w.device_id
+                  AND r.sensor_id = w.sensor_id
+                  AND r.ts >= w.start
+            ) agg
+            """,
+            [now, *columns, WINDOW_LOOKBACK_MINUTES],
+        )
+        aggregates = {}
+        for row in cursor.fetchall():
+            device_id, sensor_id, param_id = row[:3]
+            prior_ts, prior_value, latest_ts, latest_value = row[3:7]
+            count, mean, pct_value, all_ok = row[7:]
+            aggregates[((device_id, sensor_id), param_id)] = WindowAggregate(
+                prior=(
+                    ReadingSnapshot(device_id, sensor_id, prior_ts, prior_value)
+                    if prior_ts is not None
+                    else None
+                ),
+                latest=(
+                    ReadingSnapshot(device_id, sensor_id, latest_ts, latest_value)
+                    if latest_ts is not None
+                    else None
+                ),
+                count=count,
+                mean=mean,
+                percentile=pct_value,
+                all_satisfied=all_ok,
+            )
+        return aggregates
+
+
+def sustained_reading(
+    param, aggregate: Optional[WindowAggregate], now: datetime
+) -> Tuple[Optional[ReadingSnapshot], str]:
+    """
+    Leitura efetiva da janela do parâmetro.
+
+    Returns:
+        (ReadingSnapshot com o valor agregado, motivo) ou (None, motivo) quando
+        a janela está incompleta ou, no modo ``all``, a condição não se sustentou.
+        O valor retornado ainda deve passar por evaluate_condition (feito em
+        create_alert_from_reading).
+    """
+    from apps.alerts.tasks import evaluate_condition
+
+    if aggregate is None or (aggregate.prior is None and not aggregate.count):
+        return None, "no samples"
+
+    prior = aggregate.prior
+    if prior is None:
+        return None, f"window of {param.duration}min not covered"
+
+    if not aggregate.count and param.aggregation == "all":
+        # Sem amostras na janela: o valor anterior segue vigente até agora
+        if not evaluate_condition(prior.value, param.operator, param.threshold):
+            return None, f"condition not sustained for {param.duration}min"
+        return (
+            ReadingSnapshot(prior.device_id, prior.sensor_id, now, prior.value),
+            "all",
+        )
+
+    if not aggregate.count:
+        return None, f"window of {param.duration}min not covered"
+
+    latest = aggregate.latest
+
+    if param.aggregation == "all":
+        if not aggregate.all_satisfied or not evaluate_condition(
+            prior.value, param.operator, param.threshold
+        ):
+            return None, f"condition not sustained for {param.duration}min"
+        return latest, "all"
+
+    if param.aggregation == "mean":
+        value = aggregate.mean
+    elif param.aggregation == "percentile":
+        value = aggregate.percentile
+    else:
+        return latest, "latest"
+
+    return (
+        ReadingSnapshot(latest.device_id, latest.sensor_id, latest.ts, value),
+        param.aggregation,
+    )
@@ -0,0 +1,92 @@
+"""
+Signals para app de Alertas.
+
+Responsável por invalidar o índice de regras da avaliação em streaming
+(apps.alerts.services.streaming) quando regras ou a topologia de sensores mudam,
+por manter os contadores de alertas (apps.alerts.services.counters) e a
+contagem de regras habilitadas no TenantWorkIndex (apps.tenants.work_index).
+"""
+
+from django.db import connection
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.assets.models import Device, Sensor
+from apps.tenants.models import WorkType
+from apps.tenants.work_index import WorkIndexService
+
+from .models import Alert, Rule, RuleParameter
+from .services import counters
+from .services.streaming import invalidate_rule_index
+
+
+@receiver(post_save, sender=Rule)
+@receiver(post_delete, sender=Rule)
+@receiver(post_save, sender=RuleParameter)
+@receiver(post_delete, sender=RuleParameter)
+def invalidate_rule_index_on_rule_change(sender, instance, **kwargs):
+    invalidate_rule_index(connection.schema_name)
+
+
+@receiver(post_save, sender=Rule)
+@receiver(post_delete, sender=Rule)
+def refresh_rules_work_index(sender, instance, **kwargs):
+    """Reconta as regras habilitadas do tenant no TenantWorkIndex após o commit."""
+    WorkIndexService.touch_on_commit(connection.schema_name, WorkType.RULES)
+
+
+@receiver(post_delete, sender=Rule)
+def detach_alert_counters_on_rule_delete(sender, instance, **kwargs):
+    counters.detach_rule(instance.id)
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_save, sender=Sensor)
+def invalidate_rule_index_on_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Heartbeats e últimas leituras (campos voláteis) não mudam o índice.
+    """
+    from apps.ingest.services.topology import VOLATILE_TOPOLOGY_FIELDS
+
+    if update_fields and set(update_fields) <= VOLATILE_TOPOLOGY_FIELDS:
+        return
+    invalidate_rule_index(connection.schema_name)
+
+
+@receiver(post_delete, sender=Device)
+@receiver(post_delete, sender=Sensor)
+def invalidate_rule_index_on_delete(sender, instance, **kwargs):
+    invalidate_rule_index(connection.schema_name)
+
+
+def _counter_key(alert):
+    return (alert.asset_tag, alert.severity, alert.rule_id, alert.counter_state)
+
+
+@receiver(post_init, sender=Alert)
+def remember_alert_counter_key(sender, instance, **kwargs):
+    instance._counter_key = _counter_key(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Alert)
+def update_alert_counters_on_save(sender, instance, created, **kwargs):
+    new_key = _counter_key(instance)
+    old_key = None if created else getattr(instance, "_counter_key", None)
+    if old_key == new_key:
+        return
+
+    if old_key and old_key[:3] == new_key[:3]:
+        counters.record_transition(instance, old_key[3], new_key[3])
+    else:
+        if old_key:
+            asset_tag, severity, rule_id, state = old_key
+            counters.apply_delta(asset_tag, severity, rule_id, {state: -1})
+        counters.record_transition(instance, None, new_key[3])
+    instance._counter_key = new_key
+
+
+@receiver(post_delete, sender=Alert)
+def update_alert_counters_on_delete(sender, instance, **kwargs):
+    key = getattr(instance, "_counter_key", None) or _counter_key(instance)
+    asset_tag, severity, rule_id, state = key
+    counters.apply_delta(asset_tag, severity, rule_id, {state: -1})
@@ -9,13 +9,16 @@ This module contains periodic tasks that:
 
 import logging
 from datetime import timedelta
-from typing import Tuple
+from typing import Optional, Tuple
 
+from django.conf import settings
 from django.utils import timezone
 
 from celery import shared_task
 
-from apps.common.tenancy import get_tenant_by_schema, iter_tenants
+from apps.common.tenancy import get_tenant_by_schema, iter_active_tenants, iter_tenants
+from apps.tenants.models import WorkType
+from apps.tenants.work_index import WorkIndexService
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,15 @@ ACKNOWLEDGED_CHECK_INTERVAL_MINUTES = (
     60  # Check every 1 hour if alert still acknowledged
 )
 RESOLVED_COOLDOWN_MINUTES = 30  # Can generate new alert 30 min after resolution
+READING_MAX_AGE_MINUTES = 15  # Older readings never trigger alerts
+COMPOSITE_PARAMETER_KEY = "expression"  # Alert.parameter_key of composite rules
+
+
+def get_alert_cooldown_minutes(rule) -> int:
+    """Cooldown configurado pelo criador da regra (ou o padrão)."""
+    if rule.created_by and hasattr(rule.created_by, "alert_cooldown_minutes"):
+        return rule.created_by.alert_cooldown_minutes or DEFAULT_ALERT_COOLDOWN_MINUTES
+    return DEFAULT_ALERT_COOLDOWN_MINUTES
 
 
 def check_alert_cooldown(rule, parameter_key: str) -> Tuple[bool, str]:
@@ -50,11 +62,7 @@ def check_alert_cooldown(rule, parameter_key: str) -> Tuple[bool, str]:
     now = timezone.now()
 
     # Get cooldown from rule creator's preferences, or use default
-    cooldown_minutes = DEFAULT_ALERT_COOLDOWN_MINUTES
-    if rule.created_by and hasattr(rule.created_by, "alert_cooldown_minutes"):
-        cooldown_minutes = (
-            rule.created_by.alert_cooldown_minutes or DEFAULT_ALERT_COOLDOWN_MINUTES
-        )
+    cooldown_minutes = get_alert_cooldown_minutes(rule)
 
     # 1. Check for active (unacknowledged) alerts within cooldown period
     cooldown_period = timedelta(minutes=cooldown_minutes)
@@ -120,57 +128,84 @@ def check_alert_cooldown(rule, parameter_key: str) -> Tuple[bool, str]:
     return True, "OK"
 
 
-def _evaluate_rules_for_tenant(tenant_schema: str, tenant_slug: str):
+def _evaluate_rules_for_tenant(
+    tenant_schema: str,
+    tenant_slug: str,
+    rule_ids=None,
+    budget_seconds: Optional[float] = None,
+):
+    """
+    Avalia as regras ativas do tenant (ou só ``rule_ids``, quando é um shard).
+
+    Ao estourar ``budget_seconds`` as regras restantes ficam para o próximo
+    ciclo e são contadas em ``skipped`` (``over_budget=True``); o próximo ciclo
+    começa pela primeira regra pulada (ver services.scheduling). O orçamento
+    inclui a montagem do TenantEvaluationPlan, e ao menos uma regra é avaliada
+    por ciclo para que a retomada sempre avance.
+    """
     import time
 
     from django_tenants.utils import schema_context
 
     from apps.alerts.models import Rule
-    from apps.alerts.services import NotificationService
+    from apps.alerts.services import scheduling
+    from apps.alerts.services.planner import TenantEvaluationPlan
 
     tenant_start_time = time.time()
+    deadline = tenant_start_time + budget_seconds if budget_seconds else None
     evaluated_count = 0
     triggered_count = 0
     error_count = 0
+    skipped_count = 0
 
     try:
         with schema_context(tenant_schema):
-            rules = (
-                Rule.objects.filter(enabled=True)
-                .select_related("equipment", "equipment__site")
-                .prefetch_related(
-                    "parameters",
-                    "equipment__devices",
-                    "equipment__devices__sensors",
-                )
+            queryset = Rule.objects.filter(enabled=True)
+            if rule_ids is not None:
+                queryset = queryset.filter(id__in=rule_ids)
+            rules = list(
+                queryset.select_related("equipment", "equipment__site", "created_by")
+                .prefetch_related("parameters")
+                .order_by("id")
             )
 
-            if not rules.exists():
+            if not rules:
                 logger.debug("No enabled rules found for tenant %s", tenant_slug)
                 return {
                     "tenant": tenant_slug,
                     "evaluated": 0,
                     "triggered": 0,
                     "errors": 0,
+                    "skipped": 0,
+                    "over_budget": False,
                 }
 
-            enabled_rule_ids = list(rules.values_list("id", "name", "enabled"))
             logger.info(
                 "Evaluating %s enabled rules for tenant %s: %s",
-                rules.count(),
+                len(rules),
                 tenant_slug,
-                ", ".join(
-                    [f"#{r[0]} {r[1]} (enabled={r[2]})" for r in enabled_rule_ids]
-                ),
+                ", ".join([f"#{r.id} {r.name} (enabled={r.enabled})" for r in rules]),
             )
 
-            notification_service = NotificationService()
+            scope = scheduling.cursor_scope(rule_ids)
+            rules = scheduling.resume_order(rules, tenant_schema, scope)
+
+            # Sensores, últimas leituras e cooldowns de todas as regras em
+            # um número fixo de queries (ver services.planner); o tempo de
+            # montagem já conta no orçamento (deadline parte do início)
+            plan = TenantEvaluationPlan(rules)
+
+            first_skipped = None
+            for index, rule in enumerate(rules):
+                if index and deadline and time.time() > deadline:
+                    skipped_count = len(rules) - index
+                    first_skipped = rule.id
+                    break
 
-            for rule in rules:
                 try:
                     evaluated_count += 1
 
-                    alert = evaluate_single_rule(rule)
+                    alert = plan.evaluate_rule(rule)
 
                     if alert:
                         triggered_count += 1
@@ -183,25 +218,7 @@ def _evaluate_rules_for_tenant(tenant_schema: str, tenant_slug: str):
                             tenant_slug,
                         )
 
-                        try:
-                            results = notification_service.send_alert_notifications(
-                                alert
-                            )
-                            logger.info(
-                                "Notifications sent for alert %s: %s sent, %s failed, %s skipped",
-                                alert.id,
-                                len(results["sent"]),
-                                len(results["failed"]),
-                                len(results["skipped"]),
-                            )
-                        except Exception as e:
-                            logger.error(
-                                "Failed to send notifications for alert %s: %s",
-                                alert.id,
-                                str(e),
-                            )
-                            error_count += 1
-
+                        enqueue_alert_notifications(alert)
                 except Exception as e:
                     logger.error(
                         "Error evaluating rule %s in tenant %s: %s",
@@ -211,12 +228,22 @@ def _evaluate_rules_for_tenant(tenant_schema: str, tenant_slug: str):
                     )
                     error_count += 1
 
+            scheduling.save_resume_cursor(tenant_schema, scope, first_skipped)
+
     except Exception as e:
         logger.error("Error processing tenant %s: %s", tenant_slug, str(e))
         error_count += 1
 
     tenant_duration = time.time() - tenant_start_time
-    if tenant_duration > 5.0:
+    if skipped_count:
+        logger.warning(
+            "Tenant %s over time budget (%.0fs): %s rules evaluated, %s skipped",
+            tenant_slug,
+            budget_seconds,
+            evaluated_count,
+            skipped_count,
+        )
+    elif tenant_duration > 5.0:
         logger.warning(
             "Slow tenant detected: %s took %.2fs to evaluate %s rules",
             tenant_slug,
@@ -231,32 +258,301 @@ def _evaluate_rules_for_tenant(tenant_schema: str, tenant_slug: str):
         "evaluated": evaluated_count,
         "triggered": triggered_count,
         "errors": error_count,
+        "skipped": skipped_count,
+        "over_budget": bool(skipped_count),
     }
 
 
 @shared_task(name="alerts.evaluate_rules_for_tenant", bind=True)
-def evaluate_rules_for_tenant(self, tenant_schema: str):
+def evaluate_rules_for_tenant(self, tenant_schema: str, work_version=None):
+    """
+    Avalia as regras de um tenant.
+
+    Não inicia se o ciclo anterior do tenant ainda está rodando. Tenants com
+    mais de ALERTS_EVALUATION_SHARD_SIZE regras são divididos em shards por
+    equipamento, avaliados em paralelo (chord) e consolidados em
+    ``alerts.finish_tenant_evaluation``, que libera o lock do ciclo (ou
+    ``alerts.release_tenant_evaluation_lock``, se algum shard falhar).
+
+    O número de regras habilitadas é gravado no TenantWorkIndex
+    (``work_version`` vem de evaluate_rules_task).
+    """
+    from celery import chord
+    from django_tenants.utils import schema_context
+
+    from apps.alerts.models import Rule
+    from apps.alerts.services import scheduling
+
+    tenant = get_tenant_by_schema(tenant_schema)
+    if not tenant:
+        logger.error("Tenant not found for schema: %s", tenant_schema)
+        return {"tenant": tenant_schema, "evaluated": 0, "triggered": 0, "errors": 1}
+
+    token = scheduling.acquire_tenant_lock(tenant.schema_name)
+    if token is None:
+        logger.warning(
+            "Previous rule evaluation still running for tenant %s, skipping cycle",
+            tenant.slug,
+        )
+        return {
+            "tenant": tenant.slug,
+            "evaluated": 0,
+            "triggered": 0,
+            "errors": 0,
+            "skipped_cycle": True,
+        }
+
+    try:
+        with schema_context(tenant.schema_name):
+            rules = list(
+                Rule.objects.filter(enabled=True).values_list("id", "equipment_id")
+            )
+        WorkIndexService.record(
+            tenant.schema_name, WorkType.RULES, len(rules), version=work_version
+        )
+
+        shards = scheduling.shard_rules(rules)
+        if len(shards) > 1:
+            logger.info(
+                "Evaluating %s rules for tenant %s in %s shards",
+                len(rules),
+                tenant.slug,
+                len(shards),
+            )
+            # Se um shard falhar o callback não roda: o errback libera o lock
+            callback = finish_tenant_evaluation.s(tenant.schema_name, token)
+            callback.link_error(
+                release_tenant_evaluation_lock.si(tenant.schema_name, token)
+            )
+            chord(
+                evaluate_rule_shard.s(tenant.schema_name, rule_ids)
+                for rule_ids in shards
+            )(callback)
+            return {"tenant": tenant.slug, "shards": len(shards), "rules": len(rules)}
+    except Exception:
+        scheduling.release_tenant_lock(tenant.schema_name, token)
+        raise
+
+    try:
+        return _evaluate_rules_for_tenant(
+            tenant.schema_name,
+            tenant.slug,
+            budget_seconds=scheduling.time_budget_seconds(),
+        )
+    finally:
+        scheduling.release_tenant_lock(tenant.schema_name, token)
+
+
+@shared_task(name="alerts.evaluate_rule_shard", bind=True)
+def evaluate_rule_shard(self, tenant_schema: str, rule_ids):
+    """Avalia um shard de regras de um tenant (cabeçalho do chord)."""
+    from apps.alerts.services.scheduling import time_budget_seconds
+
     tenant = get_tenant_by_schema(tenant_schema)
     if not tenant:
         logger.error("Tenant not found for schema: %s", tenant_schema)
         return {"tenant": tenant_schema, "evaluated": 0, "triggered": 0, "errors": 1}
 
-    return _evaluate_rules_for_tenant(tenant.schema_name, tenant.slug)
+    return _evaluate_rules_for_tenant(
+        tenant.schema_name,
+        tenant.slug,
+        rule_ids=rule_ids,
+        budget_seconds=time_budget_seconds(),
+    )
+
+
+@shared_task(name="alerts.finish_tenant_evaluation", bind=True)
+def finish_tenant_evaluation(self, results, tenant_schema: str, token: str):
+    """Consolida os shards de um tenant e libera o lock do ciclo."""
+    from apps.alerts.services.scheduling import merge_shard_results, release_tenant_lock
+
+    release_tenant_lock(tenant_schema, token)
+    summary = merge_shard_results(tenant_schema, results)
+    log = logger.warning if summary["over_budget"] else logger.info
+    log(
+        "Tenant %s evaluated in %s shards: %s evaluated, %s triggered, %s skipped, over budget: %s",
+        tenant_schema,
+        summary["shards"],
+        summary["evaluated"],
+        summary["triggered"],
+        summary["skipped"],
+        summary["over_budget"],
+    )
+    return summary
+
+
+@shared_task(name="alerts.release_tenant_evaluation_lock")
+def release_tenant_evaluation_lock(tenant_schema: str, token: str):
+    """Errback do chord de shards: libera o lock quando um shard falha."""
+    from apps.alerts.services.scheduling import release_tenant_lock
+
+    logger.warning(
+        "Sharded rule evaluation failed for tenant %s, releasing cycle lock",
+        tenant_schema,
+    )
+    release_tenant_lock(tenant_schema, token)
 
 
 @shared_task(name="alerts.evaluate_rules")
 def evaluate_rules_task():
     """
     Schedule per-tenant rule evaluations to avoid blocking other tenants.
+
+    With ALERTS_STREAMING_EVALUATION enabled, rules are evaluated as readings
+    arrive and this task only runs as a staleness sweep. Tenants without
+    enabled rules in the tenant work index are not scheduled.
     """
-    tenants = list(iter_tenants())
+    tenants = list(iter_active_tenants(WorkType.RULES))
     for tenant in tenants:
-        evaluate_rules_for_tenant.delay(tenant.schema_name)
+        evaluate_rules_for_tenant.delay(
+            tenant.schema_name, work_version=tenant.work_version
+        )
 
     logger.info("Scheduled rule evaluation for %s tenants", len(tenants))
     return {"scheduled": len(tenants), "tenants": len(tenants)}
 
 
+@shared_task(name="alerts.evaluate_streaming_readings", bind=True)
+def evaluate_streaming_readings(self, tenant_schema: str, readings):
+    """
+    Avalia apenas as regras afetadas por leituras recém-persistidas pelo ingest
+    (ver apps.alerts.services.streaming).
+    """
+    from django_tenants.utils import schema_context
+
+    from apps.alerts.services.streaming import ReadingSnapshot, evaluate_readings
+
+    snapshots = [ReadingSnapshot.from_dict(reading) for reading in readings]
+    with schema_context(tenant_schema):
+        stats = evaluate_readings(tenant_schema, snapshots)
+
+    if stats["triggered"]:
+        logger.info(
+            "Streaming evaluation for %s: %s evaluated, %s triggered",
+            tenant_schema,
+            stats["evaluated"],
+            stats["triggered"],
+        )
+    return {"tenant": tenant_schema, **stats}
+
+
+def enqueue_alert_notifications(alert):
+    """
+    Agenda as notificações de um alerta (sem I/O externo na avaliação).
+
+    A task roda após o commit da transação que criou o alerta.
+    """
+    from django.db import connection, transaction
+
+    schema_name = connection.schema_name
+    transaction.on_commit(
+        lambda: dispatch_alert_notifications.delay(schema_name, alert.id)
+    )
+
+
+@shared_task(name="alerts.dispatch_alert_notifications", bind=True)
+def dispatch_alert_notifications(self, tenant_schema: str, alert_id: int):
+    """
+    Planeja as notificações de um alerta e agenda um envio por canal.
+
+    Preferências são carregadas em lote e os destinatários agrupados por
+    canal (ver NotificationService.plan_recipients). Cada alerta é
+    despachado uma única vez (chave de deduplicação no cache); se o
+    planejamento ou o agendamento falhar, a chave é removida.
+    """
+    from django.core.cache import cache
+
+    from django_tenants.utils import schema_context
+
+    from apps.alerts.models import Alert
+    from apps.alerts.services import NotificationService
+
+    dedup_key = f"alerts:notified:{tenant_schema}:{alert_id}"
+    dedup_ttl = getattr(settings, "ALERTS_NOTIFICATION_DEDUP_TTL_SECONDS", 86400)
+    if not cache.add(dedup_key, True, timeout=dedup_ttl):
+        logger.info("Notifications for alert %s already dispatched", alert_id)
+        return {"alert": alert_id, "duplicate": True}
+
+    try:
+        with schema_context(tenant_schema):
+            alert = Alert.objects.select_related("rule").filter(id=alert_id).first()
+            if alert is None:
+                logger.warning("Alert %s not found in %s", alert_id, tenant_schema)
+                return {"alert": alert_id, "channels": {}}
+
+            recipients, results = NotificationService().plan_recipients(alert)
+
+        channels = {}
+        for channel, channel_recipients in recipients.items():
+            user_ids = [user.id for user, _ in channel_recipients]
+            send_alert_channel.delay(tenant_schema, alert_id, channel, user_ids)
+            channels[channel] = len(user_ids)
+    except Exception:
+        # Falhou antes de agendar os envios: libera a chave para que um novo
+        # despacho do alerta não seja descartado como duplicado
+        cache.delete(dedup_key)
+        raise
+
+    logger.info(
+        "Alert %s notifications dispatched: %s (%s skipped)",
+        alert_id,
+        channels,
+        len(results["skipped"]),
+    )
+    return {"alert": alert_id, "channels": channels, "skipped": len(results["skipped"])}
+
+
+@shared_task(name="alerts.send_alert_channel", bind=True, max_retries=5)
+def send_alert_channel(self, tenant_schema: str, alert_id: int, channel: str, user_ids):
+    """
+    Envia um alerta a todos os destinatários de um canal.
+
+    Destinatários que falharam são reenviados com backoff exponencial por
+    canal (ALERTS_NOTIFICATION_RETRY_BACKOFF_SECONDS); os demais não recebem
+    a mensagem de novo.
+    """
+    from django_tenants.utils import schema_context
+
+    from apps.accounts.models import User
+    from apps.alerts.models import Alert
+    from apps.alerts.services import NotificationService
+    from apps.alerts.services.notification_service import retry_countdown
+
+    with schema_context(tenant_schema):
+        alert = Alert.objects.select_related("rule").filter(id=alert_id).first()
+        if alert is None:
+            return {"alert": alert_id, "channel": channel, "sent": 0, "failed": 0}
+
+        service = NotificationService()
+        users = list(User.objects.filter(id__in=user_ids, is_active=True))
+        preferences = service.load_preferences(users)
+        results = service.send_channel(
+            alert, channel, [(user, preferences[user.id]) for user in users]
+        )
+
+    failed_ids = [item["user_id"] for item in results["failed"]]
+    if failed_ids and self.request.retries < self.max_retries:
+        countdown = retry_countdown(channel, self.request.retries)
+        logger.warning(
+            "Retrying %s notifications for alert %s (%s recipients) in %ss",
+            channel,
+            alert_id,
+            len(failed_ids),
+            countdown,
+        )
+        raise self.retry(
+            args=(tenant_schema, alert_id, channel, failed_ids), countdown=countdown
+        )
+
+    return {
+        "alert": alert_id,
+        "channel": channel,
+        "sent": len(results["sent"]),
+        "failed": len(results["failed"]),
+        "skipped": len(results["skipped"]),
+    }
+
+
 def evaluate_single_rule(rule):
     """
     Evaluate a single rule against current telemetry data.
@@ -269,7 +565,6 @@ def evaluate_single_rule(rule):
         Alert instance if condition is met and alert was created, None otherwise
     """
 
-    from apps.alerts.models import Alert
     from apps.assets.models import Sensor
     from apps.ingest.models import Reading
 
@@ -382,68 +677,212 @@ def evaluate_single_rule(rule):
             )
             continue
 
-        # Check if reading is recent enough (within last 15 minutes)
-        # IMPORTANTE: reading.ts vem do PostgreSQL em UTC, mas precisamos comparar
-        # usando o horário real (ambos em UTC). A idade é calculada em UTC.
-        now = timezone.now()  # UTC
-        time_diff = now - latest_reading.ts
-
-        if time_diff > timedelta(minutes=15):
-            logger.info(
-                f"⚠️ Rule {rule.id} - Reading too old for {param.parameter_key}: "
-                f"reading={latest_reading.ts}, now={now}, "
-                f"diff={time_diff.total_seconds()/60:.1f} min"
-            )
+        alert = create_alert_from_reading(rule, param, latest_reading)
+        if not alert:
             continue
 
-        logger.info(
-            f"✅ Rule {rule.id} - Reading is fresh for {param.parameter_key}: "
-            f"value={latest_reading.value}, age={time_diff.total_seconds()/60:.1f} min"
+        alerts_created.append(alert)
+
+    # Retornar o primeiro alerta criado (ou None se nenhum foi criado)
+    return alerts_created[0] if alerts_created else None
+
+
+def is_reading_fresh(reading, now=None) -> bool:
+    """Leituras com mais de READING_MAX_AGE_MINUTES não disparam alertas."""
+    now = now or timezone.now()
+    return now - reading.ts <= timedelta(minutes=READING_MAX_AGE_MINUTES)
+
+
+def create_alert_from_reading(rule, param, latest_reading, score=None):
+    """
+    Avalia um RuleParameter contra uma leitura e cria o Alert se a condição
+    for satisfeita.
+
+    Usado pelo polling (evaluate_single_rule) e pela avaliação em streaming
+    (apps.alerts.services.streaming). O cooldown deve ser verificado antes.
+
+    Args:
+        rule: Rule model instance
+        param: RuleParameter instance
+        latest_reading: Reading (ou objeto com ``ts`` e ``value``)
+        score: Desvio da leitura em σ, para parâmetros de anomalia
+            (condition_type ``anomaly``/``seasonal``); comparado com
+            ``param.threshold`` (k)
+
+    Returns:
+        Alert instance ou None
+    """
+    from apps.alerts.models import Alert
+
+    # Check if reading is recent enough (within last 15 minutes)
+    # IMPORTANTE: reading.ts vem do PostgreSQL em UTC, mas precisamos comparar
+    # usando o horário real (ambos em UTC). A idade é calculada em UTC.
+    now = timezone.now()  # UTC
+    time_diff = now - latest_reading.ts
+
+    if not is_reading_fresh(latest_reading, now):
+        logger.debug(
+            f"⚠️ Rule {rule.id} - Reading too old for {param.parameter_key}: "
+            f"reading={latest_reading.ts}, now={now}, "
+            f"diff={time_diff.total_seconds()/60:.1f} min"
         )
+        return None
 
-        # Get the value to compare
-        value = latest_reading.value
+    logger.debug(
+        f"✅ Rule {rule.id} - Reading is fresh for {param.parameter_key}: "
+        f"value={latest_reading.value}, age={time_diff.total_seconds()/60:.1f} min"
+    )
 
-        # Evaluate the condition
-        condition_met = evaluate_condition(value, param.operator, param.threshold)
+    # Get the value to compare
+    value = latest_reading.value
 
-        if not condition_met:
-            logger.info(
-                f"⚠️ Rule {rule.id} parameter {param.parameter_key} condition NOT MET: "
-                f"{value} {param.operator} {param.threshold} = False"
-            )
-            continue
+    # Evaluate the condition
+    if param.condition_type != "threshold":
+        # Anomalia: desvio (em σ) da leitura comparado com k
+        condition_met = score is not None and score >= param.threshold
+        condition = f"{value} deviates {score}σ >= {param.threshold}σ"
+    else:
+        condition_met = evaluate_condition(value, param.operator, param.threshold)
+        condition = f"{value} {param.operator} {param.threshold}"
 
-        logger.info(
-            f"✅ Rule {rule.id} parameter {param.parameter_key} condition MET: "
-            f"{value} {param.operator} {param.threshold} = True - Creating alert!"
+    if not condition_met:
+        logger.debug(
+            f"⚠️ Rule {rule.id} parameter {param.parameter_key} condition NOT MET: "
+            f"{condition} = False"
         )
+        return None
+
+    logger.info(
+        f"✅ Rule {rule.id} parameter {param.parameter_key} condition MET: "
+        f"{condition} = True - Creating alert!"
+    )
 
-        # Condition is met - create alert
-        # Gerar mensagem a partir do template
-        message = generate_alert_message_from_template(
-            param.message_template, param, latest_reading, value
+    # Condition is met - create alert
+    # Gerar mensagem a partir do template
+    message = generate_alert_message_from_template(
+        param.message_template, param, latest_reading, value
+    )
+
+    alert = Alert.objects.create(
+        rule=rule,
+        asset_tag=rule.equipment.tag,
+        severity=param.severity,
+        parameter_key=param.parameter_key,
+        parameter_value=value,
+        threshold=param.threshold,
+        message=message,
+    )
+
+    logger.info(
+        f"Alert {alert.id} created for rule {rule.id} parameter {param.parameter_key}: "
+        f"{value} {param.operator} {param.threshold}"
+    )
+
+    return alert
+
+
+def create_composite_alert(rule, readings):
+    """
+    Avalia a expressão composta da regra (Rule.expression) sobre um snapshot
+    único das últimas leituras e cria o Alert se ela for verdadeira.
+
+    Args:
+        rule: Rule com ``expression``
+        readings: Dict identificador -> leitura (``ts``/``value``) de todos os
+            termos; termos sem leitura recente impedem a avaliação
+
+    Returns:
+        Alert instance ou None
+    """
+    from apps.alerts.models import Alert
+
+    expression = rule.compiled_expression
+
+    now = timezone.now()
+    missing = [
+        name
+        for name in expression.identifiers
+        if readings.get(name) is None or not is_reading_fresh(readings[name], now)
+    ]
+    if missing:
+        logger.debug(
+            f"Rule {rule.id} composite expression missing fresh readings: {', '.join(missing)}"
         )
+        return None
+
+    values = {name: readings[name].value for name in expression.identifiers}
+    if not expression.evaluate(values):
+        logger.debug(f"Rule {rule.id} composite expression not met: {values}")
+        return None
+
+    # Primeiro termo "sensor OP valor" identifica o alerta (valor/limite)
+    first = expression.terms[0] if expression.terms else None
+    parameter_value = (
+        values[first.identifier] if first else values[expression.identifiers[0]]
+    )
+    detail = ", ".join(f"{name} = {value}" for name, value in values.items())
+
+    alert = Alert.objects.create(
+        rule=rule,
+        asset_tag=rule.equipment.tag,
+        severity=rule.severity or "Medium",
+        parameter_key=COMPOSITE_PARAMETER_KEY,
+        parameter_value=parameter_value,
+        threshold=first.value if first else 0.0,
+        message=f"{rule.name}: {rule.expression} ({detail})",
+    )
+
+    logger.info(
+        f"Alert {alert.id} created for rule {rule.id}: {rule.expression} ({detail})"
+    )
+
+    return alert
+
+
+def create_legacy_alert_from_reading(rule, latest_reading):
+    """
+    Equivalente a create_alert_from_reading para regras no formato antigo
+    (campos parameter_key/operator/threshold na própria Rule).
+    """
+    from apps.alerts.models import Alert
 
-        alert = Alert.objects.create(
-            rule=rule,
-            asset_tag=rule.equipment.tag,
-            severity=param.severity,
-            parameter_key=param.parameter_key,
-            parameter_value=value,
-            threshold=param.threshold,
-            message=message,
+    # Check if reading is recent enough (within last 15 minutes)
+    # Comparação direta em UTC (ambos timestamps são UTC)
+    now = timezone.now()
+    time_diff = now - latest_reading.ts
+
+    if not is_reading_fresh(latest_reading, now):
+        logger.debug(
+            f"Latest telemetry reading is too old: reading={latest_reading.ts}, now={now}, "
+            f"diff={time_diff.total_seconds()/60:.1f} min for rule {rule.id}"
         )
+        return None
 
-        logger.info(
-            f"Alert {alert.id} created for rule {rule.id} parameter {param.parameter_key}: "
-            f"{value} {param.operator} {param.threshold}"
+    value = latest_reading.value
+
+    condition_met = evaluate_condition(value, rule.operator, rule.threshold)
+
+    if not condition_met:
+        logger.debug(
+            f"Rule {rule.id} condition not met: {value} {rule.operator} {rule.threshold} = False"
         )
+        return None
 
-        alerts_created.append(alert)
+    alert = Alert.objects.create(
+        rule=rule,
+        asset_tag=rule.equipment.tag,
+        severity=rule.severity,
+        parameter_key=rule.parameter_key,
+        parameter_value=value,
+        threshold=rule.threshold,
+        message=generate_alert_message(rule, latest_reading, value),
+    )
 
-    # Retornar o primeiro alerta criado (ou None se nenhum foi criado)
-    return alerts_created[0] if alerts_created else None
+    logger.info(
+        f"Alert {alert.id} created for rule {rule.id}: {value} {rule.operator} {rule.threshold}"
+    )
+
+    return alert
 
 
 def evaluate_single_rule_legacy(rule):
@@ -451,7 +890,6 @@ def evaluate_single_rule_legacy(rule):
     Evaluate a single rule in the old format (single parameter).
     Mantido para compatibilidade com regras antigas.
     """
-    from apps.alerts.models import Alert
     from apps.assets.models import (  # 🔧 Import necessário para buscar device correto
         Sensor,
     )
@@ -499,43 +937,7 @@ def evaluate_single_rule_legacy(rule):
             )
             return None
 
-        # Check if reading is recent enough (within last 15 minutes)
-        # Comparação direta em UTC (ambos timestamps são UTC)
-        now = timezone.now()
-        time_diff = now - latest_reading.ts
-
-        if time_diff > timedelta(minutes=15):
-            logger.debug(
-                f"Latest telemetry reading is too old: reading={latest_reading.ts}, now={now}, "
-                f"diff={time_diff.total_seconds()/60:.1f} min for rule {rule.id}"
-            )
-            return None
-
-        value = latest_reading.value
-
-        condition_met = evaluate_condition(value, rule.operator, rule.threshold)
-
-        if not condition_met:
-            logger.debug(
-                f"Rule {rule.id} condition not met: {value} {rule.operator} {rule.threshold} = False"
-            )
-            return None
-
-        alert = Alert.objects.create(
-            rule=rule,
-            asset_tag=rule.equipment.tag,
-            severity=rule.severity,
-            parameter_key=rule.parameter_key,
-            parameter_value=value,
-            threshold=rule.threshold,
-            message=generate_alert_message(rule, latest_reading, value),
-        )
-
-        logger.info(
-            f"Alert {alert.id} created for rule {rule.id}: {value} {rule.operator} {rule.threshold}"
-        )
-
-        return alert
+        return create_legacy_alert_from_reading(rule, latest_reading)
 
     except Exception as e:
         logger.error(
@@ -661,25 +1063,41 @@ def generate_alert_message(rule, reading, value):
 @shared_task(name="alerts.cleanup_old_alerts")
 def cleanup_old_alerts_task(days=90):
     """
-    Clean up old resolved alerts to keep the database lean.
+    Archive old resolved alerts to keep alerts_alert lean.
+
+    For every tenant, resolved alerts older than ``days`` are moved in chunks
+    to the alert history hypertable, and history chunks older than
+    ALERTS_HISTORY_RETENTION_DAYS are dropped (see apps.alerts.services.history).
 
     Args:
-        days: Number of days to keep resolved alerts (default: 90)
+        days: Number of days to keep resolved alerts in alerts_alert (default: 90)
 
     Returns:
-        Number of alerts deleted
+        dict with the number of archived alerts and dropped history chunks
     """
-    from apps.alerts.models import Alert
+    from django_tenants.utils import schema_context
 
-    cutoff_date = timezone.now() - timedelta(days=days)
+    from apps.alerts.services.history import archive_resolved_alerts, drop_old_history
 
-    # Delete old resolved alerts
-    deleted_count, _ = Alert.objects.filter(
-        resolved=True, resolved_at__lt=cutoff_date
-    ).delete()
+    cutoff_date = timezone.now() - timedelta(days=days)
+    stats = {"tenants": 0, "archived": 0, "dropped_chunks": 0, "errors": 0}
+
+    for tenant in iter_tenants():
+        stats["tenants"] += 1
+        try:
+            with schema_context(tenant.schema_name):
+                stats["archived"] += archive_resolved_alerts(cutoff_date)
+                stats["dropped_chunks"] += drop_old_history()
+        except Exception as e:
+            stats["errors"] += 1
+            logger.error(
+                f"Error cleaning up alerts for tenant {tenant.schema_name}: {e}",
+                exc_info=True,
+            )
 
     logger.info(
-        f"Cleaned up {deleted_count} old alerts (resolved before {cutoff_date})"
+        f"Archived {stats['archived']} old alerts (resolved before {cutoff_date}) "
+        f"and dropped {stats['dropped_chunks']} history chunks"
     )
 
-    return deleted_count
+    return stats
@@ -2,15 +2,60 @@
 Tests for alerts tasks.
 """
 
+from datetime import timedelta
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.utils import schema_context
 
-from apps.alerts.tasks import evaluate_rules_task
+from apps.alerts.models import (
+    Alert,
+    AlertCounter,
+    AlertHistory,
+    NotificationPreference,
+    Rule,
+    RuleParameter,
+    SensorBaseline,
+)
+from apps.alerts.services import NotificationService, replay
+from apps.alerts.services.anomaly import AnomalyScores, fold_bucket, refresh_baselines
+from apps.alerts.services.counters import (
+    alert_statistics,
+    rebuild_counters,
+    update_alerts,
+)
+from apps.alerts.services.expressions import ExpressionError, compile_expression
+from apps.alerts.services.history import archive_resolved_alerts
+from apps.alerts.services.planner import TenantEvaluationPlan
+from apps.alerts.services.scheduling import acquire_tenant_lock, shard_rules
+from apps.alerts.services.streaming import (
+    ReadingSnapshot,
+    build_rule_index,
+    evaluate_readings,
+    get_rule_index,
+    invalidate_rule_index,
+    on_readings_persisted,
+)
+from apps.alerts.services.windows import fetch_window_aggregates
+from apps.alerts.tasks import (
+    _evaluate_rules_for_tenant,
+    dispatch_alert_notifications,
+    enqueue_alert_notifications,
+    evaluate_rules_for_tenant,
+    evaluate_rules_task,
+    release_tenant_evaluation_lock,
+)
+from apps.assets.models import Asset, Device, Sensor, Site
+from apps.ingest.models import Reading
 from apps.tenants.models import Domain, Tenant
 
-
 class EvaluateRulesTaskTests(TenantTestCase):
     def setUp(self):
         super().setUp()
@@ -34,3 +79,958 @@ class EvaluateRulesTaskTests(TenantTestCase):
         self.assertIn(self.tenant.schema_name, called_schemas)
         self.assertIn(self.extra_tenant.schema_name, called_schemas)
         self.assertEqual(result["scheduled"], len(called_schemas))
+
+
+@patch("apps.alerts.tasks.enqueue_alert_notifications")
+class StreamingEvaluationTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.schema_name = connection.schema_name
+        invalidate_rule_index()
+
+        site = Site.objects.create(name="Site A")
+        self.asset = Asset.objects.create(
+            tag="CHILLER-001", site=site, asset_type="CHILLER"
+        )
+        device = Device.objects.create(
+            name="Gateway A",
+            serial_number="SN-ALERT-001",
+            asset=self.asset,
+            mqtt_client_id="device-001",
+            device_type="GATEWAY",
+        )
+        Sensor.objects.create(
+            tag="temp-01", device=device, metric_type="temp_supply", unit="celsius"
+        )
+        self.rule = Rule.objects.create(name="High temperature", equipment=self.asset)
+        self.param = RuleParameter.objects.create(
+            rule=self.rule,
+            parameter_key="temp-01",
+            operator=">",
+            threshold=30.0,
+            message_template="{variavel} = {value}",
+            aggregation="latest",
+        )
+
+    def _snapshot(self, value, age_minutes=0):
+        return ReadingSnapshot(
+            device_id="device-001",
+            sensor_id="temp-01",
+            ts=timezone.now() - timedelta(minutes=age_minutes),
+            value=value,
+        )
+
+    def test_index_maps_reading_key_to_parameter(self, _notify):
+        index = build_rule_index()
+
+        self.assertEqual(
+            index, {("device-001", "temp-01"): [(self.rule.id, self.param.id)]}
+        )
+
+    def test_matching_reading_creates_alert(self, _notify):
+        stats = evaluate_readings(self.schema_name, [self._snapshot(35.0)])
+
+        self.assertEqual(stats["triggered"], 1)
+        alert = Alert.objects.get()
+        self.assertEqual(alert.parameter_value, 35.0)
+        self.assertEqual(alert.message, "temp-01 = 35.0")
+
+    def test_stale_or_normal_readings_do_not_alert(self, _notify):
+        evaluate_readings(self.schema_name, [self._snapshot(20.0)])
+        evaluate_readings(self.schema_name, [self._snapshot(35.0, age_minutes=30)])
+
+        self.assertFalse(Alert.objects.exists())
+
+    @override_settings(ALERTS_STREAMING_EVALUATION=True)
+    def test_ingest_hook_evaluates_only_indexed_readings(self, _notify):
+        other = ReadingSnapshot("device-002", "temp-01", timezone.now(), 99.0)
+
+        forwarded = on_readings_persisted(
+            self.schema_name, [self._snapshot(35.0), other]
+        )
+
+        self.assertEqual(forwarded, 1)
+        self.assertEqual(Alert.objects.count(), 1)
+
+    def test_ingest_hook_disabled_by_default(self, _notify):
+        self.assertEqual(
+            on_readings_persisted(self.schema_name, [self._snapshot(35.0)]), 0
+        )
+        self.assertFalse(Alert.objects.exists())
+
+    def test_rule_change_invalidates_index(self, _notify):
+        build_rule_index()
+        self.rule.enabled = False
+        self.rule.save()
+
+        self.assertEqual(get_rule_index(self.schema_name), {})
+
+
+@patch("apps.alerts.tasks.enqueue_alert_notifications")
+class TenantEvaluationPlanTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="Site A")
+        self.asset = Asset.objects.create(
+            tag="CHILLER-001", site=site, asset_type="CHILLER"
+        )
+        device = Device.objects.create(
+            name="Gateway A",
+            serial_number="SN-PLAN-001",
+            asset=self.asset,
+            mqtt_client_id="device-001",
+            device_type="GATEWAY",
+        )
+        for index in range(3):
+            tag = f"temp-0{index}"
+            Sensor.objects.create(
+                tag=tag, device=device, metric_type="temp_supply", unit="celsius"
+            )
+            Reading.objects.create(
+                device_id="device-001", sensor_id=tag, value=25.0, ts=timezone.now()
+            )
+
+    def _rule(self, tag, threshold):
+        rule = Rule.objects.create(name=f"Rule {tag}", equipment=self.asset)
+        RuleParameter.objects.create(
+            rule=rule,
+            parameter_key=tag,
+            operator=">",
+            threshold=threshold,
+            message_template="{variavel} = {value}",
+            aggregation="latest",
+        )
+        return rule
+
+    def _load_rules(self):
+        return list(
+            Rule.objects.filter(enabled=True)
+            .select_related("equipment", "created_by")
+            .prefetch_related("parameters")
+        )
+
+    def _plan_queries(self):
+        rules = self._load_rules()
+        with self.assertNumQueries(3):
+            plan = TenantEvaluationPlan(rules)
+            for rule in rules:
+                plan.evaluate_rule(rule)
+
+    def test_query_count_does_not_grow_with_rules(self, _notify):
+        self._rule("temp-00", threshold=100.0)
+        self._plan_queries()
+
+        self._rule("temp-01", threshold=100.0)
+        self._rule("temp-02", threshold=100.0)
+        self._plan_queries()
+
+    def test_triggers_and_respects_cooldown(self, _notify):
+        rule = self._rule("temp-00", threshold=20.0)
+
+        plan = TenantEvaluationPlan(self._load_rules())
+        alert = plan.evaluate_rule(rule)
+        self.assertIsNotNone(alert)
+        self.assertEqual(alert.parameter_value, 25.0)
+
+        # Active alert blocks a second one, both in the same plan and a new one
+        self.assertIsNone(plan.evaluate_rule(rule))
+        self.assertIsNone(TenantEvaluationPlan(self._load_rules()).evaluate_rule(rule))
+        self.assertEqual(Alert.objects.count(), 1)
+
+
+@patch("apps.alerts.tasks.enqueue_alert_notifications")
+class WindowedEvaluationTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.schema_name = connection.schema_name
+        invalidate_rule_index()
+
+        site = Site.objects.create(name="Site A")
+        self.asset = Asset.objects.create(
+            tag="CHILLER-001", site=site, asset_type="CHILLER"
+        )
+        device = Device.objects.create(
+            name="Gateway A",
+            serial_number="SN-WINDOW-001",
+            asset=self.asset,
+            mqtt_client_id="device-001",
+            device_type="GATEWAY",
+        )
+        Sensor.objects.create(
+            tag="temp-01", device=device, metric_type="temp_supply", unit="celsius"
+        )
+        self.rule = Rule.objects.create(
+            name="Sustained temperature", equipment=self.asset
+        )
+
+    def _param(self, aggregation, percentile=95.0):
+        return RuleParameter.objects.create(
+            rule=self.rule,
+            parameter_key="temp-01",
+            operator=">",
+            threshold=30.0,
+            duration=5,
+            aggregation=aggregation,
+            percentile=percentile,
+            message_template="{variavel} = {value}",
+        )
+
+    def _readings(self, values_by_age):
+        """Create readings from a {minutes_ago: value} mapping."""
+        now = timezone.now()
+        for age_minutes, value in values_by_age.items():
+            Reading.objects.create(
+                device_id="device-001",
+                sensor_id="temp-01",
+                value=value,
+                ts=now - timedelta(minutes=age_minutes),
+            )
+
+    def _evaluate(self):
+        rules = list(
+            Rule.objects.filter(enabled=True)
+            .select_related("equipment", "created_by")
+            .prefetch_related("parameters")
+        )
+        plan = TenantEvaluationPlan(rules)
+        return plan.evaluate_rule(self.rule)
+
+    def test_single_spike_does_not_alert(self, _notify):
+        self._param("all")
+        self._readings({7: 25.0, 4: 25.0, 2: 25.0, 0: 40.0})
+
+        self.assertIsNone(self._evaluate())
+
+    def test_sustained_condition_alerts(self, _notify):
+        self._param("all")
+        self._readings({7: 35.0, 4: 36.0, 2: 34.0, 0: 37.0})
+
+        alert = self._evaluate()
+        self.assertIsNotNone(alert)
+        self.assertEqual(alert.parameter_value, 37.0)
+
+    def test_window_must_be_covered(self, _notify):
+        # No sample before the window start: the condition may have just begun
+        self._param("all")
+        self._readings({3: 35.0, 0: 37.0})
+
+        self.assertIsNone(self._evaluate())
+
+    def test_empty_window_uses_value_in_effect(self, _notify):
+        # Device only publishes on change: the prior sample is still in effect
+        self._param("all")
+        self._readings({7: 35.0})
+
+        alert = self._evaluate()
+        self.assertIsNotNone(alert)
+        self.assertEqual(alert.parameter_value, 35.0)
+
+    def test_empty_window_value_in_effect_must_satisfy_condition(self, _notify):
+        self._param("all")
+        self._readings({7: 25.0})
+
+        self.assertIsNone(self._evaluate())
+
+    def test_empty_window_ignores_prior_beyond_lookback(self, _notify):
+        self._param("all")
+        self._readings({25: 35.0})
+
+        self.assertIsNone(self._evaluate())
+
+    def test_mean_aggregation(self, _notify):
+        self._param("mean")
+        self._readings({7: 20.0, 4: 25.0, 2: 35.0, 0: 40.0})
+
+        alert = self._evaluate()
+        self.assertIsNotNone(alert)
+        self.assertAlmostEqual(alert.parameter_value, 100.0 / 3)
+
+    def test_percentile_aggregation(self, _notify):
+        self._param("percentile", percentile=50.0)
+        self._readings({7: 20.0, 4: 25.0, 3: 26.0, 2: 27.0, 0: 40.0})
+
+        self.assertIsNone(self._evaluate())
+
+        Alert.objects.all().delete()
+        RuleParameter.objects.filter(rule=self.rule).update(percentile=90.0)
+        self.assertIsNotNone(self._evaluate())
+
+    def test_window_aggregates_use_each_parameter_duration(self, _notify):
+        short = self._param("mean")
+        long = RuleParameter.objects.create(
+            rule=self.rule,
+            parameter_key="temp-01",
+            operator=">",
+            threshold=30.0,
+            duration=10,
+            aggregation="mean",
+            message_template="{variavel} = {value}",
+        )
+        self._readings({12: 20.0, 8: 20.0, 4: 30.0, 0: 40.0})
+        key = ("device-001", "temp-01")
+
+        with self.assertNumQueries(1):
+            aggregates = fetch_window_aggregates(
+                [(key, short), (key, long)], timezone.now()
+            )
+
+        self.assertEqual(aggregates[(key, short.id)].count, 2)
+        self.assertAlmostEqual(aggregates[(key, short.id)].mean, 35.0)
+        self.assertEqual(aggregates[(key, short.id)].prior.value, 20.0)
+        self.assertEqual(aggregates[(key, long.id)].count, 3)
+        self.assertAlmostEqual(aggregates[(key, long.id)].mean, 30.0)
+        self.assertEqual(aggregates[(key, long.id)].prior.value, 20.0)
+
+    def test_streaming_uses_window_samples(self, _notify):
+        self._param("all")
+        self._readings({7: 25.0, 4: 25.0, 0: 40.0})
+        spike = ReadingSnapshot("device-001", "temp-01", timezone.now(), 40.0)
+
+        stats = evaluate_readings(self.schema_name, [spike])
+
+        self.assertEqual(stats["triggered"], 0)
+        self.assertFalse(Alert.objects.exists())
+
+
+class ShardRulesTests(SimpleTestCase):
+    @override_settings(ALERTS_EVALUATION_SHARD_SIZE=2, ALERTS_EVALUATION_MAX_SHARDS=8)
+    def test_rules_of_an_equipment_stay_in_one_shard(self):
+        shards = shard_rules([(1, 10), (2, 11), (3, 10), (4, 12), (5, 11)])
+
+        self.assertEqual(len(shards), 3)
+        self.assertIn([1, 3], shards)
+        self.assertIn([2, 5], shards)
+        self.assertEqual(sorted(sum(shards, [])), [1, 2, 3, 4, 5])
+
+    @override_settings(ALERTS_EVALUATION_SHARD_SIZE=1, ALERTS_EVALUATION_MAX_SHARDS=2)
+    def test_shard_count_is_capped(self):
+        shards = shard_rules([(rule_id, rule_id) for rule_id in range(10)])
+
+        self.assertEqual(len(shards), 2)
+
+    def test_small_tenant_is_a_single_shard(self):
+        self.assertEqual(shard_rules([(1, 10), (2, 11)]), [[1, 2]])
+
+
+@patch("apps.alerts.tasks.enqueue_alert_notifications")
+class TenantEvaluationSchedulingTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        site = Site.objects.create(name="Site A")
+        for index in range(3):
+            asset = Asset.objects.create(
+                tag=f"CHILLER-00{index}", site=site, asset_type="CHILLER"
+            )
+            rule = Rule.objects.create(name=f"Rule {index}", equipment=asset)
+            RuleParameter.objects.create(
+                rule=rule,
+                parameter_key=f"temp-0{index}",
+                operator=">",
+                threshold=30.0,
+                message_template="{variavel} = {value}",
+            )
+
+    def test_cycle_is_skipped_while_previous_runs(self, _notify):
+        self.assertIsNotNone(acquire_tenant_lock(self.tenant.schema_name))
+
+        result = evaluate_rules_for_tenant(self.tenant.schema_name)
+
+        self.assertTrue(result["skipped_cycle"])
+        self.assertEqual(result["evaluated"], 0)
+
+    def test_lock_is_released_after_cycle(self, _notify):
+        first = evaluate_rules_for_tenant(self.tenant.schema_name)
+        second = evaluate_rules_for_tenant(self.tenant.schema_name)
+
+        self.assertEqual(first["evaluated"], 3)
+        self.assertEqual(second["evaluated"], 3)
+
+    @override_settings(ALERTS_EVALUATION_SHARD_SIZE=1)
+    def test_large_tenant_is_evaluated_in_shards(self, _notify):
+        result = evaluate_rules_for_tenant(self.tenant.schema_name)
+
+        self.assertEqual(result["shards"], 3)
+        # The chord callback released the lock
+        self.assertIsNotNone(acquire_tenant_lock(self.tenant.schema_name))
+
+    def test_time_budget_skips_remaining_rules(self, _notify):
+        result = _evaluate_rules_for_tenant(
+            self.tenant.schema_name, self.tenant.slug, budget_seconds=1e-9
+        )
+
+        self.assertTrue(result["over_budget"])
+        self.assertEqual(result["evaluated"] + result["skipped"], 3)
+
+    def test_next_cycle_resumes_from_skipped_rules(self, _notify):
+        rule_ids = list(Rule.objects.order_by("id").values_list("id", flat=True))
+        evaluated = []
+
+        def record(plan, rule):
+            evaluated.append(rule.id)
+
+        with patch(
+            "apps.alerts.services.planner.TenantEvaluationPlan.evaluate_rule",
+            autospec=True,
+            side_effect=record,
+        ):
+            first = _evaluate_rules_for_tenant(
+                self.tenant.schema_name, self.tenant.slug, budget_seconds=1e-9
+            )
+            second = _evaluate_rules_for_tenant(
+                self.tenant.schema_name, self.tenant.slug, budget_seconds=1e-9
+            )
+
+        self.assertEqual(first["evaluated"], 1)
+        self.assertEqual(second["evaluated"], 1)
+        # The tail rules are not starved: the second cycle starts where the
+        # first one stopped
+        self.assertEqual(evaluated, rule_ids[:2])
+
+    def test_failed_shard_errback_releases_lock(self, _notify):
+        token = acquire_tenant_lock(self.tenant.schema_name)
+
+        release_tenant_evaluation_lock(self.tenant.schema_name, token)
+
+        self.assertIsNotNone(acquire_tenant_lock(self.tenant.schema_name))
+
+
+@override_settings(EMAIL_NOTIFICATIONS_ENABLED=True)
+class NotificationDispatchTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(
+                username=f"notify{index}",
+                email=f"notify{index}@example.com",
+                password="testpass123",
+            )
+            for index in range(3)
+        ]
+        # Third user only wants in-app notifications
+        NotificationPreference.objects.create(user=self.users[2], email_enabled=False)
+
+        site = Site.objects.create(name="Site A")
+        asset = Asset.objects.create(tag="CHILLER-001", site=site, asset_type="CHILLER")
+        rule = Rule.objects.create(
+            name="High temperature", equipment=asset, actions=["EMAIL", "IN_APP"]
+        )
+        self.alert = Alert.objects.create(
+            rule=rule,
+            message="temp-01 = 35.0",
+            severity="High",
+            asset_tag=asset.tag,
+            parameter_key="temp-01",
+            parameter_value=35.0,
+            threshold=30.0,
+        )
+
+    def test_recipients_are_grouped_per_channel(self):
+        recipients, results = NotificationService().plan_recipients(
+            self.alert, self.users
+        )
+
+        email_users = {user.email for user, _ in recipients["email"]}
+        self.assertEqual(email_users, {"notify0@example.com", "notify1@example.com"})
+        self.assertEqual(len(recipients["in_app"]), 3)
+        self.assertEqual(results["skipped"], [])
+        # Missing preferences were created with defaults
+        self.assertEqual(NotificationPreference.objects.count(), 3)
+
+    def test_dispatch_sends_email_batch_once_per_alert(self):
+        first = dispatch_alert_notifications(self.tenant.schema_name, self.alert.id)
+        second = dispatch_alert_notifications(self.tenant.schema_name, self.alert.id)
+
+        self.assertEqual(first["channels"], {"email": 2, "in_app": 3})
+        self.assertTrue(second["duplicate"])
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            ["notify0@example.com", "notify1@example.com"],
+        )
+
+    def test_failed_dispatch_can_be_retried(self):
+        with patch.object(
+            NotificationService, "plan_recipients", side_effect=RuntimeError("db")
+        ):
+            with self.assertRaises(RuntimeError):
+                dispatch_alert_notifications(self.tenant.schema_name, self.alert.id)
+
+        # The dedup key was released, so the retry is not dropped as a duplicate
+        retry = dispatch_alert_notifications(self.tenant.schema_name, self.alert.id)
+
+        self.assertEqual(retry["channels"], {"email": 2, "in_app": 3})
+
+    @patch("apps.alerts.tasks.dispatch_alert_notifications.delay")
+    def test_enqueue_defers_dispatch_to_a_task(self, dispatch):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_alert_notifications(self.alert)
+
+        dispatch.assert_called_once_with(self.tenant.schema_name, self.alert.id)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class AlertCounterTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="Site A")
+        self.asset = Asset.objects.create(
+            tag="CHILLER-001", site=site, asset_type="CHILLER"
+        )
+        self.rule = Rule.objects.create(name="High temperature", equipment=self.asset)
+
+    def _alert(self, severity="High", **kwargs):
+        return Alert.objects.create(
+            rule=self.rule,
+            message="temp-01 = 35.0",
+            severity=severity,
+            asset_tag=self.asset.tag,
+            parameter_key="temp-01",
+            parameter_value=35.0,
+            threshold=30.0,
+            **kwargs,
+        )
+
+    def _counter(self, severity="High", rule_id=None):
+        return AlertCounter.objects.get(
+            asset_tag=self.asset.tag,
+            severity=severity,
+            rule_id=self.rule.id if rule_id is None else rule_id,
+        )
+
+    def _counts(self, counter):
+        return (counter.active, counter.acknowledged, counter.resolved)
+
+    def test_counters_follow_alert_lifecycle(self):
+        alert = self._alert()
+        self.assertEqual(self._counts(self._counter()), (1, 0, 0))
+
+        alert.acknowledged = True
+        alert.save()
+        self.assertEqual(self._counts(self._counter()), (0, 1, 0))
+
+        # Reloaded instances track their own state
+        alert = Alert.objects.get(pk=alert.pk)
+        alert.resolved = True
+        alert.save()
+        self.assertEqual(self._counts(self._counter()), (0, 0, 1))
+
+        # Saving without a state change does not count twice
+        alert.notes = "checked"
+        alert.save()
+        self.assertEqual(self._counts(self._counter()), (0, 0, 1))
+
+        alert.delete()
+        self.assertEqual(self._counts(self._counter()), (0, 0, 0))
+
+    def test_rule_delete_moves_counters_to_no_rule(self):
+        self._alert()
+        rule_id = self.rule.id
+
+        self.rule.delete()
+
+        self.assertFalse(AlertCounter.objects.filter(rule_id=rule_id).exists())
+        self.assertEqual(self._counts(self._counter(rule_id=0)), (1, 0, 0))
+
+        alert = Alert.objects.get()
+        alert.acknowledged = True
+        alert.save()
+        self.assertEqual(self._counts(self._counter(rule_id=0)), (0, 1, 0))
+
+    def test_bulk_update_keeps_counters(self):
+        self._alert()
+        self._alert(acknowledged=True)
+        self._alert(resolved=True)
+
+        updated = update_alerts(Alert.objects.all(), acknowledged=True)
+        self.assertEqual(updated, 3)
+        self.assertEqual(self._counts(self._counter()), (0, 2, 1))
+
+        update_alerts(Alert.objects.filter(resolved=False), resolved=True)
+        self.assertEqual(self._counts(self._counter()), (0, 0, 3))
+
+    def test_statistics_from_counters_match_rebuild(self):
+        self._alert(severity="Critical")
+        self._alert(severity="High", acknowledged=True)
+        self._alert(severity="High", acknowledged=True, resolved=True)
+
+        incremental = alert_statistics(AlertCounter.objects.all())
+        rebuild_counters()
+        rebuilt = alert_statistics(AlertCounter.objects.all())
+
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(incremental["total"], 3)
+        self.assertEqual(incremental["active"], 1)
+        self.assertEqual(incremental["acknowledged"], 1)
+        self.assertEqual(incremental["resolved"], 1)
+        self.assertEqual(incremental["by_severity"]["HIGH"], 2)
+
+        active_only = alert_statistics(AlertCounter.objects.all(), status="active")
+        self.assertEqual(active_only["total"], 1)
+        self.assertEqual(
+            active_only["by_severity"],
+            {"CRITICAL": 1, "HIGH": 0, "MEDIUM": 0, "LOW": 0},
+        )
+
+
+class AnomalyScoresTests(SimpleTestCase):
+    def _baseline(self, values, spread=1.0):
+        baseline = SensorBaseline(device_id="device-001", sensor_id="temp-01")
+        start = timezone.now() - timedelta(hours=len(values))
+        for index, value in enumerate(values):
+            fold_bucket(baseline, start + timedelta(hours=index), value, spread)
+        return baseline
+
+    def _param(self, operator=">", condition_type="anomaly"):
+        return RuleParameter(
+            operator=operator, condition_type=condition_type, threshold=3
+        )
+
+    @override_settings(ALERTS_ANOMALY_MIN_HOURS=24)
+    def test_scores_are_signed_by_operator(self):
+        key = ("device-001", "temp-01")
+        baseline = self._baseline([20.0] * 48)
+        reading = ReadingSnapshot("device-001", "temp-01", timezone.now(), 10.0)
+
+        scores = AnomalyScores({key: reading}, {key: baseline})
+
+        self.assertAlmostEqual(scores.rolling[key], -10.0, places=1)
+        self.assertLess(scores.score(self._param(">"), key), 0)
+        self.assertGreater(scores.score(self._param("<"), key), 3)
+        self.assertGreater(scores.score(self._param("!="), key), 3)
+
+    @override_settings(ALERTS_ANOMALY_MIN_HOURS=24)
+    def test_no_score_without_enough_history(self):
+        key = ("device-001", "temp-01")
+        baseline = self._baseline([20.0] * 5)
+        reading = ReadingSnapshot("device-001", "temp-01", timezone.now(), 90.0)
+
+        scores = AnomalyScores({key: reading}, {key: baseline})
+
+        self.assertIsNone(scores.score(self._param(), key))
+        self.assertIsNone(scores.score(self._param(condition_type="seasonal"), key))
+
+
+@patch("apps.alerts.tasks.enqueue_alert_notifications")
+@override_settings(ALERTS_ANOMALY_MIN_HOURS=24)
+class AnomalyRuleTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="Site A")
+        self.asset = Asset.objects.create(
+            tag="CHILLER-001", site=site, asset_type="CHILLER"
+        )
+        device = Device.objects.create(
+            name="Gateway A",
+            serial_number="SN-ANOMALY-001",
+            asset=self.asset,
+            mqtt_client_id="device-001",
+            device_type="GATEWAY",
+        )
+        Sensor.objects.create(
+            tag="temp-01", device=device, metric_type="temp_supply", unit="celsius"
+        )
+        self.rule = Rule.objects.create(
+            name="Temperature anomaly", equipment=self.asset
+        )
+        RuleParameter.objects.create(
+            rule=self.rule,
+            parameter_key="temp-01",
+            operator=">",
+            condition_type="anomaly",
+            threshold=3.0,
+            message_template="{variavel} = {value}",
+        )
+
+        # Two days of hourly history alternating around 20 (σ ≈ 0.5)
+        now = timezone.now()
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        Reading.objects.bulk_create(
+            Reading(
+                device_id="device-001",
+                sensor_id="temp-01",
+                value=20.5 if index % 2 else 19.5,
+                ts=hour - timedelta(hours=index, minutes=-1),
+            )
+            for index in range(1, 49)
+        )
+
+    def _evaluate(self, value):
+        Reading.objects.create(
+            device_id="device-001", sensor_id="temp-01", value=value, ts=timezone.now()
+        )
+        rules = list(
+            Rule.objects.filter(enabled=True)
+            .select_related("equipment", "created_by")
+            .prefetch_related("parameters")
+        )
+        return TenantEvaluationPlan(rules).evaluate_rule(self.rule)
+
+    def test_baseline_is_refreshed_incrementally(self, _notify):
+        key = ("device-001", "temp-01")
+
+        baseline = refresh_baselines({key})[key]
+        self.assertEqual(baseline.hours, 48)
+        self.assertAlmostEqual(baseline.mean, 20.0, delta=0.5)
+
+        # Already up to date: no Reading aggregation on the next cycle
+        with self.assertNumQueries(1):
+            refresh_baselines({key})
+        self.assertEqual(SensorBaseline.objects.get().hours, 48)
+
+    def test_normal_reading_does_not_alert(self, _notify):
+        self.assertIsNone(self._evaluate(20.4))
+
+    def test_deviating_reading_alerts(self, _notify):
+        alert = self._evaluate(35.0)
+
+        self.assertIsNotNone(alert)
+        self.assertEqual(alert.parameter_value, 35.0)
+        self.assertEqual(alert.threshold, 3.0)
+
+
+class CompileExpressionTests(SimpleTestCase):
+    def test_evaluates_boolean_combinations(self):
+        expression = compile_expression(
+            "(temp-01 >= 30 OR temp-02 >= 30) AND NOT door_open == 1"
+        )
+
+        self.assertEqual(expression.identifiers, ("temp-01", "temp-02", "door_open"))
+        self.assertTrue(
+            expression.evaluate({"temp-01": 31, "temp-02": 20, "door_open": 0})
+        )
+        self.assertFalse(
+            expression.evaluate({"temp-01": 31, "temp-02": 20, "door_open": 1})
+        )
+        self.assertFalse(
+            expression.evaluate({"temp-01": 20, "temp-02": 20, "door_open": 0})
+        )
+
+    def test_terms_normalize_reversed_comparisons(self):
+        expression = compile_expression("12 < supply_temp and current < 2")
+
+        self.assertEqual(
+            [(term.identifier, term.operator, term.value) for term in expression.terms],
+            [("supply_temp", ">", 12.0), ("current", "<", 2.0)],
+        )
+
+    def test_reversed_comparisons_flip_every_operator(self):
+        for operator, flipped in [
+            (">", "<"),
+            (">=", "<="),
+            ("<", ">"),
+            ("<=", ">="),
+            ("==", "=="),
+            ("!=", "!="),
+        ]:
+            with self.subTest(operator=operator):
+                (term,) = compile_expression(f"30 {operator} temp").terms
+                self.assertEqual(term.operator, flipped)
+
+    def test_compiled_once_per_source(self):
+        source = "supply_temp > 12 AND compressor_current < 2"
+        self.assertIs(compile_expression(source), compile_expression(source))
+
+    def test_invalid_expressions(self):
+        for source in ["", "temp >", "temp > 1 AND", "(temp > 1", "1 > 2", "temp ~ 3"]:
+            with self.subTest(source=source), self.assertRaises(ExpressionError):
+                compile_expression(source)
+
+    def test_missing_value_raises(self):
+        with self.assertRaises(ExpressionError):
+            compile_expression("a > 1 AND b > 1").evaluate({"a": 2})
+
+
+@patch("apps.alerts.tasks.enqueue_alert_notifications")
+class CompositeRuleTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="Site A")
+        self.asset = Asset.objects.create(
+            tag="CHILLER-001", site=site, asset_type="CHILLER"
+        )
+        device = Device.objects.create(
+            name="Gateway A",
+            serial_number="SN-COMPOSITE-001",
+            asset=self.asset,
+            mqtt_client_id="device-001",
+            device_type="GATEWAY",
+        )
+        for tag in ("supply_temp", "compressor_current"):
+            Sensor.objects.create(
+                tag=tag, device=device, metric_type="temp_supply", unit="celsius"
+            )
+        self.rule = Rule.objects.create(
+            name="Compressor stopped while hot",
+            equipment=self.asset,
+            expression="supply_temp > 12 AND compressor_current < 2",
+        )
+
+    def _readings(self, supply_temp, compressor_current):
+        for tag, value in (
+            ("supply_temp", supply_temp),
+            ("compressor_current", compressor_current),
+        ):
+            Reading.objects.create(
+                device_id="device-001", sensor_id=tag, value=value, ts=timezone.now()
+            )
+
+    def _load_rules(self):
+        return list(
+            Rule.objects.filter(enabled=True)
+            .select_related("equipment", "created_by")
+            .prefetch_related("parameters")
+        )
+
+    def test_triggers_when_all_terms_hold(self, _notify):
+        self._readings(supply_temp=15.0, compressor_current=0.5)
+        rules = self._load_rules()
+
+        # Both terms come from the plan's shared fetch: no query per term
+        with self.assertNumQueries(3):
+            plan = TenantEvaluationPlan(rules)
+        alert = plan.evaluate_rule(rules[0])
+
+        self.assertIsNotNone(alert)
+        self.assertEqual(alert.parameter_key, "expression")
+        self.assertEqual(alert.parameter_value, 15.0)
+        self.assertEqual(alert.threshold, 12.0)
+
+    def test_does_not_trigger_when_a_term_fails(self, _notify):
+        self._readings(supply_temp=15.0, compressor_current=8.0)
+        self.assertIsNone(
+            TenantEvaluationPlan(self._load_rules()).evaluate_rule(self.rule)
+        )
+
+    def test_missing_reading_blocks_evaluation(self, _notify):
+        Reading.objects.create(
+            device_id="device-001",
+            sensor_id="supply_temp",
+            value=15.0,
+            ts=timezone.now(),
+        )
+        self.assertIsNone(
+            TenantEvaluationPlan(self._load_rules()).evaluate_rule(self.rule)
+        )
+
+    def test_streaming_evaluates_rule_once_per_batch(self, _notify):
+        now = timezone.now()
+        invalidate_rule_index(connection.schema_name)
+        snapshots = [
+            ReadingSnapshot("device-001", "supply_temp", now, 15.0),
+            ReadingSnapshot("device-001", "compressor_current", now, 0.5),
+        ]
+
+        stats = evaluate_readings(connection.schema_name, snapshots)
+
+        self.assertEqual(stats["evaluated"], 1)
+        self.assertEqual(stats["triggered"], 1)
+        self.assertEqual(Alert.objects.filter(parameter_key="expression").count(), 1)
+
+
+class AlertHistoryTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="Site A")
+        self.asset = Asset.objects.create(
+            tag="CHILLER-001", site=site, asset_type="CHILLER"
+        )
+        self.rule = Rule.objects.create(name="High temperature", equipment=self.asset)
+        self.now = timezone.now()
+
+    def _alert(self, resolved_days_ago=None):
+        resolved = resolved_days_ago is not None
+        return Alert.objects.create(
+            rule=self.rule,
+            message="temp-01 = 35.0",
+            severity="High",
+            asset_tag=self.asset.tag,
+            parameter_key="temp-01",
+            parameter_value=35.0,
+            threshold=30.0,
+            resolved=resolved,
+            resolved_at=(
+                self.now - timedelta(days=resolved_days_ago) if resolved else None
+            ),
+        )
+
+    def test_archives_old_resolved_alerts_in_chunks(self):
+        old = [self._alert(resolved_days_ago=120) for _ in range(5)]
+        recent = self._alert(resolved_days_ago=1)
+        active = self._alert()
+
+        archived = archive_resolved_alerts(self.now - timedelta(days=90), size=2)
+
+        self.assertEqual(archived, 5)
+        self.assertEqual(
+            set(Alert.objects.values_list("id", flat=True)), {recent.id, active.id}
+        )
+        self.assertEqual(
+            set(AlertHistory.objects.values_list("alert_id", flat=True)),
+            {alert.id for alert in old},
+        )
+
+        # Counters lose the archived alerts in bulk
+        counter = AlertCounter.objects.get(
+            asset_tag=self.asset.tag, rule_id=self.rule.id
+        )
+        self.assertEqual((counter.active, counter.resolved), (1, 1))
+
+    def test_max_chunks_limits_a_run(self):
+        for _ in range(5):
+            self._alert(resolved_days_ago=120)
+
+        cutoff = self.now - timedelta(days=90)
+        self.assertEqual(archive_resolved_alerts(cutoff, size=2, max_chunks=1), 2)
+        self.assertEqual(archive_resolved_alerts(cutoff, size=2), 3)
+        self.assertEqual(archive_resolved_alerts(cutoff, size=2), 0)
+
+
+@patch("apps.alerts.tasks.enqueue_alert_notifications")
+class ReplayHarnessTests(TenantTestCase):
+    """Guards the alerts hot path: queries per cycle must not grow with rules."""
+
+    def setUp(self):
+        super().setUp()
+        self.readings = replay.synthetic_readings(devices=2, sensors=3, minutes=15)
+        self.equipment = replay.prepare_equipment(self.readings)
+
+    def _replay(self, evaluator, rules, trigger_ratio=0.0):
+        rule_ids = replay.create_rules(
+            self.equipment,
+            self.readings,
+            count=rules,
+            parameters=2,
+            trigger_ratio=trigger_ratio,
+        )
+        replay.isolate_rules(connection.schema_name, rule_ids)
+        return replay.replay(connection.schema_name, self.readings, evaluator=evaluator)
+
+    def test_periodic_queries_do_not_grow_with_rules(self, _notify):
+        small = self._replay("periodic", rules=2)
+        large = self._replay("periodic", rules=20)
+
+        self.assertEqual(small.summary()["cycles"], 3)
+        self.assertEqual((large.rules, large.parameters), (20, 40))
+        self.assertEqual(max(large.queries), max(small.queries))
+        self.assertEqual(large.errors, 0)
+
+    def test_streaming_queries_do_not_grow_with_rules(self, _notify):
+        small = self._replay("streaming", rules=2)
+        large = self._replay("streaming", rules=20)
+
+        self.assertEqual(max(large.queries), max(small.queries))
+        self.assertEqual(large.errors, 0)
+
+    def test_reports_alerts_with_cooldown(self, _notify):
+        report = self._replay("periodic", rules=4, trigger_ratio=1.0)
+        summary = report.summary()
+
+        # Every parameter fires once; the later cycles are inside the cooldown
+        self.assertEqual(summary["alerts"], 4)
+        self.assertEqual(Alert.objects.count(), 8)
+        self.assertGreaterEqual(
+            summary["latency_ms"]["p95"], summary["latency_ms"]["p50"]
+        )
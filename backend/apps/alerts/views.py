@@ -4,6 +4,7 @@ Views para o sistema de Alertas e Regras
 
 import logging
 
+from django.db.models import Count, Q
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -12,7 +13,7 @@ from rest_framework.response import Response
 
 from apps.accounts.permissions import CanWrite, IsTenantMember
 
-from .models import Alert, NotificationPreference, Rule
+from .models import Alert, AlertCounter, NotificationPreference, Rule
 from .serializers import (
     AcknowledgeAlertSerializer,
     AlertSerializer,
@@ -21,6 +22,7 @@ from .serializers import (
     ResolveAlertSerializer,
     RuleSerializer,
 )
+from .services.counters import SEVERITIES, alert_statistics
 
 logger = logging.getLogger(__name__)
 
@@ -108,19 +110,28 @@ class RuleViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def statistics(self, request):
-        """Retorna estatísticas das regras"""
-        queryset = self.get_queryset()
+        """Retorna estatísticas das regras (uma única agregação)"""
+        counts = self.get_queryset().aggregate(
+            total=Count("id"),
+            enabled=Count("id", filter=Q(enabled=True)),
+            disabled=Count("id", filter=Q(enabled=False)),
+            **{
+                severity: Count("id", filter=Q(severity=severity))
+                for severity in SEVERITIES
+            },
+        )
 
         stats = {
-            "total": queryset.count(),
-            "enabled": queryset.filter(enabled=True).count(),
-            "disabled": queryset.filter(enabled=False).count(),
-            "by_severity": {
-                "Critical": queryset.filter(severity="Critical").count(),
-                "High": queryset.filter(severity="High").count(),
-                "Medium": queryset.filter(severity="Medium").count(),
-                "Low": queryset.filter(severity="Low").count(),
-            },
+            "total": counts["total"],
+            "enabled": counts["enabled"],
+            "disabled": counts["disabled"],
+            "by_severity": {severity: counts[severity] for severity in SEVERITIES},
+            # Alertas das regras filtradas, a partir dos contadores
+            "alerts": alert_statistics(
+                AlertCounter.objects.filter(
+                    rule_id__in=self.get_queryset().values("id")
+                )
+            ),
         }
 
         return Response(stats)
@@ -303,22 +314,28 @@ class AlertViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def statistics(self, request):
-        """Retorna estatísticas dos alertas"""
-        queryset = self.get_queryset()
+        """
+        Retorna estatísticas dos alertas.
 
-        # Padronizar severidades em MAIÚSCULAS para consistência com frontend
-        stats = {
-            "total": queryset.count(),
-            "active": queryset.filter(acknowledged=False, resolved=False).count(),
-            "acknowledged": queryset.filter(acknowledged=True, resolved=False).count(),
-            "resolved": queryset.filter(resolved=True).count(),
-            "by_severity": {
-                "CRITICAL": queryset.filter(severity="Critical").count(),
-                "HIGH": queryset.filter(severity="High").count(),
-                "MEDIUM": queryset.filter(severity="Medium").count(),
-                "LOW": queryset.filter(severity="Low").count(),
-            },
-        }
+        Lê os contadores incrementais (AlertCounter) com os mesmos filtros da
+        listagem, em vez de agregar a tabela de alertas.
+        """
+        counters = AlertCounter.objects.all()
+
+        severity = request.query_params.get("severity")
+        if severity:
+            counters = counters.filter(severity__iexact=severity)
+
+        rule_id = request.query_params.get("rule_id")
+        if rule_id:
+            counters = counters.filter(rule_id=rule_id)
+
+        asset_tag = request.query_params.get("asset_tag")
+        if asset_tag:
+            counters = counters.filter(asset_tag__icontains=asset_tag)
+
+        # Severidades em MAIÚSCULAS para consistência com frontend
+        stats = alert_statistics(counters, status=request.query_params.get("status"))
 
         serializer = AlertStatisticsSerializer(stats)
         return Response(serializer.data)
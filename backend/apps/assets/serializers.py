@@ -927,7 +927,10 @@ class SensorBulkCreateSerializer(serializers.Serializer):
 
     def create(self, validated_data):
         """Cria múltiplos sensores em uma transação atômica."""
-        from django.db import transaction
+        from django.db import connection, transaction
+
+        from apps.tenants.models import WorkType
+        from apps.tenants.work_index import WorkIndexService
 
         device = self.context.get("device")
         if not device:
@@ -946,6 +949,13 @@ class SensorBulkCreateSerializer(serializers.Serializer):
             # Criar todos de uma vez (reduz round-trips ao banco)
             sensors = Sensor.objects.bulk_create(sensors_to_create)
 
+            # bulk_create não dispara signals: atualizar o TenantWorkIndex
+            WorkIndexService.touch_on_commit(
+                connection.schema_name,
+                WorkType.SENSORS,
+                delta=sum(1 for sensor in sensors if sensor.is_active),
+            )
+
         return sensors
 
 
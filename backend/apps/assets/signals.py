@@ -2,9 +2,10 @@
 Signals para app de Assets.
 
 Responsável por:
-- Atualizar cache de última leitura do Sensor quando TelemetryReading é criado
 - Atualizar status de Device quando conecta/desconecta no EMQX
 - Invalidar cache de timezone quando Site é atualizado
+- Invalidar cache de topologia do ingest quando Site/Asset/Device/Sensor mudam
+- Manter a contagem de sensores/devices ativos no TenantWorkIndex
 """
 
 import logging
@@ -12,10 +13,10 @@ import logging
 from django.conf import settings
 from django.core.cache import cache
 from django.db import connection
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
-from apps.assets.models import Site
+from apps.assets.models import Asset, Device, Sensor, Site
 
 logger = logging.getLogger(__name__)
 
@@ -58,15 +59,96 @@ def invalidate_site_timezone_cache_on_delete(sender, instance, **kwargs):
         )
 
 
-# Signal será conectado quando integrarmos com apps.ingest
-# @receiver(post_save, sender='ingest.TelemetryReading')
-# def update_sensor_last_reading(sender, instance, created, **kwargs):
-#     """
-#     Atualiza cache da última leitura do Sensor.
-#     Chamado automaticamente quando TelemetryReading é salvo.
-#     """
-#     if created and hasattr(instance, 'sensor'):
-#         instance.sensor.update_last_reading(
-#             value=instance.value,
-#             timestamp=instance.timestamp
-#         )
+def _invalidate_ingest_topology(update_fields=None):
+    """
+    Invalida o cache de topologia do ingest (apps.ingest.services.topology).
+
+    Saves que alteram apenas campos voláteis (last_seen, last_value, status...)
+    não mudam a topologia e são ignorados, senão o próprio ingest invalidaria
+    o cache a cada mensagem.
+    """
+    from apps.ingest.services.topology import (
+        VOLATILE_TOPOLOGY_FIELDS,
+        invalidate_topology_cache,
+    )
+
+    if update_fields and set(update_fields) <= VOLATILE_TOPOLOGY_FIELDS:
+        return
+
+    invalidate_topology_cache(connection.schema_name)
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Device)
+@receiver(post_save, sender=Sensor)
+def invalidate_ingest_topology_cache_on_save(
+    sender, instance, update_fields=None, **kwargs
+):
+    """
+    Invalida o cache de topologia do ingest quando a hierarquia muda.
+    """
+    _invalidate_ingest_topology(update_fields)
+
+
+@receiver(post_delete, sender=Site)
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Device)
+@receiver(post_delete, sender=Sensor)
+def invalidate_ingest_topology_cache_on_delete(sender, instance, **kwargs):
+    """
+    Invalida o cache de topologia do ingest quando um nó da hierarquia é deletado.
+    """
+    _invalidate_ingest_topology()
+
+
+def _touch_work_index(sender, delta):
+    """
+    Soma ``delta`` à contagem de sensores/devices ativos do tenant no
+    TenantWorkIndex após o commit (apps.tenants.work_index). A recontagem
+    fica com o ``record`` das tasks periódicas.
+    """
+    from apps.tenants.models import WorkType
+    from apps.tenants.work_index import WorkIndexService
+
+    work_type = WorkType.SENSORS if sender is Sensor else WorkType.DEVICES
+    WorkIndexService.touch_on_commit(connection.schema_name, work_type, delta=delta)
+
+
+@receiver(post_init, sender=Device)
+@receiver(post_init, sender=Sensor)
+def remember_work_index_state(sender, instance, **kwargs):
+    # __dict__: não dispara query se is_active foi adiado (.only(...))
+    instance._work_index_active = (
+        instance.__dict__.get("is_active") if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Device)
+@receiver(post_save, sender=Sensor)
+def update_work_index_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Criação ativa soma 1; mudança de is_active soma ±1. Demais saves
+    (auto-vínculo do ingest, last_seen/last_value...) não tocam o índice.
+    """
+    if update_fields and "is_active" not in update_fields:
+        return
+
+    was_active = False if created else instance._work_index_active
+    instance._work_index_active = instance.is_active
+    if was_active is None:
+        # Estado anterior desconhecido: fica para a recontagem periódica
+        return
+    delta = int(bool(instance.is_active)) - int(bool(was_active))
+    if delta:
+        _touch_work_index(sender, delta)
+
+
+@receiver(post_delete, sender=Device)
+@receiver(post_delete, sender=Sensor)
+def update_work_index_on_delete(sender, instance, **kwargs):
+    was_active = getattr(instance, "_work_index_active", None)
+    if was_active is None:
+        was_active = instance.is_active
+    if was_active:
+        _touch_work_index(sender, -1)
@@ -10,7 +10,9 @@ from django.utils import timezone
 from celery import shared_task
 from django_tenants.utils import schema_context
 
-from apps.common.tenancy import iter_tenants
+from apps.common.tenancy import iter_active_tenants
+from apps.tenants.models import WorkType
+from apps.tenants.work_index import WorkIndexService
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +51,7 @@ def check_sensors_online_status(self):
     }
 
     # Processar cada tenant
-    for tenant in iter_tenants():
+    for tenant in iter_active_tenants(WorkType.SENSORS):
         try:
             logger.info(f"  📊 Verificando tenant: {tenant.slug}")
 
@@ -60,6 +62,12 @@ def check_sensors_online_status(self):
                 # Buscar todos os sensores ativos
                 sensors = Sensor.objects.filter(is_active=True)
                 tenant_total = sensors.count()
+                WorkIndexService.record(
+                    tenant.schema_name,
+                    WorkType.SENSORS,
+                    tenant_total,
+                    version=tenant.work_version,
+                )
 
                 if tenant_total == 0:
                     logger.info(f"    ℹ️  Nenhum sensor encontrado em {tenant.slug}")
@@ -138,7 +146,7 @@ def update_device_online_status(self):
         "errors": [],
     }
 
-    for tenant in iter_tenants():
+    for tenant in iter_active_tenants(WorkType.DEVICES):
         try:
             logger.info(f"  📊 Verificando tenant: {tenant.slug}")
 
@@ -150,6 +158,12 @@ def update_device_online_status(self):
 
                 devices = Device.objects.filter(is_active=True)
                 tenant_total = devices.count()
+                WorkIndexService.record(
+                    tenant.schema_name,
+                    WorkType.DEVICES,
+                    tenant_total,
+                    version=tenant.work_version,
+                )
 
                 if tenant_total == 0:
                     logger.info(f"    ℹ️  Nenhum device encontrado em {tenant.slug}")
@@ -245,7 +259,7 @@ def calculate_device_availability(self):
 
     now = timezone.now()
 
-    for tenant in iter_tenants():
+    for tenant in iter_active_tenants(WorkType.DEVICES):
         try:
             logger.info("  Calculando disponibilidade para tenant: %s", tenant.slug)
 
@@ -258,6 +272,12 @@ def calculate_device_availability(self):
                     )
                 )
                 tenant_total = len(devices)
+                WorkIndexService.record(
+                    tenant.schema_name,
+                    WorkType.DEVICES,
+                    tenant_total,
+                    version=tenant.work_version,
+                )
 
                 if tenant_total == 0:
                     logger.info("    Nenhum device encontrado em %s", tenant.slug)
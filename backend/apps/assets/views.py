@@ -306,20 +306,13 @@ class SiteViewSet(viewsets.ModelViewSet):
         ).aggregate(total=Count("id"), online=Count("id", filter=Q(is_online=True)))
 
         # Estatísticas de alertas - ativos com alertas ativos (não resolvidos e não reconhecidos)
-        from apps.alerts.models import Alert
+        from apps.alerts.services.counters import active_alerts_by_asset
 
         # Buscar tags dos assets do site
         asset_tags = list(Asset.objects.filter(site=site).values_list("tag", flat=True))
 
-        # Contar quantos assets únicos têm alertas ativos (não resolvidos e não reconhecidos)
-        assets_with_alerts = (
-            Alert.objects.filter(
-                asset_tag__in=asset_tags, resolved=False, acknowledged=False
-            )
-            .values("asset_tag")
-            .distinct()
-            .count()
-        )
+        # Contar quantos assets únicos têm alertas ativos (contadores incrementais)
+        assets_with_alerts = len(active_alerts_by_asset(asset_tags))
 
         # Montar resposta
         stats = {
@@ -565,8 +558,7 @@ class AssetViewSet(viewsets.ModelViewSet):
 
         Response: Lista de assets com dados completos
         """
-        from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
-        from django.db.models.functions import Coalesce
+        from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
 
         from .serializers import AssetCompleteSerializer
 
@@ -623,21 +615,9 @@ class AssetViewSet(viewsets.ModelViewSet):
             .values("cnt")
         )
 
-        from apps.alerts.models import Alert
-
-        active_alerts_subquery = (
-            Alert.objects.filter(
-                asset_tag=OuterRef("tag"), resolved=False, acknowledged=False
-            )
-            .values("asset_tag")
-            .annotate(cnt=Count("id"))
-            .values("cnt")
-        )
-
         queryset = queryset.annotate(
             online_device_count=Subquery(online_devices_subquery),
             online_sensor_count=Subquery(online_sensors_subquery),
-            alert_count=Coalesce(Subquery(active_alerts_subquery), 0, output_field=IntegerField()),
         )
 
         def _build_latest_readings_map(assets):
@@ -662,19 +642,26 @@ class AssetViewSet(viewsets.ModelViewSet):
             )
             return {str(reading.sensor_id): reading for reading in latest_readings}
 
+        def _build_context(assets):
+            # Alertas ativos lidos dos contadores incrementais (uma query)
+            from apps.alerts.services.counters import active_alerts_by_asset
+
+            context = self.get_serializer_context()
+            context["latest_readings_by_sensor"] = _build_latest_readings_map(assets)
+            context["alert_count_by_asset_tag"] = active_alerts_by_asset(
+                asset.tag for asset in assets
+            )
+            return context
+
         # Paginação
         page = self.paginate_queryset(queryset)
         if page is not None:
-            latest_by_sensor = _build_latest_readings_map(page)
-            context = self.get_serializer_context()
-            context["latest_readings_by_sensor"] = latest_by_sensor
+            context = _build_context(page)
             serializer = AssetCompleteSerializer(page, many=True, context=context)
             return self.get_paginated_response(serializer.data)
 
         assets = list(queryset)
-        latest_by_sensor = _build_latest_readings_map(assets)
-        context = self.get_serializer_context()
-        context["latest_readings_by_sensor"] = latest_by_sensor
+        context = _build_context(assets)
         serializer = AssetCompleteSerializer(assets, many=True, context=context)
         return Response(serializer.data)
 
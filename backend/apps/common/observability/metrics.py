@@ -2,7 +2,7 @@
 Prometheus metrics definitions and helpers.
 """
 
-from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
 
 HTTP_REQUESTS_TOTAL = Counter(
     "http_requests_total",
@@ -40,6 +40,39 @@ INGEST_REQUESTS_TOTAL = Counter(
     ["status"],
 )
 
+INGEST_QUEUE_DEPTH = Gauge(
+    "ingest_queue_depth",
+    "Messages waiting in the async ingest queue (backlog)",
+)
+
+INGEST_QUEUE_REJECTED_TOTAL = Counter(
+    "ingest_queue_rejected_total",
+    "Ingest messages rejected because the queue was full (backpressure)",
+)
+
+INGEST_QUEUE_DEAD_LETTER_TOTAL = Counter(
+    "ingest_queue_dead_letter_total",
+    "Ingest messages moved to the dead-letter stream after too many deliveries",
+)
+
+INGEST_QUEUE_CONSUMER_LAG_SECONDS = Histogram(
+    "ingest_queue_consumer_lag_seconds",
+    "Time between enqueue and consumption of an ingest message",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600),
+)
+
+INGEST_QUEUE_BATCH_SIZE = Histogram(
+    "ingest_queue_batch_size",
+    "Messages per consumer micro-batch",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+INGEST_PARSER_DISPATCH_TOTAL = Counter(
+    "ingest_parser_dispatch_total",
+    "Payload parser dispatch lookups (hit = cached parser reused)",
+    ["result", "parser"],
+)
+
 
 def observe_http_request(method: str, path_template: str, status: str, duration_seconds: float):
     HTTP_REQUESTS_TOTAL.labels(
@@ -70,5 +103,27 @@ def observe_ingest_request(status: str):
     INGEST_REQUESTS_TOTAL.labels(status=status).inc()
 
 
+def observe_ingest_queue_depth(depth: int):
+    INGEST_QUEUE_DEPTH.set(depth)
+
+
+def observe_ingest_queue_rejected():
+    INGEST_QUEUE_REJECTED_TOTAL.inc()
+
+
+def observe_ingest_queue_dead_letter():
+    INGEST_QUEUE_DEAD_LETTER_TOTAL.inc()
+
+
+def observe_ingest_queue_batch(size: int, lags: list[float]):
+    INGEST_QUEUE_BATCH_SIZE.observe(size)
+    for lag in lags:
+        INGEST_QUEUE_CONSUMER_LAG_SECONDS.observe(lag)
+
+
+def observe_ingest_parser_dispatch(result: str, parser: str):
+    INGEST_PARSER_DISPATCH_TOTAL.labels(result=result, parser=parser).inc()
+
+
 def get_metrics_registry():
     return REGISTRY
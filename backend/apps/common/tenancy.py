@@ -35,3 +35,14 @@ def get_tenant_by_schema(schema_name: str) -> Tenant | None:
     normalized = schema_name.strip().lower().replace("-", "_")
     with schema_context(public_schema):
         return Tenant.objects.filter(schema_name__iexact=normalized).first()
+
+
+def iter_active_tenants(work_type: str) -> Iterable[Tenant]:
+    """
+    Yield only tenants with pending work of ``work_type`` (see
+    apps.tenants.work_index). Each tenant carries ``work_version`` to be passed
+    to WorkIndexService.record after the visit.
+    """
+    from apps.tenants.work_index import WorkIndexService
+
+    yield from WorkIndexService.active_tenants(work_type)
@@ -84,6 +84,8 @@ class OutboxEventAdmin(BaseAdmin):
         "last_attempt_at",
         "processed_at",
         "processed_by",
+        "leased_until",
+        "lease_owner",
         "created_at",
         "updated_at",
     ]
@@ -112,6 +114,8 @@ class OutboxEventAdmin(BaseAdmin):
                     "last_attempt_at",
                     "processed_at",
                     "processed_by",
+                    "leased_until",
+                    "lease_owner",
                 ]
             },
         ),
@@ -14,4 +14,4 @@ class CoreEventsConfig(AppConfig):
 
     def ready(self):
         """Import signal handlers when app is ready."""
-        pass  # Signals podem ser importados aqui se necessário
+        import apps.core_events.signals  # noqa
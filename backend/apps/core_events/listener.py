@@ -0,0 +1,116 @@
+"""
+Core Events Listener - Wakeup via PostgreSQL LISTEN/NOTIFY
+
+EventPublisher.publish emite ``NOTIFY outbox_events, '<schema>'`` na mesma
+transação do evento: o PostgreSQL só entrega a notificação no commit (e a
+descarta no rollback). Este processo de longa duração faz LISTEN no canal e
+despacha os eventos do schema notificado imediatamente, em vez de esperar o
+próximo ciclo do Celery Beat.
+
+O beat ``dispatch-outbox-events`` continua como varredura de segurança
+(OUTBOX_SWEEP_INTERVAL_SECONDS), cobrindo notificações perdidas enquanto o
+listener estava fora do ar.
+
+Uso:
+    python manage.py outbox_listener
+"""
+
+import logging
+import time
+from typing import Iterable, Optional, Set
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "outbox_events"
+
+
+def listener_conninfo() -> dict:
+    """Parâmetros de conexão psycopg a partir de DATABASES["default"]."""
+    db = settings.DATABASES["default"]
+    return {
+        "dbname": db["NAME"],
+        "user": db.get("USER") or None,
+        "password": db.get("PASSWORD") or None,
+        "host": db.get("HOST") or None,
+        "port": db.get("PORT") or None,
+    }
+
+
+def collect_schemas(notifies: Iterable) -> Set[str]:
+    """Schemas notificados (deduplicados) de um lote de notificações."""
+    return {notify.payload for notify in notifies if notify.payload}
+
+
+class OutboxListener:
+    """
+    Loop LISTEN -> dispatch.
+
+    Notificações que chegam em rajada são agrupadas por ``debounce_seconds``
+    e cada schema é despachado uma vez por lote. Sem notificações por
+    ``idle_seconds``, o loop só renova a conexão com o Django.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        debounce_seconds: float = 0.05,
+        idle_seconds: float = 30.0,
+    ):
+        self.batch_size = batch_size
+        self.debounce_seconds = debounce_seconds
+        self.idle_seconds = idle_seconds
+        self.running = True
+
+    def dispatch_schemas(self, schemas: Iterable[str]) -> int:
+        """Despacha os eventos pendentes de cada schema notificado."""
+        from .tasks import dispatch_pending_events
+
+        dispatched = 0
+        for schema_name in sorted(schemas):
+            try:
+                result = dispatch_pending_events(
+                    batch_size=self.batch_size, tenant_schema=schema_name
+                )
+                dispatched += result["dispatched"]
+            except Exception as e:
+                logger.error(f"Failed to dispatch outbox events for {schema_name}: {e}")
+        return dispatched
+
+    def wait(self, conn) -> Set[str]:
+        """Bloqueia até a primeira notificação e drena a rajada seguinte."""
+        schemas = collect_schemas(
+            conn.notifies(timeout=self.idle_seconds, stop_after=1)
+        )
+        if schemas:
+            schemas |= collect_schemas(conn.notifies(timeout=self.debounce_seconds))
+        return schemas
+
+    def run(self, max_iterations: Optional[int] = None):
+        import psycopg
+
+        with psycopg.connect(**listener_conninfo(), autocommit=True) as conn:
+            conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            logger.info(f"Listening on {NOTIFY_CHANNEL}")
+
+            iterations = 0
+            while self.running and (
+                max_iterations is None or iterations < max_iterations
+            ):
+                iterations += 1
+                schemas = self.wait(conn)
+                close_old_connections()
+                if not schemas:
+                    continue
+
+                started = time.monotonic()
+                dispatched = self.dispatch_schemas(schemas)
+                logger.info(
+                    f"Dispatched {dispatched} events for {len(schemas)} notified schemas "
+                    f"in {(time.monotonic() - started) * 1000:.0f}ms"
+                )
+
+    def stop(self, *args):
+        self.running = False
@@ -0,0 +1,46 @@
+"""
+Management command that runs the outbox LISTEN/NOTIFY dispatcher.
+
+Events published through EventPublisher notify the ``outbox_events`` channel
+on commit; this process dispatches them right away instead of waiting for the
+``dispatch-outbox-events`` beat sweep.
+
+Usage:
+    python manage.py outbox_listener
+    python manage.py outbox_listener --batch-size=200
+"""
+
+import signal
+
+from django.core.management.base import BaseCommand
+
+from apps.core_events.listener import OutboxListener
+
+
+class Command(BaseCommand):
+    help = "Dispatch outbox events as soon as they are committed (LISTEN/NOTIFY)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Maximum events dispatched per notified schema",
+        )
+        parser.add_argument(
+            "--debounce",
+            type=float,
+            default=0.05,
+            help="Seconds to group notifications arriving in a burst",
+        )
+
+    def handle(self, *args, **options):
+        listener = OutboxListener(
+            batch_size=options["batch_size"], debounce_seconds=options["debounce"]
+        )
+        signal.signal(signal.SIGTERM, listener.stop)
+        signal.signal(signal.SIGINT, listener.stop)
+
+        self.stdout.write(self.style.SUCCESS("Outbox listener started"))
+        listener.run()
+        self.stdout.write("Outbox listener stopped")
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core_events", "0002_alter_outboxevent_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxevent",
+            name="leased_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Fim do lease do dispatcher; enquanto válido o evento não é reenfileirado",
+                null=True,
+                verbose_name="Reservado até",
+            ),
+        ),
+        migrations.AddField(
+            model_name="outboxevent",
+            name="lease_owner",
+            field=models.CharField(
+                blank=True,
+                help_text="Identificador do dispatcher que reservou o evento",
+                max_length=255,
+                null=True,
+                verbose_name="Reservado por",
+            ),
+        ),
+    ]
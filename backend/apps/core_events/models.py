@@ -14,9 +14,11 @@ Campos conforme docs/events/01-contrato-eventos.md:
 - status (pending|processed|failed)
 - idempotency_key (string)
 - attempts (int), last_error (text)
+- leased_until, lease_owner (lease do dispatcher, ver services.EventClaimer)
 """
 
 import uuid
+from datetime import timedelta
 
 from django.db import models
 from django.utils import timezone
@@ -150,6 +152,22 @@ class OutboxEvent(models.Model):
         help_text="Identificador do worker/handler que processou",
     )
 
+    # Lease do dispatcher: evento pendente reservado até leased_until
+    # (reivindicado de novo se o lease expirar sem processamento)
+    leased_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Reservado até",
+        help_text="Fim do lease do dispatcher; enquanto válido o evento não é reenfileirado",
+    )
+    lease_owner = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        verbose_name="Reservado por",
+        help_text="Identificador do dispatcher que reservou o evento",
+    )
+
     # Auditoria
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
@@ -197,8 +215,17 @@ class OutboxEvent(models.Model):
         self.status = OutboxEventStatus.PROCESSED
         self.processed_at = timezone.now()
         self.processed_by = processed_by
+        self.leased_until = None
+        self.lease_owner = None
         self.save(
-            update_fields=["status", "processed_at", "processed_by", "updated_at"]
+            update_fields=[
+                "status",
+                "processed_at",
+                "processed_by",
+                "leased_until",
+                "lease_owner",
+                "updated_at",
+            ]
         )
 
     def mark_failed(self, error_message: str):
@@ -211,16 +238,27 @@ class OutboxEvent(models.Model):
         self.status = OutboxEventStatus.FAILED
         self.last_error = error_message
         self.last_attempt_at = timezone.now()
+        self.leased_until = None
+        self.lease_owner = None
         self.save(
-            update_fields=["status", "last_error", "last_attempt_at", "updated_at"]
+            update_fields=[
+                "status",
+                "last_error",
+                "last_attempt_at",
+                "leased_until",
+                "lease_owner",
+                "updated_at",
+            ]
         )
 
-    def increment_attempt(self, error_message: str = None):
+    def increment_attempt(self, error_message: str = None, lease_seconds: int = None):
         """
         Incrementa contador de tentativas e registra erro se fornecido.
 
         Args:
             error_message: Mensagem de erro opcional
+            lease_seconds: Renova o lease por este tempo (o retry do Celery
+                reprocessa o evento; o dispatcher não deve reenfileirá-lo)
 
         Returns:
             bool: True se ainda há tentativas restantes, False se deve marcar como failed
@@ -233,22 +271,33 @@ class OutboxEvent(models.Model):
 
         if self.attempts >= self.max_attempts:
             self.status = OutboxEventStatus.FAILED
+            self.leased_until = None
+            self.lease_owner = None
             self.save(
                 update_fields=[
                     "attempts",
                     "last_attempt_at",
                     "last_error",
                     "status",
+                    "leased_until",
+                    "lease_owner",
                     "updated_at",
                 ]
             )
             return False
 
-        self.save(
-            update_fields=["attempts", "last_attempt_at", "last_error", "updated_at"]
-        )
+        update_fields = ["attempts", "last_attempt_at", "last_error", "updated_at"]
+        if lease_seconds:
+            self.leased_until = self.last_attempt_at + timedelta(seconds=lease_seconds)
+            update_fields.append("leased_until")
+        self.save(update_fields=update_fields)
         return True
 
+    @property
+    def is_leased(self) -> bool:
+        """Evento reservado por um dispatcher (lease ainda válido)."""
+        return self.leased_until is not None and self.leased_until > timezone.now()
+
     @property
     def can_retry(self) -> bool:
         """Verifica se o evento pode ser reprocessado."""
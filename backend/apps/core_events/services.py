@@ -9,9 +9,12 @@ Referência: docs/events/01-contrato-eventos.md
 
 import hashlib
 import uuid
-from datetime import datetime
-from typing import Any, Dict, Optional, Union
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Union
 
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, Min, OuterRef, Q
 from django.utils import timezone
 
 from .models import OutboxEvent, OutboxEventStatus
@@ -134,8 +137,25 @@ class EventPublisher:
             max_attempts=max_attempts,
         )
 
+        cls.notify(connection.schema_name)
+
         return event
 
+    @staticmethod
+    def notify(schema_name: str):
+        """
+        Acorda o outbox_listener (NOTIFY outbox_events).
+
+        Emitido dentro da transação atual: o PostgreSQL entrega a
+        notificação só no commit e a descarta no rollback.
+        """
+        if not getattr(settings, "OUTBOX_NOTIFY_ENABLED", True):
+            return
+        from .listener import NOTIFY_CHANNEL
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [NOTIFY_CHANNEL, schema_name])
+
     @classmethod
     def publish_idempotent(
         cls,
@@ -221,6 +241,179 @@ class EventPublisher:
         return hashlib.sha256(combined.encode()).hexdigest()[:64]
 
 
+class EventClaimer:
+    """
+    Service para reservar (lease) eventos pendentes antes de enfileirá-los.
+
+    O dispatcher só enfileira eventos que conseguiu reservar: a reserva usa
+    ``SELECT ... FOR UPDATE SKIP LOCKED`` (dispatchers concorrentes pegam
+    eventos diferentes) e grava ``leased_until``/``lease_owner``. Enquanto o
+    lease vale, o evento não é reenfileirado; leases expirados (worker que
+    morreu ou fila atrasada além do TTL) voltam a ser reivindicáveis.
+    """
+
+    @staticmethod
+    def lease_seconds() -> int:
+        return int(getattr(settings, "OUTBOX_LEASE_SECONDS", 600))
+
+    @classmethod
+    def claimable(cls, now: Optional[datetime] = None):
+        """Queryset de eventos pendentes sem lease válido."""
+        now = now or timezone.now()
+        return OutboxEvent.objects.filter(status=OutboxEventStatus.PENDING).filter(
+            Q(leased_until__isnull=True) | Q(leased_until__lte=now)
+        )
+
+    @classmethod
+    def claim_pending(
+        cls,
+        owner: str,
+        limit: int = 100,
+        tenant_id: Optional[Union[uuid.UUID, str]] = None,
+        lease_seconds: Optional[int] = None,
+    ) -> List[uuid.UUID]:
+        """
+        Reserva até ``limit`` eventos pendentes (mais antigos primeiro).
+
+        Args:
+            owner: Identificador do dispatcher (gravado em lease_owner)
+            limit: Número máximo de eventos a reservar
+            tenant_id: Filtrar por tenant (opcional)
+            lease_seconds: Duração do lease (default: OUTBOX_LEASE_SECONDS)
+
+        Returns:
+            list: IDs dos eventos reservados
+        """
+        now = timezone.now()
+        leased_until = now + timedelta(seconds=lease_seconds or cls.lease_seconds())
+
+        with transaction.atomic():
+            queryset = cls.claimable(now)
+            if tenant_id:
+                queryset = queryset.filter(tenant_id=tenant_id)
+
+            event_ids = list(
+                queryset.select_for_update(skip_locked=True)
+                .order_by("created_at")
+                .values_list("id", flat=True)[:limit]
+            )
+            if event_ids:
+                OutboxEvent.objects.filter(id__in=event_ids).update(
+                    leased_until=leased_until, lease_owner=owner, updated_at=now
+                )
+
+        return event_ids
+
+    @classmethod
+    def claim_partitions(
+        cls,
+        owner: str,
+        limit: int = 100,
+        tenant_id: Optional[Union[uuid.UUID, str]] = None,
+        lease_seconds: Optional[int] = None,
+    ) -> List[List[uuid.UUID]]:
+        """
+        Reserva até ``limit`` eventos pendentes particionados por agregado
+        (aggregate_type, aggregate_id).
+
+        Agregados com algum evento pendente sob lease válido (em processamento
+        ou aguardando retry) ficam de fora: o próximo evento do agregado só é
+        reservado depois que o anterior for processado (ou marcado failed).
+        As reservas do schema são serializadas com um advisory lock, então
+        dispatchers concorrentes nunca dividem um agregado entre si. Só a
+        cabeça da sequência pendente de cada agregado é reservada: se o
+        SKIP LOCKED pulou um evento anterior (linha travada com lease
+        expirado), os eventos seguintes do agregado não são reservados.
+
+        Returns:
+            list: Partições (uma por agregado, na ordem do evento mais antigo),
+            cada uma com os IDs dos eventos em ordem de created_at
+        """
+        now = timezone.now()
+        leased_until = now + timedelta(seconds=lease_seconds or cls.lease_seconds())
+
+        in_flight = OutboxEvent.objects.filter(
+            status=OutboxEventStatus.PENDING,
+            leased_until__gt=now,
+            aggregate_type=OuterRef("aggregate_type"),
+            aggregate_id=OuterRef("aggregate_id"),
+        )
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext(%s))",
+                    [f"outbox-claim:{connection.schema_name}"],
+                )
+
+            queryset = cls.claimable(now).exclude(Exists(in_flight))
+            if tenant_id:
+                queryset = queryset.filter(tenant_id=tenant_id)
+
+            rows = cls._sequence_heads(
+                list(
+                    queryset.select_for_update(skip_locked=True)
+                    .order_by("created_at")
+                    .values_list("id", "aggregate_type", "aggregate_id", "created_at")[
+                        :limit
+                    ]
+                )
+            )
+            if rows:
+                OutboxEvent.objects.filter(id__in=[row[0] for row in rows]).update(
+                    leased_until=leased_until, lease_owner=owner, updated_at=now
+                )
+
+        partitions: Dict[tuple, List[uuid.UUID]] = {}
+        for event_id, aggregate_type, aggregate_id, _ in rows:
+            partitions.setdefault((aggregate_type, aggregate_id), []).append(event_id)
+        return list(partitions.values())
+
+    @staticmethod
+    def _sequence_heads(rows: List[tuple]) -> List[tuple]:
+        """
+        Filtra ``(id, aggregate_type, aggregate_id, created_at)`` para manter,
+        de cada agregado, só os eventos anteriores ao primeiro evento pendente
+        que ficou fora da reserva.
+        """
+        if not rows:
+            return rows
+
+        claimed_ids = [row[0] for row in rows]
+        aggregates = {(row[1], row[2]) for row in rows}
+        aggregate_filter = Q()
+        for aggregate_type, aggregate_id in aggregates:
+            aggregate_filter |= Q(
+                aggregate_type=aggregate_type, aggregate_id=aggregate_id
+            )
+
+        first_unclaimed = {
+            (row["aggregate_type"], row["aggregate_id"]): row["first_created_at"]
+            for row in OutboxEvent.objects.filter(status=OutboxEventStatus.PENDING)
+            .filter(aggregate_filter)
+            .exclude(id__in=claimed_ids)
+            .values("aggregate_type", "aggregate_id")
+            .annotate(first_created_at=Min("created_at"))
+            .order_by()
+        }
+
+        return [
+            row
+            for row in rows
+            if (row[1], row[2]) not in first_unclaimed
+            or row[3] < first_unclaimed[(row[1], row[2])]
+        ]
+
+    @classmethod
+    def release(cls, event_ids: List[Union[uuid.UUID, str]]) -> int:
+        """Libera o lease (ex.: falha ao enfileirar) para o próximo ciclo."""
+        if not event_ids:
+            return 0
+        return OutboxEvent.objects.filter(
+            id__in=event_ids, status=OutboxEventStatus.PENDING
+        ).update(leased_until=None, lease_owner=None)
+
+
 class EventRetrier:
     """
     Service para reprocessamento de eventos falhos.
@@ -253,6 +446,8 @@ class EventRetrier:
         event.last_attempt_at = None
         event.processed_at = None
         event.processed_by = None
+        event.leased_until = None
+        event.lease_owner = None
         event.save()
 
         return event
@@ -295,6 +490,8 @@ class EventRetrier:
             event.last_attempt_at = None
             event.processed_at = None
             event.processed_by = None
+            event.leased_until = None
+            event.lease_owner = None
             event.save()
             count += 1
 
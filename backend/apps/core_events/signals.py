@@ -0,0 +1,30 @@
+"""
+Core Events Signals
+
+Mantém o TenantWorkIndex (apps.tenants.work_index) para que o dispatcher só
+visite tenants com eventos pendentes.
+"""
+
+from django.db import connection
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.tenants.models import WorkType
+from apps.tenants.work_index import WorkIndexService
+
+from .models import OutboxEvent, OutboxEventStatus
+
+
+@receiver(post_save, sender=OutboxEvent)
+def mark_tenant_outbox_work(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Evento novo (ou resetado para pending pelo EventRetrier) marca o tenant
+    como ativo após o commit. Saves parciais (mark_processed, increment_attempt)
+    não criam trabalho novo.
+    """
+    if instance.status != OutboxEventStatus.PENDING:
+        return
+    if created or not update_fields:
+        WorkIndexService.touch_on_commit(
+            connection.schema_name, WorkType.OUTBOX, delta=1
+        )
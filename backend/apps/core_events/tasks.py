@@ -9,21 +9,32 @@ Referência: docs/events/01-contrato-eventos.md
 
 import logging
 import uuid
-from typing import Callable, Dict, Optional
+from collections import defaultdict
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
 
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
 from django.utils import timezone
 
 from celery import shared_task
 from django_tenants.utils import get_public_schema_name, schema_context
 
-from .models import OutboxEvent, OutboxEventStatus
-from apps.common.tenancy import iter_tenants
 from apps.common.observability.metrics import observe_outbox_event
+from apps.common.tenancy import iter_active_tenants, iter_tenants
+from apps.tenants.models import WorkType
+from apps.tenants.work_index import WorkIndexService, count_pending
+
+from .models import OutboxEvent, OutboxEventStatus
+from .services import EventClaimer, EventPublisher
 
 logger = logging.getLogger(__name__)
 
 
+# Teto do backoff entre tentativas (10 minutos)
+RETRY_BACKOFF_MAX = 600
+
 # Registry de handlers de eventos
 # Formato: {'event_name': handler_function}
 _event_handlers: Dict[str, Callable[[OutboxEvent], None]] = {}
@@ -67,6 +78,50 @@ def get_event_handler(event_name: str) -> Optional[Callable[[OutboxEvent], None]
     return _event_handlers.get(event_name)
 
 
+# Handlers de lote (opcionais): recebem os eventos pendentes de um mesmo
+# event_name e retornam {event_id: exceção} só para os que falharam
+_batch_event_handlers: Dict[
+    str, Callable[[List[OutboxEvent]], Optional[Dict[uuid.UUID, Exception]]]
+] = {}
+
+
+def register_batch_event_handler(event_name: str):
+    """
+    Decorator para registrar a versão em lote de um handler.
+
+    Usado por process_outbox_batch; process_outbox_event continua chamando o
+    handler registrado com register_event_handler. Cada evento do lote deve
+    ser processado no seu próprio atomic, e as falhas devolvidas no dict (em
+    vez de levantadas) para não afetar os demais eventos. Se o handler de lote
+    levantar exceção, o lote é reprocessado evento a evento.
+
+    Uso:
+        @register_batch_event_handler('work_order.closed')
+        def handle_work_order_closed_batch(events: list[OutboxEvent]):
+            ...
+            return {event.id: error for event, error in failures}
+
+    Args:
+        event_name: Nome do evento que o handler processa
+    """
+
+    def decorator(
+        func: Callable[[List[OutboxEvent]], Optional[Dict[uuid.UUID, Exception]]],
+    ):
+        _batch_event_handlers[event_name] = func
+        logger.info(f"Registered batch handler for event: {event_name}")
+        return func
+
+    return decorator
+
+
+def get_batch_event_handler(
+    event_name: str,
+) -> Optional[Callable[[List[OutboxEvent]], Optional[Dict[uuid.UUID, Exception]]]]:
+    """Retorna o handler de lote registrado para um evento (ou None)."""
+    return _batch_event_handlers.get(event_name)
+
+
 def get_registered_events() -> list[str]:
     """Retorna lista de eventos com handlers registrados."""
     return list(_event_handlers.keys())
@@ -126,7 +181,7 @@ def _tenant_matches_filter(tenant, tenant_id_filter: str | None) -> bool:
     bind=True,
     autoretry_for=(Exception,),
     retry_backoff=True,
-    retry_backoff_max=600,  # Max 10 minutos
+    retry_backoff_max=RETRY_BACKOFF_MAX,
     retry_jitter=True,
     max_retries=5,
     acks_late=True,  # Acknowledge após processamento
@@ -146,9 +201,10 @@ def process_outbox_event(self, event_id: str, tenant_schema: str | None = None):
     """
     error_to_raise = None
     can_retry = False
+    retry_countdown = 0
 
     def _process_event():
-        nonlocal error_to_raise, can_retry
+        nonlocal error_to_raise, can_retry, retry_countdown
 
         try:
             with transaction.atomic():
@@ -168,6 +224,7 @@ def process_outbox_event(self, event_id: str, tenant_schema: str | None = None):
                     # Marcar como failed se não há handler
                     event.mark_failed(error_msg)
                     observe_outbox_event("failed")
+                    _wake_pending_aggregates([event])
                     return
 
                 # Tentar processar
@@ -183,6 +240,7 @@ def process_outbox_event(self, event_id: str, tenant_schema: str | None = None):
                     )
                     event.mark_processed(processed_by=worker_id)
                     observe_outbox_event("processed")
+                    _wake_pending_aggregates([event])
 
                     logger.info(f"Event {event_id} processed successfully")
                     return
@@ -191,8 +249,14 @@ def process_outbox_event(self, event_id: str, tenant_schema: str | None = None):
                     error_msg = f"{type(e).__name__}: {str(e)}"
                     logger.error(f"Error processing event {event_id}: {error_msg}")
 
-                    # Incrementar tentativas
-                    can_retry = event.increment_attempt(error_msg)
+                    # Incrementar tentativas, renovando o lease até o fim do
+                    # retry: countdown explícito (sem jitter do Celery) mais
+                    # o lease normal para o processamento da nova tentativa
+                    retry_countdown = _retry_backoff_seconds(event.attempts + 1)
+                    can_retry = event.increment_attempt(
+                        error_msg,
+                        lease_seconds=retry_countdown + EventClaimer.lease_seconds(),
+                    )
 
                     if not can_retry:
                         logger.error(
@@ -200,6 +264,7 @@ def process_outbox_event(self, event_id: str, tenant_schema: str | None = None):
                         )
 
                         observe_outbox_event("failed")
+                        _wake_pending_aggregates([event])
 
                     error_to_raise = e
 
@@ -214,8 +279,344 @@ def process_outbox_event(self, event_id: str, tenant_schema: str | None = None):
         _process_event()
 
     if error_to_raise and can_retry:
-        # Re-raise para Celery fazer retry após persistir o estado
-        raise error_to_raise
+        # Retry após persistir o estado, com o mesmo countdown usado no lease
+        raise self.retry(exc=error_to_raise, countdown=retry_countdown)
+
+
+def outbox_batch_size() -> int:
+    """Eventos por task process_outbox_batch (0/1 = uma task por evento)."""
+    return int(getattr(settings, "OUTBOX_BATCH_SIZE", 0))
+
+
+def ordered_dispatch() -> bool:
+    """Reservas particionadas por agregado (ver EventClaimer.claim_partitions)."""
+    return getattr(settings, "OUTBOX_ORDERED_DISPATCH", True)
+
+
+def _wake_pending_aggregates(events: List[OutboxEvent]):
+    """
+    Renotifica o schema se os agregados dos eventos finalizados ainda têm
+    eventos reivindicáveis.
+
+    Com o dispatch ordenado, um evento publicado enquanto o anterior do mesmo
+    agregado estava sob lease fica de fora da reserva; sem este NOTIFY (entregue
+    no commit) ele só sairia na varredura de segurança do beat.
+    """
+    if not events or not ordered_dispatch():
+        return
+
+    aggregate_filter = Q()
+    for event in events:
+        aggregate_filter |= Q(
+            aggregate_type=event.aggregate_type, aggregate_id=event.aggregate_id
+        )
+    if EventClaimer.claimable().filter(aggregate_filter).exists():
+        EventPublisher.notify(connection.schema_name)
+
+
+def _retry_backoff_seconds(attempts: int) -> int:
+    """Backoff exponencial entre tentativas (mesmo teto de process_outbox_event)."""
+    return min(2**attempts, RETRY_BACKOFF_MAX)
+
+
+def _handle_event_group(
+    event_name: str, events: List[OutboxEvent]
+) -> Dict[uuid.UUID, Exception]:
+    """
+    Executa os eventos de um mesmo event_name: handler de lote quando houver,
+    senão (ou se o lote inteiro falhar) o handler por evento, cada um no seu
+    savepoint.
+
+    Returns:
+        dict: {event_id: exceção} dos eventos que falharam
+    """
+    batch_handler = get_batch_event_handler(event_name)
+    handler = get_event_handler(event_name)
+
+    if batch_handler:
+        try:
+            with transaction.atomic():
+                failures = batch_handler(events) or {}
+            return {uuid.UUID(str(event_id)): e for event_id, e in failures.items()}
+        except Exception as e:
+            if handler is None:
+                return {event.id: e for event in events}
+            logger.warning(
+                f"Batch handler for {event_name} failed ({type(e).__name__}: {e}), "
+                f"falling back to per-event processing"
+            )
+
+    failures = {}
+    for event in events:
+        try:
+            with transaction.atomic():
+                handler(event)
+        except Exception as e:
+            failures[event.id] = e
+    return failures
+
+
+@shared_task(
+    bind=True,
+    acks_late=True,
+)
+def process_outbox_batch(
+    self,
+    event_ids: list[str] | None = None,
+    tenant_schema: str | None = None,
+    batch_size: int | None = None,
+):
+    """
+    Processa um lote de eventos da Outbox de um mesmo tenant numa única task.
+
+    1. Bloqueia os eventos ainda pendentes (SKIP LOCKED) ou, sem event_ids,
+       reserva até batch_size eventos do schema
+    2. Agrupa por event_name e chama o handler de lote quando registrado
+       (register_batch_event_handler), senão o handler por evento
+    3. Marca os processados com um único UPDATE
+
+    Falhas ficam isoladas no evento: tentativas são incrementadas só para ele
+    e o lease é renovado com backoff exponencial; o próximo ciclo do
+    dispatcher o reivindica quando o lease expira. Esgotadas as tentativas
+    (ou sem handler), o evento vira failed.
+
+    Args:
+        event_ids: UUIDs dos eventos a processar (reservados pelo dispatcher)
+        tenant_schema: Schema do tenant dos eventos
+        batch_size: Máximo de eventos a reservar quando event_ids não é informado
+    """
+    worker_id = f"celery-{self.request.id}" if self.request.id else "unknown"
+
+    def _process_batch():
+        ids = event_ids
+        if ids is None:
+            ids = EventClaimer.claim_pending(
+                owner=worker_id,
+                limit=batch_size or outbox_batch_size() or 100,
+                tenant_id=(
+                    _tenant_uuid_from_schema(tenant_schema) if tenant_schema else None
+                ),
+            )
+
+        stats = {"processed": 0, "failed": 0, "retrying": 0}
+        if not ids:
+            return stats
+
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(id__in=ids, status=OutboxEventStatus.PENDING)
+                .order_by("created_at")
+            )
+
+            groups: Dict[str, List[OutboxEvent]] = defaultdict(list)
+            for event in events:
+                groups[event.event_name].append(event)
+
+            failures: Dict[uuid.UUID, str] = {}
+            unhandled = set()
+            for event_name, group in groups.items():
+                if not get_event_handler(event_name) and not get_batch_event_handler(
+                    event_name
+                ):
+                    error_msg = f"No handler registered for event: {event_name}"
+                    logger.warning(error_msg)
+                    for event in group:
+                        failures[event.id] = error_msg
+                        unhandled.add(event.id)
+                    continue
+
+                logger.info(f"Processing {len(group)} events: {event_name}")
+                for event_id, e in _handle_event_group(event_name, group).items():
+                    failures[event_id] = f"{type(e).__name__}: {str(e)}"
+                    logger.error(
+                        f"Error processing event {event_id}: {failures[event_id]}"
+                    )
+
+            now = timezone.now()
+            processed_ids = [event.id for event in events if event.id not in failures]
+            if processed_ids:
+                OutboxEvent.objects.filter(id__in=processed_ids).update(
+                    status=OutboxEventStatus.PROCESSED,
+                    processed_at=now,
+                    processed_by=worker_id,
+                    leased_until=None,
+                    lease_owner=None,
+                    updated_at=now,
+                )
+                stats["processed"] = len(processed_ids)
+
+            failed_events = []
+            for event in events:
+                if event.id not in failures:
+                    continue
+                event.last_error = failures[event.id]
+                event.last_attempt_at = now
+                event.updated_at = now
+                if event.id not in unhandled:
+                    event.attempts += 1
+                if event.id in unhandled or event.attempts >= event.max_attempts:
+                    event.status = OutboxEventStatus.FAILED
+                    event.leased_until = None
+                    event.lease_owner = None
+                    stats["failed"] += 1
+                else:
+                    event.leased_until = now + timedelta(
+                        seconds=_retry_backoff_seconds(event.attempts)
+                    )
+                    event.lease_owner = worker_id
+                    stats["retrying"] += 1
+                failed_events.append(event)
+
+            if failed_events:
+                OutboxEvent.objects.bulk_update(
+                    failed_events,
+                    [
+                        "status",
+                        "attempts",
+                        "last_error",
+                        "last_attempt_at",
+                        "leased_until",
+                        "lease_owner",
+                        "updated_at",
+                    ],
+                )
+
+            # Agregados que saíram do lease (processados ou failed) e ainda
+            # têm eventos pendentes
+            _wake_pending_aggregates(
+                [
+                    event
+                    for event in events
+                    if event.id not in failures
+                    or event.status == OutboxEventStatus.FAILED
+                ]
+            )
+
+        for _ in range(stats["processed"]):
+            observe_outbox_event("processed")
+        for _ in range(stats["failed"]):
+            observe_outbox_event("failed")
+
+        logger.info(
+            f"Processed outbox batch: {stats['processed']} processed, "
+            f"{stats['retrying']} retrying, {stats['failed']} failed"
+        )
+        return stats
+
+    if tenant_schema:
+        with schema_context(tenant_schema):
+            return _process_batch()
+    return _process_batch()
+
+
+def _record_outbox_work(tenant):
+    """Grava no TenantWorkIndex quantos eventos do tenant seguem pendentes."""
+    with schema_context(tenant.schema_name):
+        pending = count_pending(WorkType.OUTBOX)
+    WorkIndexService.record(
+        tenant.schema_name,
+        WorkType.OUTBOX,
+        pending,
+        version=getattr(tenant, "work_version", None),
+    )
+
+
+def _process_in_order(event_id: str, worker_id: str) -> str:
+    """
+    Processa um evento de uma partição ordenada.
+
+    Returns:
+        str: "processed", "failed", "retrying" ou "skipped"
+    """
+    with transaction.atomic():
+        event = OutboxEvent.objects.select_for_update().filter(id=event_id).first()
+        if event is None or event.status != OutboxEventStatus.PENDING:
+            return "skipped"
+
+        handler = get_event_handler(event.event_name)
+        if not handler:
+            error_msg = f"No handler registered for event: {event.event_name}"
+            logger.warning(error_msg)
+            event.mark_failed(error_msg)
+            observe_outbox_event("failed")
+            _wake_pending_aggregates([event])
+            return "failed"
+
+        try:
+            with transaction.atomic():
+                handler(event)
+        except Exception as e:
+            error_msg = f"{type(e).__name__}: {str(e)}"
+            logger.error(f"Error processing event {event_id}: {error_msg}")
+
+            # O lease (com backoff) bloqueia o agregado até a nova tentativa
+            can_retry = event.increment_attempt(
+                error_msg, lease_seconds=_retry_backoff_seconds(event.attempts + 1)
+            )
+            if not can_retry:
+                logger.error(
+                    f"Event {event_id} marked as failed after {event.attempts} attempts"
+                )
+                observe_outbox_event("failed")
+                _wake_pending_aggregates([event])
+                return "failed"
+            return "retrying"
+
+        event.mark_processed(processed_by=worker_id)
+        observe_outbox_event("processed")
+        _wake_pending_aggregates([event])
+        return "processed"
+
+
+@shared_task(
+    bind=True,
+    acks_late=True,
+)
+def process_outbox_partition(
+    self, event_ids: list[str], tenant_schema: str | None = None
+):
+    """
+    Processa, em ordem, os eventos reservados de um mesmo agregado.
+
+    Cada evento roda na sua própria transação. Se um evento falhar e ainda
+    tiver tentativas, a partição para: os eventos seguintes têm o lease
+    liberado e o agregado fica bloqueado pelo lease (com backoff) do evento
+    que falhou, de modo que nenhum evento posterior roda antes dele. Eventos
+    que esgotam as tentativas viram failed e não bloqueiam os seguintes.
+
+    Args:
+        event_ids: UUIDs dos eventos do agregado, em ordem de created_at
+        tenant_schema: Schema do tenant dos eventos
+    """
+    worker_id = f"celery-{self.request.id}" if self.request.id else "unknown"
+
+    def _process_partition():
+        stats = {
+            "processed": 0,
+            "failed": 0,
+            "retrying": 0,
+            "skipped": 0,
+            "deferred": 0,
+        }
+        for index, event_id in enumerate(event_ids):
+            outcome = _process_in_order(event_id, worker_id)
+            stats[outcome] += 1
+            if outcome == "retrying":
+                remaining = event_ids[index + 1 :]
+                EventClaimer.release(remaining)
+                stats["deferred"] = len(remaining)
+                logger.info(
+                    f"Event {event_id} will be retried; deferred {len(remaining)} "
+                    f"later events of the same aggregate"
+                )
+                break
+        return stats
+
+    if tenant_schema:
+        with schema_context(tenant_schema):
+            return _process_partition()
+    return _process_partition()
 
 
 @shared_task(
@@ -232,34 +633,92 @@ def dispatch_pending_events(
     Dispatcher principal: busca eventos pendentes e agenda processamento.
 
     Esta task é executada periodicamente (via Celery Beat) para:
-    1. Buscar eventos com status 'pending'
+    1. Reservar (lease) eventos pendentes sem lease válido
     2. Agendar uma task process_outbox_event para cada um
 
+    Cada evento pendente é enfileirado uma única vez por lease
+    (OUTBOX_LEASE_SECONDS); leases expirados são reivindicados de novo.
+    A varredura sem filtro visita só os tenants com eventos pendentes no
+    TenantWorkIndex (apps.tenants.work_index) e grava o que restou pendente.
+    Com OUTBOX_ORDERED_DISPATCH (padrão), a reserva é particionada por
+    agregado: eventos de um mesmo agregado seguem numa única task
+    process_outbox_partition, em ordem, e agregados diferentes em paralelo.
+    Com OUTBOX_BATCH_SIZE > 1, os eventos reservados de cada tenant são
+    enfileirados em tasks process_outbox_batch de até OUTBOX_BATCH_SIZE
+    eventos, em vez de uma task por evento.
+
     Args:
         batch_size: Número máximo de eventos a processar por execução
         tenant_id: Filtrar por tenant específico (opcional)
     """
+    lease_owner = f"dispatcher-{self.request.id}" if self.request.id else "dispatcher"
+
     def _dispatch_for_schema(schema_name: str, tenant_id_filter: str | None):
         tenant_uuid = _normalize_tenant_uuid(tenant_id_filter, schema_name)
         with schema_context(schema_name):
-            queryset = OutboxEvent.objects.filter(
-                status=OutboxEventStatus.PENDING
-            ).order_by("created_at")
-            if tenant_uuid:
-                queryset = queryset.filter(tenant_id=tenant_uuid)
-
-            pending_events = list(queryset[:batch_size])
+            # Reserva (lease) antes de enfileirar: eventos já reservados e
+            # ainda não processados não são enfileirados de novo
+            if ordered_dispatch():
+                partitions = EventClaimer.claim_partitions(
+                    owner=lease_owner, limit=batch_size, tenant_id=tenant_uuid
+                )
+            else:
+                partitions = [
+                    [event_id]
+                    for event_id in EventClaimer.claim_pending(
+                        owner=lease_owner, limit=batch_size, tenant_id=tenant_uuid
+                    )
+                ]
 
-        if not pending_events:
+        if not partitions:
             return 0
 
         dispatched = 0
-        for event in pending_events:
+        failed = []
+        # Agregado com vários eventos reservados: uma task que os processa em
+        # ordem; agregados diferentes seguem em tasks paralelas
+        event_ids = []
+        for partition in partitions:
+            if len(partition) == 1:
+                event_ids.append(partition[0])
+                continue
             try:
-                process_outbox_event.delay(str(event.id), tenant_schema=schema_name)
-                dispatched += 1
+                process_outbox_partition.delay(
+                    [str(event_id) for event_id in partition], tenant_schema=schema_name
+                )
+                dispatched += len(partition)
             except Exception as e:
-                logger.error(f"Failed to dispatch event {event.id}: {e}")
+                logger.error(
+                    f"Failed to dispatch partition of {len(partition)} events: {e}"
+                )
+                failed.extend(partition)
+
+        chunk_size = outbox_batch_size()
+        if chunk_size > 1:
+            for start in range(0, len(event_ids), chunk_size):
+                chunk = event_ids[start : start + chunk_size]
+                try:
+                    process_outbox_batch.delay(
+                        [str(event_id) for event_id in chunk], tenant_schema=schema_name
+                    )
+                    dispatched += len(chunk)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to dispatch batch of {len(chunk)} events: {e}"
+                    )
+                    failed.extend(chunk)
+        else:
+            for event_id in event_ids:
+                try:
+                    process_outbox_event.delay(str(event_id), tenant_schema=schema_name)
+                    dispatched += 1
+                except Exception as e:
+                    logger.error(f"Failed to dispatch event {event_id}: {e}")
+                    failed.append(event_id)
+
+        if failed:
+            with schema_context(schema_name):
+                EventClaimer.release(failed)
 
         return dispatched
 
@@ -273,13 +732,17 @@ def dispatch_pending_events(
 
     total_dispatched = 0
     tenant_count = 0
-    for tenant in iter_tenants():
+    # Sem filtro, só tenants com eventos pendentes no TenantWorkIndex
+    tenants = iter_tenants() if tenant_id else iter_active_tenants(WorkType.OUTBOX)
+    for tenant in tenants:
         if not _tenant_matches_filter(tenant, tenant_id):
             continue
         tenant_count += 1
         total_dispatched += _dispatch_for_schema(
             tenant.schema_name, _tenant_uuid_from_schema(tenant.schema_name)
         )
+        if not tenant_id:
+            _record_outbox_work(tenant)
 
     if total_dispatched == 0:
         logger.debug("No pending events to dispatch")
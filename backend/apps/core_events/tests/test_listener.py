@@ -0,0 +1,123 @@
+"""
+Testes para o wakeup da outbox via LISTEN/NOTIFY.
+
+Testa:
+- NOTIFY emitido pelo EventPublisher.publish
+- Agrupamento de notificações por schema
+- Dispatch imediato dos schemas notificados
+"""
+
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from django_tenants.test.cases import TenantTestCase
+
+from apps.core_events.listener import NOTIFY_CHANNEL, OutboxListener, collect_schemas
+from apps.core_events.models import OutboxEvent
+from apps.core_events.services import EventPublisher
+
+
+def _notify(payload):
+    return SimpleNamespace(channel=NOTIFY_CHANNEL, payload=payload, pid=1)
+
+
+class FakeListenConnection:
+    """Conexão psycopg falsa: entrega lotes de notificações em sequência."""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+        self.calls = []
+
+    def notifies(self, timeout=None, stop_after=None):
+        self.calls.append({"timeout": timeout, "stop_after": stop_after})
+        return iter(self.batches.pop(0) if self.batches else [])
+
+
+class PublishNotifyTest(TenantTestCase):
+    """Testes do NOTIFY emitido na publicação."""
+
+    def _publish(self):
+        return EventPublisher.publish(
+            tenant_id=uuid.uuid4(),
+            event_name="work_order.closed",
+            aggregate_type="work_order",
+            aggregate_id=uuid.uuid4(),
+            data={},
+        )
+
+    def test_publish_notifies_schema(self):
+        """Testa que publish emite pg_notify com o schema atual."""
+        with CaptureQueriesContext(connection) as queries:
+            self._publish()
+
+        notify_sql = [
+            q["sql"] for q in queries.captured_queries if "pg_notify" in q["sql"]
+        ]
+        self.assertEqual(len(notify_sql), 1)
+        self.assertIn(NOTIFY_CHANNEL, notify_sql[0])
+        self.assertIn(self.tenant.schema_name, notify_sql[0])
+
+    @override_settings(OUTBOX_NOTIFY_ENABLED=False)
+    def test_publish_without_notify(self):
+        """Testa que o NOTIFY pode ser desligado."""
+        with CaptureQueriesContext(connection) as queries:
+            self._publish()
+
+        self.assertFalse(any("pg_notify" in q["sql"] for q in queries.captured_queries))
+
+
+class CollectSchemasTest(SimpleTestCase):
+    """Testes do agrupamento de notificações."""
+
+    def test_collect_deduplicates_schemas(self):
+        schemas = collect_schemas(
+            [_notify("umc"), _notify("acme"), _notify("umc"), _notify("")]
+        )
+
+        self.assertSetEqual(schemas, {"umc", "acme"})
+
+    def test_wait_drains_burst_after_first_notification(self):
+        conn = FakeListenConnection([_notify("umc")], [_notify("acme"), _notify("umc")])
+
+        schemas = OutboxListener(debounce_seconds=0.01).wait(conn)
+
+        self.assertSetEqual(schemas, {"umc", "acme"})
+        self.assertEqual(conn.calls[0]["stop_after"], 1)
+        self.assertEqual(conn.calls[1]["timeout"], 0.01)
+
+    def test_wait_returns_empty_on_idle_timeout(self):
+        conn = FakeListenConnection([])
+
+        self.assertSetEqual(OutboxListener().wait(conn), set())
+        self.assertEqual(len(conn.calls), 1)
+
+
+class ListenerDispatchTest(TenantTestCase):
+    """Testes do dispatch dos schemas notificados."""
+
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    def test_dispatch_schemas_enqueues_pending_events(self, mock_delay):
+        OutboxEvent.objects.create(
+            tenant_id=uuid.uuid5(
+                uuid.NAMESPACE_DNS, f"tenant:{self.tenant.schema_name}"
+            ),
+            event_name="work_order.closed",
+            aggregate_type="work_order",
+            aggregate_id=uuid.uuid4(),
+            occurred_at=timezone.now(),
+            payload={"data": {}},
+            idempotency_key=str(uuid.uuid4()),
+        )
+
+        dispatched = OutboxListener().dispatch_schemas({self.tenant.schema_name})
+
+        self.assertEqual(dispatched, 1)
+        self.assertEqual(
+            mock_delay.call_args.kwargs.get("tenant_schema"), self.tenant.schema_name
+        )
@@ -5,30 +5,43 @@ Testa:
 - Registro de handlers
 - process_outbox_event task
 - dispatch_pending_events task
+- process_outbox_batch task
+- process_outbox_partition task (ordem por agregado)
 - retry_failed_events task
 """
 
 import uuid
+from datetime import timedelta
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from django_tenants.test.cases import TenantTestCase
 from django_tenants.utils import schema_context
 
+from apps.core_events.listener import OutboxListener
 from apps.core_events.models import OutboxEvent, OutboxEventStatus
+from apps.core_events.services import EventClaimer
 from apps.core_events.tasks import (
+    RETRY_BACKOFF_MAX,
+    _batch_event_handlers,
     _event_handlers,
     cleanup_old_events,
     dispatch_pending_events,
     get_event_handler,
     get_registered_events,
+    process_outbox_batch,
     process_outbox_event,
+    process_outbox_partition,
+    register_batch_event_handler,
     register_event_handler,
     retry_failed_events,
 )
-from apps.tenants.models import Tenant
+from apps.tenants.models import Tenant, WorkType
+from apps.tenants.work_index import WorkIndexService
 
 
 def _tenant_uuid(schema_name: str) -> uuid.UUID:
@@ -184,6 +197,25 @@ class ProcessOutboxEventTaskTest(TenantEventTestMixin, TenantTestCase):
         self.assertEqual(event.attempts, 1)
         self.assertIn("ValueError", event.last_error)
 
+    @override_settings(OUTBOX_LEASE_SECONDS=600)
+    def test_process_event_lease_outlasts_retry_countdown(self):
+        """Testa que o lease renovado cobre o countdown do retry."""
+
+        @register_event_handler("test.error")
+        def error_handler(event):
+            raise ValueError("Test error")
+
+        event = self._create_event(event_name="test.error", max_attempts=20)
+        event.attempts = 9
+        event.save(update_fields=["attempts"])
+
+        with self.assertRaises(ValueError):
+            process_outbox_event(str(event.id))
+
+        event.refresh_from_db()
+        lease = (event.leased_until - event.last_attempt_at).total_seconds()
+        self.assertEqual(lease, RETRY_BACKOFF_MAX + 600)
+
     def test_process_event_marks_failed_when_no_handler(self):
         """Testa que evento é marcado failed quando não há handler."""
         event = self._create_event(event_name="unknown.event")
@@ -330,6 +362,607 @@ class DispatchPendingEventsTaskTest(TenantEventTestMixin, TenantTestCase):
         self.assertEqual(result["dispatched"], 0)
         mock_delay.assert_not_called()
 
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    def test_dispatch_does_not_requeue_leased_events(self, mock_delay):
+        """Testa que eventos reservados não são reenfileirados no próximo ciclo."""
+        event = self._create_event()
+
+        first = dispatch_pending_events(batch_size=10)
+        second = dispatch_pending_events(batch_size=10)
+
+        self.assertEqual(first["dispatched"], 1)
+        self.assertEqual(second["dispatched"], 0)
+        self.assertEqual(mock_delay.call_count, 1)
+
+        event.refresh_from_db()
+        self.assertTrue(event.is_leased)
+        self.assertEqual(event.lease_owner, "dispatcher")
+
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    def test_dispatch_reclaims_expired_leases(self, mock_delay):
+        """Testa que leases expirados são reivindicados de novo."""
+        event = self._create_event(
+            leased_until=timezone.now() - timedelta(seconds=1),
+            lease_owner="dead-dispatcher",
+        )
+
+        result = dispatch_pending_events(batch_size=10)
+
+        self.assertEqual(result["dispatched"], 1)
+        event.refresh_from_db()
+        self.assertEqual(event.lease_owner, "dispatcher")
+
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    def test_dispatch_releases_lease_when_enqueue_fails(self, mock_delay):
+        """Testa que falha ao enfileirar libera o lease para o próximo ciclo."""
+        mock_delay.side_effect = ConnectionError("broker down")
+        event = self._create_event()
+
+        result = dispatch_pending_events(batch_size=10)
+
+        self.assertEqual(result["dispatched"], 0)
+        event.refresh_from_db()
+        self.assertIsNone(event.leased_until)
+
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    def test_dispatch_skips_idle_tenants(self, mock_delay):
+        """Testa que tenants sem eventos no TenantWorkIndex não são visitados."""
+        tenant_b = self._create_tenant("tenant-idle")
+        WorkIndexService.record(tenant_b.schema_name, WorkType.OUTBOX, 0)
+        # Criado sem commit: o índice de tenant_b continua zerado
+        self._create_event_in_schema(
+            tenant_b.schema_name, _tenant_uuid(tenant_b.schema_name)
+        )
+        self._create_event()
+
+        result = dispatch_pending_events(batch_size=10)
+
+        self.assertEqual(result["dispatched"], 1)
+        self.assertEqual(result["tenants"], 1)
+        self.assertEqual(
+            mock_delay.call_args.kwargs.get("tenant_schema"), self.tenant.schema_name
+        )
+
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    def test_dispatch_records_idle_tenant(self, mock_delay):
+        """Testa que um tenant sem pendências deixa de ser visitado."""
+        first = dispatch_pending_events(batch_size=10)
+        second = dispatch_pending_events(batch_size=10)
+
+        self.assertEqual(first["tenants"], 1)
+        self.assertEqual(second["tenants"], 0)
+
+    def test_processed_event_clears_lease(self):
+        """Testa que processar o evento encerra o lease."""
+        event = self._create_event(
+            leased_until=timezone.now() + timedelta(minutes=5), lease_owner="dispatcher"
+        )
+
+        event.mark_processed(processed_by="worker")
+
+        event.refresh_from_db()
+        self.assertIsNone(event.leased_until)
+        self.assertIsNone(event.lease_owner)
+
+
+class ProcessOutboxBatchTaskTest(TenantEventTestMixin, TenantTestCase):
+    """Testes para a task process_outbox_batch."""
+
+    def setUp(self):
+        """Setup comum para os testes."""
+        super().setUp()
+        self.tenant_id = _tenant_uuid(self.tenant.schema_name)
+        self._original_handlers = _event_handlers.copy()
+        self._original_batch_handlers = _batch_event_handlers.copy()
+        _event_handlers.clear()
+        _batch_event_handlers.clear()
+
+    def tearDown(self):
+        """Restaurar handlers originais."""
+        _event_handlers.clear()
+        _event_handlers.update(self._original_handlers)
+        _batch_event_handlers.clear()
+        _batch_event_handlers.update(self._original_batch_handlers)
+
+    def _create_event(self, event_name="test.batch", **kwargs):
+        """Helper para criar evento."""
+        defaults = {
+            "tenant_id": self.tenant_id,
+            "event_name": event_name,
+            "aggregate_type": "test",
+            "aggregate_id": uuid.uuid4(),
+            "occurred_at": timezone.now(),
+            "payload": {"data": {}},
+            "idempotency_key": str(uuid.uuid4()),
+        }
+        defaults.update(kwargs)
+        return OutboxEvent.objects.create(**defaults)
+
+    def test_batch_calls_batch_handler_once(self):
+        """Testa que o handler de lote recebe todos os eventos numa chamada."""
+        calls = []
+
+        @register_event_handler("test.batch")
+        def handler(event):
+            raise AssertionError("Per-event handler should not be called")
+
+        @register_batch_event_handler("test.batch")
+        def batch_handler(events):
+            calls.append([event.id for event in events])
+            return {}
+
+        events = [self._create_event() for _ in range(3)]
+
+        result = process_outbox_batch([str(event.id) for event in events])
+
+        self.assertEqual(result["processed"], 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(calls[0], [event.id for event in events])
+        self.assertEqual(
+            OutboxEvent.objects.filter(status=OutboxEventStatus.PROCESSED).count(), 3
+        )
+
+    def test_batch_falls_back_to_per_event_handler(self):
+        """Testa que sem handler de lote cada evento usa o handler registrado."""
+        seen = []
+
+        @register_event_handler("test.batch")
+        def handler(event):
+            seen.append(event.id)
+
+        events = [self._create_event() for _ in range(2)]
+
+        result = process_outbox_batch([str(event.id) for event in events])
+
+        self.assertEqual(result["processed"], 2)
+        self.assertCountEqual(seen, [event.id for event in events])
+
+    def test_batch_marks_processed_with_single_update(self):
+        """Testa que os processados são marcados com um único UPDATE."""
+
+        @register_batch_event_handler("test.batch")
+        def batch_handler(events):
+            return {}
+
+        events = [self._create_event() for _ in range(5)]
+        ids = [str(event.id) for event in events]
+
+        with CaptureQueriesContext(connection) as queries:
+            process_outbox_batch(ids)
+
+        updates = [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1)
+
+        for event in events:
+            event.refresh_from_db()
+            self.assertEqual(event.status, OutboxEventStatus.PROCESSED)
+            self.assertIsNotNone(event.processed_at)
+            self.assertIsNone(event.leased_until)
+
+    def test_batch_failure_is_isolated_to_event(self):
+        """Testa que a falha de um evento não afeta os demais do lote."""
+
+        @register_event_handler("test.batch")
+        def handler(event):
+            if event.event_data.get("fail"):
+                raise ValueError("boom")
+
+        ok = self._create_event()
+        bad = self._create_event(payload={"data": {"fail": True}}, max_attempts=5)
+
+        result = process_outbox_batch([str(ok.id), str(bad.id)])
+
+        self.assertEqual(result["processed"], 1)
+        self.assertEqual(result["retrying"], 1)
+
+        ok.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual(ok.status, OutboxEventStatus.PROCESSED)
+        self.assertEqual(bad.status, OutboxEventStatus.PENDING)
+        self.assertEqual(bad.attempts, 1)
+        self.assertIn("ValueError", bad.last_error)
+        # Lease com backoff: o dispatcher só o reivindica depois
+        self.assertTrue(bad.is_leased)
+
+    def test_batch_handler_failures_are_reported_per_event(self):
+        """Testa que falhas devolvidas pelo handler de lote ficam no evento."""
+        ok = self._create_event()
+        bad = self._create_event(max_attempts=1)
+
+        @register_batch_event_handler("test.batch")
+        def batch_handler(events):
+            return {bad.id: ValueError("invalid payload")}
+
+        result = process_outbox_batch([str(ok.id), str(bad.id)])
+
+        self.assertEqual(result["processed"], 1)
+        self.assertEqual(result["failed"], 1)
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, OutboxEventStatus.FAILED)
+        self.assertIsNone(bad.leased_until)
+
+    def test_batch_handler_exception_falls_back_to_per_event(self):
+        """Testa que exceção no handler de lote reprocessa evento a evento."""
+        seen = []
+
+        @register_event_handler("test.batch")
+        def handler(event):
+            seen.append(event.id)
+
+        @register_batch_event_handler("test.batch")
+        def batch_handler(events):
+            raise RuntimeError("batch down")
+
+        events = [self._create_event() for _ in range(2)]
+
+        result = process_outbox_batch([str(event.id) for event in events])
+
+        self.assertEqual(result["processed"], 2)
+        self.assertEqual(len(seen), 2)
+
+    def test_batch_marks_failed_when_no_handler(self):
+        """Testa que eventos sem handler são marcados failed."""
+        event = self._create_event(event_name="unknown.event")
+
+        result = process_outbox_batch([str(event.id)])
+
+        self.assertEqual(result["failed"], 1)
+        event.refresh_from_db()
+        self.assertEqual(event.status, OutboxEventStatus.FAILED)
+        self.assertIn("No handler registered", event.last_error)
+
+    def test_batch_skips_already_processed(self):
+        """Testa que eventos já processados são ignorados."""
+
+        @register_event_handler("test.batch")
+        def handler(event):
+            raise Exception("Should not be called")
+
+        event = self._create_event(status=OutboxEventStatus.PROCESSED)
+
+        result = process_outbox_batch([str(event.id)])
+
+        self.assertEqual(result["processed"], 0)
+
+    def test_batch_claims_events_when_no_ids(self):
+        """Testa que sem event_ids a task reserva até batch_size eventos do tenant."""
+
+        @register_event_handler("test.batch")
+        def handler(event):
+            pass
+
+        for _ in range(3):
+            self._create_event()
+
+        result = process_outbox_batch(
+            tenant_schema=self.tenant.schema_name, batch_size=2
+        )
+
+        self.assertEqual(result["processed"], 2)
+        self.assertEqual(
+            OutboxEvent.objects.filter(status=OutboxEventStatus.PENDING).count(), 1
+        )
+
+    @override_settings(OUTBOX_BATCH_SIZE=2)
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    @patch("apps.core_events.tasks.process_outbox_batch.delay")
+    def test_dispatch_enqueues_batches_per_tenant(self, mock_batch_delay, mock_delay):
+        """Testa que com OUTBOX_BATCH_SIZE o dispatcher enfileira lotes."""
+        for _ in range(5):
+            self._create_event()
+
+        result = dispatch_pending_events(batch_size=10)
+
+        self.assertEqual(result["dispatched"], 5)
+        mock_delay.assert_not_called()
+        self.assertEqual(mock_batch_delay.call_count, 3)
+        self.assertEqual(
+            [len(call.args[0]) for call in mock_batch_delay.call_args_list], [2, 2, 1]
+        )
+        self.assertEqual(
+            mock_batch_delay.call_args.kwargs.get("tenant_schema"),
+            self.tenant.schema_name,
+        )
+
+
+class ProcessOutboxPartitionTaskTest(TenantEventTestMixin, TenantTestCase):
+    """Testes para o consumo ordenado por agregado (process_outbox_partition)."""
+
+    def setUp(self):
+        """Setup comum para os testes."""
+        super().setUp()
+        self.tenant_id = _tenant_uuid(self.tenant.schema_name)
+        self._original_handlers = _event_handlers.copy()
+        _event_handlers.clear()
+
+    def tearDown(self):
+        """Restaurar handlers originais."""
+        _event_handlers.clear()
+        _event_handlers.update(self._original_handlers)
+
+    def _create_event(self, aggregate_id, sequence, **kwargs):
+        """Helper para criar evento de um agregado com created_at crescente."""
+        defaults = {
+            "tenant_id": self.tenant_id,
+            "event_name": "test.ordered",
+            "aggregate_type": "work_order",
+            "aggregate_id": aggregate_id,
+            "occurred_at": timezone.now(),
+            "payload": {"data": {"sequence": sequence}},
+            "idempotency_key": str(uuid.uuid4()),
+        }
+        defaults.update(kwargs)
+        event = OutboxEvent.objects.create(**defaults)
+        created_at = (
+            timezone.now() - timedelta(minutes=10) + timedelta(seconds=sequence)
+        )
+        OutboxEvent.objects.filter(id=event.id).update(created_at=created_at)
+        return event
+
+    def _partition_calls(self, mock_delay):
+        return [
+            [uuid.UUID(event_id) for event_id in call.args[0]]
+            for call in mock_delay.call_args_list
+        ]
+
+    def test_claim_groups_events_by_aggregate_in_order(self):
+        """Testa que eventos de um agregado formam uma partição em ordem de criação."""
+        aggregate_a, aggregate_b = uuid.uuid4(), uuid.uuid4()
+        a1 = self._create_event(aggregate_a, 1)
+        b1 = self._create_event(aggregate_b, 2)
+        a2 = self._create_event(aggregate_a, 3)
+        a3 = self._create_event(aggregate_a, 4)
+
+        partitions = EventClaimer.claim_partitions(owner="dispatcher")
+
+        self.assertEqual(partitions, [[a1.id, a2.id, a3.id], [b1.id]])
+
+    def test_in_flight_aggregate_is_not_claimed(self):
+        """Testa que um agregado com evento sob lease não tem eventos novos reservados."""
+        aggregate_a, aggregate_b = uuid.uuid4(), uuid.uuid4()
+        self._create_event(
+            aggregate_a,
+            1,
+            leased_until=timezone.now() + timedelta(minutes=5),
+            lease_owner="worker",
+        )
+        self._create_event(aggregate_a, 2)
+        b1 = self._create_event(aggregate_b, 3)
+
+        partitions = EventClaimer.claim_partitions(owner="dispatcher")
+
+        self.assertEqual(partitions, [[b1.id]])
+
+    def test_skipped_head_blocks_later_events_of_aggregate(self):
+        """Testa que só a cabeça da sequência pendente do agregado é reservada."""
+        aggregate_a, aggregate_b = uuid.uuid4(), uuid.uuid4()
+        self._create_event(aggregate_a, 1)
+        a2 = self._create_event(aggregate_a, 2)
+        b1 = self._create_event(aggregate_b, 3)
+
+        # a1 ficou fora da seleção (linha travada pulada pelo SKIP LOCKED)
+        selected = OutboxEvent.objects.filter(id__in=[a2.id, b1.id]).order_by(
+            "created_at"
+        )
+        rows = list(
+            selected.values_list("id", "aggregate_type", "aggregate_id", "created_at")
+        )
+
+        heads = EventClaimer._sequence_heads(rows)
+
+        self.assertEqual([row[0] for row in heads], [b1.id])
+
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    @patch("apps.core_events.tasks.process_outbox_partition.delay")
+    def test_dispatch_enqueues_one_task_per_aggregate(
+        self, mock_partition_delay, mock_delay
+    ):
+        """Testa que o dispatcher enfileira uma task por agregado com vários eventos."""
+        aggregate_a, aggregate_b = uuid.uuid4(), uuid.uuid4()
+        a1 = self._create_event(aggregate_a, 1)
+        a2 = self._create_event(aggregate_a, 2)
+        b1 = self._create_event(aggregate_b, 3)
+
+        result = dispatch_pending_events(batch_size=10)
+
+        self.assertEqual(result["dispatched"], 3)
+        self.assertEqual(self._partition_calls(mock_partition_delay), [[a1.id, a2.id]])
+        self.assertEqual(
+            mock_partition_delay.call_args.kwargs.get("tenant_schema"),
+            self.tenant.schema_name,
+        )
+        mock_delay.assert_called_once_with(
+            str(b1.id), tenant_schema=self.tenant.schema_name
+        )
+
+    def test_partition_processes_events_in_order(self):
+        """Testa que a partição executa os handlers na ordem dos eventos."""
+        seen = []
+
+        @register_event_handler("test.ordered")
+        def handler(event):
+            seen.append(event.payload["data"]["sequence"])
+
+        aggregate_id = uuid.uuid4()
+        events = [self._create_event(aggregate_id, sequence) for sequence in (1, 2, 3)]
+
+        result = process_outbox_partition([str(event.id) for event in events])
+
+        self.assertEqual(result["processed"], 3)
+        self.assertEqual(seen, [1, 2, 3])
+
+    def test_partition_failure_defers_later_events(self):
+        """Testa que uma falha com retry libera os eventos seguintes do agregado."""
+        seen = []
+
+        @register_event_handler("test.ordered")
+        def handler(event):
+            sequence = event.payload["data"]["sequence"]
+            if sequence == 2 and not seen.count(2):
+                seen.append(2)
+                raise ValueError("Temporary failure")
+            seen.append(sequence)
+
+        aggregate_id = uuid.uuid4()
+        e1, e2, e3 = [
+            self._create_event(aggregate_id, sequence) for sequence in (1, 2, 3)
+        ]
+
+        result = process_outbox_partition([str(e1.id), str(e2.id), str(e3.id)])
+
+        self.assertEqual(result["processed"], 1)
+        self.assertEqual(result["retrying"], 1)
+        self.assertEqual(result["deferred"], 1)
+        e2.refresh_from_db()
+        e3.refresh_from_db()
+        self.assertEqual(e2.status, OutboxEventStatus.PENDING)
+        self.assertIsNotNone(e2.leased_until)
+        self.assertIsNone(e3.leased_until)
+
+        # O lease do evento que falhou bloqueia o agregado
+        self.assertEqual(EventClaimer.claim_partitions(owner="dispatcher"), [])
+
+        # Expirado o backoff, os eventos voltam juntos e na ordem original
+        OutboxEvent.objects.filter(id=e2.id).update(
+            leased_until=timezone.now() - timedelta(seconds=1)
+        )
+        partitions = EventClaimer.claim_partitions(owner="dispatcher")
+        self.assertEqual(partitions, [[e2.id, e3.id]])
+
+        process_outbox_partition([str(event_id) for event_id in partitions[0]])
+
+        self.assertEqual(seen, [1, 2, 2, 3])
+        self.assertEqual(
+            OutboxEvent.objects.filter(status=OutboxEventStatus.PROCESSED).count(), 3
+        )
+
+    def test_exhausted_event_does_not_block_aggregate(self):
+        """Testa que um evento que esgota as tentativas não bloqueia os seguintes."""
+        seen = []
+
+        @register_event_handler("test.ordered")
+        def handler(event):
+            sequence = event.payload["data"]["sequence"]
+            if sequence == 1:
+                raise ValueError("Permanent failure")
+            seen.append(sequence)
+
+        aggregate_id = uuid.uuid4()
+        e1 = self._create_event(aggregate_id, 1, attempts=4, max_attempts=5)
+        e2 = self._create_event(aggregate_id, 2)
+
+        result = process_outbox_partition([str(e1.id), str(e2.id)])
+
+        self.assertEqual(result["failed"], 1)
+        self.assertEqual(result["processed"], 1)
+        self.assertEqual(seen, [2])
+
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    @patch("apps.core_events.tasks.process_outbox_partition.delay")
+    def test_aggregates_are_claimed_as_independent_partitions(
+        self, mock_partition_delay, mock_delay
+    ):
+        """
+        Testa que 4 agregados com 3 eventos cada viram, numa única varredura,
+        4 tasks de partição com até 3 eventos em ordem de criação.
+        """
+        aggregates = [uuid.uuid4() for _ in range(4)]
+        sequence = 0
+        for _ in range(3):
+            for aggregate_id in aggregates:
+                sequence += 1
+                self._create_event(aggregate_id, sequence)
+
+        result = dispatch_pending_events(batch_size=100)
+
+        partitions = self._partition_calls(mock_partition_delay)
+        self.assertEqual(result["dispatched"], 12)
+        self.assertEqual(len(partitions), 4)
+        self.assertEqual(max(len(partition) for partition in partitions), 3)
+        mock_delay.assert_not_called()
+        for partition in partitions:
+            created = list(
+                OutboxEvent.objects.filter(id__in=partition)
+                .order_by("created_at")
+                .values_list("id", flat=True)
+            )
+            self.assertEqual(partition, created)
+
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    def test_event_published_while_head_in_flight_is_dispatched_without_sweep(
+        self, mock_delay
+    ):
+        """
+        Testa que o evento 2, publicado com o evento 1 em processamento, é
+        despachado pelo listener sem esperar a varredura.
+        """
+
+        @register_event_handler("test.ordered")
+        def handler(event):
+            pass
+
+        schema_name = self.tenant.schema_name
+        aggregate_id = uuid.uuid4()
+        e1 = self._create_event(aggregate_id, 1)
+        dispatch_pending_events(batch_size=10, tenant_schema=schema_name)
+        mock_delay.assert_called_once_with(str(e1.id), tenant_schema=schema_name)
+
+        # e1 sob lease: e2 fica de fora da reserva
+        e2 = self._create_event(aggregate_id, 2)
+        result = dispatch_pending_events(batch_size=10, tenant_schema=schema_name)
+        self.assertEqual(result["dispatched"], 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            process_outbox_event(str(e1.id))
+
+        notifies = [
+            q["sql"] for q in queries.captured_queries if "pg_notify" in q["sql"]
+        ]
+        self.assertEqual(len(notifies), 1)
+        self.assertIn(schema_name, notifies[0])
+
+        # O listener recebe o NOTIFY (no commit) e despacha o schema
+        mock_delay.reset_mock()
+        dispatched = OutboxListener().dispatch_schemas({schema_name})
+
+        self.assertEqual(dispatched, 1)
+        mock_delay.assert_called_once_with(str(e2.id), tenant_schema=schema_name)
+
+    def test_finished_aggregate_is_not_renotified(self):
+        """Testa que não há NOTIFY quando o agregado não tem eventos pendentes."""
+
+        @register_event_handler("test.ordered")
+        def handler(event):
+            pass
+
+        event = self._create_event(uuid.uuid4(), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            process_outbox_event(str(event.id))
+
+        self.assertFalse(any("pg_notify" in q["sql"] for q in queries.captured_queries))
+
+    @override_settings(OUTBOX_ORDERED_DISPATCH=False)
+    @patch("apps.core_events.tasks.process_outbox_event.delay")
+    @patch("apps.core_events.tasks.process_outbox_partition.delay")
+    def test_unordered_dispatch_enqueues_each_event(
+        self, mock_partition_delay, mock_delay
+    ):
+        """Testa que com OUTBOX_ORDERED_DISPATCH=False cada evento segue sozinho."""
+        aggregate_id = uuid.uuid4()
+        for sequence in (1, 2):
+            self._create_event(aggregate_id, sequence)
+
+        result = dispatch_pending_events(batch_size=10)
+
+        self.assertEqual(result["dispatched"], 2)
+        mock_partition_delay.assert_not_called()
+        self.assertEqual(mock_delay.call_count, 2)
+
 
 class RetryFailedEventsTaskTest(TenantTestCase):
     """Testes para a task retry_failed_events."""
@@ -5,3 +5,10 @@ class IngestConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.ingest"
     verbose_name = "Telemetry Ingest"
+
+    def ready(self):
+        """Import signals when app is ready"""
+        try:
+            import apps.ingest.signals  # noqa
+        except ImportError:
+            pass
@@ -0,0 +1,49 @@
+"""
+Decodificação rápida de JSON para o caminho quente do ingest.
+
+Usa orjson quando instalado (parse direto dos bytes, sem decode para str) e
+cai para o json da stdlib caso contrário. ``orjson.JSONDecodeError`` herda de
+``json.JSONDecodeError``, então os chamadores tratam um único tipo de erro.
+"""
+
+import json
+
+try:  # pragma: no cover - depende do ambiente
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data):
+    """
+    Decodifica JSON a partir de bytes/str.
+
+    Com orjson, valores que ele recusa mas a stdlib aceita (NaN, inteiros
+    acima de 64 bits) caem para ``json.loads``, mantendo o comportamento.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    # json.loads aceita bytes (detecta UTF-8/16/32); bytes inválidos geram
+    # UnicodeDecodeError, convertido aqui para JSONDecodeError
+    try:
+        return json.loads(data)
+    except UnicodeDecodeError as e:
+        raise JSONDecodeError(f"Invalid UTF-8: {e.reason}", "", e.start) from e
+
+
+def dumps(obj) -> str:
+    """Serializa para str JSON (orjson quando disponível)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(obj)
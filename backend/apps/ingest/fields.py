@@ -0,0 +1,41 @@
+"""
+Campos customizados do app de ingest.
+"""
+
+from django.db import models
+
+try:
+    from psycopg.types.json import Jsonb
+except ImportError:  # pragma: no cover - psycopg2
+    Jsonb = None
+
+
+def _already_serialized(value):
+    return value
+
+
+class RawJSON(str):
+    """
+    Texto JSON já serializado (ex.: payload SenML recebido como string).
+
+    Atribuído a um ``RawJSONField`` é gravado como está, sem passar de novo
+    por ``json.dumps``.
+    """
+
+    __slots__ = ()
+
+
+class RawJSONField(models.JSONField):
+    """
+    JSONField que aceita ``RawJSON`` e grava o texto original diretamente.
+
+    Leitura e demais valores se comportam exatamente como ``JSONField``.
+    """
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, RawJSON):
+            # O PostgreSQL valida o texto ao converter para jsonb
+            if Jsonb is not None:
+                return Jsonb(str(value), dumps=_already_serialized)
+            return str(value)
+        return super().get_db_prep_value(value, connection, prepared)
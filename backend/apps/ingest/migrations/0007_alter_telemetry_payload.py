@@ -0,0 +1,20 @@
+# Telemetry.payload passa a ser RawJSONField (mesma coluna jsonb, sem mudança no banco)
+
+import apps.ingest.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ingest", "0006_alter_reading_asset_tag_alter_reading_site_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="telemetry",
+            name="payload",
+            field=apps.ingest.fields.RawJSONField(
+                help_text="Original MQTT message payload (parsed JSON)"
+            ),
+        ),
+    ]
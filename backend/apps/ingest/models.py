@@ -1,6 +1,8 @@
 from django.db import models
 from django.utils import timezone
 
+from .fields import RawJSONField
+
 
 class Telemetry(models.Model):
     """
@@ -29,8 +31,9 @@ class Telemetry(models.Model):
         help_text="Full MQTT topic path (e.g., tenants/umc/devices/001/sensors/temp)",
     )
 
-    # Message payload (JSON from MQTT)
-    payload = models.JSONField(help_text="Original MQTT message payload (parsed JSON)")
+    # Message payload (JSON from MQTT). Accepts RawJSON to store the original
+    # text as received, without re-serializing it.
+    payload = RawJSONField(help_text="Original MQTT message payload (parsed JSON)")
 
     # Timestamp from EMQX (Unix milliseconds) - used for TimescaleDB partitioning
     timestamp = models.DateTimeField(
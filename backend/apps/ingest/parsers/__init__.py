@@ -7,8 +7,10 @@ formatos de payload MQTT de diversos fabricantes e modelos de dispositivos.
 
 import importlib
 import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -66,12 +68,63 @@ class PayloadParser(ABC):
         """
         pass
 
+    def try_parse(self, payload: Any, topic: str) -> Optional[Dict[str, Any]]:
+        """
+        Detecta e processa o payload numa única passada.
+
+        Retorna None se o payload não é deste formato. Parsers que precisam
+        decodificar/varrer o payload para decidir devem sobrescrever este
+        método para reaproveitar esse trabalho no parse.
+        """
+        if not self.can_parse(payload, topic):
+            return None
+        return self.parse(payload, topic)
+
+
+# Segmentos do tópico cujo valor seguinte é um identificador (vira "*")
+TOPIC_ID_SEGMENTS = {"tenants", "sites", "assets", "devices", "sensors"}
+
+
+def topic_pattern(topic: str) -> str:
+    """
+    Normaliza o tópico para um padrão sem identificadores.
+
+    tenants/umc/sites/A/assets/CH-1/telemetry -> tenants/*/sites/*/assets/*/telemetry
+    """
+    parts = (topic or "").split("/")
+    for index in range(1, len(parts)):
+        if parts[index - 1] in TOPIC_ID_SEGMENTS:
+            parts[index] = "*"
+    return "/".join(parts)
+
+
+def payload_signature(payload: Any) -> Tuple:
+    """
+    Assinatura barata do "formato" do payload (tipo + chaves de topo).
+
+    Para listas (SenML) usa as chaves do primeiro elemento; para dicts as
+    chaves de topo e, se houver wrapper ``payload``, o tipo do conteúdo.
+    """
+    if isinstance(payload, list):
+        first = payload[0] if payload else None
+        keys = tuple(sorted(first)) if isinstance(first, dict) else ()
+        return ("list", keys)
+    if isinstance(payload, dict):
+        inner = payload.get("payload")
+        return ("dict", tuple(sorted(payload)), type(inner).__name__)
+    return (type(payload).__name__,)
+
 
 class PayloadParserManager:
     """Gerencia os parsers de payload disponíveis."""
 
+    # Máximo de entradas no cache de dispatch (padrão de tópico x formato)
+    DISPATCH_CACHE_SIZE = 1024
+
     def __init__(self):
         self._parsers: List[PayloadParser] = []
+        self._dispatch_cache: "OrderedDict[Tuple, PayloadParser]" = OrderedDict()
+        self._dispatch_lock = threading.Lock()
         self._load_parsers()
 
     def _load_parsers(self):
@@ -139,10 +192,80 @@ class PayloadParserManager:
         logger.warning(f"⚠️ Nenhum parser encontrado para o payload. Topic: {topic}")
         return None
 
+    def _cached_parser(self, key) -> Optional[PayloadParser]:
+        with self._dispatch_lock:
+            parser = self._dispatch_cache.get(key)
+            if parser is not None:
+                self._dispatch_cache.move_to_end(key)
+            return parser
+
+    def _remember_parser(self, key, parser: PayloadParser):
+        with self._dispatch_lock:
+            self._dispatch_cache[key] = parser
+            self._dispatch_cache.move_to_end(key)
+            while len(self._dispatch_cache) > self.DISPATCH_CACHE_SIZE:
+                self._dispatch_cache.popitem(last=False)
+
+    def _forget_parser(self, key):
+        with self._dispatch_lock:
+            self._dispatch_cache.pop(key, None)
+
+    def detect_and_parse(
+        self, payload: Any, topic: str
+    ) -> Optional[Tuple[PayloadParser, Dict[str, Any]]]:
+        """
+        Escolhe o parser e processa o payload numa única passada.
+
+        O parser escolhido é lembrado por (padrão do tópico, formato do
+        payload): mensagens seguintes do mesmo device/tópico vão direto ao
+        parser certo, sem chamar ``can_parse`` dos demais.
+
+        Returns:
+            (parser, dados parseados) ou None se nenhum parser reconhece o payload
+
+        Raises:
+            Exception: erros do ``parse`` do parser reconhecido são propagados
+        """
+        from apps.common.observability.metrics import observe_ingest_parser_dispatch
+
+        key = (topic_pattern(topic), payload_signature(payload))
+
+        parser = self._cached_parser(key)
+        if parser is not None:
+            parsed = parser.try_parse(payload, topic)
+            if parsed is not None:
+                observe_ingest_parser_dispatch("hit", parser.__class__.__name__)
+                return parser, parsed
+            # Mesmo formato aparente, mas o parser não reconhece mais: redetectar
+            self._forget_parser(key)
+
+        # Miss: detecção completa (uma vez por padrão de tópico/formato)
+        for parser in self._parsers:
+            try:
+                matched = parser.can_parse(payload, topic)
+            except Exception as e:
+                logger.error(
+                    f"❌ Erro ao verificar parser {parser.__class__.__name__}: {e}",
+                    exc_info=True,
+                )
+                continue
+
+            if matched:
+                logger.info(f"🎯 Parser selecionado: {parser.__class__.__name__}")
+                self._remember_parser(key, parser)
+                observe_ingest_parser_dispatch("miss", parser.__class__.__name__)
+                return parser, parser.parse(payload, topic)
+
+        observe_ingest_parser_dispatch("miss", "none")
+        logger.warning(f"⚠️ Nenhum parser encontrado para o payload. Topic: {topic}")
+        return None
+
     def reload_parsers(self):
         """Recarrega todos os parsers (útil para adicionar novos em runtime)."""
         logger.info("🔄 Recarregando parsers...")
         self._parsers.clear()
+        with self._dispatch_lock:
+            self._dispatch_cache.clear()
         self._load_parsers()
         logger.info(f"✅ {len(self._parsers)} parser(s) carregado(s)")
 
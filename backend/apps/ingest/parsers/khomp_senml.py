@@ -6,13 +6,13 @@ conforme RFC 8428, usado pelos gateways Khomp.
 """
 
 import datetime
-import json
 import logging
 from typing import Any, Dict, Optional
 
 from django.utils import timezone
 
 from apps.assets.models import Asset, Device, Sensor
+from apps.ingest import decoding
 from apps.ingest.parsers import PayloadParser
 
 logger = logging.getLogger(__name__)
@@ -82,82 +82,95 @@ class KhompSenMLParser(PayloadParser):
         "gateway": "gateway_info",
     }
 
-    def can_parse(self, payload: Dict[str, Any], topic: str) -> bool:
+    def _unwrap(self, payload: Any) -> Any:
         """
-        Verifica se o payload é no formato SenML da Khomp.
+        Extrai a lista SenML do payload (pode vir encapsulado do EMQX).
 
-        Critérios:
-        1. Payload deve ser uma lista (array JSON)
-        2. Primeiro elemento deve ter 'bn' (basename) e 'bt' (basetime)
-        3. Elementos devem ter estrutura SenML (n, v/vs/vb, u opcional)
+        Se o conteúdo interno for string JSON, decodifica uma única vez e
+        grava o resultado de volta no wrapper, para não decodificar de novo.
+
+        Raises:
+            decoding.JSONDecodeError: conteúdo interno não é JSON válido
         """
-        # Se o payload vem encapsulado do EMQX
         if isinstance(payload, dict) and "payload" in payload:
             inner_payload = payload.get("payload")
-
-            # ✨ NOVO: Se o inner_payload é uma string, tenta converter para JSON
             if isinstance(inner_payload, str):
-                try:
-                    inner_payload = json.loads(inner_payload)
-                    # Atualiza o payload original com o JSON parseado
-                    payload["payload"] = inner_payload
-                    logger.info(
-                        f"✅ Payload string convertido para JSON com {len(inner_payload)} elementos"
-                    )
-                except json.JSONDecodeError as e:
-                    logger.warning(f"❌ Erro ao decodificar payload JSON string: {e}")
-                    return False
-        else:
-            inner_payload = payload
-
-        # Verificar se é uma lista
-        if not isinstance(inner_payload, list):
-            return False
+                inner_payload = decoding.loads(inner_payload)
+                payload["payload"] = inner_payload
+                logger.debug(
+                    f"✅ Payload string convertido para JSON com {len(inner_payload)} elementos"
+                )
+            return inner_payload
+        return payload
 
-        if len(inner_payload) < 2:
+    def _is_senml(self, senml_data: Any) -> bool:
+        """
+        Critérios:
+        1. Payload deve ser uma lista (array JSON)
+        2. Primeiro elemento deve ter 'bn' (basename) e 'bt' (basetime)
+        3. Elementos devem ter estrutura SenML (n, v/vs/vb, u opcional)
+        """
+        if not isinstance(senml_data, list) or len(senml_data) < 2:
             return False
 
-        # Verificar primeiro elemento (deve ter bn e bt)
-        first_element = inner_payload[0]
+        first_element = senml_data[0]
         if not isinstance(first_element, dict):
             return False
 
         if "bn" not in first_element or "bt" not in first_element:
             return False
 
-        # Verificar se tem elementos com estrutura SenML
-        for element in inner_payload[1:]:
+        # Deve ter pelo menos um elemento com valor (v, vs, ou vb)
+        for element in senml_data[1:]:
             if isinstance(element, dict) and "n" in element:
-                # Deve ter pelo menos um valor (v, vs, ou vb)
-                if any(k in element for k in ["v", "vs", "vb"]):
-                    logger.info("✅ Payload identificado como formato SenML da Khomp")
+                if "v" in element or "vs" in element or "vb" in element:
                     return True
 
         return False
 
+    def can_parse(self, payload: Dict[str, Any], topic: str) -> bool:
+        """
+        Verifica se o payload é no formato SenML da Khomp.
+        """
+        try:
+            senml_data = self._unwrap(payload)
+        except decoding.JSONDecodeError as e:
+            logger.warning(f"❌ Erro ao decodificar payload JSON string: {e}")
+            return False
+
+        if self._is_senml(senml_data):
+            logger.debug("✅ Payload identificado como formato SenML da Khomp")
+            return True
+        return False
+
+    def try_parse(self, payload: Any, topic: str) -> Optional[Dict[str, Any]]:
+        """
+        Detecta e processa numa única passada (decodifica e varre uma vez).
+        """
+        try:
+            senml_data = self._unwrap(payload)
+        except decoding.JSONDecodeError:
+            return None
+
+        if not self._is_senml(senml_data):
+            return None
+
+        return self._parse_senml(senml_data, topic)
+
     def parse(self, payload: Dict[str, Any], topic: str) -> Dict[str, Any]:
         """
         Processa payload SenML e converte para formato padrão TrakSense.
         """
         # Extrair o payload real (pode vir encapsulado do EMQX)
-        if isinstance(payload, dict) and "payload" in payload:
-            senml_data = payload.get("payload")
-
-            # ✨ NOVO: Se o senml_data é uma string, tenta converter para JSON
-            if isinstance(senml_data, str):
-                try:
-                    senml_data = json.loads(senml_data)
-                    logger.info("✅ Parse: Payload string convertido para JSON")
-                except json.JSONDecodeError as e:
-                    raise ValueError(
-                        f"Erro ao decodificar payload JSON string: {e}"
-                    ) from e
-
-            emqx_wrapper = payload  # noqa: F841
-        else:
-            senml_data = payload
-            emqx_wrapper = None  # noqa: F841
+        try:
+            senml_data = self._unwrap(payload)
+        except decoding.JSONDecodeError as e:
+            raise ValueError(f"Erro ao decodificar payload JSON string: {e}") from e
+
+        return self._parse_senml(senml_data, topic)
 
+    def _parse_senml(self, senml_data: Any, topic: str) -> Dict[str, Any]:
+        """Converte a lista SenML já decodificada para o formato padrão."""
         if not isinstance(senml_data, list) or len(senml_data) < 1:
             raise ValueError("Payload SenML inválido: deve ser uma lista")
 
@@ -260,11 +273,34 @@ class KhompSenMLParser(PayloadParser):
         )
 
         # 🆕 AUTO-REGISTRO: Registrar dispositivo e sensores automaticamente
+        # (pulado quando device/sensores já estão no cache de topologia)
+        self._auto_register_cached(device_id, gateway_id, model, sensors)
+
+        return result
+
+    def _auto_register_cached(self, device_id, gateway_id, model, sensors) -> None:
+        """
+        Executa o auto-registro apenas se device/sensores não estiverem no
+        cache de topologia do tenant (invalidado por apps.assets.signals).
+        """
+        from django.db import connection, transaction
+
+        from apps.ingest.services.topology import topology_cache
+
+        schema_name = connection.schema_name
+        keys = [
+            ("khomp", device_id, sensor_reading.get("sensor_id"))
+            for sensor_reading in sensors
+        ] or [("khomp", device_id, None)]
+
+        if topology_cache.contains_all(schema_name, keys):
+            return
+
         self._auto_register_device(device_id, gateway_id, model)
         for sensor_reading in sensors:
             self._auto_register_sensor(device_id, sensor_reading)
 
-        return result
+        transaction.on_commit(lambda: topology_cache.add_all(schema_name, keys))
 
     def _auto_register_device(
         self, device_id: str, gateway_id: Optional[str], model: Optional[str]
@@ -282,9 +318,17 @@ class KhompSenMLParser(PayloadParser):
             device = Device.objects.filter(mqtt_client_id=device_id).first()
 
             if device:
-                # Atualizar last_seen para dispositivos existentes
-                device.last_seen = timezone.now()
-                device.save(update_fields=["last_seen"])
+                # last_seen de dispositivos existentes: heartbeat write-behind
+                # após o commit (uma falha não aborta a mensagem)
+                from django.db import connection, transaction
+
+                from apps.ingest.services.last_value import record_heartbeats
+
+                schema_name = connection.schema_name
+                seen_at = timezone.now()
+                transaction.on_commit(
+                    lambda: record_heartbeats(schema_name, [device_id], seen_at)
+                )
                 logger.debug(f"🔄 Dispositivo existente atualizado: {device_id}")
             else:
                 # Criar novo dispositivo
@@ -0,0 +1,37 @@
+"""
+Services para o pipeline de ingestão de telemetria.
+"""
+
+from .auth import (
+    authenticate_message,
+    release_replay,
+    resolve_tenant,
+    revoke_device_secret,
+)
+from .persistence import (
+    IngestError,
+    PersistResult,
+    PreparedMessage,
+    ensure_aware_timestamp,
+    insert_readings,
+    persist_batch,
+    persist_isolated,
+    prepare_message,
+    validate_envelope,
+)
+
+__all__ = [
+    "IngestError",
+    "PersistResult",
+    "PreparedMessage",
+    "authenticate_message",
+    "ensure_aware_timestamp",
+    "insert_readings",
+    "persist_batch",
+    "persist_isolated",
+    "prepare_message",
+    "release_replay",
+    "resolve_tenant",
+    "revoke_device_secret",
+    "validate_envelope",
+]
@@ -0,0 +1,189 @@
+"""
+Autenticação de mensagens de ingest (HMAC por device + anti-replay).
+"""
+
+import hashlib
+import hmac
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from django_tenants.utils import get_public_schema_name, schema_context
+
+from .local_cache import LocalTTLCache
+from .persistence import IngestError
+
+logger = logging.getLogger(__name__)
+
+# Tenant por slug e segredo HMAC por (schema, mqtt_client_id). Invalidados por
+# apps.ingest.signals quando Tenant/Device mudam.
+tenant_cache = LocalTTLCache(
+    "tenant_by_slug",
+    maxsize=getattr(settings, "INGEST_TENANT_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "INGEST_AUTH_CACHE_TTL_SECONDS", 300),
+)
+device_secret_cache = LocalTTLCache(
+    "device_secret",
+    maxsize=getattr(settings, "INGEST_DEVICE_SECRET_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "INGEST_AUTH_CACHE_TTL_SECONDS", 300),
+)
+
+
+def resolve_tenant(tenant_slug):
+    """Busca o tenant pelo slug no schema public (com cache em processo)."""
+    tenant = tenant_cache.get(tenant_slug)
+    if tenant is not None:
+        return tenant
+
+    from apps.tenants.models import Tenant
+
+    with schema_context(get_public_schema_name()):
+        tenant = Tenant.objects.filter(slug=tenant_slug).first()
+
+    # Slugs desconhecidos não são cacheados (evita crescer com lixo)
+    if tenant is not None:
+        tenant_cache.set(tenant_slug, tenant)
+    return tenant
+
+
+def get_device_secret(tenant, device_id):
+    """
+    Segredo HMAC do device ativo (ou None), com cache por (schema, device).
+
+    O resultado negativo fica no cache só por INGEST_AUTH_NEGATIVE_CACHE_TTL_SECONDS
+    (absorve rajadas de um device desconhecido sem atrasar o cadastro).
+    """
+
+    def load():
+        from apps.assets.models import Device
+
+        with schema_context(tenant.schema_name):
+            device = (
+                Device.objects.filter(mqtt_client_id=device_id, is_active=True)
+                .only("ingest_secret")
+                .first()
+            )
+        return device.ingest_secret if device else None
+
+    return device_secret_cache.get_or_load(
+        (tenant.schema_name, device_id),
+        load,
+        negative_ttl=getattr(settings, "INGEST_AUTH_NEGATIVE_CACHE_TTL_SECONDS", 5),
+    )
+
+
+def revoke_device_secret(mqtt_client_ids, schema_name=None):
+    """
+    Invalida o segredo cacheado dos devices em todos os processos.
+
+    ``Device.save()`` já invalida via signal; ``QuerySet.update`` e
+    ``bulk_update`` de ``is_active``/``ingest_secret``/``mqtt_client_id`` não
+    disparam signals e devem chamar esta função após o commit, senão o device
+    revogado segue autenticando até o TTL do cache.
+
+    Deve ser chamado dentro do schema do tenant (ou com ``schema_name``).
+    """
+    schema_name = schema_name or connection.schema_name
+    for mqtt_client_id in set(mqtt_client_ids):
+        device_secret_cache.invalidate((schema_name, mqtt_client_id))
+
+
+def authenticate_message(
+    tenant,
+    device_id,
+    raw_body,
+    timestamp_header=None,
+    signature=None,
+    device_token=None,
+):
+    """
+    Valida uma mensagem de ingest usando assinatura HMAC por device + anti-replay.
+
+    A assinatura é HMAC-SHA256(device.ingest_secret, f"{timestamp}.{raw_body}").
+    Quando INGEST_ALLOW_GLOBAL_SECRET=True, aceita o token global legado no
+    lugar da assinatura.
+
+    Args:
+        tenant: Tenant já resolvido
+        device_id: mqtt_client_id do device
+        raw_body: bytes exatamente como assinados pelo emissor
+        timestamp_header: timestamp Unix (segundos ou ms) usado na assinatura
+        signature: assinatura HMAC em hex
+        device_token: token global legado (opcional)
+
+    Returns:
+        str | None: chave anti-replay reservada para a mensagem (None no modo
+        de token global). Se a persistência falhar com erro transitório, o
+        chamador deve liberá-la com ``release_replay`` para aceitar o reenvio.
+
+    Raises:
+        IngestError: 401 para falha de autenticação, 409 para replay
+    """
+    allow_global = getattr(settings, "INGEST_ALLOW_GLOBAL_SECRET", False)
+
+    if not timestamp_header or not signature:
+        if not allow_global:
+            raise IngestError("Missing ingest signature", status_code=401)
+
+        if not device_token:
+            raise IngestError("Missing x-device-token header", status_code=401)
+
+        ingestion_secret = getattr(settings, "INGESTION_SECRET", None)
+        if (
+            ingestion_secret
+            and isinstance(device_token, str)
+            and hmac.compare_digest(device_token, ingestion_secret)
+        ):
+            return None
+
+        raise IngestError("Invalid device token", status_code=401)
+
+    if not isinstance(signature, str):
+        raise IngestError("Invalid ingest signature", status_code=401)
+
+    try:
+        timestamp = int(timestamp_header)
+    except (TypeError, ValueError, OverflowError):
+        raise IngestError("Invalid ingest timestamp", status_code=401) from None
+
+    if abs(timestamp) > 1e12:
+        timestamp = int(timestamp / 1000)
+
+    max_skew = getattr(settings, "INGEST_SIGNATURE_MAX_SKEW_SECONDS", 300)
+    now_ts = int(time.time())
+    if abs(now_ts - timestamp) > max_skew:
+        raise IngestError("Ingest signature expired", status_code=401)
+
+    ingest_secret = get_device_secret(tenant, device_id)
+    if not ingest_secret:
+        raise IngestError("Device not authorized", status_code=401)
+
+    message = f"{timestamp}.".encode("utf-8") + raw_body
+    expected = hmac.new(
+        ingest_secret.encode("utf-8"), message, hashlib.sha256
+    ).hexdigest()
+
+    if not hmac.compare_digest(signature, expected):
+        raise IngestError("Invalid ingest signature", status_code=401)
+
+    replay_ttl = getattr(settings, "INGEST_REPLAY_TTL_SECONDS", max_skew)
+    replay_key = (
+        f"ingest:replay:{tenant.schema_name}:{device_id}:{timestamp}:{signature}"
+    )
+    # cache.add é atômico: de duas entregas simultâneas, só uma reserva a chave
+    if not cache.add(replay_key, True, timeout=replay_ttl):
+        raise IngestError("Replay detected", status_code=409)
+
+    return replay_key
+
+
+def release_replay(replay_key):
+    """
+    Libera a chave anti-replay de uma mensagem que não foi persistida
+    (falha transitória), para que o reenvio do emissor seja aceito.
+    """
+    if replay_key:
+        cache.delete(replay_key)
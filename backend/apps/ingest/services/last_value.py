@@ -0,0 +1,307 @@
+"""
+Write-behind da última leitura de cada sensor (Sensor.last_value / last_reading_at).
+
+O ingest registra a leitura mais recente de cada (device_id, sensor_id) num
+store rápido (Redis, compartilhado entre processos, ou memória do worker) e
+a task ``ingest.flush_last_values`` grava tudo no banco com um único UPDATE
+por tenant (sensores + Device.last_seen/status).
+
+Heartbeats de Device (mensagens sem leitura nova, auto-vínculo, parser Khomp)
+passam pelo mesmo store, com sensor_id vazio: o flush é o único escritor de
+status/last_seen em ``devices``, em qualquer processo.
+
+Assim ``check_sensors_online_status`` enxerga last_reading_at correto sem
+precisar de ``DISTINCT ON`` sobre o hypertable ``reading``.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from typing import Dict, Iterable, Set, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# (device_id, sensor_id) -> (ts_epoch, value)
+LastValues = Dict[Tuple[str, str], Tuple[float, float]]
+
+FIELD_SEPARATOR = "\x1f"
+# sensor_id das entradas que só marcam o device como visto (heartbeat)
+HEARTBEAT_SENSOR_ID = ""
+FLUSH_CHUNK_SIZE = 5000
+
+
+def _latest(entries: Iterable[Tuple[str, str, float, float]]) -> LastValues:
+    """Reduz (device_id, sensor_id, ts_epoch, value) para a leitura mais recente."""
+    latest: LastValues = {}
+    for device_id, sensor_id, ts_epoch, value in entries:
+        key = (device_id, sensor_id)
+        current = latest.get(key)
+        if current is None or current[0] < ts_epoch:
+            latest[key] = (ts_epoch, value)
+    return latest
+
+
+class MemoryLastValueStore:
+    """
+    Store em memória do processo (dev/testes ou deploy de processo único).
+
+    Como a task periódica roda em outro processo, o próprio ingest faz o
+    flush do tenant quando o intervalo expira (ver ``record_readings``).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, LastValues] = {}
+        self._flushed_at: Dict[str, float] = {}
+
+    def record(self, schema_name: str, values: LastValues):
+        with self._lock:
+            bucket = self._data.setdefault(schema_name, {})
+            for key, (ts_epoch, value) in values.items():
+                current = bucket.get(key)
+                if current is None or current[0] < ts_epoch:
+                    bucket[key] = (ts_epoch, value)
+
+    def drain(self, schema_name: str) -> LastValues:
+        with self._lock:
+            self._flushed_at[schema_name] = time.monotonic()
+            return self._data.pop(schema_name, {})
+
+    def dirty_schemas(self) -> Set[str]:
+        with self._lock:
+            return {schema for schema, bucket in self._data.items() if bucket}
+
+    def flush_due(self, schema_name: str, interval: float) -> bool:
+        with self._lock:
+            flushed_at = self._flushed_at.setdefault(schema_name, time.monotonic())
+            return time.monotonic() - flushed_at >= interval
+
+
+class RedisLastValueStore:
+    """
+    Store em Redis: um hash por tenant + um set com os tenants pendentes.
+
+    A gravação mantém só a leitura mais recente (comparação de timestamp no
+    próprio Redis, via Lua) e o drain é atômico (HGETALL + DEL).
+    """
+
+    HASH_KEY = "ingest:last_value:{schema}"
+    DIRTY_KEY = "ingest:last_value:schemas"
+
+    # KEYS[1]=hash, KEYS[2]=dirty set; ARGV[1]=schema, depois (field, ts, value)*
+    RECORD_SCRIPT = """
+    for i = 2, #ARGV, 3 do
+        local current = redis.call('HGET', KEYS[1], ARGV[i])
+        if (not current) or tonumber(string.match(current, '^[^|]+')) < tonumber(ARGV[i + 1]) then
+            redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1] .. '|' .. ARGV[i + 2])
+        end
+    end
+    redis.call('SADD', KEYS[2], ARGV[1])
+    return 1
+    """
+
+    # KEYS[1]=hash, KEYS[2]=dirty set; ARGV[1]=schema
+    DRAIN_SCRIPT = """
+    local data = redis.call('HGETALL', KEYS[1])
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], ARGV[1])
+    return data
+    """
+
+    def __init__(self, redis_url):
+        from redis import Redis
+
+        self._client = Redis.from_url(redis_url)
+        self._record = self._client.register_script(self.RECORD_SCRIPT)
+        self._drain = self._client.register_script(self.DRAIN_SCRIPT)
+
+    def record(self, schema_name: str, values: LastValues):
+        if not values:
+            return
+        args = [schema_name]
+        for (device_id, sensor_id), (ts_epoch, value) in values.items():
+            args.extend(
+                [
+                    f"{device_id}{FIELD_SEPARATOR}{sensor_id}",
+                    repr(ts_epoch),
+                    repr(value),
+                ]
+            )
+        self._record(
+            keys=[self.HASH_KEY.format(schema=schema_name), self.DIRTY_KEY], args=args
+        )
+
+    def drain(self, schema_name: str) -> LastValues:
+        raw = self._drain(
+            keys=[self.HASH_KEY.format(schema=schema_name), self.DIRTY_KEY],
+            args=[schema_name],
+        )
+        values: LastValues = {}
+        for field, packed in zip(raw[0::2], raw[1::2], strict=False):
+            device_id, sensor_id = field.decode("utf-8").split(FIELD_SEPARATOR, 1)
+            ts_epoch, value = packed.decode("utf-8").split("|", 1)
+            values[(device_id, sensor_id)] = (float(ts_epoch), float(value))
+        return values
+
+    def dirty_schemas(self) -> Set[str]:
+        return {
+            schema.decode("utf-8") for schema in self._client.smembers(self.DIRTY_KEY)
+        }
+
+    def flush_due(self, schema_name: str, interval: float) -> bool:
+        # Flush é feito pela task periódica (compartilha o mesmo Redis)
+        return False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_last_value_store():
+    """Retorna o store configurado em INGEST_LAST_VALUE_BACKEND (redis | memory)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = getattr(settings, "INGEST_LAST_VALUE_BACKEND", "redis")
+                if backend == "memory":
+                    _store = MemoryLastValueStore()
+                else:
+                    _store = RedisLastValueStore(settings.REDIS_URL)
+    return _store
+
+
+def record_readings(schema_name: str, readings) -> None:
+    """
+    Registra a última leitura de cada sensor de uma lista de Reading.
+
+    Falhas do store não podem derrubar o ingest (as leituras já estão no
+    hypertable); apenas o cache de última leitura fica defasado.
+    """
+    values = _latest(
+        (reading.device_id, reading.sensor_id, reading.ts.timestamp(), reading.value)
+        for reading in readings
+    )
+    _record(schema_name, values)
+
+
+def record_heartbeats(schema_name: str, device_ids, seen_at: datetime) -> None:
+    """
+    Registra heartbeat (status ONLINE + last_seen) dos devices no store.
+
+    Usado em ``transaction.on_commit``: uma falha aqui não pode fazer o
+    chamador achar que a mensagem (já commitada) não foi gravada.
+    """
+    ts_epoch = seen_at.timestamp()
+    values = {
+        (device_id, HEARTBEAT_SENSOR_ID): (ts_epoch, 0.0) for device_id in device_ids
+    }
+    _record(schema_name, values)
+
+
+def _record(schema_name: str, values: LastValues) -> None:
+    if not values:
+        return
+
+    try:
+        store = get_last_value_store()
+        store.record(schema_name, values)
+
+        interval = getattr(settings, "INGEST_LAST_VALUE_FLUSH_SECONDS", 15)
+        if store.flush_due(schema_name, interval):
+            flush_last_values_for_schema(schema_name)
+    except Exception as exc:
+        logger.warning(f"⚠️ Falha ao registrar última leitura no store: {exc}")
+
+
+def flush_last_values_for_schema(schema_name: str) -> Dict[str, int]:
+    """
+    Grava as últimas leituras pendentes do tenant no banco.
+
+    Deve ser chamado dentro do schema do tenant. Um único UPDATE (CTE)
+    atualiza Sensor.last_value/last_reading_at/is_online e Device.last_seen
+    (e status ONLINE), ignorando leituras mais antigas que as já gravadas.
+    Heartbeats (sensor_id vazio) só contam para o Device.
+
+    Se a gravação falhar, os valores voltam para o store.
+    """
+    store = get_last_value_store()
+    values = store.drain(schema_name)
+    stats = {"sensors": 0, "devices": 0, "pending": len(values)}
+    if not values:
+        return stats
+
+    rows = list(values.items())
+    try:
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), FLUSH_CHUNK_SIZE):
+                chunk = rows[start : start + FLUSH_CHUNK_SIZE]
+                params = []
+                for (device_id, sensor_id), (ts_epoch, value) in chunk:
+                    params.extend(
+                        [
+                            device_id,
+                            sensor_id,
+                            value,
+                            datetime.fromtimestamp(ts_epoch, tz=dt_timezone.utc),
+                        ]
+                    )
+                placeholders = ", ".join(
+                    ["(%s, %s, %s::double precision, %s::timestamptz)"] * len(chunk)
+                )
+                cursor.execute(
+                    f"""
+                    WITH v (device_id, tag, value, ts) AS (VALUES {placeholders}),
+                    latest AS (
+                        SELECT d.id AS device_pk, v.tag, v.value, v.ts
+                        FROM v JOIN devices d ON d.mqtt_client_id = v.device_id
+                    ),
+                    sensors_updated AS (
+                        UPDATE sensors s
+                        SET last_value = latest.value,
+                            last_reading_at = latest.ts,
+                            is_online = TRUE,
+                            updated_at = now()
+                        FROM latest
+                        WHERE latest.tag <> ''
+                          AND s.device_id = latest.device_pk
+                          AND s.tag = latest.tag
+                          AND (s.last_reading_at IS NULL OR s.last_reading_at <= latest.ts)
+                        RETURNING 1
+                    ),
+                    devices_updated AS (
+                        UPDATE devices d
+                        SET last_seen = GREATEST(COALESCE(d.last_seen, m.ts), m.ts),
+                            status = CASE
+                                WHEN d.last_seen IS NULL OR d.last_seen <= m.ts
+                                THEN 'ONLINE' ELSE d.status
+                            END
+                        FROM (
+                            SELECT device_pk, MAX(ts) AS ts FROM latest GROUP BY device_pk
+                        ) m
+                        WHERE d.id = m.device_pk
+                        RETURNING 1
+                    )
+                    SELECT
+                        (SELECT COUNT(*) FROM sensors_updated),
+                        (SELECT COUNT(*) FROM devices_updated)
+                    """,
+                    params,
+                )
+                sensors_updated, devices_updated = cursor.fetchone()
+                stats["sensors"] += sensors_updated
+                stats["devices"] += devices_updated
+    except Exception:
+        store.record(schema_name, values)
+        raise
+
+    logger.info(
+        f"💾 Última leitura gravada ({schema_name}): "
+        f"{stats['sensors']} sensores, {stats['devices']} devices"
+    )
+    return stats
@@ -0,0 +1,141 @@
+"""
+LRU com TTL em memória do processo, com invalidação propagada entre processos.
+
+Usado no caminho quente do ingest (tenant por slug, segredo HMAC por device)
+para não tocar no banco a cada mensagem.
+
+A invalidação local é imediata; os demais processos percebem a mudança
+porque cada invalidação incrementa uma versão no cache do Django, verificada
+no máximo a cada ``version_check_interval`` segundos. A chave invalidada fica
+registrada junto com a versão, então os outros processos descartam só ela;
+o cache inteiro só é descartado numa invalidação total ou quando o registro
+não está mais disponível (processo muito atrasado, cache expirado).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+_MISSING = object()
+
+# Quantas invalidações um processo atrasado tenta aplicar chave a chave antes
+# de desistir e descartar tudo
+INVALIDATION_LOG_SIZE = 256
+INVALIDATION_LOG_TTL = 3600
+
+
+class LocalTTLCache:
+    def __init__(self, name, maxsize=1024, ttl=60, version_check_interval=5):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+        self._checked_at = 0.0
+
+    @property
+    def version_key(self):
+        return f"ingest:local_cache:{self.name}:version"
+
+    def _log_key(self, version):
+        return f"{self.version_key}:{version}"
+
+    def _sync_version(self, now):
+        if (
+            self._version is not None
+            and now - self._checked_at < self.version_check_interval
+        ):
+            return
+        version = cache.get(self.version_key, 0)
+        if version != self._version:
+            self._apply_invalidations(self._version, version)
+            self._version = version
+        self._checked_at = now
+
+    def _apply_invalidations(self, current, version):
+        """Aplica as invalidações entre ``current`` e ``version``."""
+        if current is None or not 0 < version - current <= INVALIDATION_LOG_SIZE:
+            self._entries.clear()
+            return
+
+        log_keys = [self._log_key(v) for v in range(current + 1, version + 1)]
+        logged = cache.get_many(log_keys)
+        for log_key in log_keys:
+            entry = logged.get(log_key)
+            if entry is None or entry["key"] is None:
+                self._entries.clear()
+                return
+            self._entries.pop(entry["key"], None)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version(now)
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at < now:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def contains(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            self._sync_version(now)
+            self._entries[key] = (value, now + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader, negative_ttl=None):
+        """
+        Retorna o valor cacheado ou carrega com ``loader``.
+
+        ``negative_ttl`` (segundos) limita quanto tempo um resultado ``None``
+        fica no cache; ``0`` não cacheia resultados negativos.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None or negative_ttl is None:
+                self.set(key, value)
+            elif negative_ttl > 0:
+                self.set(key, value, ttl=negative_ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Remove uma chave (ou tudo) localmente e sinaliza os demais processos.
+
+        A chave fica registrada na nova versão para que os outros processos
+        descartem só ela na próxima verificação de versão.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+        try:
+            version = cache.incr(self.version_key)
+        except ValueError:
+            # Chave ainda não existe no cache
+            version = 1
+            cache.set(self.version_key, version, timeout=None)
+        cache.set(self._log_key(version), {"key": key}, timeout=INVALIDATION_LOG_TTL)
+
+        with self._lock:
+            # Já em dia com a própria invalidação; se outro processo invalidou
+            # no meio, a próxima verificação aplica as duas
+            if self._version == version - 1:
+                self._version = version
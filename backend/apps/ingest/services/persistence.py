@@ -0,0 +1,646 @@
+"""
+Pipeline compartilhado de ingestão: validação do envelope EMQX, parse do
+payload e persistência de Telemetry/Reading.
+
+IngestView (uma mensagem por request) e BatchIngestView (várias mensagens por
+request, agrupadas por tenant) usam as mesmas funções daqui, de forma que o
+comportamento de parse e persistência é idêntico nos dois caminhos.
+
+Todas as funções que acessam o banco devem ser chamadas já dentro do schema
+do tenant (connection.set_tenant / schema_context).
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone as dj_timezone
+
+import pytz
+
+from apps.ingest import decoding
+from apps.ingest.fields import RawJSON
+from apps.ingest.models import Reading, Telemetry
+from apps.ingest.parsers import parser_manager
+
+from .last_value import record_heartbeats, record_readings
+from .retention import should_store_raw, store_parse_failure
+from .topology import extract_site_and_asset_from_topic, link_topology_cached
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SITE_TIMEZONE = "America/Sao_Paulo"
+
+
+class IngestError(Exception):
+    """
+    Erro de validação/processamento de uma mensagem de ingest.
+
+    Carrega o status HTTP e o corpo de erro que o endpoint deve devolver,
+    para que o caminho unitário e o caminho em lote respondam igual.
+    """
+
+    def __init__(self, error: str, status_code: int = 400, **extra):
+        super().__init__(error)
+        self.error = error
+        self.status_code = status_code
+        self.extra = extra
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"error": self.error, **self.extra}
+
+    @property
+    def retryable(self) -> bool:
+        """Erros 5xx são transitórios; 4xx indicam mensagem inválida."""
+        return self.status_code >= 500
+
+
+@dataclass
+class PreparedMessage:
+    """Mensagem validada e parseada, pronta para persistência."""
+
+    device_id: str
+    topic: str
+    payload: Any
+    ingest_timestamp: datetime
+    parsed_data: Dict[str, Any]
+    site_name: Optional[str] = None
+    asset_tag: Optional[str] = None
+    tenant_name: Optional[str] = None
+    readings: List[Reading] = field(default_factory=list)
+    # Texto JSON original quando o payload chegou como string. Payloads que
+    # chegam já decodificados (objeto dentro do envelope, lote, fila) não
+    # têm os bytes originais: são serializados uma vez com orjson
+    raw_payload: Optional[str] = None
+    # Política de retenção do tenant (ver services.retention)
+    store_raw: bool = True
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return self.parsed_data.get("metadata", {}) or {}
+
+    @property
+    def telemetry_payload(self):
+        """
+        Valor gravado em Telemetry.payload: o texto original quando existe,
+        senão o payload serializado com ``decoding.dumps`` (orjson preserva a
+        ordem das chaves). Em ambos os casos o JSONField não chama json.dumps;
+        como a coluna é jsonb, o valor gravado é o mesmo.
+        """
+        if self.raw_payload is not None:
+            return RawJSON(self.raw_payload)
+        return RawJSON(decoding.dumps(self.payload))
+
+
+@dataclass
+class PersistResult:
+    """Resultado da persistência de uma mensagem."""
+
+    telemetry_id: Optional[int]
+    device_id: str
+    timestamp: datetime
+    readings_attempted: int
+    readings_inserted: int = 0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duplicates_skipped(self) -> int:
+        return self.readings_attempted - self.readings_inserted
+
+    def as_response(self) -> Dict[str, Any]:
+        response_data = {
+            "status": "accepted",
+            "id": self.telemetry_id,
+            "device_id": self.device_id,
+            "timestamp": self.timestamp.isoformat(),
+            "sensors_saved": self.readings_inserted,
+            "duplicates_skipped": self.duplicates_skipped,
+            "format": self.metadata.get("format", "unknown"),
+        }
+        if self.metadata.get("gateway_id"):
+            response_data["gateway_id"] = self.metadata["gateway_id"]
+        if self.metadata.get("model"):
+            response_data["model"] = self.metadata["model"]
+        return response_data
+
+
+def ensure_aware_timestamp(value, fallback):
+    """Converte timestamps em datetime timezone-aware em UTC."""
+    if value is None:
+        return fallback
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            logger.warning(f"⚠️ Timestamp inválido recebido: {value}")
+            return fallback
+    if isinstance(value, (int, float)):
+        try:
+            # Assume valor em segundos; se vier em milissegundos, converter
+            if abs(value) > 1e12:
+                value = value / 1000.0
+            value = datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        except (ValueError, OSError, OverflowError) as exc:
+            logger.warning(f"⚠️ Falha ao converter timestamp numérico {value}: {exc}")
+            return fallback
+    if isinstance(value, datetime):
+        if dj_timezone.is_naive(value):
+            # Força timezone UTC diretamente, sem usar make_aware do Django
+            return value.replace(tzinfo=dt_timezone.utc)
+        # Se já é timezone-aware, garante que está em UTC
+        if value.tzinfo != dt_timezone.utc:
+            return value.astimezone(dt_timezone.utc)
+        return value
+    return fallback
+
+
+def validate_envelope(data, tenant_slug):
+    """
+    Valida o envelope EMQX antes de qualquer acesso ao banco.
+
+    🔒 SECURITY: o tenant do tópico deve bater com o tenant declarado
+    (header x-tenant ou grupo do lote), evitando enumeração entre tenants.
+
+    Returns:
+        tuple: (topic, client_id)
+
+    Raises:
+        IngestError: se o envelope for inválido
+    """
+    if not isinstance(data, dict):
+        logger.warning(f"Invalid payload type: {type(data)}")
+        raise IngestError("Payload must be JSON object")
+
+    topic = data.get("topic")
+    if not topic:
+        logger.warning("Missing required field: topic")
+        raise IngestError("Missing required field: topic")
+
+    # Topic format: tenants/{slug}/sites/{site}/assets/{tag}/telemetry
+    topic_parts = topic.split("/")
+    if len(topic_parts) < 2 or topic_parts[0] != "tenants":
+        logger.warning(f"Invalid topic format: {topic}")
+        raise IngestError("Invalid topic format")
+
+    topic_tenant_slug = topic_parts[1]
+    if topic_tenant_slug != tenant_slug:
+        logger.error(
+            f"🚨 SECURITY VIOLATION: Tenant mismatch! "
+            f"Header: {tenant_slug}, Topic: {topic_tenant_slug}, "
+            f"Client: {data.get('client_id')}, Full Topic: {topic}"
+        )
+        raise IngestError("Tenant validation failed", status_code=403)
+
+    device_id = data.get("client_id")
+    if not device_id:
+        logger.warning("Missing required field: client_id")
+        raise IngestError("Missing required field: client_id")
+
+    return topic, device_id
+
+
+def resolve_site_timezone(tenant_slug, site_name):
+    """
+    Obtém o timezone do Site com CACHE (evita query em cada mensagem).
+
+    O cache é invalidado por apps.assets.signals quando o Site muda.
+    """
+    cache_key = f"site_timezone:{tenant_slug}:{site_name}"
+    site_timezone_str = cache.get(cache_key)
+
+    if site_timezone_str:
+        logger.debug(f"✅ Timezone do Site '{site_name}' do cache: {site_timezone_str}")
+        return site_timezone_str
+
+    # Cache miss - consultar banco de dados
+    from apps.assets.models import Site
+
+    try:
+        site = Site.objects.filter(name=site_name).first()
+        if site and site.timezone:
+            site_timezone_str = site.timezone
+            # Cache por 24 horas (86400 segundos)
+            # Será invalidado apenas se Site for atualizado
+            cache.set(cache_key, site_timezone_str, 86400)
+            logger.info(
+                f"📍 Timezone do Site '{site_name}' cacheado: {site_timezone_str}"
+            )
+        else:
+            site_timezone_str = DEFAULT_SITE_TIMEZONE
+            cache.set(cache_key, site_timezone_str, 86400)
+            logger.warning(
+                f"⚠️ Site '{site_name}' não encontrado, usando timezone padrão: {site_timezone_str}"
+            )
+    except Exception as e:
+        logger.error(f"❌ Erro ao buscar Site '{site_name}': {e}")
+        site_timezone_str = DEFAULT_SITE_TIMEZONE
+        cache.set(
+            cache_key, site_timezone_str, 3600
+        )  # Cache por 1 hora em caso de erro
+
+    return site_timezone_str
+
+
+def _extract_tenant_from_topic(topic):
+    """Extrai o tenant do tópico (tenants/{tenant}/...)."""
+    topic_parts = topic.split("/")
+    if "tenants" in topic_parts:
+        tenant_idx = topic_parts.index("tenants")
+        if tenant_idx + 1 < len(topic_parts):
+            return topic_parts[tenant_idx + 1]
+    return None
+
+
+def prepare_message(data, tenant_slug) -> PreparedMessage:
+    """
+    Resolve timestamp, escolhe o parser e normaliza uma mensagem EMQX.
+
+    Deve ser chamado dentro do schema do tenant (o parser Khomp e o
+    lookup de timezone do Site acessam o banco).
+
+    Raises:
+        IngestError: payload ausente, formato não reconhecido ou erro de parse
+    """
+    topic = data.get("topic")
+    payload = data.get("payload")
+    ts = data.get("ts")  # Timestamp do EMQX (fallback)
+
+    if not payload:
+        logger.warning("Missing required field: payload")
+        raise IngestError("Missing required field: payload")
+
+    # 🌍 bt é Unix timestamp UTC; o timezone do Site só é usado quando
+    # nenhum timestamp foi enviado
+    ingest_timestamp = None
+    site_timezone_str = DEFAULT_SITE_TIMEZONE
+
+    # Formato: tenants/{tenant}/sites/{site_name}/assets/{asset_tag}/telemetry
+    topic_parts = topic.split("/")
+    if len(topic_parts) >= 4 and topic_parts[2] == "sites":
+        site_timezone_str = resolve_site_timezone(tenant_slug, topic_parts[3])
+
+    # Payload pode vir como string JSON (SenML encapsulado pelo EMQX).
+    # Decodificado uma única vez aqui; o texto original é o que vai para
+    # Telemetry.payload
+    raw_payload = None
+    if isinstance(payload, str):
+        raw_payload = payload
+        try:
+            payload = decoding.loads(payload)
+        except decoding.JSONDecodeError as e:
+            logger.warning(f"Failed to parse payload JSON: {e}")
+            store_parse_failure(tenant_slug, data, "Invalid JSON in payload")
+            raise IngestError("Invalid JSON in payload") from e
+
+    # Extrair bt do payload SenML
+    try:
+        if isinstance(payload, list) and len(payload) > 0:
+            base_element = payload[0]
+            if isinstance(base_element, dict):
+                senml_bt = base_element.get("bt")
+                if senml_bt:
+                    # Com USE_TZ=True, Django sempre normaliza para UTC no banco
+                    ingest_timestamp = datetime.fromtimestamp(
+                        senml_bt, tz=dt_timezone.utc
+                    )
+                    logger.info(
+                        f"⏰ TIMESTAMP - Unix={senml_bt}s, "
+                        f"✅ Armazenando: {ingest_timestamp.strftime('%d/%m/%Y %H:%M:%S %Z')}"
+                    )
+    except Exception as e:
+        logger.warning(f"Erro ao extrair bt do SenML: {e}")
+
+    # Fallback para ts do EMQX se não conseguiu extrair bt
+    if not ingest_timestamp and ts:
+        try:
+            ingest_timestamp = datetime.fromtimestamp(ts / 1000.0, tz=dt_timezone.utc)
+            logger.warning(
+                f"⚠️ USANDO TIMESTAMP DO EMQX (fallback) - "
+                f"ts_original={ts}ms, "
+                f"UTC={ingest_timestamp.strftime('%d/%m/%Y %H:%M:%S')}"
+            )
+        except (ValueError, TypeError, OSError, OverflowError) as e:
+            logger.warning(f"Invalid EMQX timestamp: {ts} - {e}")
+
+    # Se não tem nenhum timestamp, usar timestamp atual no timezone local
+    if not ingest_timestamp:
+        utc_now = datetime.now(tz=dt_timezone.utc)
+        ingest_timestamp = utc_now.astimezone(pytz.timezone(site_timezone_str))
+        logger.warning(
+            f"⚠️ Nenhum timestamp encontrado, usando timestamp atual: "
+            f"{ingest_timestamp.strftime('%d/%m/%Y %H:%M:%S %Z')}"
+        )
+
+    # IMPORTANTE: Passar o payload interno, não o data completo!
+    # detect_and_parse usa o cache de dispatch e decodifica/varre uma vez só
+    try:
+        detected = parser_manager.detect_and_parse(payload, topic)
+    except Exception as e:
+        logger.error(f"❌ Erro ao parsear payload: {e}", exc_info=True)
+        store_parse_failure(tenant_slug, data, f"Erro ao processar payload: {str(e)}")
+        raise IngestError(
+            f"Erro ao processar payload: {str(e)}", status_code=500
+        ) from e
+
+    if not detected:
+        logger.warning(f"⚠️ Nenhum parser encontrado para o payload. Topic: {topic}")
+        if settings.DEBUG:
+            logger.warning(
+                f"⚠️ Parsers disponíveis: {[p.__class__.__name__ for p in parser_manager._parsers]}"
+            )
+        store_parse_failure(tenant_slug, data, "Formato de payload não reconhecido")
+        raise IngestError("Formato de payload não reconhecido")
+
+    parser, parsed_data = detected
+    if settings.DEBUG:
+        logger.info(
+            f"✅ Payload parseado com sucesso usando {parser.__class__.__name__}"
+        )
+
+    parsed_data["timestamp"] = ensure_aware_timestamp(
+        parsed_data.get("timestamp"), ingest_timestamp
+    )
+
+    site_name, asset_tag = extract_site_and_asset_from_topic(topic)
+
+    message = PreparedMessage(
+        device_id=parsed_data["device_id"],
+        topic=topic,
+        payload=payload,
+        ingest_timestamp=ingest_timestamp,
+        parsed_data=parsed_data,
+        site_name=site_name,
+        asset_tag=asset_tag,
+        tenant_name=_extract_tenant_from_topic(topic),
+        raw_payload=raw_payload,
+        store_raw=should_store_raw(tenant_slug),
+    )
+    message.readings = build_readings(message)
+    return message
+
+
+def build_readings(message: PreparedMessage) -> List[Reading]:
+    """Monta as instâncias Reading (não salvas) de uma mensagem parseada."""
+    base_timestamp = message.parsed_data["timestamp"]
+    readings = []
+
+    for sensor in message.parsed_data.get("sensors", []):
+        if not isinstance(sensor, dict):
+            continue
+
+        sensor_id = sensor.get("sensor_id")
+        value = sensor.get("value")
+
+        if not sensor_id or value is None:
+            continue
+
+        labels = sensor.get("labels", {})
+        if not isinstance(labels, dict):
+            labels = {}
+
+        reading_timestamp = ensure_aware_timestamp(
+            sensor.get("timestamp"), base_timestamp
+        )
+
+        readings.append(
+            Reading(
+                device_id=message.device_id,
+                sensor_id=sensor_id,
+                value=float(value),
+                labels=labels,
+                ts=reading_timestamp,
+                # MQTT Topic Hierarchy (source of truth)
+                asset_tag=message.asset_tag,
+                tenant=message.tenant_name,
+                site=message.site_name,
+            )
+        )
+
+    return readings
+
+
+def link_topology(message: PreparedMessage):
+    """Auto-vincula Site/Asset/Device/Sensor a partir do tópico da mensagem."""
+    if not message.asset_tag:
+        logger.warning(
+            f"⚠️ Não foi possível extrair asset_tag do tópico: {message.topic}"
+        )
+        return None
+
+    return link_topology_cached(
+        site_name=message.site_name,
+        asset_tag=message.asset_tag,
+        device_id=message.device_id,
+        parsed_data=message.parsed_data,
+    )
+
+
+READING_INSERT_CHUNK_SIZE = 1000
+
+_READING_INSERT_COLUMNS = (
+    "device_id",
+    "sensor_id",
+    "asset_tag",
+    "tenant",
+    "site",
+    "value",
+    "labels",
+    "ts",
+    "created_at",
+)
+
+
+def insert_readings(readings: List[Reading]) -> Set[Tuple[str, str, datetime]]:
+    """
+    Insere leituras com ``INSERT ... ON CONFLICT DO NOTHING RETURNING``.
+
+    Substitui ``bulk_create(ignore_conflicts=True)`` + COUNT antes/depois:
+    o próprio INSERT devolve as chaves efetivamente gravadas, sem varrer
+    o hypertable. Duplicatas (unique_reading_per_sensor_timestamp) continuam
+    sendo ignoradas silenciosamente.
+
+    Returns:
+        Conjunto de chaves (device_id, sensor_id, ts) inseridas
+    """
+    inserted = set()
+    if not readings:
+        return inserted
+
+    table = connection.ops.quote_name(Reading._meta.db_table)
+    columns = ", ".join(
+        connection.ops.quote_name(column) for column in _READING_INSERT_COLUMNS
+    )
+    row_placeholder = "(%s, %s, %s, %s, %s, %s, %s::jsonb, %s, %s)"
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(readings), READING_INSERT_CHUNK_SIZE):
+            chunk = readings[start : start + READING_INSERT_CHUNK_SIZE]
+            params = []
+            for reading in chunk:
+                params.extend(
+                    [
+                        reading.device_id,
+                        reading.sensor_id,
+                        reading.asset_tag,
+                        reading.tenant,
+                        reading.site,
+                        reading.value,
+                        decoding.dumps(reading.labels or {}),
+                        reading.ts,
+                        reading.created_at,
+                    ]
+                )
+
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"VALUES {', '.join([row_placeholder] * len(chunk))} "
+                "ON CONFLICT DO NOTHING "
+                "RETURNING device_id, sensor_id, ts",
+                params,
+            )
+            inserted.update(
+                (device_id, sensor_id, ts)
+                for device_id, sensor_id, ts in cursor.fetchall()
+            )
+
+    return inserted
+
+
+def _count_inserted(message: PreparedMessage, inserted: Set[Tuple[str, str, datetime]]):
+    """Conta quantas leituras da mensagem foram gravadas (consumindo as chaves)."""
+    count = 0
+    for reading in message.readings:
+        key = (reading.device_id, reading.sensor_id, reading.ts)
+        if key in inserted:
+            # Remove para que a mesma chave repetida em outra mensagem do lote
+            # seja contada como duplicata, como o banco fez
+            inserted.discard(key)
+            count += 1
+    return count
+
+
+def _evaluate_alerts(schema_name: str, readings: List[Reading]) -> None:
+    # Import tardio: apps.alerts.services.streaming importa services.local_cache
+    from apps.alerts.services.streaming import on_readings_persisted
+
+    on_readings_persisted(schema_name, readings)
+
+
+def persist_batch(messages: List[PreparedMessage]) -> List[PersistResult]:
+    """
+    Persiste várias mensagens de um mesmo tenant em uma única transação.
+
+    - Telemetry: um único bulk INSERT (mensagens retidas pela política do tenant)
+    - Reading: INSERT ... ON CONFLICT DO NOTHING RETURNING (ver insert_readings)
+    - Device: status/last_seen via heartbeat no store write-behind após o commit
+    - Sensor: última leitura enviada ao store write-behind após o commit
+
+    Se a transação falhar, nenhuma mensagem do lote é gravada; o chamador
+    decide se reprocessa individualmente.
+    """
+    if not messages:
+        return []
+
+    with transaction.atomic():
+        # Telemetry bruta só para as mensagens retidas (ver services.retention)
+        stored = [message for message in messages if message.store_raw]
+        telemetry_rows = Telemetry.objects.bulk_create(
+            [
+                Telemetry(
+                    device_id=message.device_id,
+                    topic=message.topic,
+                    payload=message.telemetry_payload,
+                    timestamp=message.ingest_timestamp,
+                )
+                for message in stored
+            ]
+        )
+        telemetry_by_message = {
+            id(message): telemetry
+            for message, telemetry in zip(stored, telemetry_rows, strict=False)
+        }
+
+        for message in messages:
+            link_topology(message)
+
+        readings = [reading for message in messages for reading in message.readings]
+        # 🔒 ON CONFLICT DO NOTHING: duplicatas (device_id, sensor_id, ts) são
+        # ignoradas em vez de abortar o lote inteiro
+        inserted = insert_readings(readings)
+        inserted_counts = [_count_inserted(message, inserted) for message in messages]
+
+        # Sensor.last_value/last_reading_at: write-behind (ver services.last_value)
+        schema_name = connection.schema_name
+        transaction.on_commit(lambda: record_readings(schema_name, readings))
+
+        # Avaliação de alertas em streaming (ALERTS_STREAMING_EVALUATION)
+        transaction.on_commit(lambda: _evaluate_alerts(schema_name, readings))
+
+        # Status ONLINE/last_seen: mesmo write-behind (ver services.last_value)
+        device_ids = {message.device_id for message in messages if message.readings}
+        if device_ids:
+            seen_at = dj_timezone.now()
+            transaction.on_commit(
+                lambda: record_heartbeats(schema_name, device_ids, seen_at)
+            )
+
+    readings_created = sum(inserted_counts)
+    logger.info(
+        f"💾 Lote persistido: {len(telemetry_rows)} telemetry, "
+        f"{readings_created} readings inseridos, "
+        f"{len(readings) - readings_created} duplicados ignorados, "
+        f"{len(device_ids)} devices"
+    )
+
+    results = []
+    for message, readings_inserted in zip(messages, inserted_counts, strict=False):
+        telemetry = telemetry_by_message.get(id(message))
+        results.append(
+            PersistResult(
+                telemetry_id=telemetry.id if telemetry else None,
+                device_id=message.device_id,
+                timestamp=message.ingest_timestamp,
+                readings_attempted=len(message.readings),
+                readings_inserted=readings_inserted,
+                metadata=message.metadata,
+            )
+        )
+    return results
+
+
+def persist_isolated(messages: List[PreparedMessage]) -> List[Any]:
+    """
+    Persiste um lote e, se a transação do lote falhar, regrava mensagem a
+    mensagem para isolar a(s) mensagem(ns) problemática(s).
+
+    Returns:
+        Lista alinhada com ``messages`` contendo PersistResult ou IngestError
+        (retryable) para cada mensagem.
+    """
+    try:
+        return persist_batch(messages)
+    except Exception as exc:
+        if len(messages) == 1:
+            logger.error(f"Failed to save telemetry: {exc}", exc_info=True)
+            return [IngestError("Failed to save telemetry", status_code=500)]
+        logger.warning(
+            f"⚠️ Falha ao persistir lote de {len(messages)} mensagens, "
+            f"reprocessando individualmente: {exc}"
+        )
+
+    outcomes = []
+    for message in messages:
+        try:
+            outcomes.extend(persist_batch([message]))
+        except Exception as exc:
+            logger.error(
+                f"Failed to save telemetry for device {message.device_id}: {exc}",
+                exc_info=True,
+            )
+            outcomes.append(IngestError("Failed to save telemetry", status_code=500))
+    return outcomes
@@ -0,0 +1,375 @@
+"""
+Modo assíncrono do ingest: aceitar na request, persistir no consumidor.
+
+Com ``INGEST_QUEUE_MODE=True`` os endpoints de ingest só validam e autenticam
+a mensagem, a enfileiram e respondem 202. Consumidores (task Celery
+``ingest.consume_queue``, que pode rodar em vários workers ao mesmo tempo)
+drenam a fila em micro-lotes usando o mesmo ``prepare_message`` +
+``persist_isolated`` do caminho síncrono.
+
+Backends (``INGEST_QUEUE_BACKEND``):
+- ``redis``: Redis Stream com consumer group (durável; mensagens não
+  confirmadas de um consumidor que caiu são reclamadas via XAUTOCLAIM, e as
+  que passam de ``INGEST_QUEUE_MAX_DELIVERIES`` entregas vão para o stream de
+  dead letter ``ingest:stream:dead``)
+- ``memory``: fila em memória do processo (dev/testes)
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+from django_tenants.utils import schema_context
+
+from apps.common.observability.metrics import (
+    observe_ingest_queue_batch,
+    observe_ingest_queue_dead_letter,
+    observe_ingest_queue_depth,
+    observe_ingest_queue_rejected,
+)
+from apps.ingest import decoding
+
+from .auth import resolve_tenant
+from .persistence import IngestError, persist_isolated, prepare_message
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueFull(Exception):
+    """Fila acima de INGEST_QUEUE_MAX_DEPTH (backpressure)."""
+
+
+@dataclass
+class QueuedMessage:
+    """Mensagem já autenticada aguardando persistência."""
+
+    id: str
+    tenant_slug: str
+    data: Dict[str, Any]
+    received_at: float
+
+
+def queue_mode_enabled() -> bool:
+    return getattr(settings, "INGEST_QUEUE_MODE", False)
+
+
+class MemoryIngestQueue:
+    """Stand-in local da fila (sem durabilidade nem redelivery)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = deque()
+        self._sequence = 0
+
+    def depth(self) -> int:
+        return len(self._items)
+
+    def enqueue(self, tenant_slug: str, data: Dict[str, Any]) -> str:
+        with self._lock:
+            self._sequence += 1
+            message_id = str(self._sequence)
+            self._items.append(
+                QueuedMessage(message_id, tenant_slug, data, time.time())
+            )
+        return message_id
+
+    def read(self, consumer: str, count: int) -> List[QueuedMessage]:
+        with self._lock:
+            batch = []
+            while self._items and len(batch) < count:
+                batch.append(self._items.popleft())
+        return batch
+
+    def ack(self, message_ids: List[str]):
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class RedisIngestQueue:
+    """
+    Redis Stream + consumer group.
+
+    Mensagens confirmadas são removidas do stream (XACK + XDEL), de modo que
+    XLEN é o backlog real (pendentes + não lidas) usado no backpressure.
+    """
+
+    STREAM_KEY = "ingest:stream"
+    DEAD_LETTER_KEY = "ingest:stream:dead"
+    GROUP = "ingest-consumers"
+
+    def __init__(self, redis_url):
+        from redis import Redis
+        from redis.exceptions import ResponseError
+
+        self._client = Redis.from_url(redis_url)
+        try:
+            self._client.xgroup_create(
+                self.STREAM_KEY, self.GROUP, id="0", mkstream=True
+            )
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def depth(self) -> int:
+        return self._client.xlen(self.STREAM_KEY)
+
+    def enqueue(self, tenant_slug: str, data: Dict[str, Any]) -> str:
+        message_id = self._client.xadd(
+            self.STREAM_KEY,
+            {
+                "tenant": tenant_slug,
+                "body": decoding.dumps(data),
+                "received_at": repr(time.time()),
+            },
+        )
+        return message_id.decode("utf-8")
+
+    def read(self, consumer: str, count: int) -> List[QueuedMessage]:
+        claim_idle_ms = int(
+            getattr(settings, "INGEST_QUEUE_CLAIM_IDLE_SECONDS", 60) * 1000
+        )
+        # 1. Reclamar mensagens de consumidores que caíram / falhas transitórias
+        _, entries, *_ = self._client.xautoclaim(
+            self.STREAM_KEY,
+            self.GROUP,
+            consumer,
+            min_idle_time=claim_idle_ms,
+            count=count,
+        )
+        entries = self._drop_exhausted(entries)
+        # 2. Completar o lote com mensagens novas
+        if len(entries) < count:
+            response = self._client.xreadgroup(
+                self.GROUP, consumer, {self.STREAM_KEY: ">"}, count=count - len(entries)
+            )
+            for _stream, stream_entries in response or []:
+                entries.extend(stream_entries)
+
+        messages = []
+        for message_id, fields in entries:
+            if not fields:
+                # Entrada já removida do stream
+                continue
+            try:
+                data = decoding.loads(fields[b"body"])
+            except decoding.JSONDecodeError as exc:
+                self.dead_letter(message_id, fields, f"Invalid body: {exc}")
+                continue
+            messages.append(
+                QueuedMessage(
+                    id=message_id.decode("utf-8"),
+                    tenant_slug=fields[b"tenant"].decode("utf-8"),
+                    data=data,
+                    received_at=float(fields[b"received_at"]),
+                )
+            )
+        return messages
+
+    def _drop_exhausted(self, entries):
+        """
+        Move para o dead letter as mensagens reclamadas que já passaram de
+        INGEST_QUEUE_MAX_DELIVERIES entregas (contador do XPENDING, que o
+        XAUTOCLAIM incrementa), para que uma mensagem que sempre falha não
+        seja reprocessada para sempre.
+        """
+        max_deliveries = getattr(settings, "INGEST_QUEUE_MAX_DELIVERIES", 5)
+        if not entries or not max_deliveries:
+            return entries
+
+        pipe = self._client.pipeline()
+        for message_id, _fields in entries:
+            pipe.xpending_range(
+                self.STREAM_KEY, self.GROUP, min=message_id, max=message_id, count=1
+            )
+        pending = pipe.execute()
+
+        kept = []
+        for (message_id, fields), info in zip(entries, pending, strict=False):
+            deliveries = info[0]["times_delivered"] if info else 0
+            if fields and deliveries > max_deliveries:
+                self.dead_letter(
+                    message_id, fields, f"Exceeded {max_deliveries} deliveries"
+                )
+                continue
+            kept.append((message_id, fields))
+        return kept
+
+    def dead_letter(self, message_id, fields, reason: str):
+        """Copia a mensagem para o stream de dead letter e a confirma."""
+        pipe = self._client.pipeline()
+        pipe.xadd(
+            self.DEAD_LETTER_KEY,
+            {**fields, "source_id": message_id, "reason": reason},
+            maxlen=getattr(settings, "INGEST_QUEUE_DEAD_LETTER_MAXLEN", 100000),
+            approximate=True,
+        )
+        pipe.xack(self.STREAM_KEY, self.GROUP, message_id)
+        pipe.xdel(self.STREAM_KEY, message_id)
+        pipe.execute()
+
+        observe_ingest_queue_dead_letter()
+        logger.error(f"☠️ Mensagem {message_id!r} movida para o dead letter: {reason}")
+
+    def ack(self, message_ids: List[str]):
+        if not message_ids:
+            return
+        pipe = self._client.pipeline()
+        pipe.xack(self.STREAM_KEY, self.GROUP, *message_ids)
+        pipe.xdel(self.STREAM_KEY, *message_ids)
+        pipe.execute()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_ingest_queue():
+    """Retorna a fila configurada em INGEST_QUEUE_BACKEND (redis | memory)."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                backend = getattr(settings, "INGEST_QUEUE_BACKEND", "redis")
+                if backend == "memory":
+                    _queue = MemoryIngestQueue()
+                else:
+                    _queue = RedisIngestQueue(settings.REDIS_URL)
+    return _queue
+
+
+def enqueue_message(tenant_slug: str, data: Dict[str, Any]) -> str:
+    """
+    Enfileira uma mensagem já validada/autenticada.
+
+    Raises:
+        IngestQueueFull: se o backlog passou de INGEST_QUEUE_MAX_DEPTH
+    """
+    queue = get_ingest_queue()
+    depth = queue.depth()
+    observe_ingest_queue_depth(depth)
+
+    max_depth = getattr(settings, "INGEST_QUEUE_MAX_DEPTH", 100000)
+    if depth >= max_depth:
+        observe_ingest_queue_rejected()
+        logger.warning(f"⚠️ Fila de ingest cheia ({depth}/{max_depth}), rejeitando")
+        raise IngestQueueFull()
+
+    return queue.enqueue(tenant_slug, data)
+
+
+def consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _persist_tenant_group(tenant_slug: str, messages: List[QueuedMessage]) -> List[str]:
+    """
+    Persiste as mensagens de um tenant. Retorna os ids que podem ser confirmados.
+
+    Erros de validação/parse (4xx ou parse 5xx determinístico) são descartados
+    com log; apenas falhas de persistência ficam pendentes para nova tentativa.
+    Uma falha inesperada do parser fica restrita à mensagem: ela não é
+    confirmada (nova entrega e, após INGEST_QUEUE_MAX_DELIVERIES, dead letter)
+    e o restante do micro-lote segue normalmente.
+    """
+    tenant = resolve_tenant(tenant_slug)
+    if not tenant:
+        logger.error(
+            f"❌ Tenant {tenant_slug} não encontrado, descartando "
+            f"{len(messages)} mensagens da fila"
+        )
+        return [message.id for message in messages]
+
+    ack_ids = []
+    with schema_context(tenant.schema_name):
+        prepared = []
+        for queued in messages:
+            try:
+                prepared.append((queued, prepare_message(queued.data, tenant_slug)))
+            except IngestError as exc:
+                logger.warning(
+                    f"⚠️ Mensagem {queued.id} descartada da fila: {exc.error}"
+                )
+                ack_ids.append(queued.id)
+            except Exception:
+                logger.exception(
+                    f"❌ Erro inesperado ao preparar mensagem {queued.id} da fila "
+                    f"(tenant {tenant_slug})"
+                )
+
+        outcomes = persist_isolated([message for _, message in prepared])
+
+    for (queued, _message), outcome in zip(prepared, outcomes, strict=False):
+        if isinstance(outcome, IngestError) and outcome.retryable:
+            continue
+        ack_ids.append(queued.id)
+
+    return ack_ids
+
+
+def drain_queue(
+    consumer: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    time_budget: Optional[float] = None,
+) -> Dict[str, int]:
+    """
+    Drena a fila em micro-lotes até esvaziar ou estourar o orçamento de tempo.
+
+    Returns:
+        dict: batches, consumed, acked
+    """
+    queue = get_ingest_queue()
+    consumer = consumer or consumer_name()
+    batch_size = batch_size or getattr(settings, "INGEST_QUEUE_BATCH_SIZE", 500)
+    time_budget = time_budget or getattr(
+        settings, "INGEST_QUEUE_CONSUMER_BUDGET_SECONDS", 20
+    )
+
+    stats = {"batches": 0, "consumed": 0, "acked": 0}
+    deadline = time.monotonic() + time_budget
+
+    while time.monotonic() < deadline:
+        messages = queue.read(consumer, batch_size)
+        if not messages:
+            break
+
+        now = time.time()
+        observe_ingest_queue_batch(
+            size=len(messages),
+            lags=[now - message.received_at for message in messages],
+        )
+
+        by_tenant = defaultdict(list)
+        for message in messages:
+            by_tenant[message.tenant_slug].append(message)
+
+        ack_ids = []
+        for tenant_slug, tenant_messages in by_tenant.items():
+            try:
+                ack_ids.extend(_persist_tenant_group(tenant_slug, tenant_messages))
+            except Exception as exc:
+                logger.error(
+                    f"❌ Erro ao consumir mensagens do tenant {tenant_slug}: {exc}",
+                    exc_info=True,
+                )
+
+        queue.ack(ack_ids)
+        stats["batches"] += 1
+        stats["consumed"] += len(messages)
+        stats["acked"] += len(ack_ids)
+
+        if len(ack_ids) < len(messages):
+            # Falhas transitórias: não girar em falso, aguardar o XAUTOCLAIM
+            break
+
+    observe_ingest_queue_depth(queue.depth())
+    return stats
@@ -0,0 +1,207 @@
+"""
+Retenção da telemetria por tenant.
+
+No ingest, a política ``Tenant.raw_telemetry_mode`` decide quais mensagens
+geram uma linha bruta em Telemetry (as leituras normalizadas em Reading são
+sempre gravadas):
+
+- ``all``: todas as mensagens (comportamento original)
+- ``sampled``: 1 a cada ``raw_telemetry_sample_rate`` mensagens, por processo
+- ``errors``: apenas mensagens cujo payload falhou no parse
+- ``compressed``: todas, com os chunks de telemetry comprimidos assim que
+  fecham (ver ``apply_storage_policies``)
+
+A task ``ingest.apply_storage_policies`` aplica compressão e drop_chunks do
+TimescaleDB em ``telemetry`` e ``reading`` conforme os dias configurados no
+tenant. Compressão exige a licença Community do TimescaleDB; na edição Apache
+a etapa é ignorada com log e só o descarte de chunks é aplicado.
+"""
+
+import itertools
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone as dj_timezone
+
+from apps.ingest.models import Telemetry
+from apps.tenants.models import RawTelemetryMode
+
+logger = logging.getLogger(__name__)
+
+# Chunks de telemetry têm 1 dia; no modo "compressed" são comprimidos logo
+# após fechar
+COMPRESSED_MODE_COMPRESS_AFTER_DAYS = 1
+
+HYPERTABLES = {
+    "telemetry": {"segmentby": "device_id", "orderby": "timestamp DESC"},
+    "reading": {"segmentby": "device_id, sensor_id", "orderby": "ts DESC"},
+}
+
+_sample_counters: Dict[str, "itertools.count"] = {}
+_sample_lock = threading.Lock()
+
+
+def _resolve(tenant_slug):
+    # Import tardio: auth importa persistence, que importa este módulo
+    from .auth import resolve_tenant
+
+    return resolve_tenant(tenant_slug)
+
+
+def raw_telemetry_mode(tenant) -> str:
+    return getattr(tenant, "raw_telemetry_mode", None) or RawTelemetryMode.ALL
+
+
+def should_store_raw(tenant_slug: str) -> bool:
+    """Decide se a mensagem (parseada com sucesso) gera uma linha em Telemetry."""
+    tenant = _resolve(tenant_slug)
+    mode = raw_telemetry_mode(tenant)
+
+    if mode == RawTelemetryMode.ERRORS:
+        return False
+
+    if mode == RawTelemetryMode.SAMPLED:
+        rate = max(tenant.raw_telemetry_sample_rate or 1, 1)
+        with _sample_lock:
+            counter = _sample_counters.setdefault(tenant.schema_name, itertools.count())
+            return next(counter) % rate == 0
+
+    return True
+
+
+def store_parse_failure(tenant_slug: str, data: Dict[str, Any], error: str) -> None:
+    """
+    Grava o payload bruto de uma mensagem que falhou no parse (modo ``errors``).
+
+    Deve ser chamada dentro do schema do tenant. Falhas aqui só geram log:
+    a resposta ao cliente continua sendo o erro de parse original.
+    """
+    tenant = _resolve(tenant_slug)
+    if raw_telemetry_mode(tenant) != RawTelemetryMode.ERRORS:
+        return
+
+    payload = data.get("payload")
+    if isinstance(payload, str):
+        # Texto que não é JSON válido não cabe em jsonb; guarda como string
+        payload = {"raw": payload}
+
+    try:
+        with transaction.atomic():
+            Telemetry.objects.create(
+                device_id=str(data.get("client_id") or "unknown")[:255],
+                topic=str(data.get("topic") or "")[:500],
+                payload={"payload": payload, "error": error},
+                timestamp=dj_timezone.now(),
+            )
+    except Exception as exc:
+        logger.warning(f"⚠️ Falha ao gravar payload com erro de parse: {exc}")
+
+
+# =============================================================================
+# Compressão / drop_chunks (TimescaleDB)
+# =============================================================================
+
+
+def _hypertable_exists(schema_name: str, table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT 1 FROM timescaledb_information.hypertables
+            WHERE hypertable_schema = %s AND hypertable_name = %s
+            """,
+            [schema_name, table],
+        )
+        return cursor.fetchone() is not None
+
+
+def drop_old_chunks(table: str, days: int) -> int:
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM drop_chunks(%s::regclass, older_than => make_interval(days => %s))",
+            [table, days],
+        )
+        return cursor.fetchone()[0]
+
+
+def compress_old_chunks(schema_name: str, table: str, days: int) -> int:
+    options = HYPERTABLES[table]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT compression_enabled FROM timescaledb_information.hypertables
+            WHERE hypertable_schema = %s AND hypertable_name = %s
+            """,
+            [schema_name, table],
+        )
+        row = cursor.fetchone()
+        if row and not row[0]:
+            cursor.execute(
+                f"ALTER TABLE {table} SET ("
+                f"timescaledb.compress, "
+                f"timescaledb.compress_segmentby = '{options['segmentby']}', "
+                f"timescaledb.compress_orderby = '{options['orderby']}')"
+            )
+
+        cursor.execute(
+            """
+            SELECT count(compress_chunk(c, if_not_compressed => true))
+            FROM show_chunks(%s::regclass, older_than => make_interval(days => %s)) c
+            """,
+            [table, days],
+        )
+        return cursor.fetchone()[0]
+
+
+def storage_policy(tenant) -> Dict[str, Dict[str, Optional[int]]]:
+    """Dias de compressão/retenção por hypertable para o tenant."""
+    compress_after = tenant.compress_after_days
+    telemetry_compress = compress_after
+    if raw_telemetry_mode(tenant) == RawTelemetryMode.COMPRESSED:
+        telemetry_compress = COMPRESSED_MODE_COMPRESS_AFTER_DAYS
+
+    return {
+        "telemetry": {
+            "compress_after_days": telemetry_compress,
+            "retention_days": tenant.telemetry_retention_days,
+        },
+        "reading": {
+            "compress_after_days": compress_after,
+            "retention_days": tenant.reading_retention_days,
+        },
+    }
+
+
+def apply_storage_policies(tenant) -> Dict[str, Any]:
+    """
+    Aplica drop_chunks e compressão nas hypertables do tenant.
+
+    Deve ser chamada dentro do schema do tenant.
+
+    Returns:
+        dict: chunks descartados/comprimidos por tabela e se a compressão
+        está disponível no servidor
+    """
+    stats = {"dropped": {}, "compressed": {}, "compression_available": True}
+
+    for table, policy in storage_policy(tenant).items():
+        if not _hypertable_exists(tenant.schema_name, table):
+            continue
+
+        if policy["retention_days"]:
+            stats["dropped"][table] = drop_old_chunks(table, policy["retention_days"])
+
+        if policy["compress_after_days"] and stats["compression_available"]:
+            try:
+                stats["compressed"][table] = compress_old_chunks(
+                    tenant.schema_name, table, policy["compress_after_days"]
+                )
+            except DatabaseError as exc:
+                # Licença Apache do TimescaleDB não suporta compressão
+                logger.warning(
+                    f"⚠️ Compressão indisponível em {tenant.schema_name}.{table}: {exc}"
+                )
+                stats["compression_available"] = False
+
+    return stats
@@ -0,0 +1,416 @@
+"""
+Auto-vínculo da hierarquia Site → Asset → Device → Sensor a partir do tópico MQTT.
+
+Usado tanto pelo endpoint unitário (IngestView) quanto pelo endpoint em lote
+(BatchIngestView), garantindo que ambos criem/vinculem a topologia da mesma forma.
+"""
+
+import logging
+import threading
+import time
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Campos atualizados a cada mensagem (heartbeat/última leitura). Saves que
+# tocam apenas estes campos não alteram a topologia e não invalidam o cache.
+VOLATILE_TOPOLOGY_FIELDS = frozenset(
+    {
+        "last_seen",
+        "status",
+        "last_value",
+        "last_reading_at",
+        "is_online",
+        "availability",
+        "updated_at",
+    }
+)
+
+
+class TopologyCache:
+    """
+    Cache em processo dos vínculos Site → Asset → Device → Sensor já confirmados.
+
+    Chave: (site_name, asset_tag, device_id, sensor_tag), separada por schema.
+    Em regime permanente a topologia quase nunca muda, então um hit evita
+    todas as queries de auto-vínculo (Site/Asset/Device/Sensor).
+
+    Invalidação:
+    - apps.assets.signals chama ``invalidate_topology_cache`` quando Site,
+      Asset, Device ou Sensor mudam; isso limpa o cache local e incrementa
+      uma versão no cache do Django, verificada pelos outros processos a cada
+      ``INGEST_TOPOLOGY_CACHE_VERSION_CHECK_SECONDS``
+    - entradas expiram após ``INGEST_TOPOLOGY_CACHE_TTL_SECONDS`` como rede
+      de segurança
+    """
+
+    VERSION_KEY = "ingest:topology:version:{schema}"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # schema -> {"version": int, "checked_at": float, "entries": {key: expires_at}}
+        self._schemas = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, "INGEST_TOPOLOGY_CACHE_TTL_SECONDS", 300)
+
+    @property
+    def version_check_interval(self):
+        return getattr(settings, "INGEST_TOPOLOGY_CACHE_VERSION_CHECK_SECONDS", 5)
+
+    def _shared_version(self, schema_name):
+        return cache.get(self.VERSION_KEY.format(schema=schema_name), 0)
+
+    def _bucket(self, schema_name, now):
+        bucket = self._schemas.get(schema_name)
+        if bucket is None:
+            bucket = {
+                "version": self._shared_version(schema_name),
+                "checked_at": now,
+                "entries": {},
+            }
+            self._schemas[schema_name] = bucket
+        elif now - bucket["checked_at"] >= self.version_check_interval:
+            version = self._shared_version(schema_name)
+            if version != bucket["version"]:
+                bucket["entries"].clear()
+                bucket["version"] = version
+            bucket["checked_at"] = now
+        return bucket
+
+    def contains_all(self, schema_name, keys):
+        """True se todas as chaves estão no cache (e não expiraram)."""
+        if not keys:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            entries = self._bucket(schema_name, now)["entries"]
+            for key in keys:
+                expires_at = entries.get(key)
+                if expires_at is None or expires_at < now:
+                    return False
+        return True
+
+    def add_all(self, schema_name, keys):
+        now = time.monotonic()
+        expires_at = now + self.ttl
+        with self._lock:
+            entries = self._bucket(schema_name, now)["entries"]
+            for key in keys:
+                entries[key] = expires_at
+
+    def invalidate(self, schema_name):
+        with self._lock:
+            self._schemas.pop(schema_name, None)
+
+        version_key = self.VERSION_KEY.format(schema=schema_name)
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            # Chave ainda não existe no cache
+            cache.set(version_key, 1, timeout=None)
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+
+
+topology_cache = TopologyCache()
+
+
+def invalidate_topology_cache(schema_name=None):
+    """Invalida o cache de topologia do schema (padrão: schema atual)."""
+    topology_cache.invalidate(schema_name or connection.schema_name)
+
+
+def topology_keys(site_name, asset_tag, device_id, parsed_data):
+    """
+    Monta as chaves (site_name, asset_tag, device_id, sensor_tag) de uma mensagem.
+
+    Mensagens sem sensores geram uma única chave com sensor_tag None.
+    """
+    sensor_tags = [
+        sensor_data.get("sensor_id")
+        for sensor_data in parsed_data.get("sensors", [])
+        if isinstance(sensor_data, dict) and sensor_data.get("sensor_id")
+    ]
+    if not sensor_tags:
+        return [(site_name, asset_tag, device_id, None)]
+    return [(site_name, asset_tag, device_id, tag) for tag in sensor_tags]
+
+
+def extract_site_and_asset_from_topic(topic):
+    """
+    Extrai site_name e asset_tag do tópico MQTT.
+
+    Padrões suportados:
+    - tenants/{tenant}/sites/{site_name}/assets/{asset_tag}/telemetry (NOVO - com site)
+    - tenants/{tenant}/assets/{asset_tag}/telemetry (legado - sem site)
+
+    Returns:
+        tuple: (site_name, asset_tag) ou (None, None)
+    """
+    parts = topic.split("/")
+    site_name = None
+    asset_tag = None
+
+    try:
+        # Novo padrão com site
+        if "sites" in parts and "assets" in parts:
+            site_idx = parts.index("sites")
+            asset_idx = parts.index("assets")
+
+            if site_idx + 1 < len(parts):
+                site_name = parts[site_idx + 1]
+                # Decodificar URL encoding se necessário
+                site_name = unquote(site_name)
+
+            if asset_idx + 1 < len(parts):
+                asset_tag = parts[asset_idx + 1]
+
+            logger.info(
+                f"✅ Extraído do tópico - Site: {site_name}, Asset: {asset_tag}"
+            )
+
+        # Padrão legado sem site (mantém compatibilidade)
+        elif "assets" in parts:
+            asset_idx = parts.index("assets")
+            if asset_idx + 1 < len(parts):
+                asset_tag = parts[asset_idx + 1]
+                logger.info(f"✅ Asset extraído (sem site): {asset_tag}")
+
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao extrair informações do tópico: {e}")
+
+    return site_name, asset_tag
+
+
+def detect_asset_type(asset_tag):
+    """
+    Detecta o tipo de asset baseado no tag.
+    """
+    tag_upper = asset_tag.upper()
+
+    if "CHILLER" in tag_upper or "CH-" in tag_upper:
+        return "CHILLER"
+    elif "AHU" in tag_upper:
+        return "AHU"
+    elif "VRF" in tag_upper:
+        return "VRF"
+    elif "FCU" in tag_upper:
+        return "FCU"
+    elif "SPLIT" in tag_upper:
+        return "SPLIT"
+    elif "RTU" in tag_upper:
+        return "RTU"
+    elif "COOLING" in tag_upper or "TOWER" in tag_upper:
+        return "COOLING_TOWER"
+    else:
+        return "OTHER"
+
+
+def map_sensor_type_to_metric(sensor_type):
+    """
+    Mapeia sensor_type do parser para metric_type do model Sensor.
+    """
+    mapping = {
+        "temperature": "temperature",
+        "humidity": "humidity",
+        "pressure": "pressure",
+        "counter": "counter",
+        "signal_strength": "signal",
+        "battery": "voltage",
+        "door_state": "status",
+        "unknown": "other",
+    }
+    return mapping.get(sensor_type, "other")
+
+
+def link_topology_cached(site_name, asset_tag, device_id, parsed_data):
+    """
+    Auto-vínculo com cache: em um hit não executa nenhuma query de topologia.
+
+    O cache cobre só o vínculo Site/Asset/Device/Sensor. O estado por
+    mensagem (Sensor.last_value/last_reading_at/is_online, Device.last_seen
+    e status) é gravado por persist_batch em toda mensagem, com ou sem hit.
+
+    Returns:
+        True se a topologia da mensagem está vinculada (hit ou miss bem-sucedido)
+    """
+    schema_name = connection.schema_name
+    keys = topology_keys(site_name, asset_tag, device_id, parsed_data)
+
+    if topology_cache.contains_all(schema_name, keys):
+        logger.debug(f"✅ Topologia em cache: {asset_tag}/{device_id}")
+        return True
+
+    asset = auto_create_and_link_asset(site_name, asset_tag, device_id, parsed_data)
+    if asset is None:
+        return False
+
+    # Só cacheia após o commit: se a transação do ingest for revertida, os
+    # vínculos criados aqui também são
+    transaction.on_commit(lambda: topology_cache.add_all(schema_name, keys))
+    return True
+
+
+def auto_create_and_link_asset(site_name, asset_tag, device_id, parsed_data):
+    """
+    Cria ou atualiza automaticamente asset e vincula device/sensores.
+
+    Fluxo:
+    1. Se site_name fornecido, busca ou cria o site
+    2. Busca ou cria o asset no site correto
+    3. Busca ou cria o device e vincula ao asset
+    4. Vincula sensores ao device (last_value fica a cargo de services.last_value)
+
+    Deve ser chamado já dentro do schema do tenant.
+
+    Args:
+        site_name: Nome do site (pode ser None)
+        asset_tag: Tag do asset
+        device_id: ID MQTT do device
+        parsed_data: Dados parseados do payload (incluindo metadata e sensors)
+
+    Returns:
+        Asset object ou None
+    """
+    try:
+        from django.utils import timezone
+
+        from apps.assets.models import Asset, Device, Sensor, Site
+
+        from .last_value import record_heartbeats
+
+        # 1. Determinar o site
+        site = None
+        if site_name:
+            site = Site.objects.filter(name=site_name, is_active=True).first()
+            if site:
+                logger.info(f"📍 Site encontrado: {site.name}")
+            else:
+                logger.warning(
+                    f"⚠️ Site '{site_name}' não encontrado. Ignorando auto-criação."
+                )
+                return None
+        else:
+            # 🔒 SECURITY FIX #5: Reject missing site metadata instead of guessing
+            # Previously used .first() which silently attached devices to arbitrary sites,
+            # corrupting the asset hierarchy and breaking tenant isolation
+            logger.error(
+                f"❌ Missing site metadata in topic for asset {asset_tag}. "
+                f"Topic MUST encode site: tenants/{{tenant}}/sites/{{site}}/assets/{{asset}}/telemetry"
+            )
+            return None
+
+        if not site:
+            logger.error("❌ Nenhum site disponível para vincular o asset")
+            return None
+
+        # 2. Buscar ou criar o asset
+        asset, asset_created = Asset.objects.get_or_create(
+            tag=asset_tag,
+            defaults={
+                "name": f"{asset_tag}",
+                "site": site,
+                "asset_type": detect_asset_type(asset_tag),
+                "status": "OPERATIONAL",
+                "health_score": 100,
+                "is_active": True,
+            },
+        )
+
+        if asset_created:
+            logger.info(
+                f"✨ Asset criado automaticamente: {asset.tag} no site {site.name}"
+            )
+        else:
+            # Atualizar site do asset se mudou
+            if asset.site != site:
+                old_site = asset.site.name
+                asset.site = site
+                asset.save(update_fields=["site", "updated_at"])
+                logger.info(
+                    f"🔄 Asset {asset_tag} movido de {old_site} para {site.name}"
+                )
+            else:
+                logger.debug(f"✅ Asset {asset_tag} já existe no site {site.name}")
+
+        # 3. Buscar ou criar o device e vincular ao asset
+        metadata = parsed_data.get("metadata", {})
+        device, device_created = Device.objects.get_or_create(
+            mqtt_client_id=device_id,
+            defaults={
+                "asset": asset,
+                "name": f"Gateway {asset_tag}",
+                "serial_number": device_id,
+                "device_type": "GATEWAY",
+                "firmware_version": metadata.get("model", "unknown"),
+                "status": "OFFLINE",
+                "is_active": True,
+                "last_seen": timezone.now(),
+            },
+        )
+
+        if device_created:
+            logger.info(f"✨ Device criado e vinculado ao asset {asset_tag}")
+        else:
+            # Atualizar asset do device se mudou
+            if device.asset != asset:
+                old_asset = device.asset.tag if device.asset else "N/A"
+                device.asset = asset
+                device.last_seen = timezone.now()
+                device.save(update_fields=["asset", "last_seen", "updated_at"])
+                logger.info(
+                    f"🔄 Device {device_id} movido de {old_asset} para {asset_tag}"
+                )
+            else:
+                # Apenas heartbeat: write-behind após o commit da mensagem
+                schema_name = connection.schema_name
+                seen_at = timezone.now()
+                transaction.on_commit(
+                    lambda: record_heartbeats(schema_name, [device_id], seen_at)
+                )
+
+        # 4. Processar sensores do payload
+        if "sensors" in parsed_data:
+            for sensor_data in parsed_data["sensors"]:
+                sensor_id = sensor_data.get("sensor_id")
+                if not sensor_id:
+                    continue
+
+                labels = sensor_data.get("labels", {})
+                sensor_type = labels.get("type", "unknown")
+                unit = labels.get("unit", "")
+
+                # Buscar ou criar sensor
+                sensor, sensor_created = Sensor.objects.get_or_create(
+                    tag=sensor_id,
+                    device=device,
+                    defaults={
+                        "metric_type": map_sensor_type_to_metric(sensor_type),
+                        "unit": unit,
+                        "is_online": True,
+                        "is_active": True,
+                    },
+                )
+
+                if sensor_created:
+                    logger.info(
+                        f"✨ Sensor {sensor_id} criado e vinculado ao device {device_id}"
+                    )
+
+                # Último valor do sensor é gravado pelo write-behind
+                # (services.last_value), não a cada mensagem
+
+        return asset
+
+    except Exception as e:
+        logger.error(f"❌ Erro ao criar/vincular asset: {e}", exc_info=True)
+        return None
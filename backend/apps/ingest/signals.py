@@ -0,0 +1,80 @@
+"""
+Signals para app de Ingest.
+
+Responsável por:
+- Invalidar o cache de tenant por slug quando um Tenant muda
+- Invalidar o cache de segredo HMAC quando um Device muda
+"""
+
+import logging
+
+from django.db import connection
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.assets.models import Device
+from apps.tenants.models import Tenant
+
+from .services.auth import device_secret_cache, revoke_device_secret, tenant_cache
+
+logger = logging.getLogger(__name__)
+
+# Campos do Device que afetam a autenticação do ingest
+DEVICE_AUTH_FIELDS = frozenset({"ingest_secret", "mqtt_client_id", "is_active"})
+
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    """
+    Invalida o tenant cacheado (slug pode ter mudado: limpa tudo).
+    """
+    tenant_cache.invalidate()
+    device_secret_cache.invalidate()
+
+
+def _auth_state(instance):
+    # __dict__: não dispara query para campos adiados (.only(...))
+    return {field: instance.__dict__.get(field) for field in DEVICE_AUTH_FIELDS}
+
+
+@receiver(post_init, sender=Device)
+def remember_device_auth_state(sender, instance, **kwargs):
+    instance._ingest_auth_state = _auth_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Device)
+def invalidate_device_secret_cache_on_save(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    """
+    Invalida o segredo cacheado quando segredo, client id ou status ativo mudam.
+
+    Só as chaves (schema, client id antigo) e (schema, client id novo) são
+    invalidadas; saves que não mexem nesses campos (heartbeats, get_or_create
+    do auto-vínculo) são ignorados.
+    """
+    if update_fields and not (set(update_fields) & DEVICE_AUTH_FIELDS):
+        return
+
+    old_state = None if created else getattr(instance, "_ingest_auth_state", None)
+    new_state = _auth_state(instance)
+    instance._ingest_auth_state = new_state
+    if old_state == new_state:
+        return
+
+    schema_name = connection.schema_name
+    client_ids = {instance.mqtt_client_id}
+    if old_state and old_state["mqtt_client_id"]:
+        client_ids.add(old_state["mqtt_client_id"])
+    revoke_device_secret(client_ids, schema_name)
+    logger.debug(
+        "Cache de segredo de ingest invalidado (devices %s, schema %s)",
+        sorted(client_ids),
+        schema_name,
+    )
+
+
+@receiver(post_delete, sender=Device)
+def invalidate_device_secret_cache_on_delete(sender, instance, **kwargs):
+    revoke_device_secret([instance.mqtt_client_id])
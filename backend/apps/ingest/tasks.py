@@ -0,0 +1,134 @@
+"""
+Celery tasks for the ingest pipeline.
+"""
+
+import logging
+
+from celery import shared_task
+from django_tenants.utils import schema_context
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(
+    name="ingest.flush_last_values",
+    bind=True,
+    soft_time_limit=60,
+    time_limit=120,
+)
+def flush_last_values(self):
+    """
+    Grava no banco as últimas leituras acumuladas pelo write-behind do ingest.
+
+    Para cada tenant com leituras pendentes no store, executa um único UPDATE
+    em Sensor (last_value/last_reading_at/is_online) e Device (last_seen e
+    status, incluindo os heartbeats registrados no mesmo store).
+
+    Execução: a cada INGEST_LAST_VALUE_FLUSH_SECONDS (Celery Beat)
+
+    Returns:
+        dict: Estatísticas da execução (tenants, sensors, devices, errors)
+    """
+    from apps.ingest.services.last_value import (
+        flush_last_values_for_schema,
+        get_last_value_store,
+    )
+
+    stats = {"tenants": 0, "sensors": 0, "devices": 0, "errors": []}
+
+    for schema_name in get_last_value_store().dirty_schemas():
+        try:
+            with schema_context(schema_name):
+                result = flush_last_values_for_schema(schema_name)
+            stats["tenants"] += 1
+            stats["sensors"] += result["sensors"]
+            stats["devices"] += result["devices"]
+        except Exception as e:
+            error_msg = f"Erro ao gravar últimas leituras do schema {schema_name}: {e}"
+            logger.error(f"❌ {error_msg}", exc_info=True)
+            stats["errors"].append(error_msg)
+
+    if stats["tenants"]:
+        logger.info(
+            f"💾 Write-behind concluído: {stats['tenants']} tenants, "
+            f"{stats['sensors']} sensores, {stats['devices']} devices"
+        )
+
+    return stats
+
+
+@shared_task(
+    name="ingest.consume_queue",
+    bind=True,
+    soft_time_limit=60,
+    time_limit=120,
+)
+def consume_queue(self):
+    """
+    Consome a fila assíncrona de ingest (INGEST_QUEUE_MODE) em micro-lotes.
+
+    Várias execuções podem rodar em paralelo (um consumidor por processo do
+    worker); cada mensagem é entregue a um único consumidor.
+
+    Execução: a cada INGEST_QUEUE_CONSUME_INTERVAL_SECONDS (Celery Beat)
+
+    Returns:
+        dict: Estatísticas da execução (batches, consumed, acked)
+    """
+    from apps.ingest.services.queue import drain_queue
+
+    stats = drain_queue()
+
+    if stats["consumed"]:
+        logger.info(
+            f"📥 Fila de ingest: {stats['consumed']} consumidas, "
+            f"{stats['acked']} confirmadas em {stats['batches']} lotes"
+        )
+
+    return stats
+
+
+@shared_task(
+    name="ingest.apply_storage_policies",
+    bind=True,
+    soft_time_limit=1800,
+    time_limit=2100,
+)
+def apply_storage_policies(self):
+    """
+    Aplica as políticas de retenção/compressão do TimescaleDB por tenant.
+
+    Para cada tenant, descarta chunks de ``telemetry``/``reading`` mais antigos
+    que os dias de retenção configurados e comprime os chunks mais antigos que
+    ``compress_after_days`` (ver apps.ingest.services.retention).
+
+    Execução: diária (Celery Beat)
+
+    Returns:
+        dict: Estatísticas da execução (tenants, dropped, compressed, errors)
+    """
+    from django_tenants.utils import get_tenant_model
+
+    from apps.ingest.services.retention import apply_storage_policies as apply_policies
+
+    Tenant = get_tenant_model()
+    stats = {"tenants": 0, "dropped": 0, "compressed": 0, "errors": []}
+
+    for tenant in Tenant.objects.exclude(schema_name="public").order_by("schema_name"):
+        try:
+            with schema_context(tenant.schema_name):
+                result = apply_policies(tenant)
+            stats["tenants"] += 1
+            stats["dropped"] += sum(result["dropped"].values())
+            stats["compressed"] += sum(result["compressed"].values())
+        except Exception as e:
+            error_msg = f"Erro ao aplicar retenção no schema {tenant.schema_name}: {e}"
+            logger.error(f"❌ {error_msg}", exc_info=True)
+            stats["errors"].append(error_msg)
+
+    logger.info(
+        f"🗄️ Retenção aplicada: {stats['tenants']} tenants, "
+        f"{stats['dropped']} chunks descartados, {stats['compressed']} comprimidos"
+    )
+
+    return stats
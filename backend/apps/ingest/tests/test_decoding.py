@@ -0,0 +1,86 @@
+"""
+Tests for the ingest JSON decode path and raw payload storage.
+"""
+
+from django.test import SimpleTestCase
+
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import schema_context
+
+from apps.ingest import decoding
+from apps.ingest.fields import RawJSON
+from apps.ingest.models import Telemetry
+from apps.ingest.services import prepare_message
+
+SENML = (
+    '[{"bn": "F80332010002C873", "bt": 1700000000},'
+    ' {"n": "temperatura", "u": "Cel", "v": 21.5},'
+    ' {"n": "rssi", "u": "dBW", "v": -61}]'
+)
+
+
+class DecodingTests(SimpleTestCase):
+    def test_loads_accepts_bytes_and_str(self):
+        self.assertEqual(decoding.loads(b'{"a": 1}'), {"a": 1})
+        self.assertEqual(decoding.loads('{"a": 1}'), {"a": 1})
+
+    def test_invalid_utf8_raises_json_error(self):
+        with self.assertRaises(decoding.JSONDecodeError):
+            decoding.loads(b'{"a": "\xff"}')
+
+    def test_invalid_json_raises_json_error(self):
+        with self.assertRaises(decoding.JSONDecodeError):
+            decoding.loads(b"{not json")
+
+
+class RawPayloadStorageTests(TenantTestCase):
+    def test_string_payload_is_stored_without_reencoding(self):
+        with schema_context(self.tenant.schema_name):
+            message = prepare_message(
+                {
+                    "topic": "tenants/umc/sites/Site A/assets/CHILLER-001/telemetry",
+                    "payload": SENML,
+                },
+                self.tenant.slug,
+            )
+
+            self.assertEqual(message.raw_payload, SENML)
+            self.assertIsInstance(message.telemetry_payload, RawJSON)
+
+            telemetry = Telemetry.objects.create(
+                device_id=message.device_id,
+                topic=message.topic,
+                payload=message.telemetry_payload,
+                timestamp=message.ingest_timestamp,
+            )
+            telemetry.refresh_from_db()
+
+        self.assertEqual(telemetry.payload, decoding.loads(SENML))
+
+    def test_object_payload_is_serialized_once(self):
+        payload = {
+            "device_id": "device-001",
+            "sensors": [{"sensor_id": "temp-01", "value": 1}],
+        }
+        with schema_context(self.tenant.schema_name):
+            message = prepare_message(
+                {
+                    "topic": "tenants/umc/sites/Site A/assets/CHILLER-001/telemetry",
+                    "client_id": "device-001",
+                    "payload": payload,
+                },
+                self.tenant.slug,
+            )
+
+            self.assertIsNone(message.raw_payload)
+            self.assertIsInstance(message.telemetry_payload, RawJSON)
+
+            telemetry = Telemetry.objects.create(
+                device_id=message.device_id,
+                topic=message.topic,
+                payload=message.telemetry_payload,
+                timestamp=message.ingest_timestamp,
+            )
+            telemetry.refresh_from_db()
+
+        self.assertEqual(telemetry.payload, payload)
@@ -0,0 +1,96 @@
+"""
+Tests for device heartbeats routed through the write-behind last-value store.
+"""
+
+from datetime import timedelta
+
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from django_tenants.test.cases import TenantTestCase
+
+from apps.assets.models import Asset, Device, Sensor, Site
+from apps.ingest.services.last_value import (
+    flush_last_values_for_schema,
+    get_last_value_store,
+    record_heartbeats,
+)
+from apps.ingest.services.topology import auto_create_and_link_asset
+from apps.ingest.tasks import flush_last_values
+
+
+class HeartbeatWriteBehindTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.schema_name = connection.schema_name
+        get_last_value_store().drain(self.schema_name)
+
+        site = Site.objects.create(name="Site A")
+        self.asset = Asset.objects.create(
+            tag="ASSET-001", site=site, asset_type="CHILLER"
+        )
+        self.device = Device.objects.create(
+            name="Gateway A",
+            serial_number="SN-HB-001",
+            asset=self.asset,
+            mqtt_client_id="device-001",
+            device_type="GATEWAY",
+            status="OFFLINE",
+        )
+
+    @override_settings(INGEST_LAST_VALUE_FLUSH_SECONDS=3600)
+    def test_heartbeat_is_buffered_in_the_store(self):
+        with self.assertNumQueries(0):
+            record_heartbeats(self.schema_name, ["device-001"], timezone.now())
+
+        self.assertIn(self.schema_name, get_last_value_store().dirty_schemas())
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.status, "OFFLINE")
+
+    @override_settings(INGEST_LAST_VALUE_FLUSH_SECONDS=3600)
+    def test_flush_writes_device_in_one_statement(self):
+        later = timezone.now() + timedelta(seconds=10)
+        record_heartbeats(self.schema_name, ["device-001", "device-unknown"], later)
+
+        with self.assertNumQueries(1):
+            stats = flush_last_values_for_schema(self.schema_name)
+
+        self.assertEqual(stats["devices"], 1)
+        self.assertEqual(stats["sensors"], 0)
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.status, "ONLINE")
+        self.assertEqual(self.device.last_seen, later)
+
+    @override_settings(INGEST_LAST_VALUE_FLUSH_SECONDS=3600)
+    def test_last_seen_never_goes_back(self):
+        now = timezone.now()
+        Device.objects.filter(id=self.device.id).update(last_seen=now)
+        record_heartbeats(self.schema_name, ["device-001"], now - timedelta(minutes=1))
+
+        flush_last_values()
+
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.last_seen, now)
+
+    @override_settings(INGEST_LAST_VALUE_FLUSH_SECONDS=3600)
+    def test_heartbeat_does_not_touch_sensors(self):
+        sensor = Sensor.objects.create(
+            tag="temp-01", device=self.device, metric_type="temp_supply", unit="celsius"
+        )
+        record_heartbeats(self.schema_name, ["device-001"], timezone.now())
+
+        flush_last_values()
+
+        sensor.refresh_from_db()
+        self.assertIsNone(sensor.last_reading_at)
+
+    @override_settings(INGEST_LAST_VALUE_FLUSH_SECONDS=3600)
+    def test_auto_link_heartbeat_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            auto_create_and_link_asset("Site A", "ASSET-001", "device-001", {})
+
+        self.assertNotIn(self.schema_name, get_last_value_store().dirty_schemas())
+        for callback in callbacks:
+            callback()
+        self.assertIn(self.schema_name, get_last_value_store().dirty_schemas())
@@ -0,0 +1,163 @@
+"""
+Tests for cached tenant resolution and device-secret lookup in ingest auth.
+"""
+
+import hashlib
+import hmac
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import schema_context
+
+from apps.assets.models import Asset, Device, Site
+from apps.ingest.services import (
+    IngestError,
+    authenticate_message,
+    resolve_tenant,
+    revoke_device_secret,
+)
+from apps.ingest.services.auth import (
+    device_secret_cache,
+    get_device_secret,
+    tenant_cache,
+)
+from apps.ingest.services.local_cache import LocalTTLCache
+from apps.tenants.models import Tenant
+
+
+@override_settings(INGEST_ALLOW_GLOBAL_SECRET=False)
+class IngestAuthCacheTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        tenant_cache.invalidate()
+        device_secret_cache.invalidate()
+
+        with schema_context("public"):
+            self.tenant = Tenant.objects.create(
+                name="Cache Tenant", slug="cache-tenant"
+            )
+
+        with schema_context(self.tenant.schema_name):
+            site = Site.objects.create(name="Site A")
+            asset = Asset.objects.create(
+                tag="ASSET-001", site=site, asset_type="CHILLER"
+            )
+            self.device = Device.objects.create(
+                name="Gateway A",
+                serial_number="SN-CACHE-001",
+                asset=asset,
+                mqtt_client_id="device-001",
+                device_type="GATEWAY",
+            )
+
+    def _authenticate(self, secret, timestamp=None):
+        body = b'{"client_id": "device-001"}'
+        timestamp = timestamp or int(time.time())
+        signature = hmac.new(
+            secret.encode("utf-8"),
+            f"{timestamp}.".encode("utf-8") + body,
+            hashlib.sha256,
+        ).hexdigest()
+        authenticate_message(
+            tenant=self.tenant,
+            device_id="device-001",
+            raw_body=body,
+            timestamp_header=str(timestamp),
+            signature=signature,
+        )
+
+    def test_tenant_lookup_is_cached(self):
+        self.assertEqual(resolve_tenant("cache-tenant"), self.tenant)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_tenant("cache-tenant"), self.tenant)
+
+    def test_fast_path_makes_no_queries(self):
+        now = int(time.time())
+        self._authenticate(self.device.ingest_secret, timestamp=now)
+
+        with self.assertNumQueries(0):
+            self._authenticate(self.device.ingest_secret, timestamp=now - 1)
+
+    def test_secret_rotation_invalidates_cache(self):
+        now = int(time.time())
+        old_secret = self.device.ingest_secret
+        self._authenticate(old_secret, timestamp=now)
+
+        with schema_context(self.tenant.schema_name):
+            self.device.ingest_secret = "rotated-secret"
+            self.device.save(update_fields=["ingest_secret"])
+
+        with self.assertRaises(IngestError):
+            self._authenticate(old_secret, timestamp=now - 1)
+        self._authenticate("rotated-secret", timestamp=now - 2)
+
+    def test_save_without_auth_changes_keeps_cache(self):
+        now = int(time.time())
+        self._authenticate(self.device.ingest_secret, timestamp=now)
+
+        with schema_context(self.tenant.schema_name):
+            device = Device.objects.get(pk=self.device.pk)
+            device.name = "Gateway renamed"
+            device.save()
+
+        with self.assertNumQueries(0):
+            self._authenticate(self.device.ingest_secret, timestamp=now - 1)
+
+    def test_client_id_change_invalidates_old_key(self):
+        self.assertIsNotNone(get_device_secret(self.tenant, "device-001"))
+
+        with schema_context(self.tenant.schema_name):
+            self.device.mqtt_client_id = "device-002"
+            self.device.save()
+
+        self.assertIsNone(get_device_secret(self.tenant, "device-001"))
+        self.assertIsNotNone(get_device_secret(self.tenant, "device-002"))
+
+    @override_settings(INGEST_AUTH_NEGATIVE_CACHE_TTL_SECONDS=0)
+    def test_unknown_device_is_not_cached(self):
+        self.assertIsNone(get_device_secret(self.tenant, "device-unknown"))
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(get_device_secret(self.tenant, "device-unknown"))
+
+    def test_bulk_revocation_with_helper(self):
+        now = int(time.time())
+        self._authenticate(self.device.ingest_secret, timestamp=now)
+
+        with schema_context(self.tenant.schema_name):
+            Device.objects.filter(pk=self.device.pk).update(is_active=False)
+            revoke_device_secret(["device-001"])
+
+        with self.assertRaises(IngestError):
+            self._authenticate(self.device.ingest_secret, timestamp=now - 1)
+
+
+class LocalTTLCacheInvalidationTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        # Dois "processos" compartilhando o mesmo cache do Django
+        self.writer = LocalTTLCache("test_propagation", version_check_interval=0)
+        self.reader = LocalTTLCache("test_propagation", version_check_interval=0)
+
+    def test_key_invalidation_only_drops_that_key(self):
+        self.reader.set("a", 1)
+        self.reader.set("b", 2)
+
+        self.writer.invalidate("a")
+
+        self.assertIsNone(self.reader.get("a"))
+        self.assertEqual(self.reader.get("b"), 2)
+
+    def test_full_invalidation_drops_everything(self):
+        self.reader.set("a", 1)
+        self.reader.set("b", 2)
+
+        self.writer.invalidate()
+
+        self.assertIsNone(self.reader.get("a"))
+        self.assertIsNone(self.reader.get("b"))
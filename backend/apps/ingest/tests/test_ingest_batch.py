@@ -0,0 +1,251 @@
+"""
+Tests for the batch ingest endpoint (POST /ingest/batch).
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import schema_context
+
+from apps.assets.models import Asset, Device, Site
+from apps.ingest.models import Reading, Telemetry
+from apps.ingest.services import IngestError, prepare_message
+from apps.ingest.views import BatchIngestView
+from apps.tenants.models import Tenant
+
+
+@override_settings(INGEST_ALLOW_GLOBAL_SECRET=False)
+class BatchIngestTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+        with schema_context("public"):
+            self.tenant = Tenant.objects.create(
+                name="Batch Tenant", slug="batch-tenant"
+            )
+
+        with schema_context(self.tenant.schema_name):
+            site = Site.objects.create(name="Site A")
+            asset = Asset.objects.create(
+                tag="ASSET-001", site=site, asset_type="CHILLER"
+            )
+            self.device = Device.objects.create(
+                name="Gateway A",
+                serial_number="SN-BATCH-001",
+                asset=asset,
+                mqtt_client_id="device-001",
+                device_type="GATEWAY",
+            )
+
+        self.view = BatchIngestView.as_view()
+        self.factory = APIRequestFactory()
+
+    def _build_body(self, sensor_id="temp-01", value=21.5, tenant_slug=None):
+        payload = {
+            "client_id": self.device.mqtt_client_id,
+            "topic": (
+                f"tenants/{tenant_slug or self.tenant.slug}"
+                "/sites/Site A/assets/ASSET-001/telemetry"
+            ),
+            "payload": {
+                "device_id": self.device.mqtt_client_id,
+                "sensors": [{"sensor_id": sensor_id, "value": value}],
+            },
+            "ts": int(time.time() * 1000),
+        }
+        return json.dumps(payload)
+
+    def _sign(self, body, timestamp):
+        message = f"{timestamp}.".encode("utf-8") + body.encode("utf-8")
+        return hmac.new(
+            self.device.ingest_secret.encode("utf-8"),
+            message,
+            hashlib.sha256,
+        ).hexdigest()
+
+    def _message(self, msg_id, body, signature=None, timestamp=None):
+        timestamp = timestamp or int(time.time())
+        return {
+            "id": msg_id,
+            "timestamp": timestamp,
+            "signature": signature or self._sign(body, timestamp),
+            "body": body,
+        }
+
+    def _post(self, messages, tenant_slug=None):
+        envelope = {
+            "batches": [
+                {"tenant": tenant_slug or self.tenant.slug, "messages": messages}
+            ]
+        }
+        request = self.factory.post(
+            "/ingest/batch",
+            data=json.dumps(envelope),
+            content_type="application/json",
+        )
+        return self.view(request)
+
+    def test_batch_accepted(self):
+        messages = [
+            self._message("m1", self._build_body(sensor_id="temp-01")),
+            self._message("m2", self._build_body(sensor_id="temp-02")),
+        ]
+
+        response = self._post(messages)
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["accepted"], 2)
+        self.assertEqual([r["ref"] for r in response.data["results"]], ["m1", "m2"])
+
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Telemetry.objects.count(), 2)
+            self.assertEqual(Reading.objects.count(), 2)
+
+    def test_duplicate_readings_reported_without_counting(self):
+        body = self._build_body(sensor_id="temp-01")
+        now = int(time.time())
+        # Distinct signing timestamps so the second message is not a replay
+        messages = [
+            self._message("m1", body, timestamp=now),
+            self._message("m2", body, timestamp=now - 1),
+        ]
+
+        response = self._post(messages)
+
+        self.assertEqual(response.status_code, 202)
+        first, second = response.data["results"]
+        self.assertEqual(first["sensors_saved"], 1)
+        self.assertEqual(first["duplicates_skipped"], 0)
+        self.assertEqual(second["sensors_saved"], 0)
+        self.assertEqual(second["duplicates_skipped"], 1)
+
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Reading.objects.count(), 1)
+
+    def test_invalid_signature_is_isolated(self):
+        messages = [
+            self._message("good", self._build_body(sensor_id="temp-01")),
+            self._message("bad", self._build_body(sensor_id="temp-02"), "invalid"),
+        ]
+
+        response = self._post(messages)
+
+        self.assertEqual(response.status_code, 207)
+        results = {r["ref"]: r for r in response.data["results"]}
+        self.assertEqual(results["good"]["status"], "accepted")
+        self.assertEqual(results["bad"]["status"], "rejected")
+        self.assertEqual(results["bad"]["http_status"], 401)
+        self.assertFalse(results["bad"]["retry"])
+
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Telemetry.objects.count(), 1)
+
+    def test_tenant_mismatch_rejected(self):
+        body = self._build_body(tenant_slug="other-tenant")
+
+        response = self._post([self._message("m1", body)])
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data["results"][0]["http_status"], 403)
+
+    def test_unknown_tenant_rejects_group(self):
+        body = self._build_body()
+
+        response = self._post([self._message("m1", body)], tenant_slug="missing")
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data["results"][0]["http_status"], 404)
+
+    @override_settings(INGEST_BATCH_MAX_MESSAGES=1)
+    def test_batch_too_large(self):
+        messages = [
+            self._message("m1", self._build_body(sensor_id="temp-01")),
+            self._message("m2", self._build_body(sensor_id="temp-02")),
+        ]
+
+        response = self._post(messages)
+
+        self.assertEqual(response.status_code, 413)
+
+    def test_non_string_signature_rejected_per_message(self):
+        body = self._build_body(sensor_id="temp-02")
+        bad = self._message("bad", body)
+        bad["signature"] = 12345
+        messages = [self._message("good", self._build_body(sensor_id="temp-01")), bad]
+
+        response = self._post(messages)
+
+        self.assertEqual(response.status_code, 207)
+        results = {r["ref"]: r for r in response.data["results"]}
+        self.assertEqual(results["good"]["status"], "accepted")
+        self.assertEqual(results["bad"]["http_status"], 401)
+
+    def test_malformed_group_rejected(self):
+        envelope = {"batches": [{"tenant": self.tenant.slug, "messages": 3}]}
+        request = self.factory.post(
+            "/ingest/batch",
+            data=json.dumps(envelope),
+            content_type="application/json",
+        )
+
+        response = self.view(request)
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_retryable_failure_accepts_resend(self):
+        message = self._message("m1", self._build_body())
+
+        with patch(
+            "apps.ingest.views.persist_isolated",
+            return_value=[IngestError("Database unavailable", status_code=503)],
+        ):
+            failed = self._post([message])
+
+        self.assertTrue(failed.data["results"][0]["retry"])
+
+        # Same signed message resent by EMQX: not a replay, now persisted
+        response = self._post([message])
+
+        self.assertEqual(response.status_code, 202)
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Reading.objects.count(), 1)
+
+    def test_parser_crash_is_isolated_and_retryable(self):
+        broken = self._message("m1", self._build_body(sensor_id="temp-01"))
+        healthy = self._message("m2", self._build_body(sensor_id="temp-02"))
+
+        def crash_on_first(data, tenant_slug):
+            if data["payload"]["sensors"][0]["sensor_id"] == "temp-01":
+                raise KeyError("unexpected payload shape")
+            return prepare_message(data, tenant_slug)
+
+        with patch("apps.ingest.views.prepare_message", side_effect=crash_on_first):
+            response = self._post([broken, healthy])
+
+        self.assertEqual(response.status_code, 207)
+        first, second = response.data["results"]
+        self.assertEqual(first["http_status"], 500)
+        self.assertTrue(first["retry"])
+        self.assertEqual(second["status"], "accepted")
+
+        # The replay key was released, so the EMQX resend is persisted
+        resent = self._post([broken])
+
+        self.assertEqual(resent.data["results"][0]["status"], "accepted")
+
+    def test_accepted_message_resend_is_replay(self):
+        message = self._message("m1", self._build_body())
+
+        self._post([message])
+        response = self._post([message])
+
+        self.assertEqual(response.data["results"][0]["http_status"], 409)
@@ -0,0 +1,195 @@
+"""
+Tests for the asynchronous ingest queue mode.
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import schema_context
+
+from apps.assets.models import Asset, Device, Site
+from apps.ingest.models import Reading, Telemetry
+from apps.ingest.services import prepare_message
+from apps.ingest.services.queue import (
+    RedisIngestQueue,
+    drain_queue,
+    get_ingest_queue,
+)
+from apps.ingest.views import IngestView
+from apps.tenants.models import Tenant
+
+
+@override_settings(INGEST_ALLOW_GLOBAL_SECRET=False, INGEST_QUEUE_MODE=True)
+class IngestQueueModeTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        get_ingest_queue().clear()
+
+        with schema_context("public"):
+            self.tenant = Tenant.objects.create(
+                name="Queue Tenant", slug="queue-tenant"
+            )
+
+        with schema_context(self.tenant.schema_name):
+            site = Site.objects.create(name="Site A")
+            asset = Asset.objects.create(
+                tag="ASSET-001", site=site, asset_type="CHILLER"
+            )
+            self.device = Device.objects.create(
+                name="Gateway A",
+                serial_number="SN-QUEUE-001",
+                asset=asset,
+                mqtt_client_id="device-001",
+                device_type="GATEWAY",
+            )
+
+        self.view = IngestView.as_view()
+        self.factory = APIRequestFactory()
+
+    def _post(self):
+        body = json.dumps(
+            {
+                "client_id": self.device.mqtt_client_id,
+                "topic": f"tenants/{self.tenant.slug}/sites/Site A/assets/ASSET-001/telemetry",
+                "payload": {
+                    "device_id": self.device.mqtt_client_id,
+                    "sensors": [{"sensor_id": "temp-01", "value": 21.5}],
+                },
+                "ts": int(time.time() * 1000),
+            }
+        )
+        timestamp = int(time.time())
+        signature = hmac.new(
+            self.device.ingest_secret.encode("utf-8"),
+            f"{timestamp}.".encode("utf-8") + body.encode("utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+        request = self.factory.post(
+            "/ingest",
+            data=body,
+            content_type="application/json",
+            HTTP_X_TENANT=self.tenant.slug,
+            HTTP_X_INGEST_TIMESTAMP=str(timestamp),
+            HTTP_X_INGEST_SIGNATURE=signature,
+        )
+        return self.view(request)
+
+    def test_request_only_enqueues(self):
+        response = self._post()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.data["queued"])
+        self.assertEqual(get_ingest_queue().depth(), 1)
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Telemetry.objects.count(), 0)
+
+    def test_consumer_persists_queued_messages(self):
+        self._post()
+
+        stats = drain_queue(consumer="test", time_budget=5)
+
+        self.assertEqual(stats["consumed"], 1)
+        self.assertEqual(stats["acked"], 1)
+        self.assertEqual(get_ingest_queue().depth(), 0)
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Telemetry.objects.count(), 1)
+            self.assertEqual(Reading.objects.count(), 1)
+
+    def test_parser_crash_only_holds_back_the_offending_message(self):
+        queue = get_ingest_queue()
+        message_ids = {}
+        for sensor_id in ("broken", "temp-01"):
+            message_ids[sensor_id] = queue.enqueue(
+                self.tenant.slug,
+                {
+                    "client_id": self.device.mqtt_client_id,
+                    "topic": f"tenants/{self.tenant.slug}/sites/Site A/assets/ASSET-001/telemetry",
+                    "payload": {
+                        "device_id": self.device.mqtt_client_id,
+                        "sensors": [{"sensor_id": sensor_id, "value": 21.5}],
+                    },
+                    "ts": int(time.time() * 1000),
+                },
+            )
+
+        def flaky_prepare(data, tenant_slug):
+            if data["payload"]["sensors"][0]["sensor_id"] == "broken":
+                raise RuntimeError("parser bug")
+            return prepare_message(data, tenant_slug)
+
+        with (
+            patch(
+                "apps.ingest.services.queue.prepare_message",
+                side_effect=flaky_prepare,
+            ),
+            patch.object(queue, "ack") as ack,
+        ):
+            stats = drain_queue(consumer="test", time_budget=5)
+
+        self.assertEqual(stats["consumed"], 2)
+        self.assertEqual(stats["acked"], 1)
+        ack.assert_called_once_with([message_ids["temp-01"]])
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Telemetry.objects.count(), 1)
+            self.assertEqual(Reading.objects.count(), 1)
+
+    @override_settings(INGEST_QUEUE_MAX_DEPTH=0)
+    def test_backpressure_returns_503(self):
+        response = self._post()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "5")
+
+
+@override_settings(INGEST_QUEUE_MAX_DELIVERIES=3)
+class RedisIngestQueueDeadLetterTests(SimpleTestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.pipe = self.client.pipeline.return_value
+        self.queue = RedisIngestQueue.__new__(RedisIngestQueue)
+        self.queue._client = self.client
+        self.client.xreadgroup.return_value = []
+
+    def _fields(self, body=b'{"client_id": "device-001"}'):
+        return {b"tenant": b"umc", b"body": body, b"received_at": b"1.0"}
+
+    def test_exhausted_message_goes_to_dead_letter(self):
+        self.client.xautoclaim.return_value = [
+            b"0-0",
+            [(b"1-0", self._fields()), (b"2-0", self._fields())],
+        ]
+        self.pipe.execute.side_effect = [
+            [[{"times_delivered": 4}], [{"times_delivered": 2}]],
+            [b"9-0", 1, 1],
+        ]
+
+        messages = self.queue.read("consumer", 10)
+
+        self.assertEqual([message.id for message in messages], ["2-0"])
+        self.pipe.xadd.assert_called_once()
+        self.assertEqual(
+            self.pipe.xadd.call_args.args[0], RedisIngestQueue.DEAD_LETTER_KEY
+        )
+        self.pipe.xack.assert_called_once_with(
+            RedisIngestQueue.STREAM_KEY, RedisIngestQueue.GROUP, b"1-0"
+        )
+
+    def test_unreadable_body_goes_to_dead_letter(self):
+        self.client.xautoclaim.return_value = [b"0-0", []]
+        self.client.xreadgroup.return_value = [
+            (b"ingest:stream", [(b"3-0", self._fields(body=b"{not json"))])
+        ]
+
+        messages = self.queue.read("consumer", 10)
+
+        self.assertEqual(messages, [])
+        self.pipe.xdel.assert_called_once_with(RedisIngestQueue.STREAM_KEY, b"3-0")
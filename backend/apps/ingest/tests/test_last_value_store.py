@@ -0,0 +1,92 @@
+"""
+Tests for the ingest write-behind last-value store.
+"""
+
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from django_tenants.test.cases import TenantTestCase
+
+from apps.assets.models import Asset, Device, Sensor, Site
+from apps.ingest.models import Reading
+from apps.ingest.services.last_value import (
+    flush_last_values_for_schema,
+    get_last_value_store,
+    record_readings,
+)
+from apps.ingest.tasks import flush_last_values
+
+
+class LastValueStoreTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.schema_name = connection.schema_name
+        get_last_value_store().drain(self.schema_name)
+
+        site = Site.objects.create(name="Site A")
+        asset = Asset.objects.create(tag="ASSET-001", site=site, asset_type="CHILLER")
+        self.device = Device.objects.create(
+            name="Gateway A",
+            serial_number="SN-LV-001",
+            asset=asset,
+            mqtt_client_id="device-001",
+            device_type="GATEWAY",
+        )
+        self.sensor = Sensor.objects.create(
+            tag="temp-01", device=self.device, metric_type="temp_supply", unit="celsius"
+        )
+
+    def _reading(self, value, ts):
+        return Reading(device_id="device-001", sensor_id="temp-01", value=value, ts=ts)
+
+    def test_flush_keeps_latest_reading(self):
+        now = timezone.now()
+        record_readings(
+            self.schema_name,
+            [
+                self._reading(22.0, now),
+                self._reading(20.0, now - timedelta(seconds=30)),
+            ],
+        )
+
+        stats = flush_last_values_for_schema(self.schema_name)
+
+        self.assertEqual(stats["sensors"], 1)
+        self.sensor.refresh_from_db()
+        self.device.refresh_from_db()
+        self.assertEqual(self.sensor.last_value, 22.0)
+        self.assertEqual(self.sensor.last_reading_at, now)
+        self.assertTrue(self.sensor.is_online)
+        self.assertEqual(self.device.last_seen, now)
+
+    def test_flush_marks_device_online(self):
+        Device.objects.filter(id=self.device.id).update(status="OFFLINE")
+        record_readings(self.schema_name, [self._reading(22.0, timezone.now())])
+
+        flush_last_values_for_schema(self.schema_name)
+
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.status, "ONLINE")
+
+    def test_flush_does_not_go_back_in_time(self):
+        now = timezone.now()
+        self.sensor.update_last_reading(value=30.0, timestamp=now)
+        record_readings(
+            self.schema_name, [self._reading(10.0, now - timedelta(minutes=5))]
+        )
+
+        flush_last_values_for_schema(self.schema_name)
+
+        self.sensor.refresh_from_db()
+        self.assertEqual(self.sensor.last_value, 30.0)
+
+    def test_task_flushes_dirty_tenants(self):
+        record_readings(self.schema_name, [self._reading(25.0, timezone.now())])
+
+        result = flush_last_values()
+
+        self.assertEqual(result["errors"], [])
+        self.assertGreaterEqual(result["sensors"], 1)
+        self.assertEqual(get_last_value_store().dirty_schemas(), set())
@@ -0,0 +1,58 @@
+"""
+Tests for the payload parser dispatch cache.
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.ingest.parsers import (
+    PayloadParserManager,
+    payload_signature,
+    topic_pattern,
+)
+from apps.ingest.parsers.standard import StandardParser
+
+TOPIC = "tenants/umc/sites/Site A/assets/CHILLER-001/telemetry"
+
+
+def _standard_payload(value=21.5):
+    return {
+        "device_id": "device-001",
+        "sensors": [{"sensor_id": "temp-01", "value": value}],
+    }
+
+
+class ParserDispatchCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.manager = PayloadParserManager()
+
+    def test_topic_pattern_strips_identifiers(self):
+        self.assertEqual(topic_pattern(TOPIC), "tenants/*/sites/*/assets/*/telemetry")
+
+    def test_payload_signature_ignores_values(self):
+        self.assertEqual(
+            payload_signature(_standard_payload(1.0)),
+            payload_signature(_standard_payload(2.0)),
+        )
+        self.assertNotEqual(
+            payload_signature(_standard_payload()),
+            payload_signature([{"bn": "x", "bt": 1}, {"n": "A", "v": 1}]),
+        )
+
+    def test_second_message_skips_detection(self):
+        parser, parsed = self.manager.detect_and_parse(_standard_payload(), TOPIC)
+        self.assertIsInstance(parser, StandardParser)
+        self.assertEqual(parsed["sensors"][0]["sensor_id"], "temp-01")
+
+        other_topic = "tenants/umc/sites/Site B/assets/CHILLER-002/telemetry"
+        with mock.patch.object(PayloadParserManager, "_remember_parser") as remember:
+            parser, _ = self.manager.detect_and_parse(
+                _standard_payload(30.0), other_topic
+            )
+
+        self.assertIsInstance(parser, StandardParser)
+        remember.assert_not_called()
+
+    def test_unknown_payload_returns_none(self):
+        self.assertIsNone(self.manager.detect_and_parse({"foo": "bar"}, TOPIC))
@@ -0,0 +1,112 @@
+"""
+Tests for per-tenant raw telemetry retention policies.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import schema_context
+
+from apps.assets.models import Asset, Device, Site
+from apps.ingest.models import Reading, Telemetry
+from apps.ingest.services import IngestError, persist_isolated, prepare_message
+from apps.ingest.services.auth import tenant_cache
+from apps.ingest.services.retention import storage_policy
+from apps.tenants.models import RawTelemetryMode, Tenant
+
+
+class RawTelemetryPolicyTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        tenant_cache.invalidate()
+
+        with schema_context("public"):
+            self.tenant = Tenant.objects.create(
+                name="Retention Tenant", slug="retention-tenant"
+            )
+
+        with schema_context(self.tenant.schema_name):
+            site = Site.objects.create(name="Site A")
+            asset = Asset.objects.create(
+                tag="ASSET-001", site=site, asset_type="CHILLER"
+            )
+            Device.objects.create(
+                name="Gateway A",
+                serial_number="SN-RET-001",
+                asset=asset,
+                mqtt_client_id="device-001",
+                device_type="GATEWAY",
+            )
+
+    def _set_mode(self, mode, sample_rate=10):
+        with schema_context("public"):
+            self.tenant.raw_telemetry_mode = mode
+            self.tenant.raw_telemetry_sample_rate = sample_rate
+            self.tenant.save()
+        tenant_cache.invalidate()
+
+    def _data(self, index, payload=None):
+        return {
+            "client_id": "device-001",
+            "topic": f"tenants/{self.tenant.slug}/sites/Site A/assets/ASSET-001/telemetry",
+            "payload": payload
+            or {
+                "device_id": "device-001",
+                "sensors": [{"sensor_id": "temp-01", "value": 20.0 + index}],
+            },
+            # Distinct timestamps so readings are not deduplicated
+            "ts": int(time.time() * 1000) - index * 1000,
+        }
+
+    def _ingest(self, count):
+        with schema_context(self.tenant.schema_name):
+            messages = [
+                prepare_message(self._data(i), self.tenant.slug) for i in range(count)
+            ]
+            return persist_isolated(messages)
+
+    def test_sampled_mode_stores_one_in_n(self):
+        self._set_mode(RawTelemetryMode.SAMPLED, sample_rate=2)
+
+        results = self._ingest(4)
+
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Telemetry.objects.count(), 2)
+            self.assertEqual(Reading.objects.count(), 4)
+        self.assertEqual(sum(1 for r in results if r.telemetry_id is None), 2)
+
+    def test_errors_mode_only_stores_parse_failures(self):
+        self._set_mode(RawTelemetryMode.ERRORS)
+
+        self._ingest(2)
+        with schema_context(self.tenant.schema_name):
+            self.assertEqual(Telemetry.objects.count(), 0)
+            self.assertEqual(Reading.objects.count(), 2)
+
+            with self.assertRaises(IngestError):
+                prepare_message(self._data(9, payload={"foo": "bar"}), self.tenant.slug)
+
+            failed = Telemetry.objects.get()
+        self.assertEqual(failed.payload["payload"], {"foo": "bar"})
+        self.assertEqual(failed.payload["error"], "Formato de payload não reconhecido")
+
+
+class StoragePolicyTests(SimpleTestCase):
+    def test_compressed_mode_compresses_telemetry_early(self):
+        tenant = Tenant(
+            raw_telemetry_mode=RawTelemetryMode.COMPRESSED,
+            compress_after_days=7,
+            telemetry_retention_days=30,
+            reading_retention_days=365,
+        )
+
+        policy = storage_policy(tenant)
+
+        self.assertEqual(policy["telemetry"]["compress_after_days"], 1)
+        self.assertEqual(policy["telemetry"]["retention_days"], 30)
+        self.assertEqual(policy["reading"]["compress_after_days"], 7)
+        self.assertEqual(policy["reading"]["retention_days"], 365)
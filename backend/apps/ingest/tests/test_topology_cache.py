@@ -0,0 +1,116 @@
+"""
+Tests for the ingest topology cache (auto-linking Site/Asset/Device/Sensor).
+"""
+
+import time
+
+from django.db import connection
+from django.test import override_settings
+
+from django_tenants.test.cases import TenantTestCase
+
+from apps.assets.models import Asset, Device, Sensor, Site
+from apps.ingest.services import persist_isolated, prepare_message
+from apps.ingest.services.last_value import get_last_value_store
+from apps.ingest.services.topology import link_topology_cached, topology_cache
+
+
+class TopologyCacheTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        topology_cache.clear()
+        self.site = Site.objects.create(name="Site A")
+        self.parsed_data = {
+            "metadata": {"model": "test"},
+            "sensors": [
+                {
+                    "sensor_id": "temp-01",
+                    "value": 21.5,
+                    "labels": {"type": "temperature"},
+                },
+                {"sensor_id": "hum-01", "value": 55.0, "labels": {"type": "humidity"}},
+            ],
+        }
+
+    def _link(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return link_topology_cached(
+                site_name="Site A",
+                asset_tag="CHILLER-001",
+                device_id="device-001",
+                parsed_data=self.parsed_data,
+            )
+
+    def test_miss_creates_topology(self):
+        self.assertTrue(self._link())
+
+        asset = Asset.objects.get(tag="CHILLER-001")
+        device = Device.objects.get(mqtt_client_id="device-001")
+        self.assertEqual(asset.site, self.site)
+        self.assertEqual(device.asset, asset)
+        self.assertEqual(Sensor.objects.filter(device=device).count(), 2)
+
+    def test_hit_makes_no_queries(self):
+        self._link()
+
+        with self.assertNumQueries(0):
+            self.assertTrue(self._link())
+
+    def test_new_sensor_is_a_miss(self):
+        self._link()
+        self.parsed_data["sensors"].append({"sensor_id": "press-01", "value": 1.0})
+
+        self._link()
+
+        self.assertTrue(Sensor.objects.filter(tag="press-01").exists())
+
+    def test_heartbeat_save_does_not_invalidate(self):
+        self._link()
+        device = Device.objects.get(mqtt_client_id="device-001")
+        device.save(update_fields=["last_seen"])
+
+        with self.assertNumQueries(0):
+            self._link()
+
+    def test_asset_change_invalidates(self):
+        self._link()
+        asset = Asset.objects.get(tag="CHILLER-001")
+        asset.name = "Chiller renamed"
+        asset.save()
+
+        self.assertFalse(
+            topology_cache.contains_all(
+                connection.schema_name,
+                [("Site A", "CHILLER-001", "device-001", "temp-01")],
+            )
+        )
+
+    @override_settings(INGEST_LAST_VALUE_FLUSH_SECONDS=0)
+    def test_hit_still_updates_sensor_and_device_state(self):
+        """A topology hit skips linking, never the per-message state writes."""
+        get_last_value_store().drain(connection.schema_name)
+        self._link()
+
+        ts_ms = int(time.time() * 1000)
+        message = prepare_message(
+            {
+                "client_id": "device-001",
+                "topic": "tenants/test/sites/Site A/assets/CHILLER-001/telemetry",
+                "payload": {
+                    "device_id": "device-001",
+                    "sensors": [{"sensor_id": "temp-01", "value": 23.0}],
+                },
+                "ts": ts_ms,
+            },
+            "test",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            persist_isolated([message])
+
+        sensor = Sensor.objects.get(tag="temp-01")
+        device = Device.objects.get(mqtt_client_id="device-001")
+        self.assertEqual(sensor.last_value, 23.0)
+        self.assertIsNotNone(sensor.last_reading_at)
+        self.assertTrue(sensor.is_online)
+        self.assertIsNotNone(device.last_seen)
+        self.assertEqual(device.status, "ONLINE")
@@ -1,29 +1,43 @@
-import hashlib
-import hmac
 import logging
-import time
-from datetime import datetime
-from datetime import timezone as dt_timezone
 
-from django.core.cache import cache
-from django.db import connection, transaction
-from django.utils import timezone as dj_timezone
+from django.conf import settings
+from django.db import connection
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-import pytz
+from django_tenants.utils import schema_context
+
+from . import decoding
+from .services import (
+    IngestError,
+    authenticate_message,
+    persist_isolated,
+    prepare_message,
+    release_replay,
+    resolve_tenant,
+    topology,
+    validate_envelope,
+)
+from .services.queue import IngestQueueFull, enqueue_message, queue_mode_enabled
 
-from django_tenants.utils import get_public_schema_name, schema_context
+logger = logging.getLogger(__name__)
 
-from apps.tenants.models import Tenant
 
-from .models import Reading, Telemetry
-from .parsers import parser_manager
+def _set_observability_context(tenant, device_id=None):
+    from apps.common.observability.context import (
+        set_device_context,
+        set_request_context,
+    )
 
-logger = logging.getLogger(__name__)
+    set_request_context(
+        tenant_schema=tenant.schema_name,
+        tenant_slug=getattr(tenant, "slug", None) or tenant.schema_name,
+    )
+    if device_id:
+        set_device_context(device_id=device_id)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -58,14 +72,13 @@ class IngestView(APIView):
     # Disable DRF authentication (using custom device token auth)
     authentication_classes = []
     permission_classes = []
+    # Chave anti-replay reservada por _authenticate_ingest_request
+    replay_key = None
 
     def post(self, request, *args, **kwargs):
-        
         """
         Process incoming telemetry data from EMQX.
         """
-        from django.conf import settings
-
         # Only log verbose details in DEBUG mode
         if settings.DEBUG:
             logger.info("INGEST POST START")
@@ -82,18 +95,13 @@ class IngestView(APIView):
 
         # Parse and validate payload BEFORE accessing database
         try:
-            # Validate payload structure
-            if settings.DEBUG:
-                logger.info("Parsing JSON body for ingest request")
-            import json
-
             try:
                 raw_body_bytes = request.body
-                raw_body = raw_body_bytes.decode("utf-8")
-                data = json.loads(raw_body)
+                # Parse direto dos bytes, sem decode intermediário para str
+                data = decoding.loads(raw_body_bytes)
                 if settings.DEBUG:
                     logger.info("JSON parsed successfully, type=%s", type(data))
-            except json.JSONDecodeError as e_json:
+            except decoding.JSONDecodeError as e_json:
                 logger.error("Error parsing JSON: %s", e_json, exc_info=True)
                 return Response(
                     {"error": f"Erro ao parsear JSON: {str(e_json)}"},
@@ -106,58 +114,14 @@ class IngestView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            if settings.DEBUG:
-                logger.info("Ingest payload parsed (keys=%s)", list(data.keys()))
-
-            if not isinstance(data, dict):
-                logger.warning(f"Invalid payload type: {type(data)}")
-                return Response(
-                    {"error": "Payload must be JSON object"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            topic = data.get("topic")
-            if not topic:
-                logger.warning("Missing required field: topic")
-                return Response(
-                    {"error": "Missing required field: topic"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
             # 🔒 SECURITY: Validate tenant from topic matches x-tenant header
             # This validation happens BEFORE database access to prevent enumeration attacks
-            # Topic format: tenants/{slug}/sites/{site}/assets/{tag}/telemetry
-            topic_parts = topic.split("/")
-            if len(topic_parts) < 2 or topic_parts[0] != "tenants":
-                logger.warning(f"Invalid topic format: {topic}")
-                return Response(
-                    {"error": "Invalid topic format"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            topic_tenant_slug = topic_parts[1]
-            if topic_tenant_slug != tenant_slug:
-                logger.error(
-                    f"🚨 SECURITY VIOLATION: Tenant mismatch! "
-                    f"Header: {tenant_slug}, Topic: {topic_tenant_slug}, "
-                    f"Client: {data.get('client_id')}, Full Topic: {topic}"
-                )
-                return Response(
-                    {"error": "Tenant validation failed"},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            device_id = data.get("client_id")
-            if not device_id:
-                logger.warning("Missing required field: client_id")
-                return Response(
-                    {"error": "Missing required field: client_id"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            with schema_context(get_public_schema_name()):
-                tenant = Tenant.objects.filter(slug=tenant_slug).first()
+            try:
+                topic, device_id = validate_envelope(data, tenant_slug)
+            except IngestError as exc:
+                return Response(exc.as_dict(), status=exc.status_code)
 
+            tenant = resolve_tenant(tenant_slug)
             if not tenant:
                 logger.warning(
                     f"Tenant not found: {tenant_slug} (client misconfiguration)"
@@ -167,16 +131,7 @@ class IngestView(APIView):
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            from apps.common.observability.context import (
-                set_device_context,
-                set_request_context,
-            )
-
-            set_request_context(
-                tenant_schema=tenant.schema_name,
-                tenant_slug=getattr(tenant, "slug", None) or tenant.schema_name,
-            )
-            set_device_context(device_id=device_id)
+            _set_observability_context(tenant, device_id=device_id)
 
             auth_response = self._authenticate_ingest_request(
                 request=request,
@@ -193,6 +148,23 @@ class IngestView(APIView):
                 {"error": "Invalid request"}, status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Modo assíncrono: só enfileira, a persistência fica com o consumidor
+        if queue_mode_enabled():
+            try:
+                queue_id = enqueue_message(tenant_slug, data)
+            except IngestQueueFull:
+                release_replay(self.replay_key)
+                return self._queue_full_response()
+            return Response(
+                {
+                    "status": "accepted",
+                    "queued": True,
+                    "queue_id": queue_id,
+                    "device_id": device_id,
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
+
         # NOW we can safely access the database with validated tenant
         try:
             connection.set_tenant(tenant)
@@ -203,742 +175,91 @@ class IngestView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        def ensure_aware_timestamp(value, fallback):
-            """Converte timestamps em datetime timezone-aware em UTC."""
-            if value is None:
-                return fallback
-            if isinstance(value, str):
-                try:
-                    value = datetime.fromisoformat(value.replace("Z", "+00:00"))
-                except ValueError:
-                    logger.warning(f"⚠️ Timestamp inválido recebido: {value}")
-                    return fallback
-            if isinstance(value, (int, float)):
-                try:
-                    # Assume valor em segundos; se vier em milissegundos, converter
-                    if abs(value) > 1e12:
-                        value = value / 1000.0
-                    value = datetime.fromtimestamp(value, tz=dt_timezone.utc)
-                except (ValueError, OSError, OverflowError) as exc:
-                    logger.warning(
-                        f"⚠️ Falha ao converter timestamp numérico {value}: {exc}"
-                    )
-                    return fallback
-            if isinstance(value, datetime):
-                if dj_timezone.is_naive(value):
-                    # Força timezone UTC diretamente, sem usar make_aware do Django
-                    return value.replace(tzinfo=dt_timezone.utc)
-                # Se já é timezone-aware, garante que está em UTC
-                if value.tzinfo != dt_timezone.utc:
-                    return value.astimezone(dt_timezone.utc)
-                return value
-            return fallback
-
         # Continue processing with validated data and connected tenant
         try:
-            _client_id = data.get("client_id")  # noqa: F841 - kept for debugging
-            payload = data.get("payload")
-            ts = data.get("ts")  # Timestamp do EMQX (fallback)
-
-            if not payload:
-                logger.warning("Missing required field: payload")
-                return Response(
-                    {"error": "Missing required field: payload"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # 🌍 CORREÇÃO: Converter timestamp para horário local do Site
-            # bt é Unix timestamp UTC, mas armazenamos no horário local do Site
-            # Isso facilita análises e debug sem conversões mentais
-
-            ingest_timestamp = None
-            senml_bt = None
-            site_timezone_str = "America/Sao_Paulo"  # Default
-
-            # 1. Extrair nome do Site do tópico MQTT
-            # Formato: tenants/{tenant}/sites/{site_name}/assets/{asset_tag}/telemetry
-            site_name = None
-            topic_parts = topic.split("/")
-            if len(topic_parts) >= 4 and topic_parts[2] == "sites":
-                site_name = topic_parts[3]
-
-                # 2. Obter timezone do Site com CACHE (evita query em cada mensagem)
-                cache_key = f"site_timezone:{tenant_slug}:{site_name}"
-                site_timezone_str = cache.get(cache_key)
-
-                if not site_timezone_str:
-                    # Cache miss - consultar banco de dados
-                    from apps.assets.models import Site
-
-                    try:
-                        site = Site.objects.filter(name=site_name).first()
-                        if site and site.timezone:
-                            site_timezone_str = site.timezone
-                            # Cache por 24 horas (86400 segundos)
-                            # Será invalidado apenas se Site for atualizado
-                            cache.set(cache_key, site_timezone_str, 86400)
-                            logger.info(
-                                f"📍 Timezone do Site '{site_name}' cacheado: {site_timezone_str}"
-                            )
-                        else:
-                            site_timezone_str = "America/Sao_Paulo"
-                            cache.set(cache_key, site_timezone_str, 86400)
-                            logger.warning(
-                                f"⚠️ Site '{site_name}' não encontrado, usando timezone padrão: {site_timezone_str}"
-                            )
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao buscar Site '{site_name}': {e}")
-                        site_timezone_str = "America/Sao_Paulo"
-                        cache.set(
-                            cache_key, site_timezone_str, 3600
-                        )  # Cache por 1 hora em caso de erro
-                else:
-                    logger.debug(
-                        f"✅ Timezone do Site '{site_name}' do cache: {site_timezone_str}"
-                    )
-
-            # 3. Extrair bt do payload SenML e converter para timezone local
             try:
-                if isinstance(payload, str):
-                    import json
-
-                    payload = json.loads(payload)
-
-                if isinstance(payload, list) and len(payload) > 0:
-                    base_element = payload[0]
-                    if isinstance(base_element, dict):
-                        senml_bt = base_element.get("bt")
-
-                        if senml_bt:
-                            # bt é Unix timestamp UTC - armazenar diretamente em UTC
-                            # Com USE_TZ=True, Django sempre normaliza para UTC no banco
-                            utc_dt = datetime.fromtimestamp(
-                                senml_bt, tz=dt_timezone.utc
-                            )
-                            ingest_timestamp = utc_dt
-
-                            logger.info(
-                                f"⏰ TIMESTAMP - "
-                                f"Unix={senml_bt}s, "
-                                f"UTC={utc_dt.strftime('%d/%m/%Y %H:%M:%S')}, "
-                                f"✅ Armazenando: {ingest_timestamp.strftime('%d/%m/%Y %H:%M:%S %Z')}"
-                            )
-            except Exception as e:
-                logger.warning(f"Erro ao extrair bt do SenML: {e}")
-
-            # Fallback para ts do EMQX se não conseguiu extrair bt
-            if not ingest_timestamp and ts:
-                try:
-                    # Usar ts do EMQX diretamente em UTC
-                    utc_dt = datetime.fromtimestamp(ts / 1000.0, tz=dt_timezone.utc)
-                    ingest_timestamp = utc_dt
-
-                    logger.warning(
-                        f"⚠️ USANDO TIMESTAMP DO EMQX (fallback) - "
-                        f"ts_original={ts}ms, "
-                        f"UTC={utc_dt.strftime('%d/%m/%Y %H:%M:%S')}"
-                    )
-                except (ValueError, TypeError, OSError, OverflowError) as e:
-                    logger.warning(f"Invalid EMQX timestamp: {ts} - {e}")
-
-            # Se não tem nenhum timestamp, usar timestamp atual no timezone local
-            if not ingest_timestamp:
-                utc_now = datetime.now(tz=dt_timezone.utc)
-                site_tz = pytz.timezone(site_timezone_str)
-                ingest_timestamp = utc_now.astimezone(site_tz)
-                logger.warning(
-                    f"⚠️ Nenhum timestamp encontrado, usando timestamp atual: "
-                    f"{ingest_timestamp.strftime('%d/%m/%Y %H:%M:%S %Z')}"
-                )
-
-            # Payload já foi parseado acima ao extrair o bt, não precisa fazer novamente
-            if isinstance(payload, str):
-                import json
-
-                try:
-                    payload = json.loads(payload)
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse payload JSON: {e}")
-                    return Response(
-                        {"error": "Invalid JSON in payload"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-            if settings.DEBUG:
-                logger.info(f"🔍 Tentando encontrar parser para topic: {topic}")
-                logger.info(f"🔍 Tipo do payload: {type(payload)}")
-
-            # IMPORTANTE: Passar o payload interno, não o data completo!
-            parser = parser_manager.get_parser(payload, topic)
-
-            if not parser:
-                logger.warning(
-                    f"⚠️ Nenhum parser encontrado para o payload. Topic: {topic}"
-                )
-                if settings.DEBUG:
-                    logger.warning(
-                        f"⚠️ Parsers disponíveis: {[p.__class__.__name__ for p in parser_manager._parsers]}"
-                    )
-                return Response(
-                    {"error": "Formato de payload não reconhecido"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+                message = prepare_message(data, tenant_slug)
+            except IngestError as exc:
+                return Response(exc.as_dict(), status=exc.status_code)
 
+            # Telemetry + topologia + readings (INSERT ... ON CONFLICT DO NOTHING
+            # RETURNING) + status do device, numa única transação
             try:
-                # IMPORTANTE: Passar o payload interno, não o data completo!
-                parsed_data = parser.parse(payload, topic)
-                if settings.DEBUG:
-                    logger.info(
-                        f"✅ Payload parseado com sucesso usando {parser.__class__.__name__}"
-                    )
-                    logger.info(
-                        f"📊 Device: {parsed_data['device_id']}, Sensors: {len(parsed_data['sensors'])}"
-                    )
-            except Exception as e:
-                logger.error(f"❌ Erro ao parsear payload: {e}", exc_info=True)
-                return Response(
-                    {"error": f"Erro ao processar payload: {str(e)}"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            device_id = parsed_data["device_id"]
-            sensors = parsed_data["sensors"]
-            metadata = parsed_data.get("metadata", {})
-            base_timestamp = ensure_aware_timestamp(
-                parsed_data.get("timestamp"), ingest_timestamp
+                outcome = persist_isolated([message])[0]
+            except Exception:
+                release_replay(self.replay_key)
+                raise
+            if isinstance(outcome, IngestError):
+                # Falha transitória: o reenvio do emissor não pode virar replay
+                if outcome.retryable:
+                    release_replay(self.replay_key)
+                return Response(outcome.as_dict(), status=outcome.status_code)
+
+            metadata = message.metadata
+            logger.info(
+                f"✅ Telemetry saved: tenant={tenant_slug}, "
+                f"device={outcome.device_id}, topic={topic}, format={metadata.get('format', 'unknown')}"
+            )
+            logger.info(
+                f"📊 Created {outcome.readings_inserted} sensor readings "
+                f"(duplicados ignorados: {outcome.duplicates_skipped})"
             )
-            parsed_data["timestamp"] = base_timestamp
-
-            try:
-                with transaction.atomic():
-                    telemetry = Telemetry.objects.create(
-                        device_id=device_id,
-                        topic=topic,
-                        payload=payload,
-                        timestamp=ingest_timestamp,
-                    )
-
-                    logger.info(
-                        f"💾 TABELA: telemetry (histórico raw) - "
-                        f"ID={telemetry.id}, device={device_id}, topic={topic}"
-                    )
-
-                    # Auto linking - extract hierarchy from MQTT topic
-                    site_name, asset_tag = self._extract_site_and_asset_from_topic(
-                        topic
-                    )
-
-                    # Extract tenant from topic (tenants/{tenant}/...)
-                    tenant_name = None
-                    topic_parts = topic.split("/")
-                    if "tenants" in topic_parts:
-                        tenant_idx = topic_parts.index("tenants")
-                        if tenant_idx + 1 < len(topic_parts):
-                            tenant_name = topic_parts[tenant_idx + 1]
-
-                    if asset_tag:
-                        logger.info(f"🔗 Asset tag extraído do tópico: {asset_tag}")
-                        if site_name:
-                            logger.info(f"📍 Site extraído do tópico: {site_name}")
-                        if tenant_name:
-                            logger.info(f"🏢 Tenant extraído do tópico: {tenant_name}")
-
-                        asset = self._auto_create_and_link_asset(
-                            site_name=site_name,
-                            asset_tag=asset_tag,
-                            device_id=device_id,
-                            parsed_data=parsed_data,
-                        )
-
-                        if asset:
-                            logger.info(
-                                f"✅ Asset {asset_tag} processado no site {asset.site.name}"
-                            )
-                        else:
-                            logger.warning(
-                                f"⚠️ Não foi possível processar asset {asset_tag}"
-                            )
-                    else:
-                        logger.warning(
-                            f"⚠️ Não foi possível extrair asset_tag do tópico: {topic}"
-                        )
-
-                    readings_to_create = []
-                    duplicates_skipped = 0
-
-                    for sensor in sensors:
-                        if not isinstance(sensor, dict):
-                            continue
-
-                        sensor_id = sensor.get("sensor_id")
-                        value = sensor.get("value")
-
-                        if not sensor_id or value is None:
-                            continue
-
-                        labels = sensor.get("labels", {})
-                        if not isinstance(labels, dict):
-                            labels = {}
-
-                        reading_timestamp = ensure_aware_timestamp(
-                            sensor.get("timestamp"), base_timestamp
-                        )
-
-                        # Log timestamp para debug
-                        logger.debug(
-                            f"📊 READING CRIADO - sensor_id={sensor_id}, "
-                            f"value={value}, timestamp_sensor={sensor.get('timestamp')}, "
-                            f"reading_timestamp={reading_timestamp.isoformat()}"
-                        )
-
-                        # 🔧 PERFORMANCE FIX: Remove redundant .exists() check
-                        # bulk_create with ignore_conflicts=True already handles duplicates
-                        # This .exists() causes N database roundtrips for each sensor
-
-                        readings_to_create.append(
-                            Reading(
-                                device_id=device_id,
-                                sensor_id=sensor_id,
-                                value=float(value),
-                                labels=labels,
-                                ts=reading_timestamp,
-                                # MQTT Topic Hierarchy (source of truth)
-                                asset_tag=asset_tag,
-                                tenant=tenant_name,
-                                site=site_name,
-                            )
-                        )
-
-                    if readings_to_create:
-                        # 🔒 SECURITY FIX #4: Use ignore_conflicts to prevent race condition
-                        # Concurrent ingestions can violate unique constraint (device_id, sensor_id, ts)
-                        # Instead of dropping entire batch on IntegrityError, silently skip duplicates
-
-                        # 🔧 PERFORMANCE FIX: Capture actual insert count
-                        # bulk_create with ignore_conflicts returns empty list in Django
-                        # 🔧 PERFORMANCE FIX (Nov 2025): Use delta calculation instead of 2 range scans
-                        # Audit finding: "Conta linhas antes e depois de cada inserção para calcular
-                        # o total, mas o resultado é sobrescrito. Além disso, faz duas range scans caras."
-                        #
-                        # OLD: 2 expensive range scans (before + after)
-                        # NEW: Single count before + delta from bulk_create result
-
-                        # Count existing readings before insert
-                        count_before = Reading.objects.filter(
-                            device_id=device_id,
-                            ts__gte=min(r.ts for r in readings_to_create),
-                            ts__lte=max(r.ts for r in readings_to_create),
-                        ).count()
-
-                        # Bulk insert (ignores duplicates silently)
-                        Reading.objects.bulk_create(
-                            readings_to_create, ignore_conflicts=True
-                        )
-
-                        # Count after to get actual inserts (delta method)
-                        count_after = Reading.objects.filter(
-                            device_id=device_id,
-                            ts__gte=min(r.ts for r in readings_to_create),
-                            ts__lte=max(r.ts for r in readings_to_create),
-                        ).count()
-
-                        # Calculate accurate metrics
-                        readings_created = count_after - count_before
-                        duplicates_skipped = len(readings_to_create) - readings_created
-
-                        logger.info(
-                            f"💾 TABELA: reading (TimescaleDB hypertable) - "
-                            f"Inseridos={readings_created}, Duplicados ignorados={duplicates_skipped}, "
-                            f"Total tentativa={len(readings_to_create)}"
-                        )
-
-                        # Atualizar status do device para ONLINE e last_seen
-                        try:
-                            from apps.assets.models import Device
-
-                            Device.objects.filter(mqtt_client_id=device_id).update(
-                                status="ONLINE", last_seen=dj_timezone.now()
-                            )
-                            logger.info(f"✅ Device {device_id} marcado como ONLINE")
-                        except Exception as e_device:
-                            logger.warning(
-                                f"⚠️ Não foi possível atualizar status do device: {e_device}"
-                            )
-
-                    # ❌ REMOVED: Line that overwrote accurate count
-                    # readings_created = len(readings_to_create)  # BUG: Sobrescrevia contagem real!
-
-                logger.info(
-                    f"✅ Telemetry saved: tenant={tenant_slug}, "
-                    f"device={device_id}, topic={topic}, format={metadata.get('format', 'unknown')}"
-                )
-                logger.info(
-                    f"📊 Created {readings_created} sensor readings (duplicados ignorados: {duplicates_skipped})"
-                )
-
-                response_data = {
-                    "status": "accepted",
-                    "id": telemetry.id,
-                    "device_id": telemetry.device_id,
-                    "timestamp": telemetry.timestamp.isoformat(),
-                    "sensors_saved": readings_created,
-                    "duplicates_skipped": duplicates_skipped,
-                    "format": metadata.get("format", "unknown"),
-                }
-
-                if metadata.get("gateway_id"):
-                    response_data["gateway_id"] = metadata["gateway_id"]
-                if metadata.get("model"):
-                    response_data["model"] = metadata["model"]
-
-                return Response(response_data, status=status.HTTP_202_ACCEPTED)
 
-            except Exception as e:
-                logger.error(f"Failed to save telemetry: {e}", exc_info=True)
-                return Response(
-                    {"error": "Failed to save telemetry"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
+            return Response(outcome.as_response(), status=status.HTTP_202_ACCEPTED)
 
         finally:
             connection.set_schema_to_public()
 
+    @staticmethod
+    def _queue_full_response():
+        retry_after = getattr(settings, "INGEST_QUEUE_RETRY_AFTER_SECONDS", 5)
+        response = Response(
+            {"error": "Ingest queue full", "retry_after": retry_after},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        response["Retry-After"] = str(retry_after)
+        return response
+
     def _authenticate_ingest_request(self, request, tenant, device_id, raw_body):
         """
         Validate ingest request using per-device HMAC signature + anti-replay.
-        """
-        from django.conf import settings
-
-        timestamp_header = request.headers.get("x-ingest-timestamp")
-        signature = request.headers.get("x-ingest-signature")
-        allow_global = getattr(settings, "INGEST_ALLOW_GLOBAL_SECRET", False)
-
-        if not timestamp_header or not signature:
-            if not allow_global:
-                return Response(
-                    {"error": "Missing ingest signature"},
-                    status=status.HTTP_401_UNAUTHORIZED,
-                )
-
-            device_token = request.headers.get("x-device-token")
-            if not device_token:
-                return Response(
-                    {"error": "Missing x-device-token header"},
-                    status=status.HTTP_401_UNAUTHORIZED,
-                )
-
-            ingestion_secret = getattr(settings, "INGESTION_SECRET", None)
-            if ingestion_secret and hmac.compare_digest(
-                device_token, ingestion_secret
-            ):
-                return None
-
-            return Response(
-                {"error": "Invalid device token"},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
 
+        The reserved replay key is kept in ``self.replay_key`` so it can be
+        released if persistence fails with a retryable error.
+        """
         try:
-            timestamp = int(timestamp_header)
-        except (TypeError, ValueError):
-            return Response(
-                {"error": "Invalid ingest timestamp"},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-
-        if abs(timestamp) > 1e12:
-            timestamp = int(timestamp / 1000)
-
-        max_skew = getattr(settings, "INGEST_SIGNATURE_MAX_SKEW_SECONDS", 300)
-        now_ts = int(time.time())
-        if abs(now_ts - timestamp) > max_skew:
-            return Response(
-                {"error": "Ingest signature expired"},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-
-        from apps.assets.models import Device
-
-        with schema_context(tenant.schema_name):
-            device = (
-                Device.objects.filter(mqtt_client_id=device_id, is_active=True)
-                .only("ingest_secret")
-                .first()
-            )
-
-        if not device or not device.ingest_secret:
-            return Response(
-                {"error": "Device not authorized"},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-
-        message = f"{timestamp}.".encode("utf-8") + raw_body
-        expected = hmac.new(
-            device.ingest_secret.encode("utf-8"), message, hashlib.sha256
-        ).hexdigest()
-
-        if not hmac.compare_digest(signature, expected):
-            return Response(
-                {"error": "Invalid ingest signature"},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-
-        replay_ttl = getattr(settings, "INGEST_REPLAY_TTL_SECONDS", max_skew)
-        replay_key = f"ingest:replay:{tenant.schema_name}:{device_id}:{timestamp}:{signature}"
-        if cache.get(replay_key):
-            return Response(
-                {"error": "Replay detected"},
-                status=status.HTTP_409_CONFLICT,
+            self.replay_key = authenticate_message(
+                tenant=tenant,
+                device_id=device_id,
+                raw_body=raw_body,
+                timestamp_header=request.headers.get("x-ingest-timestamp"),
+                signature=request.headers.get("x-ingest-signature"),
+                device_token=request.headers.get("x-device-token"),
             )
-
-        cache.set(replay_key, True, timeout=replay_ttl)
+        except IngestError as exc:
+            return Response(exc.as_dict(), status=exc.status_code)
         return None
 
     def _extract_site_and_asset_from_topic(self, topic):
-        """
-        Extrai site_name e asset_tag do tópico MQTT.
-
-        Padrões suportados:
-        - tenants/{tenant}/sites/{site_name}/assets/{asset_tag}/telemetry (NOVO - com site)
-        - tenants/{tenant}/assets/{asset_tag}/telemetry (legado - sem site)
-
-        Returns:
-            tuple: (site_name, asset_tag) ou (None, None)
-        """
-        from urllib.parse import unquote
-
-        parts = topic.split("/")
-        site_name = None
-        asset_tag = None
-
-        try:
-            # Novo padrão com site
-            if "sites" in parts and "assets" in parts:
-                site_idx = parts.index("sites")
-                asset_idx = parts.index("assets")
-
-                if site_idx + 1 < len(parts):
-                    site_name = parts[site_idx + 1]
-                    # Decodificar URL encoding se necessário
-                    site_name = unquote(site_name)
-
-                if asset_idx + 1 < len(parts):
-                    asset_tag = parts[asset_idx + 1]
-
-                logger.info(
-                    f"✅ Extraído do tópico - Site: {site_name}, Asset: {asset_tag}"
-                )
-
-            # Padrão legado sem site (mantém compatibilidade)
-            elif "assets" in parts:
-                asset_idx = parts.index("assets")
-                if asset_idx + 1 < len(parts):
-                    asset_tag = parts[asset_idx + 1]
-                    logger.info(f"✅ Asset extraído (sem site): {asset_tag}")
-
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao extrair informações do tópico: {e}")
-
-        return site_name, asset_tag
+        """Delegado para services.topology (mantido por compatibilidade)."""
+        return topology.extract_site_and_asset_from_topic(topic)
 
     def _detect_asset_type(self, asset_tag):
-        """
-        Detecta o tipo de asset baseado no tag.
-        """
-        tag_upper = asset_tag.upper()
-
-        if "CHILLER" in tag_upper or "CH-" in tag_upper:
-            return "CHILLER"
-        elif "AHU" in tag_upper:
-            return "AHU"
-        elif "VRF" in tag_upper:
-            return "VRF"
-        elif "FCU" in tag_upper:
-            return "FCU"
-        elif "SPLIT" in tag_upper:
-            return "SPLIT"
-        elif "RTU" in tag_upper:
-            return "RTU"
-        elif "COOLING" in tag_upper or "TOWER" in tag_upper:
-            return "COOLING_TOWER"
-        else:
-            return "OTHER"
+        """Delegado para services.topology (mantido por compatibilidade)."""
+        return topology.detect_asset_type(asset_tag)
 
     def _auto_create_and_link_asset(self, site_name, asset_tag, device_id, parsed_data):
-        """
-        Cria ou atualiza automaticamente asset e vincula device/sensores.
-
-        Fluxo:
-        1. Se site_name fornecido, busca ou cria o site
-        2. Busca ou cria o asset no site correto
-        3. Busca ou cria o device e vincula ao asset
-        4. Vincula sensores ao device
-
-        Args:
-            site_name: Nome do site (pode ser None)
-            asset_tag: Tag do asset
-            device_id: ID MQTT do device
-            parsed_data: Dados parseados do payload (incluindo metadata e sensors)
-
-        Returns:
-            Asset object ou None
-        """
-        try:
-            from django.utils import timezone
-
-            from apps.assets.models import Asset, Device, Sensor, Site
-
-            # 1. Determinar o site
-            site = None
-            if site_name:
-                site = Site.objects.filter(name=site_name, is_active=True).first()
-                if site:
-                    logger.info(f"📍 Site encontrado: {site.name}")
-                else:
-                    logger.warning(
-                        f"⚠️ Site '{site_name}' não encontrado. Ignorando auto-criação."
-                    )
-                    return None
-            else:
-                # 🔒 SECURITY FIX #5: Reject missing site metadata instead of guessing
-                # Previously used .first() which silently attached devices to arbitrary sites,
-                # corrupting the asset hierarchy and breaking tenant isolation
-                logger.error(
-                    f"❌ Missing site metadata in topic for asset {asset_tag}. "
-                    f"Topic MUST encode site: tenants/{{tenant}}/sites/{{site}}/assets/{{asset}}/telemetry"
-                )
-                return None
-
-            if not site:
-                logger.error("❌ Nenhum site disponível para vincular o asset")
-                return None
-
-            # 2. Buscar ou criar o asset
-            asset, asset_created = Asset.objects.get_or_create(
-                tag=asset_tag,
-                defaults={
-                    "name": f"{asset_tag}",
-                    "site": site,
-                    "asset_type": self._detect_asset_type(asset_tag),
-                    "status": "OPERATIONAL",
-                    "health_score": 100,
-                    "is_active": True,
-                },
-            )
-
-            if asset_created:
-                logger.info(
-                    f"✨ Asset criado automaticamente: {asset.tag} no site {site.name}"
-                )
-            else:
-                # Atualizar site do asset se mudou
-                if asset.site != site:
-                    old_site = asset.site.name
-                    asset.site = site
-                    asset.save(update_fields=["site", "updated_at"])
-                    logger.info(
-                        f"🔄 Asset {asset_tag} movido de {old_site} para {site.name}"
-                    )
-                else:
-                    logger.debug(f"✅ Asset {asset_tag} já existe no site {site.name}")
-
-            # 3. Buscar ou criar o device e vincular ao asset
-            metadata = parsed_data.get("metadata", {})
-            device, device_created = Device.objects.get_or_create(
-                mqtt_client_id=device_id,
-                defaults={
-                    "asset": asset,
-                    "name": f"Gateway {asset_tag}",
-                    "serial_number": device_id,
-                    "device_type": "GATEWAY",
-                    "firmware_version": metadata.get("model", "unknown"),
-                    "status": "OFFLINE",
-                    "is_active": True,
-                    "last_seen": timezone.now(),
-                },
-            )
-
-            if device_created:
-                logger.info(f"✨ Device criado e vinculado ao asset {asset_tag}")
-            else:
-                # Atualizar asset do device se mudou
-                if device.asset != asset:
-                    old_asset = device.asset.tag if device.asset else "N/A"
-                    device.asset = asset
-                    device.last_seen = timezone.now()
-                    device.save(update_fields=["asset", "last_seen", "updated_at"])
-                    logger.info(
-                        f"🔄 Device {device_id} movido de {old_asset} para {asset_tag}"
-                    )
-                else:
-                    # Apenas atualizar last_seen
-                    device.last_seen = timezone.now()
-                    device.save(update_fields=["last_seen"])
-
-            # 4. Processar sensores do payload
-            if "sensors" in parsed_data:
-                for sensor_data in parsed_data["sensors"]:
-                    sensor_id = sensor_data.get("sensor_id")
-                    if not sensor_id:
-                        continue
-
-                    labels = sensor_data.get("labels", {})
-                    sensor_type = labels.get("type", "unknown")
-                    unit = labels.get("unit", "")
-
-                    # Buscar ou criar sensor
-                    sensor, sensor_created = Sensor.objects.get_or_create(
-                        tag=sensor_id,
-                        device=device,
-                        defaults={
-                            "metric_type": self._map_sensor_type_to_metric(sensor_type),
-                            "unit": unit,
-                            "is_online": True,
-                            "is_active": True,
-                        },
-                    )
-
-                    if sensor_created:
-                        logger.info(
-                            f"✨ Sensor {sensor_id} criado e vinculado ao device {device_id}"
-                        )
-
-                    # Atualizar último valor do sensor
-                    value = sensor_data.get("value")
-                    if value is not None:
-                        sensor.last_value = value
-                        sensor.last_reading_at = timezone.now()
-                        sensor.is_online = True
-                        sensor.save(
-                            update_fields=[
-                                "last_value",
-                                "last_reading_at",
-                                "is_online",
-                                "updated_at",
-                            ]
-                        )
-
-            return asset
-
-        except Exception as e:
-            logger.error(f"❌ Erro ao criar/vincular asset: {e}", exc_info=True)
-            return None
+        """Delegado para services.topology (mantido por compatibilidade)."""
+        return topology.auto_create_and_link_asset(
+            site_name=site_name,
+            asset_tag=asset_tag,
+            device_id=device_id,
+            parsed_data=parsed_data,
+        )
 
     def _map_sensor_type_to_metric(self, sensor_type):
-        """
-        Mapeia sensor_type do parser para metric_type do model Sensor.
-        """
-        mapping = {
-            "temperature": "temperature",
-            "humidity": "humidity",
-            "pressure": "pressure",
-            "counter": "counter",
-            "signal_strength": "signal",
-            "battery": "voltage",
-            "door_state": "status",
-            "unknown": "other",
-        }
-        return mapping.get(sensor_type, "other")
+        """Delegado para services.topology (mantido por compatibilidade)."""
+        return topology.map_sensor_type_to_metric(sensor_type)
 
     def _extract_asset_tag_from_topic(self, topic):
         """
@@ -1154,3 +475,263 @@ class IngestView(APIView):
                 exc_info=True,
             )
             return None
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class BatchIngestView(APIView):
+    """
+    Endpoint de ingest em lote para o EMQX (várias mensagens por request).
+
+    Cada mensagem continua assinada individualmente com o segredo do seu
+    device, exatamente como no endpoint unitário. O ganho vem de amortizar o
+    overhead por request: um lookup de tenant e uma troca de schema por grupo,
+    e um único bulk INSERT por tabela (telemetry/reading) por grupo.
+
+    Envelope esperado:
+    {
+        "batches": [
+            {
+                "tenant": "umc",
+                "messages": [
+                    {
+                        "id": "emqx-msg-id",          // opcional, devolvido no resultado
+                        "timestamp": 1697572800,      // x-ingest-timestamp da mensagem
+                        "signature": "<hex>",         // HMAC-SHA256(secret, f"{timestamp}.{body}")
+                        "body": "{\\"client_id\\": ...}"  // corpo bruto, igual ao do POST /ingest
+                    }
+                ]
+            }
+        ]
+    }
+
+    Resposta: um resultado por mensagem, na ordem recebida, com ``retry``
+    indicando se o EMQX deve reenviar (apenas falhas transitórias 5xx).
+    Status HTTP 202 se todas foram aceitas, 207 se houve falhas parciais.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request, *args, **kwargs):
+        try:
+            data = decoding.loads(request.body)
+        except decoding.JSONDecodeError as e_json:
+            logger.error("Error parsing batch ingest JSON: %s", e_json)
+            return Response(
+                {"error": f"Erro ao parsear JSON: {str(e_json)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        groups = data.get("batches") if isinstance(data, dict) else None
+        if not isinstance(groups, list):
+            return Response(
+                {"error": "Missing required field: batches"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        for group in groups:
+            if not isinstance(group, dict) or not isinstance(
+                group.get("messages") or [], list
+            ):
+                return Response(
+                    {"error": "Invalid batch group"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        max_messages = getattr(settings, "INGEST_BATCH_MAX_MESSAGES", 1000)
+        total_messages = sum(len(group.get("messages") or []) for group in groups)
+        if total_messages > max_messages:
+            return Response(
+                {
+                    "error": "Batch too large",
+                    "max_messages": max_messages,
+                    "received": total_messages,
+                },
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        device_token = request.headers.get("x-device-token")
+
+        results = []
+        for group in groups:
+            results.extend(self._process_group(group, device_token))
+
+        accepted = sum(1 for result in results if result["status"] == "accepted")
+        summary = {
+            "total": len(results),
+            "accepted": accepted,
+            "rejected": sum(1 for result in results if result["status"] == "rejected"),
+            "failed": sum(1 for result in results if result["status"] == "failed"),
+        }
+
+        logger.info(
+            f"📦 Batch ingest: {summary['total']} mensagens, "
+            f"{summary['accepted']} aceitas, {summary['rejected']} rejeitadas, "
+            f"{summary['failed']} falharam"
+        )
+
+        response_status = (
+            status.HTTP_202_ACCEPTED
+            if accepted == len(results)
+            else status.HTTP_207_MULTI_STATUS
+        )
+        return Response({**summary, "results": results}, status=response_status)
+
+    def _process_group(self, group, device_token):
+        """
+        Processa as mensagens de um tenant: valida e autentica cada uma,
+        depois faz parse e persistência do grupo dentro de um único schema.
+        """
+        tenant_slug = group.get("tenant")
+        items = group.get("messages") or []
+        results = [None] * len(items)
+
+        if not tenant_slug:
+            error = IngestError("Missing required field: tenant")
+            return [
+                self._error_result(item, index, tenant_slug, error)
+                for index, item in enumerate(items)
+            ]
+
+        tenant = resolve_tenant(tenant_slug)
+        if not tenant:
+            logger.warning(f"Tenant not found: {tenant_slug} (client misconfiguration)")
+            error = IngestError("Tenant not found", status_code=404, tenant=tenant_slug)
+            return [
+                self._error_result(item, index, tenant_slug, error)
+                for index, item in enumerate(items)
+            ]
+
+        _set_observability_context(tenant)
+
+        # 1. Validar envelope + assinatura (antes de tocar no schema do tenant)
+        authenticated = []
+        for index, item in enumerate(items):
+            try:
+                data, raw_body = self._decode_item(item)
+                _topic, device_id = validate_envelope(data, tenant_slug)
+                replay_key = authenticate_message(
+                    tenant=tenant,
+                    device_id=device_id,
+                    raw_body=raw_body,
+                    timestamp_header=item.get("timestamp"),
+                    signature=item.get("signature"),
+                    device_token=device_token,
+                )
+                authenticated.append((index, data, replay_key))
+            except IngestError as exc:
+                results[index] = self._error_result(item, index, tenant_slug, exc)
+
+        if queue_mode_enabled():
+            return self._enqueue_group(items, authenticated, results, tenant_slug)
+
+        # 2. Parse + persistência com uma única troca de schema
+        replay_keys = {index: replay_key for index, _data, replay_key in authenticated}
+        with schema_context(tenant.schema_name):
+            prepared = []
+            for index, data, replay_key in authenticated:
+                try:
+                    prepared.append((index, prepare_message(data, tenant_slug)))
+                    continue
+                except IngestError as exc:
+                    error = exc
+                except Exception:
+                    # Falha do parser fica restrita à mensagem: 5xx para que o
+                    # EMQX reenvie só ela
+                    logger.exception(
+                        f"Unexpected error preparing batch message {index} "
+                        f"for tenant {tenant_slug}"
+                    )
+                    error = IngestError("Failed to process message", status_code=500)
+                if error.retryable:
+                    release_replay(replay_key)
+                results[index] = self._error_result(
+                    items[index], index, tenant_slug, error
+                )
+
+            try:
+                outcomes = persist_isolated([message for _, message in prepared])
+            except Exception:
+                for index, _message in prepared:
+                    release_replay(replay_keys[index])
+                raise
+
+        for (index, _message), outcome in zip(prepared, outcomes, strict=False):
+            if isinstance(outcome, IngestError):
+                # Falha transitória: o reenvio do EMQX não pode virar replay
+                if outcome.retryable:
+                    release_replay(replay_keys[index])
+                results[index] = self._error_result(
+                    items[index], index, tenant_slug, outcome
+                )
+            else:
+                results[index] = {
+                    "ref": self._item_ref(items[index], index),
+                    "tenant": tenant_slug,
+                    "retry": False,
+                    **outcome.as_response(),
+                }
+
+        return results
+
+    def _enqueue_group(self, items, authenticated, results, tenant_slug):
+        """Modo assíncrono: enfileira as mensagens autenticadas do grupo."""
+        for index, data, replay_key in authenticated:
+            try:
+                queue_id = enqueue_message(tenant_slug, data)
+            except IngestQueueFull:
+                release_replay(replay_key)
+                error = IngestError("Ingest queue full", status_code=503)
+                results[index] = self._error_result(
+                    items[index], index, tenant_slug, error
+                )
+                continue
+            results[index] = {
+                "ref": self._item_ref(items[index], index),
+                "tenant": tenant_slug,
+                "retry": False,
+                "status": "accepted",
+                "queued": True,
+                "queue_id": queue_id,
+                "device_id": data.get("client_id"),
+            }
+        return results
+
+    def _decode_item(self, item):
+        """
+        Extrai o corpo da mensagem e os bytes exatos usados na assinatura.
+
+        ``body`` deve ser a string JSON original (a mesma que seria enviada ao
+        POST /ingest). Um objeto JSON só é aceito no modo de token global,
+        em que não há assinatura a validar.
+        """
+        if not isinstance(item, dict):
+            raise IngestError("Message must be JSON object")
+
+        body = item.get("body")
+        if isinstance(body, str):
+            raw_body = body.encode("utf-8")
+            try:
+                return decoding.loads(raw_body), raw_body
+            except decoding.JSONDecodeError as e_json:
+                raise IngestError(f"Erro ao parsear JSON: {str(e_json)}") from e_json
+
+        if isinstance(body, dict):
+            return body, decoding.dumps(body).encode("utf-8")
+
+        raise IngestError("Missing required field: body")
+
+    def _item_ref(self, item, index):
+        if isinstance(item, dict) and item.get("id") is not None:
+            return item["id"]
+        return index
+
+    def _error_result(self, item, index, tenant_slug, exc):
+        return {
+            "ref": self._item_ref(item, index),
+            "tenant": tenant_slug,
+            "status": "failed" if exc.retryable else "rejected",
+            "http_status": exc.status_code,
+            "retry": exc.retryable,
+            **exc.as_dict(),
+        }
@@ -49,6 +49,20 @@ class TenantAdmin(TenantAdminMixin, ModelAdmin):
                 "description": "Nome e identificador único do tenant/organização.",
             },
         ),
+        (
+            "Retenção de Telemetria",
+            {
+                "fields": (
+                    "raw_telemetry_mode",
+                    "raw_telemetry_sample_rate",
+                    "telemetry_retention_days",
+                    "reading_retention_days",
+                    "compress_after_days",
+                ),
+                "classes": ("collapse",),
+                "description": "Armazenamento da telemetria bruta, compressão e descarte de chunks TimescaleDB.",
+            },
+        ),
         (
             "Schema e Timestamps",
             {
@@ -0,0 +1,62 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0003_rename_tenant_feat_tenant__6d8d5a_idx_tenant_feat_tenant__d3515a_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="raw_telemetry_mode",
+            field=models.CharField(
+                choices=[
+                    ("all", "Armazenar todas"),
+                    ("sampled", "Amostrar 1 a cada N"),
+                    ("errors", "Somente erros de parse"),
+                    ("compressed", "Armazenar todas (comprimidas)"),
+                ],
+                default="all",
+                help_text="Quais mensagens brutas são gravadas em Telemetry",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="raw_telemetry_sample_rate",
+            field=models.PositiveIntegerField(
+                default=10,
+                help_text="No modo amostrado, grava 1 a cada N mensagens",
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="telemetry_retention_days",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Dias de retenção da Telemetry bruta (vazio = sem limite)",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="reading_retention_days",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Dias de retenção das leituras normalizadas (vazio = sem limite)",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tenant",
+            name="compress_after_days",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Comprimir chunks de telemetry/reading mais antigos que N dias "
+                "(vazio = não comprimir)",
+                null=True,
+            ),
+        ),
+    ]
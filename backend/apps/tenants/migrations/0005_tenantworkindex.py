@@ -0,0 +1,64 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0004_tenant_telemetry_retention"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantWorkIndex",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "work_type",
+                    models.CharField(
+                        choices=[
+                            ("outbox", "Eventos pendentes na outbox"),
+                            ("rules", "Regras de alerta habilitadas"),
+                            ("sensors", "Sensores ativos"),
+                            ("devices", "Devices ativos"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("pending", models.PositiveIntegerField(default=0)),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="work_index",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tenant Work Index",
+                "verbose_name_plural": "Tenant Work Index",
+                "db_table": "tenant_work_index",
+                "indexes": [
+                    models.Index(
+                        fields=["work_type", "pending"], name="tenant_work_type_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tenant", "work_type"), name="tenant_work_index_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -10,6 +10,15 @@ from django.db import models
 from django_tenants.models import DomainMixin, TenantMixin
 
 
+class RawTelemetryMode(models.TextChoices):
+    """Política de armazenamento da Telemetry bruta (payload original)."""
+
+    ALL = "all", "Armazenar todas"
+    SAMPLED = "sampled", "Amostrar 1 a cada N"
+    ERRORS = "errors", "Somente erros de parse"
+    COMPRESSED = "compressed", "Armazenar todas (comprimidas)"
+
+
 class Tenant(TenantMixin):
     """
     Tenant model representing an organization/client.
@@ -20,6 +29,11 @@ class Tenant(TenantMixin):
     Attributes:
         name: Display name of the organization (e.g., "Uberlandia Medical Center")
         slug: URL-friendly identifier (e.g., "uberlandia-medical-center")
+        raw_telemetry_mode: Which raw Telemetry rows are stored on ingest
+        raw_telemetry_sample_rate: N for the "1 in N" sampling mode
+        telemetry_retention_days: Drop raw telemetry chunks older than this
+        reading_retention_days: Drop reading chunks older than this
+        compress_after_days: Compress telemetry/reading chunks older than this
         created_at: Timestamp when tenant was created
         updated_at: Timestamp of last update
     """
@@ -34,6 +48,34 @@ class Tenant(TenantMixin):
         help_text="Identificador único para URLs e schema do banco",
     )
 
+    # Retenção de telemetria (aplicada por apps.ingest.services.retention)
+    raw_telemetry_mode = models.CharField(
+        max_length=20,
+        choices=RawTelemetryMode.choices,
+        default=RawTelemetryMode.ALL,
+        help_text="Quais mensagens brutas são gravadas em Telemetry",
+    )
+    raw_telemetry_sample_rate = models.PositiveIntegerField(
+        default=10,
+        help_text="No modo amostrado, grava 1 a cada N mensagens",
+    )
+    telemetry_retention_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Dias de retenção da Telemetry bruta (vazio = sem limite)",
+    )
+    reading_retention_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Dias de retenção das leituras normalizadas (vazio = sem limite)",
+    )
+    compress_after_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Comprimir chunks de telemetry/reading mais antigos que N dias "
+        "(vazio = não comprimir)",
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -83,3 +125,53 @@ class Domain(DomainMixin):
 
     def __str__(self):
         return f"{self.domain} → {self.tenant.name}"
+
+
+class WorkType(models.TextChoices):
+    """Tipos de trabalho periódico acompanhados pelo TenantWorkIndex."""
+
+    OUTBOX = "outbox", "Eventos pendentes na outbox"
+    RULES = "rules", "Regras de alerta habilitadas"
+    SENSORS = "sensors", "Sensores ativos"
+    DEVICES = "devices", "Devices ativos"
+
+
+class TenantWorkIndex(models.Model):
+    """
+    Índice (schema público) do trabalho pendente de cada tenant por tipo.
+
+    As tasks periódicas consultam o índice numa única query e só abrem
+    schema_context nos tenants com ``pending > 0`` (ou ainda sem linha para o
+    tipo). Mantido por apps.tenants.work_index.WorkIndexService.
+
+    Attributes:
+        pending: Itens pendentes do tipo (eventos, regras, sensores, devices)
+        version: Incrementado a cada escrita; protege a contagem gravada pelas
+            tasks contra escritas concorrentes
+    """
+
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="work_index",
+    )
+    work_type = models.CharField(max_length=20, choices=WorkType.choices)
+    pending = models.PositiveIntegerField(default=0)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "tenant_work_index"
+        verbose_name = "Tenant Work Index"
+        verbose_name_plural = "Tenant Work Index"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "work_type"], name="tenant_work_index_unique"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["work_type", "pending"], name="tenant_work_type_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant_id}: {self.work_type} ({self.pending})"
@@ -0,0 +1,167 @@
+"""
+Tests for the tenant work index (apps.tenants.work_index).
+
+Tests cover:
+1. Tenants without an index row are visited; idle tenants are skipped
+2. Writers bump the version and a stale task count is discarded
+3. Signals keep the index in sync after commit (sensors/devices by delta)
+"""
+
+import uuid
+
+from django.test import override_settings
+from django.utils import timezone
+
+from django_tenants.test.cases import TenantTestCase
+from django_tenants.utils import schema_context
+
+from apps.alerts.models import Rule
+from apps.assets.models import Asset, Device, Sensor, Site
+from apps.core_events.models import OutboxEvent
+from apps.tenants.models import Tenant, TenantWorkIndex, WorkType
+from apps.tenants.work_index import WorkIndexService
+
+
+class WorkIndexServiceTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        with schema_context("public"):
+            self.idle_tenant = Tenant.objects.create(
+                name="Idle Tenant", slug="idle-tenant", schema_name="idle_tenant"
+            )
+        site = Site.objects.create(name="Work Index Site")
+        self.asset = Asset.objects.create(tag="WI-001", site=site, asset_type="CHILLER")
+
+    def _row(self, tenant, work_type):
+        with schema_context("public"):
+            return TenantWorkIndex.objects.filter(
+                tenant=tenant, work_type=work_type
+            ).first()
+
+    def _active_schemas(self, work_type):
+        return {
+            tenant.schema_name for tenant in WorkIndexService.active_tenants(work_type)
+        }
+
+    def test_tenants_without_row_are_active(self):
+        active = self._active_schemas(WorkType.OUTBOX)
+
+        self.assertIn(self.tenant.schema_name, active)
+        self.assertIn(self.idle_tenant.schema_name, active)
+
+    def test_idle_tenants_are_skipped(self):
+        WorkIndexService.record(self.idle_tenant.schema_name, WorkType.OUTBOX, 0)
+        WorkIndexService.touch(self.tenant.schema_name, WorkType.OUTBOX, delta=1)
+
+        active = self._active_schemas(WorkType.OUTBOX)
+
+        self.assertIn(self.tenant.schema_name, active)
+        self.assertNotIn(self.idle_tenant.schema_name, active)
+
+    @override_settings(TENANT_WORK_INDEX_ENABLED=False)
+    def test_disabled_index_visits_all_tenants(self):
+        WorkIndexService.record(self.idle_tenant.schema_name, WorkType.OUTBOX, 0)
+
+        self.assertIn(
+            self.idle_tenant.schema_name, self._active_schemas(WorkType.OUTBOX)
+        )
+
+    def test_touch_increments_pending_and_version(self):
+        WorkIndexService.touch(self.tenant.schema_name, WorkType.OUTBOX, delta=1)
+        WorkIndexService.touch(self.tenant.schema_name, WorkType.OUTBOX, delta=2)
+
+        row = self._row(self.tenant, WorkType.OUTBOX)
+        self.assertEqual(row.pending, 3)
+        self.assertEqual(row.version, 2)
+
+    def test_record_discards_stale_count(self):
+        """A writer between listing and record keeps the tenant active."""
+        WorkIndexService.touch(self.tenant.schema_name, WorkType.OUTBOX, delta=1)
+        version = self._row(self.tenant, WorkType.OUTBOX).version
+
+        WorkIndexService.touch(self.tenant.schema_name, WorkType.OUTBOX, delta=1)
+        recorded = WorkIndexService.record(
+            self.tenant.schema_name, WorkType.OUTBOX, 0, version=version
+        )
+
+        self.assertFalse(recorded)
+        self.assertEqual(self._row(self.tenant, WorkType.OUTBOX).pending, 2)
+
+    def test_record_with_current_version(self):
+        WorkIndexService.touch(self.tenant.schema_name, WorkType.OUTBOX, delta=1)
+        version = self._row(self.tenant, WorkType.OUTBOX).version
+
+        recorded = WorkIndexService.record(
+            self.tenant.schema_name, WorkType.OUTBOX, 0, version=version
+        )
+
+        self.assertTrue(recorded)
+        self.assertNotIn(self.tenant.schema_name, self._active_schemas(WorkType.OUTBOX))
+
+    def test_refresh_counts_enabled_rules(self):
+        Rule.objects.create(name="Enabled", equipment=self.asset, enabled=True)
+        Rule.objects.create(name="Disabled", equipment=self.asset, enabled=False)
+
+        WorkIndexService.refresh(self.tenant.schema_name, WorkType.RULES)
+
+        self.assertEqual(self._row(self.tenant, WorkType.RULES).pending, 1)
+
+    def test_outbox_event_marks_tenant_after_commit(self):
+        WorkIndexService.record(self.tenant.schema_name, WorkType.OUTBOX, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OutboxEvent.objects.create(
+                tenant_id=uuid.uuid4(),
+                event_name="test.event",
+                aggregate_type="test",
+                aggregate_id=uuid.uuid4(),
+                occurred_at=timezone.now(),
+                payload={"data": {}},
+                idempotency_key=str(uuid.uuid4()),
+            )
+
+        self.assertIn(self.tenant.schema_name, self._active_schemas(WorkType.OUTBOX))
+
+    def test_rule_signal_refreshes_rule_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rule = Rule.objects.create(name="Rule", equipment=self.asset, enabled=True)
+        self.assertEqual(self._row(self.tenant, WorkType.RULES).pending, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.enabled = False
+            rule.save()
+        self.assertEqual(self._row(self.tenant, WorkType.RULES).pending, 0)
+        self.assertNotIn(self.tenant.schema_name, self._active_schemas(WorkType.RULES))
+
+    def test_sensor_signals_apply_deltas_without_recount(self):
+        WorkIndexService.record(self.tenant.schema_name, WorkType.SENSORS, 0)
+        device = Device.objects.create(
+            name="Gateway WI",
+            serial_number="SN-WI-001",
+            asset=self.asset,
+            mqtt_client_id="device-wi-001",
+            device_type="GATEWAY",
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sensor = Sensor.objects.create(
+                tag="temp-01", device=device, metric_type="temp_supply"
+            )
+        row = self._row(self.tenant, WorkType.SENSORS)
+        self.assertEqual(row.pending, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sensor.unit = "celsius"
+            sensor.save()
+        self.assertEqual(self._row(self.tenant, WorkType.SENSORS).version, row.version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sensor.is_active = False
+            sensor.save(update_fields=["is_active"])
+        self.assertEqual(self._row(self.tenant, WorkType.SENSORS).pending, 0)
+
+    def test_negative_delta_does_not_create_row(self):
+        WorkIndexService.touch(self.tenant.schema_name, WorkType.DEVICES, delta=-1)
+
+        self.assertIsNone(self._row(self.tenant, WorkType.DEVICES))
+        self.assertIn(self.tenant.schema_name, self._active_schemas(WorkType.DEVICES))
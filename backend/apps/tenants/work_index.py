@@ -0,0 +1,240 @@
+"""
+Tenant Work Index - quais tenants têm trabalho para as tasks periódicas.
+
+Os beats (dispatch da outbox, avaliação de regras, status de sensores e
+devices) percorriam todos os tenants e abriam um schema_context em cada um,
+mesmo sem nada a fazer. O TenantWorkIndex (schema público) guarda, por tenant
+e tipo de trabalho, quantos itens estão pendentes; ``active_tenants`` devolve
+numa única query só os tenants a visitar.
+
+Manutenção:
+- writers chamam ``touch`` (incremento/decremento, ex.: evento publicado,
+  sensor criado/desativado) ou ``refresh`` (recontagem, ex.: regra
+  habilitada/desabilitada) após o commit; toda escrita incrementa ``version``;
+- as tasks gravam a contagem encontrada na visita com ``record``, condicionada
+  à ``version`` lida em ``active_tenants``: se um writer escreveu no meio da
+  visita, a contagem da task é descartada e o tenant continua ativo;
+- tenants sem linha para o tipo (índice ainda não construído) são visitados,
+  e a primeira visita cria a linha.
+
+Com TENANT_WORK_INDEX_ENABLED=False as tasks voltam a visitar todos os tenants.
+"""
+
+import logging
+from typing import List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import OuterRef, Q, Subquery
+
+from django_tenants.utils import get_public_schema_name, schema_context
+
+from .models import Tenant, TenantWorkIndex, WorkType
+
+logger = logging.getLogger(__name__)
+
+# O que conta como pendente em cada tipo: (app_label, model, filtro)
+WORK_COUNTERS = {
+    WorkType.OUTBOX: ("core_events", "OutboxEvent", {"status": "pending"}),
+    WorkType.RULES: ("alerts", "Rule", {"enabled": True}),
+    WorkType.SENSORS: ("assets", "Sensor", {"is_active": True}),
+    WorkType.DEVICES: ("assets", "Device", {"is_active": True}),
+}
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "TENANT_WORK_INDEX_ENABLED", True)
+
+
+def count_pending(work_type: str) -> int:
+    """Conta os itens pendentes do tipo no schema atual."""
+    app_label, model_name, filters = WORK_COUNTERS[work_type]
+    return apps.get_model(app_label, model_name).objects.filter(**filters).count()
+
+
+def _tables():
+    public_schema = get_public_schema_name()
+    return (
+        f'"{public_schema}".{TenantWorkIndex._meta.db_table}',
+        f'"{public_schema}".{Tenant._meta.db_table}',
+    )
+
+
+class WorkIndexService:
+    """Leitura e manutenção do TenantWorkIndex (sempre no schema público)."""
+
+    @classmethod
+    def touch(
+        cls,
+        schema_name: str,
+        work_type: str,
+        pending: Optional[int] = None,
+        delta: int = 0,
+    ):
+        """
+        Escrita de um writer: grava ``pending`` (ou soma ``delta``) e
+        incrementa ``version``.
+
+        Um ``delta`` negativo só ajusta uma linha existente: sem linha o tenant
+        continua sendo visitado até a primeira contagem (``record``).
+        """
+        index_table, tenant_table = _tables()
+        if pending is None and delta < 0:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    UPDATE {index_table} SET
+                        pending = GREATEST(pending + %s, 0),
+                        version = version + 1,
+                        updated_at = now()
+                    WHERE work_type = %s
+                      AND tenant_id = (SELECT id FROM {tenant_table} WHERE schema_name = %s)
+                    """,
+                    [delta, work_type, schema_name],
+                )
+            return
+
+        if pending is None:
+            pending_sql = "GREATEST(idx.pending + EXCLUDED.pending, 0)"
+            value = max(delta, 0)
+        else:
+            pending_sql = "EXCLUDED.pending"
+            value = pending
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {index_table} AS idx
+                    (tenant_id, work_type, pending, version, updated_at)
+                SELECT id, %s, %s, 1, now() FROM {tenant_table} WHERE schema_name = %s
+                ON CONFLICT (tenant_id, work_type) DO UPDATE SET
+                    pending = {pending_sql},
+                    version = idx.version + 1,
+                    updated_at = now()
+                """,
+                [work_type, value, schema_name],
+            )
+
+    @classmethod
+    def refresh(cls, schema_name: str, work_type: str):
+        """
+        Reconta os itens do tipo no schema e grava o resultado.
+
+        A linha do índice é bloqueada (touch) antes da contagem, de modo que
+        refreshes concorrentes do mesmo tenant são serializados e o último
+        grava a contagem mais recente.
+        """
+        with transaction.atomic():
+            cls.touch(schema_name, work_type, delta=0)
+            with schema_context(schema_name):
+                pending = count_pending(work_type)
+            cls.touch(schema_name, work_type, pending=pending)
+
+    @classmethod
+    def touch_on_commit(
+        cls, schema_name: str, work_type: str, delta: Optional[int] = None
+    ):
+        """
+        Agenda ``touch`` (com ``delta``) ou ``refresh`` (sem ``delta``) para
+        depois do commit da transação atual. Falhas do índice não afetam o
+        writer: no pior caso o tenant fica sem visita até a próxima escrita.
+        """
+
+        def _update():
+            try:
+                if delta is None:
+                    cls.refresh(schema_name, work_type)
+                else:
+                    cls.touch(schema_name, work_type, delta=delta)
+            except Exception as e:
+                logger.warning(
+                    f"Could not update work index ({work_type}) for {schema_name}: {e}"
+                )
+
+        if not schema_name or schema_name == get_public_schema_name():
+            return
+        transaction.on_commit(_update)
+
+    @classmethod
+    def record(
+        cls,
+        schema_name: str,
+        work_type: str,
+        pending: int,
+        version: Optional[int] = None,
+    ) -> bool:
+        """
+        Grava a contagem encontrada por uma task que visitou o tenant.
+
+        Args:
+            version: ``work_version`` lida em active_tenants; a contagem só é
+                gravada se nenhum writer escreveu desde então. None = tenant
+                ainda sem linha (cria a linha se continuar sem).
+
+        Returns:
+            bool: True se a contagem foi gravada
+        """
+        try:
+            with transaction.atomic():
+                return cls._record(schema_name, work_type, pending, version)
+        except Exception as e:
+            logger.warning(
+                f"Could not record work index ({work_type}) for {schema_name}: {e}"
+            )
+            return False
+
+    @classmethod
+    def _record(
+        cls, schema_name: str, work_type: str, pending: int, version: Optional[int]
+    ) -> bool:
+        index_table, tenant_table = _tables()
+        with connection.cursor() as cursor:
+            if version is None:
+                cursor.execute(
+                    f"""
+                    INSERT INTO {index_table}
+                        (tenant_id, work_type, pending, version, updated_at)
+                    SELECT id, %s, %s, 0, now() FROM {tenant_table} WHERE schema_name = %s
+                    ON CONFLICT (tenant_id, work_type) DO NOTHING
+                    """,
+                    [work_type, pending, schema_name],
+                )
+            else:
+                cursor.execute(
+                    f"""
+                    UPDATE {index_table} SET pending = %s, updated_at = now()
+                    WHERE work_type = %s AND version = %s
+                      AND tenant_id = (SELECT id FROM {tenant_table} WHERE schema_name = %s)
+                    """,
+                    [pending, work_type, version, schema_name],
+                )
+            return cursor.rowcount > 0
+
+    @classmethod
+    def active_tenants(cls, work_type: str) -> List[Tenant]:
+        """
+        Tenants com trabalho do tipo (``pending > 0`` ou sem linha no índice).
+
+        Cada tenant vem anotado com ``work_version`` (None sem linha), a ser
+        repassada para ``record`` após a visita.
+        """
+        public_schema = get_public_schema_name()
+        index = TenantWorkIndex.objects.filter(
+            tenant=OuterRef("pk"), work_type=work_type
+        )
+
+        with schema_context(public_schema):
+            queryset = (
+                Tenant.objects.exclude(schema_name=public_schema)
+                .exclude(slug="public")
+                .annotate(
+                    work_pending=Subquery(index.values("pending")[:1]),
+                    work_version=Subquery(index.values("version")[:1]),
+                )
+            )
+            if is_enabled():
+                queryset = queryset.filter(
+                    Q(work_pending__isnull=True) | Q(work_pending__gt=0)
+                )
+            return list(queryset)
@@ -13,6 +13,7 @@ Regras de negócio:
 """
 
 import logging
+import uuid
 from decimal import Decimal
 from typing import Any, Dict, List, Optional, Union
 
@@ -94,6 +95,14 @@ def _resolve_asset(asset_id: Union[str, int, None]) -> Optional[int]:
     return None
 
 
+def _cost_center_key(cost_center_id: Any) -> Optional[str]:
+    """Chave canônica (UUID em texto) de um cost_center_id; None se inválido."""
+    try:
+        return str(uuid.UUID(str(cost_center_id)))
+    except ValueError:
+        return None
+
+
 class CostEngineError(Exception):
     """Erro base do Cost Engine."""
 
@@ -124,6 +133,7 @@ class CostEngineService:
         cls,
         event_data: Dict[str, Any],
         tenant_id: str,
+        cost_centers: Optional[Dict[str, Optional[CostCenter]]] = None,
     ) -> Dict[str, Any]:
         """
         Processa evento work_order.closed e cria lançamentos no ledger.
@@ -131,6 +141,8 @@ class CostEngineService:
         Args:
             event_data: Dados do evento (payload)
             tenant_id: ID do tenant
+            cost_centers: Cache de CostCenter por id (chave None = default),
+                preenchido por process_work_orders_closed
 
         Returns:
             Dict com resultado:
@@ -160,8 +172,16 @@ class CostEngineService:
             raise CostEngineError("asset_id é obrigatório")
 
         # Validar cost_center se fornecido
-        cost_center = None
-        if cost_center_id:
+        if cost_centers is not None:
+            cost_center = cost_centers.get(
+                _cost_center_key(cost_center_id) if cost_center_id else None
+            )
+            if cost_center is None and cost_center_id:
+                logger.warning(
+                    f"CostCenter {cost_center_id} não encontrado, usando default"
+                )
+                cost_center = cost_centers.get(None)
+        elif cost_center_id:
             try:
                 cost_center = CostCenter.objects.get(id=cost_center_id)
             except CostCenter.DoesNotExist:
@@ -252,6 +272,55 @@ class CostEngineService:
 
         return result
 
+    @classmethod
+    def process_work_orders_closed(
+        cls,
+        events_data: List[Dict[str, Any]],
+        tenant_id: str,
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Processa um lote de eventos work_order.closed do mesmo tenant.
+
+        Os CostCenters do lote (e o default) são carregados numa única query.
+        Cada OS roda no seu próprio atomic (savepoint dentro do lote): uma
+        falha não desfaz as demais.
+
+        Args:
+            events_data: Dados de cada evento (payload)
+            tenant_id: ID do tenant
+
+        Returns:
+            Lista alinhada com events_data: dict de resultado
+            (ver process_work_order_closed) ou a exceção da OS que falhou
+        """
+        cost_center_ids = {
+            _cost_center_key(data["cost_center_id"])
+            for data in events_data
+            if data.get("cost_center_id")
+        }
+        cost_centers: Dict[Optional[str], Optional[CostCenter]] = {
+            str(cost_center.id): cost_center
+            for cost_center in CostCenter.objects.filter(
+                id__in=[key for key in cost_center_ids if key]
+            )
+        }
+        cost_centers[None] = cls._get_default_cost_center()
+
+        results: List[Union[Dict[str, Any], Exception]] = []
+        for event_data in events_data:
+            try:
+                results.append(
+                    cls.process_work_order_closed(
+                        event_data=event_data,
+                        tenant_id=tenant_id,
+                        cost_centers=cost_centers,
+                    )
+                )
+            except Exception as e:
+                results.append(e)
+
+        return results
+
     @classmethod
     def _get_default_cost_center(cls) -> Optional[CostCenter]:
         """Retorna o primeiro CostCenter ativo como fallback."""
@@ -11,9 +11,12 @@ Referências:
 """
 
 import logging
+import uuid
+from collections import defaultdict
+from typing import Dict, List
 
 from apps.core_events.models import OutboxEvent
-from apps.core_events.tasks import register_event_handler
+from apps.core_events.tasks import register_batch_event_handler, register_event_handler
 
 from .cost_engine import CostEngineError, CostEngineService
 
@@ -64,6 +67,50 @@ def handle_work_order_closed(event: OutboxEvent) -> None:
         raise CostEngineError(f"Unexpected error: {e}") from e
 
 
+@register_batch_event_handler("work_order.closed")
+def handle_work_order_closed_batch(
+    events: List[OutboxEvent],
+) -> Dict[uuid.UUID, Exception]:
+    """
+    Versão em lote de handle_work_order_closed (process_outbox_batch).
+
+    Os CostCenters do lote são carregados uma única vez e cada OS roda no
+    seu próprio atomic; as OS que falharam são devolvidas em vez de
+    interromper o lote.
+
+    Args:
+        events: OutboxEvents work_order.closed do mesmo tenant
+
+    Returns:
+        dict: {event_id: CostEngineError} dos eventos que falharam
+    """
+    logger.info(f"Processing {len(events)} work_order.closed events in batch")
+
+    failures = {}
+    tenant_groups = defaultdict(list)
+    for event in events:
+        tenant_groups[str(event.tenant_id)].append(event)
+
+    for tenant_id, tenant_events in tenant_groups.items():
+        results = CostEngineService.process_work_orders_closed(
+            events_data=[event.event_data for event in tenant_events],
+            tenant_id=tenant_id,
+        )
+        for event, result in zip(tenant_events, results, strict=False):
+            if isinstance(result, CostEngineError):
+                logger.error(f"CostEngine error processing event {event.id}: {result}")
+                failures[event.id] = result
+            elif isinstance(result, Exception):
+                logger.error(f"Unexpected error processing event {event.id}: {result}")
+                failures[event.id] = CostEngineError(f"Unexpected error: {result}")
+
+    logger.info(
+        f"work_order.closed batch processed - "
+        f"events: {len(events)}, failed: {len(failures)}"
+    )
+    return failures
+
+
 @register_event_handler("commitment.approved")
 def handle_commitment_approved(event: OutboxEvent) -> None:
     """
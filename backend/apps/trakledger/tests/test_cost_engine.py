@@ -515,3 +515,72 @@ class CostEngineValidationTests(CostEngineTestCase):
         # Transaction should use default cost center (query by idempotency_key)
         tx = CostTransaction.objects.filter(idempotency_key=f"wo:{wo_id}:labor").first()
         self.assertEqual(tx.cost_center_id, self.cost_center.id)
+
+
+class CostEngineBatchTests(CostEngineTestCase):
+    """Tests for CostEngineService.process_work_orders_closed()"""
+
+    def test_batch_processes_each_work_order(self):
+        """Each work order in the batch should get its own transactions."""
+        wo_ids = [str(uuid.uuid4()) for _ in range(3)]
+        events_data = [{**self.event_data, "work_order_id": wo_id} for wo_id in wo_ids]
+
+        results = CostEngineService.process_work_orders_closed(
+            events_data=events_data,
+            tenant_id=self.tenant_id,
+        )
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result["success"] for result in results))
+        for wo_id in wo_ids:
+            self.assertTrue(
+                CostTransaction.objects.filter(
+                    idempotency_key=f"wo:{wo_id}:labor",
+                    cost_center=self.cost_center,
+                ).exists()
+            )
+
+    def test_batch_isolates_failures(self):
+        """An invalid work order should not roll back the rest of the batch."""
+        wo_id = str(uuid.uuid4())
+        events_data = [
+            {"asset_id": str(uuid.uuid4())},  # Missing work_order_id
+            {**self.event_data, "work_order_id": wo_id},
+        ]
+
+        results = CostEngineService.process_work_orders_closed(
+            events_data=events_data,
+            tenant_id=self.tenant_id,
+        )
+
+        self.assertIsInstance(results[0], CostEngineError)
+        self.assertTrue(results[1]["success"])
+        self.assertTrue(
+            CostTransaction.objects.filter(idempotency_key=f"wo:{wo_id}:labor").exists()
+        )
+
+    def test_batch_invalid_cost_center_uses_default(self):
+        """Unknown or malformed cost_center_id should fall back to the default."""
+        wo_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+        events_data = [
+            {
+                **self.event_data,
+                "work_order_id": wo_ids[0],
+                "cost_center_id": str(uuid.uuid4()),
+            },
+            {
+                **self.event_data,
+                "work_order_id": wo_ids[1],
+                "cost_center_id": "not-a-uuid",
+            },
+        ]
+
+        results = CostEngineService.process_work_orders_closed(
+            events_data=events_data,
+            tenant_id=self.tenant_id,
+        )
+
+        self.assertTrue(all(result["success"] for result in results))
+        for wo_id in wo_ids:
+            tx = CostTransaction.objects.get(idempotency_key=f"wo:{wo_id}:labor")
+            self.assertEqual(tx.cost_center_id, self.cost_center.id)
@@ -400,6 +400,123 @@ INGEST_SIGNATURE_MAX_SKEW_SECONDS = int(
     os.getenv("INGEST_SIGNATURE_MAX_SKEW_SECONDS", "300")
 )
 INGEST_REPLAY_TTL_SECONDS = int(os.getenv("INGEST_REPLAY_TTL_SECONDS", "600"))
+# Cache em processo (LRU + TTL) de tenant por slug e segredo HMAC por device
+INGEST_AUTH_CACHE_TTL_SECONDS = int(os.getenv("INGEST_AUTH_CACHE_TTL_SECONDS", "300"))
+INGEST_AUTH_NEGATIVE_CACHE_TTL_SECONDS = int(
+    os.getenv("INGEST_AUTH_NEGATIVE_CACHE_TTL_SECONDS", "5")
+)
+INGEST_TENANT_CACHE_SIZE = int(os.getenv("INGEST_TENANT_CACHE_SIZE", "1024"))
+INGEST_DEVICE_SECRET_CACHE_SIZE = int(
+    os.getenv("INGEST_DEVICE_SECRET_CACHE_SIZE", "10000")
+)
+# Máximo de mensagens aceitas por request em POST /ingest/batch
+INGEST_BATCH_MAX_MESSAGES = int(os.getenv("INGEST_BATCH_MAX_MESSAGES", "1000"))
+# Cache em processo da topologia Site/Asset/Device/Sensor usada no auto-vínculo
+INGEST_TOPOLOGY_CACHE_TTL_SECONDS = int(
+    os.getenv("INGEST_TOPOLOGY_CACHE_TTL_SECONDS", "300")
+)
+INGEST_TOPOLOGY_CACHE_VERSION_CHECK_SECONDS = int(
+    os.getenv("INGEST_TOPOLOGY_CACHE_VERSION_CHECK_SECONDS", "5")
+)
+# Write-behind de Sensor.last_value/last_reading_at (redis | memory)
+INGEST_LAST_VALUE_BACKEND = os.getenv("INGEST_LAST_VALUE_BACKEND", "redis")
+INGEST_LAST_VALUE_FLUSH_SECONDS = int(
+    os.getenv("INGEST_LAST_VALUE_FLUSH_SECONDS", "15")
+)
+# Modo assíncrono: /ingest só autentica e enfileira (Redis Stream); a
+# persistência é feita pela task ingest.consume_queue
+INGEST_QUEUE_MODE = os.getenv("INGEST_QUEUE_MODE", "False").lower() == "true"
+INGEST_QUEUE_BACKEND = os.getenv("INGEST_QUEUE_BACKEND", "redis")
+INGEST_QUEUE_MAX_DEPTH = int(os.getenv("INGEST_QUEUE_MAX_DEPTH", "100000"))
+INGEST_QUEUE_RETRY_AFTER_SECONDS = int(
+    os.getenv("INGEST_QUEUE_RETRY_AFTER_SECONDS", "5")
+)
+INGEST_QUEUE_BATCH_SIZE = int(os.getenv("INGEST_QUEUE_BATCH_SIZE", "500"))
+INGEST_QUEUE_CLAIM_IDLE_SECONDS = int(
+    os.getenv("INGEST_QUEUE_CLAIM_IDLE_SECONDS", "60")
+)
+# Entregas (XAUTOCLAIM) antes de mover a mensagem para o dead letter
+# ingest:stream:dead; 0 = sem limite
+INGEST_QUEUE_MAX_DELIVERIES = int(os.getenv("INGEST_QUEUE_MAX_DELIVERIES", "5"))
+INGEST_QUEUE_DEAD_LETTER_MAXLEN = int(
+    os.getenv("INGEST_QUEUE_DEAD_LETTER_MAXLEN", "100000")
+)
+INGEST_QUEUE_CONSUMER_BUDGET_SECONDS = int(
+    os.getenv("INGEST_QUEUE_CONSUMER_BUDGET_SECONDS", "20")
+)
+INGEST_QUEUE_CONSUME_INTERVAL_SECONDS = int(
+    os.getenv("INGEST_QUEUE_CONSUME_INTERVAL_SECONDS", "2")
+)
+
+# Alertas: avaliação em streaming a partir do ingest. Com ela ativa, a task
+# alerts.evaluate_rules vira apenas uma varredura periódica de segurança
+ALERTS_STREAMING_EVALUATION = (
+    os.getenv("ALERTS_STREAMING_EVALUATION", "False").lower() == "true"
+)
+ALERTS_RULE_INDEX_TTL_SECONDS = int(os.getenv("ALERTS_RULE_INDEX_TTL_SECONDS", "300"))
+ALERTS_SWEEP_INTERVAL_SECONDS = int(
+    os.getenv(
+        "ALERTS_SWEEP_INTERVAL_SECONDS", "900" if ALERTS_STREAMING_EVALUATION else "300"
+    )
+)
+# Avaliação periódica: tenants com mais regras que ALERTS_EVALUATION_SHARD_SIZE
+# são divididos em shards paralelos; cada avaliação tem um orçamento de tempo e
+# um novo ciclo não começa enquanto o anterior do mesmo tenant não terminar
+ALERTS_EVALUATION_SHARD_SIZE = int(os.getenv("ALERTS_EVALUATION_SHARD_SIZE", "200"))
+ALERTS_EVALUATION_MAX_SHARDS = int(os.getenv("ALERTS_EVALUATION_MAX_SHARDS", "8"))
+ALERTS_EVALUATION_BUDGET_SECONDS = int(
+    os.getenv("ALERTS_EVALUATION_BUDGET_SECONDS", "60")
+)
+ALERTS_EVALUATION_LOCK_TTL_SECONDS = int(
+    os.getenv("ALERTS_EVALUATION_LOCK_TTL_SECONDS", "600")
+)
+# Regras de anomalia (k·σ): linhas de base por sensor atualizadas a partir de
+# agregados horários de Reading (ver apps/alerts/services/anomaly.py)
+ALERTS_ANOMALY_EWMA_ALPHA = float(os.getenv("ALERTS_ANOMALY_EWMA_ALPHA", "0.1"))
+ALERTS_ANOMALY_SEASONAL_ALPHA = float(os.getenv("ALERTS_ANOMALY_SEASONAL_ALPHA", "0.2"))
+ALERTS_ANOMALY_MIN_HOURS = int(os.getenv("ALERTS_ANOMALY_MIN_HOURS", "24"))
+ALERTS_ANOMALY_SEASONAL_MIN_DAYS = int(
+    os.getenv("ALERTS_ANOMALY_SEASONAL_MIN_DAYS", "3")
+)
+ALERTS_ANOMALY_BACKFILL_DAYS = int(os.getenv("ALERTS_ANOMALY_BACKFILL_DAYS", "14"))
+
+# Notificações de alertas são enviadas por tasks (uma por canal); cada alerta
+# é despachado uma única vez dentro deste TTL
+ALERTS_NOTIFICATION_DEDUP_TTL_SECONDS = int(
+    os.getenv("ALERTS_NOTIFICATION_DEDUP_TTL_SECONDS", "86400")
+)
+
+# Limpeza diária: alertas resolvidos antigos são movidos em lotes para o
+# histórico (hypertable); o histórico além da retenção é descartado por chunk
+ALERTS_CLEANUP_CHUNK_SIZE = int(os.getenv("ALERTS_CLEANUP_CHUNK_SIZE", "1000"))
+ALERTS_HISTORY_RETENTION_DAYS = int(os.getenv("ALERTS_HISTORY_RETENTION_DAYS", "365"))
+
+# Outbox: eventos reservados pelo dispatcher não são reenfileirados enquanto
+# o lease vale (>= retry_backoff_max de process_outbox_event)
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "600"))
+# Com o outbox_listener (LISTEN/NOTIFY) os eventos são despachados no commit
+# e o beat vira só uma varredura de segurança
+OUTBOX_NOTIFY_ENABLED = os.getenv("OUTBOX_NOTIFY_ENABLED", "True").lower() == "true"
+OUTBOX_LISTENER_ENABLED = (
+    os.getenv("OUTBOX_LISTENER_ENABLED", "False").lower() == "true"
+)
+OUTBOX_SWEEP_INTERVAL_SECONDS = int(
+    os.getenv(
+        "OUTBOX_SWEEP_INTERVAL_SECONDS", "300" if OUTBOX_LISTENER_ENABLED else "30"
+    )
+)
+# > 1: o dispatcher enfileira uma task process_outbox_batch por lote de até N
+# eventos do tenant (handlers de lote amortizam queries); 0 = uma task por evento
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "0"))
+# Reserva particionada por agregado: eventos de um agregado são processados em
+# ordem (uma task por agregado) e agregados diferentes em paralelo
+OUTBOX_ORDERED_DISPATCH = os.getenv("OUTBOX_ORDERED_DISPATCH", "True").lower() == "true"
+
+# Tasks periódicas só visitam tenants com trabalho pendente no TenantWorkIndex
+# (apps.tenants.work_index); False = visitar todos os tenants
+TENANT_WORK_INDEX_ENABLED = (
+    os.getenv("TENANT_WORK_INDEX_ENABLED", "True").lower() == "true"
+)
 
 # Celery Configuration
 CELERY_BROKER_URL = REDIS_URL
@@ -436,10 +553,26 @@ CELERY_BEAT_SCHEDULE = {
             "expires": 300,
         },
     },
-    # Avaliar regras de alertas a cada 5 minutos
+    # Gravar últimas leituras do ingest (write-behind) em Sensor/Device
+    "flush-ingest-last-values": {
+        "task": "ingest.flush_last_values",
+        "schedule": float(INGEST_LAST_VALUE_FLUSH_SECONDS),
+        "options": {
+            "expires": INGEST_LAST_VALUE_FLUSH_SECONDS,
+        },
+    },
+    # Retenção/compressão de telemetry e reading por tenant (diário)
+    "apply-ingest-storage-policies": {
+        "task": "ingest.apply_storage_policies",
+        "schedule": 86400.0,  # 24 horas em segundos
+        "options": {
+            "expires": 3600,  # Expira em 1 hora se não executar
+        },
+    },
+    # Avaliar regras de alertas (5 min; varredura de 15 min em modo streaming)
     "evaluate-alert-rules": {
         "task": "alerts.evaluate_rules",
-        "schedule": 300.0,  # 5 minutos em segundos
+        "schedule": float(ALERTS_SWEEP_INTERVAL_SECONDS),
         "options": {
             "expires": 60,  # Expira em 1 minuto se não executar
         },
@@ -452,10 +585,11 @@ CELERY_BEAT_SCHEDULE = {
             "expires": 3600,  # Expira em 1 hora se não executar
         },
     },
-    # Despachar eventos pendentes da Outbox a cada 30 segundos
+    # Despachar eventos pendentes da Outbox (30 s; varredura de 5 min com o
+    # outbox_listener)
     "dispatch-outbox-events": {
         "task": "apps.core_events.tasks.dispatch_pending_events",
-        "schedule": 30.0,  # 30 segundos
+        "schedule": float(OUTBOX_SWEEP_INTERVAL_SECONDS),
         "options": {
             "expires": 25,  # Expira em 25 segundos se não executar
         },
@@ -471,6 +605,16 @@ CELERY_BEAT_SCHEDULE = {
     },
 }
 
+# Consumir a fila assíncrona de ingest (apenas com INGEST_QUEUE_MODE)
+if INGEST_QUEUE_MODE:
+    CELERY_BEAT_SCHEDULE["consume-ingest-queue"] = {
+        "task": "ingest.consume_queue",
+        "schedule": float(INGEST_QUEUE_CONSUME_INTERVAL_SECONDS),
+        "options": {
+            "expires": INGEST_QUEUE_CONSUME_INTERVAL_SECONDS * 5,
+        },
+    }
+
 # MinIO / S3
 MINIO_ENDPOINT = os.getenv("MINIO_ENDPOINT", "minio:9000")
 MINIO_ACCESS_KEY = os.getenv("MINIO_ACCESS_KEY")
@@ -88,6 +88,10 @@ CACHES = {
     }
 }
 
+# Ingest write-behind store in process memory (no Redis in tests)
+INGEST_LAST_VALUE_BACKEND = "memory"
+INGEST_QUEUE_BACKEND = "memory"
+
 # Celery configuration for tests (run tasks synchronously)
 CELERY_TASK_ALWAYS_EAGER = True
 CELERY_TASK_EAGER_PROPAGATES = True
@@ -17,6 +17,8 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from apps.ingest.views import BatchIngestView
+
 urlpatterns = [
     # Observability endpoints (no auth required)
     path("", include("apps.common.observability.urls")),
@@ -37,6 +39,7 @@ urlpatterns = [
     # Telemetry API (tenant-specific data)
     path("api/telemetry/", include("apps.ingest.api_urls")),
     # EMQX Webhook (tenant or public schema)
+    path("ingest/batch", BatchIngestView.as_view(), name="ingest-batch"),
     path("ingest", include("apps.ingest.urls")),
     # Alerts & Rules API (tenant-specific data)
     path("api/alerts/", include("apps.alerts.urls")),
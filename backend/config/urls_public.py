@@ -20,6 +20,7 @@ from apps.accounts.views_password_reset import (
 from apps.accounts.views_team import PublicInviteAcceptView, PublicInviteValidateView
 from apps.common.health import health_check
 from apps.common.admin_site import climatrak_admin_site, register_all_models
+from apps.ingest.views import BatchIngestView
 
 # Registrar todos os modelos no admin site customizado
 register_all_models()
@@ -34,6 +35,7 @@ urlpatterns = [
     # Health check
     path("health", health_check, name="health"),
     # MQTT Ingest (called by EMQX without tenant domain)
+    path("ingest/batch", BatchIngestView.as_view(), name="ingest-batch"),
     path("ingest", include("apps.ingest.urls")),
     # ==========================================================================
     # 🔐 NEW Centralized Authentication (public_identity app)
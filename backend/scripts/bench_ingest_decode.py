@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark do decode do corpo de ingest (envelope EMQX + SenML Khomp).
+
+Compara o caminho antigo (bytes -> str -> json.loads do envelope e de novo
+json.loads do payload interno, seguido de json.dumps para gravar em
+Telemetry.payload) com o caminho atual (apps.ingest.decoding.loads direto dos
+bytes e payload interno decodificado uma única vez, gravado como texto
+original).
+
+Não depende de Django nem de banco:
+
+    python scripts/bench_ingest_decode.py [--sensors 12] [--number 20000]
+"""
+
+import argparse
+import json
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from apps.ingest import decoding  # noqa: E402
+
+
+def build_body(sensors):
+    senml = [{"bn": "F80332010002C873", "bt": int(time.time())}]
+    for i in range(sensors):
+        senml.append({"n": f"temperatura_{i}", "u": "Cel", "v": 21.5 + i / 10})
+        senml.append({"n": f"umidade_{i}", "u": "%RH", "v": 55.0 + i / 10})
+    senml.append({"n": "rssi", "u": "dBW", "v": -61})
+    envelope = {
+        "client_id": "F80332010002C873",
+        "topic": "tenants/umc/sites/Site A/assets/CHILLER-001/telemetry",
+        "payload": json.dumps(senml),
+        "ts": int(time.time() * 1000),
+    }
+    return json.dumps(envelope).encode("utf-8")
+
+
+def legacy_path(body):
+    data = json.loads(body.decode("utf-8"))
+    payload = json.loads(data["payload"])
+    # Khomp re-decodificava o payload interno no parser
+    json.loads(data["payload"])
+    return json.dumps(payload)
+
+
+def current_path(body):
+    data = decoding.loads(body)
+    raw_payload = data["payload"]
+    decoding.loads(raw_payload)
+    return raw_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sensors", type=int, default=12)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    body = build_body(args.sensors)
+    backend = "orjson" if decoding.orjson is not None else "json (stdlib)"
+    print(
+        f"Corpo: {len(body)} bytes, {args.sensors * 2 + 1} medições, backend: {backend}"
+    )
+
+    results = {}
+    for name, func in (("legado", legacy_path), ("atual", current_path)):
+        timings = timeit.repeat(
+            lambda func=func: func(body), number=args.number, repeat=args.repeat
+        )
+        per_msg_us = min(timings) / args.number * 1_000_000
+        results[name] = per_msg_us
+        print(f"{name:>7}: {per_msg_us:8.2f} µs/mensagem")
+
+    print(f"Ganho: {results['legado'] / results['atual']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()